@@ -1,13 +1,44 @@
 """Implements NPC opponent algorithms."""
-import copy
-from random import randint
-from typing import Literal
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Tuple
 
+import numpy as np
+
+from bitboard import (
+    BitboardLayout, bitboards_to_planes, board_to_bitboards, get_layout,
+    get_move_bit, get_playable_columns, has_n_in_a_row, popcount_array
+)
 from components import Board
-from constants import NUM_IN_A_ROW_TO_WIN
+from constants import (
+    ENDGAME_TABLEBASE_PATH, NUM_IN_A_ROW_TO_WIN, VALUE_POLICY_WEIGHTS_PATH
+)
+from metrics import MOVE_METRICS
+from threats import (
+    get_immediate_threats, get_non_losing_moves, get_odd_row_mask,
+    get_playable_cells, get_winning_cells, get_winning_cells_array,
+    popcount
+)
+from transposition import (
+    EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable, get_position_key
+)
+
+if TYPE_CHECKING:
+    from tablebase import Tablebase, TablebaseEntry
+    from value_network import ValuePolicyNetwork
 
 PLAYER_2_VALUE = 2
 
+# loaded on first use by `get_value_policy_network`.
+VALUE_POLICY_NETWORK = None
+# set once there turned out to be no weights to load, so that they aren't
+# looked for again on every move.
+HAS_NO_VALUE_POLICY_WEIGHTS = False
+# loaded on first use by `get_endgame_tablebase`.
+ENDGAME_TABLEBASE = None
+
 # maps tuple of player (1 vs. 2) plus how many in a row for that player
 # ([0, 4]) to a score. Done from PoV of AI player (P2), so P2 moves have
 # positive evaluation and P1 moves have negative evaluation. These values
@@ -26,13 +57,45 @@ ALPHA_BETA_STATE_SCORES = {
     (2, 4): 100
 }
 
+# how many moves ahead `make_move_alpha_beta_pruning` searches.
+ALPHA_BETA_SEARCH_DEPTH = 6
+# with this many empty cells or fewer, search to the end of the game.
+ENDGAME_SOLVE_NUM_EMPTY_CELLS = 12
+
+# scores used by the bitboard search. A win is worth `WIN_SCORE` minus the
+# number of pieces on the board once it's won; heuristic scores stay far
+# below that.
+WIN_SCORE = 1000
+THREAT_SCORE = 5
+GOOD_THREAT_SCORE = 10
+CENTER_SCORE = 1
+# any score above this is a win (found by search, not by the heuristic).
+MIN_WIN_SCORE = WIN_SCORE - 100
+
+# how often (in nodes) a search checks whether it has been told to stop.
+STOP_CHECK_INTERVAL_NUM_NODES = 256
+
+# half-width of the window that iterative deepening searches around the
+# score of the previous iteration (see `iterative_deepening_search`): about
+# two threats.
+ASPIRATION_WINDOW = 2 * THREAT_SCORE
+
+# kept between moves (and shared with pondering, see `ponder.py`).
+ALPHA_BETA_TRANSPOSITION_TABLE = TranspositionTable()
 
-def make_move_naive(board: Board):
-    """Randomly picks next available move on board."""
+
+def make_move_naive(board: Board, rng: Optional[random.Random] = None):
+    """Randomly picks next available move on board.
+
+    Args:
+        rng (random.Random | None): picks the move. The `random` module if
+        None.
+    """
+    rng = rng or random
     num_cols = board.num_columns
     has_made_next_move = False
     while not has_made_next_move:
-        rand_colnum = randint(0, num_cols - 1)
+        rand_colnum = rng.randint(0, num_cols - 1)
         next_valid_move = board.get_next_valid_row_in_column(
             col_num=rand_colnum
         )
@@ -50,88 +113,659 @@ def score_game_state(board: Board, player: Literal[1, 2]):
     if len(max_num_in_a_row_dict.keys()) == 0:
         return 0
 
-    max_in_a_row_num = max_num_in_a_row_dict.keys()[0]
-    player = max_num_in_a_row_dict[max_in_a_row_num]
+    max_in_a_row_num, players = next(iter(max_num_in_a_row_dict.items()))
+    if player not in players:
+        player = players[0]
 
     return ALPHA_BETA_STATE_SCORES[(player, max_in_a_row_num)]
 
 
-def make_move_alpha_beta_pruning(board: Board):
-    """Uses alpha-beta pruning to determine next move."""
-    dict_next_valid_moves = board.get_dict_next_valid_moves()
-    move_tuples_list = []
-    for col, row in dict_next_valid_moves.items():
-        move_tuples_list.append([row, col])
-
-    # check if any moves can result in an immediate win for you. If so,
-    # make that move.
-    for (row, col) in move_tuples_list:
-        # make deepcopy of board
-        test_board = copy.deepcopy(board)
-        test_board[row, col] = PLAYER_2_VALUE
-        is_game_over, winner = test_board.is_game_over()
-        if is_game_over and winner == PLAYER_2_VALUE:
-            board[row, col] = PLAYER_2_VALUE
-
-    # assume that AI is doing the max step and that the human player will be
-    # doing the min step.
-
-    def _max_value(
-        scored_game: int, alpha: int, beta: int,
-        is_player_two_turn: bool = True
-    ):
-        """Perform 'max' step in minimax algorithm."""
-        test_board = copy.deepcopy(board)
-        value = -999
-        dict_next_valid_moves = board.get_dict_next_valid_moves()
-        move_tuples_list = []
-        for col, row in dict_next_valid_moves.items():
-            move_tuples_list.append([row, col])
-
-        for (row, col) in move_tuples_list:
-            test_board[row, col] = 2 if is_player_two_turn else 1
-            scored_game = score_game_state(test_board)
-            value = max(value, _min_value(scored_game, alpha, beta))
-            if value >= beta:
-                return value
-            beta = max(alpha, value)
-        return value
-
-    def _min_value(
-        scored_game: int, alpha: int, beta: int,
-        is_player_two_turn: bool = False
+def get_column_order(num_columns: int) -> List[int]:
+    """Columns ordered from the center outwards. Central moves take part in
+    more lines, so trying them first makes alpha-beta prune more."""
+    return sorted(
+        range(num_columns),
+        key=lambda col_num: abs(2 * col_num - (num_columns - 1))
+    )
+
+
+def get_good_row_masks(layout: BitboardLayout) -> Tuple[int, int]:
+    """Rows whose threats favor Player 1 and Player 2, respectively."""
+    odd_row_mask = get_odd_row_mask(layout)
+    return odd_row_mask, layout.board_mask & ~odd_row_mask
+
+
+def get_center_mask(layout: BitboardLayout) -> int:
+    """Cells in the two central columns."""
+    center_mask = 0
+    for col_num in get_column_order(layout.num_columns)[:2]:
+        center_mask |= layout.column_masks[col_num]
+    return center_mask
+
+
+def evaluate_position(
+    current_pieces: int, mask: int, layout: BitboardLayout
+) -> int:
+    """Heuristic score of a position, from the point of view of the player
+    to move.
+
+    Counts each player's threats, with a bonus for threats whose row parity
+    favors their owner (see `threats.py`), and a small bonus for pieces in
+    the central columns.
+    """
+    opponent_pieces = current_pieces ^ mask
+    player_1_good_rows, player_2_good_rows = get_good_row_masks(layout)
+    if popcount(mask) % 2 == 0:
+        current_good_rows, opponent_good_rows = (
+            player_1_good_rows, player_2_good_rows
+        )
+    else:
+        current_good_rows, opponent_good_rows = (
+            player_2_good_rows, player_1_good_rows
+        )
+
+    current_threats = get_winning_cells(current_pieces, mask, layout)
+    opponent_threats = get_winning_cells(opponent_pieces, mask, layout)
+    center_mask = get_center_mask(layout)
+
+    return (
+        THREAT_SCORE * (
+            popcount(current_threats) - popcount(opponent_threats)
+        )
+        + GOOD_THREAT_SCORE * (
+            popcount(current_threats & current_good_rows)
+            - popcount(opponent_threats & opponent_good_rows)
+        )
+        + CENTER_SCORE * (
+            popcount(current_pieces & center_mask)
+            - popcount(opponent_pieces & center_mask)
+        )
+    )
+
+
+def evaluate_positions(
+    current_pieces_array: np.ndarray,
+    mask_array: np.ndarray,
+    layout: BitboardLayout
+) -> np.ndarray:
+    """Vectorized `evaluate_position`, over uint64 arrays of positions.
+
+    Gives the same scores as `evaluate_position`, for a whole batch of
+    positions in one pass.
+    """
+    current_pieces_array = np.asarray(current_pieces_array, dtype=np.uint64)
+    mask_array = np.asarray(mask_array, dtype=np.uint64)
+    opponent_pieces_array = current_pieces_array ^ mask_array
+
+    player_1_good_rows, player_2_good_rows = (
+        np.uint64(rows) for rows in get_good_row_masks(layout)
+    )
+    is_player_1_to_move = popcount_array(mask_array) % 2 == 0
+    current_good_rows = np.where(
+        is_player_1_to_move, player_1_good_rows, player_2_good_rows
+    )
+    opponent_good_rows = np.where(
+        is_player_1_to_move, player_2_good_rows, player_1_good_rows
+    )
+
+    current_threats = get_winning_cells_array(
+        current_pieces_array, mask_array, layout
+    )
+    opponent_threats = get_winning_cells_array(
+        opponent_pieces_array, mask_array, layout
+    )
+    center_mask = np.uint64(get_center_mask(layout))
+
+    return (
+        THREAT_SCORE * (
+            popcount_array(current_threats) - popcount_array(opponent_threats)
+        )
+        + GOOD_THREAT_SCORE * (
+            popcount_array(current_threats & current_good_rows)
+            - popcount_array(opponent_threats & opponent_good_rows)
+        )
+        + CENTER_SCORE * (
+            popcount_array(current_pieces_array & center_mask)
+            - popcount_array(opponent_pieces_array & center_mask)
+        )
+    )
+
+
+class SearchAborted(Exception):
+    """Raised inside a search that has been told to stop."""
+
+
+class SearchContext:
+    """State shared by every node of a search: the board layout, an
+    optional transposition table and endgame tablebase, the number of nodes
+    searched and the conditions for stopping early (a stop event, a
+    deadline or a node budget)."""
+
+    def __init__(
+        self,
+        layout: BitboardLayout,
+        transposition_table: Optional[TranspositionTable] = None,
+        stop_event: Optional[threading.Event] = None,
+        deadline: Optional[float] = None,
+        tablebase: Optional["Tablebase"] = None,
+        use_principal_variation_search: bool = True,
+        max_num_nodes: Optional[int] = None
     ):
-        """Performs 'min' step in minimax algorithm."""
-        test_board = copy.deepcopy(board)
-        value = 999
-        dict_next_valid_moves = board.get_dict_next_valid_moves()
-        move_tuples_list = []
-        for col, row in dict_next_valid_moves.items():
-            move_tuples_list.append([row, col])
-
-        for (row, col) in move_tuples_list:
-            test_board[row, col] = 2 if is_player_two_turn else 1
-            scored_game = score_game_state(test_board)
-            value = min(value, _max_value(scored_game, alpha, beta))
-            if value <= alpha:
-                return value
-            beta = min(beta, value)
-        return value
-
-    # implement alpha-beta search
-    best_score = -999
-    beta = 999
-    best_move_row_col = (None, None)
-
-    for (row, col) in move_tuples_list:
-        value = _min_value(board, best_score, beta)
-        if value > best_score:
-            best_score = value
-            best_move_row_col = (row, col)
-
-    board[best_move_row_col[0], best_move_row_col[1]] = PLAYER_2_VALUE
-
-
-def make_move_deep_q_learning(board: Board):
-    """Uses deep Q learning in order to make next available move."""
-    pass
+        self.layout = layout
+        self.transposition_table = transposition_table
+        # only consulted if it was generated for this board size.
+        self.tablebase = (
+            tablebase if tablebase is not None and tablebase.layout == layout
+            else None
+        )
+        self.stop_event = stop_event
+        # compared against `time.perf_counter()`.
+        self.deadline = deadline
+        self.column_order = get_column_order(layout.num_columns)
+        # if False, every move is searched with the full window (see
+        # `search_moves`).
+        self.use_principal_variation_search = use_principal_variation_search
+        # checked at every node, so that no search goes over it.
+        self.max_num_nodes = max_num_nodes
+        self.num_nodes = 0
+        # whether the deadline stopped the search: if not, the search went
+        # the same as it would have without one.
+        self.is_past_deadline = False
+
+    def count_node(self):
+        """Counts a searched node. Raises `SearchAborted` instead once the
+        node budget is spent and, every so often, checks whether the search
+        should stop for any other reason."""
+        if self.max_num_nodes is not None and (
+            self.num_nodes >= self.max_num_nodes
+        ):
+            raise SearchAborted()
+        self.num_nodes += 1
+        if self.num_nodes % STOP_CHECK_INTERVAL_NUM_NODES:
+            return
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchAborted()
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            self.is_past_deadline = True
+            raise SearchAborted()
+
+
+def get_tablebase_score(entry: "TablebaseEntry", num_moves: int) -> int:
+    """Converts a tablebase result into a search score (see `negamax`)."""
+    if entry.result == 0:
+        return 0
+    score = WIN_SCORE - (num_moves + entry.distance)
+    return score if entry.result > 0 else -score
+
+
+def _order_columns(
+    column_order: List[int], first_col_num: Optional[int]
+) -> List[int]:
+    """Moves `first_col_num` (e.g. the best move found by an earlier
+    search) to the front of `column_order`."""
+    if first_col_num is None:
+        return column_order
+    return [first_col_num] + [
+        col_num for col_num in column_order if col_num != first_col_num
+    ]
+
+
+def search_moves(
+    current_pieces: int,
+    mask: int,
+    moves: int,
+    depth: int,
+    alpha: int,
+    beta: int,
+    first_col_num: Optional[int],
+    context: SearchContext
+) -> Tuple[Optional[int], int]:
+    """Searches the given moves of the player to move with principal
+    variation search, `first_col_num` first and then from the center out.
+
+    The first move is searched with the full (alpha, beta) window. Every
+    later move is first searched with a null window around alpha, which
+    only tells whether it beats the best move so far; only moves that do
+    are searched again with the full window. With good move ordering, most
+    moves fail the null-window search, which prunes far more than a full
+    window.
+
+    Args:
+        moves (int): a bit set on the landing cell of every move to search.
+
+    Returns:
+        best_col_num (int | None): the best move, or None if there are no
+        moves.
+        value (int): its score: exact if it's within (alpha, beta), and
+        otherwise a bound, as in `negamax`.
+    """
+    layout = context.layout
+    opponent_pieces = current_pieces ^ mask
+    value = -WIN_SCORE
+    best_col_num = None
+    for col_num in _order_columns(context.column_order, first_col_num):
+        move_bit = moves & layout.column_masks[col_num]
+        if not move_bit:
+            continue
+        next_mask = mask | move_bit
+        if best_col_num is None or not (
+            context.use_principal_variation_search
+        ):
+            score = -negamax(
+                opponent_pieces, next_mask, depth - 1, -beta, -alpha, context
+            )
+        else:
+            score = -negamax(
+                opponent_pieces, next_mask, depth - 1, -alpha - 1, -alpha,
+                context
+            )
+            if alpha < score < beta:
+                score = -negamax(
+                    opponent_pieces, next_mask, depth - 1, -beta, -alpha,
+                    context
+                )
+        if best_col_num is None or score > value:
+            value = score
+            best_col_num = col_num
+        if value > alpha:
+            alpha = value
+        if alpha >= beta:
+            break
+    return best_col_num, value
+
+
+def negamax(
+    current_pieces: int,
+    mask: int,
+    depth: int,
+    alpha: int,
+    beta: int,
+    context: SearchContext
+) -> int:
+    """Alpha-beta search, in negamax form, from the point of view of the
+    player to move.
+
+    Wins score `WIN_SCORE` minus the number of pieces on the board once the
+    game is won, so that faster wins score higher. Children are pruned with
+    the threat masks before recursing: an immediate win ends the search,
+    and only non-losing moves are searched (see `search_moves`).
+    Positions in the context's endgame tablebase, if any, are scored
+    exactly without searching.
+    Results are stored in (and read back from) the context's transposition
+    table, if any.
+    """
+    context.count_node()
+    layout = context.layout
+    if mask == layout.board_mask:
+        return 0
+
+    num_moves = popcount(mask)
+    if get_immediate_threats(current_pieces, mask, layout):
+        return WIN_SCORE - (num_moves + 1)
+
+    non_losing_moves = get_non_losing_moves(current_pieces, mask, layout)
+    if not non_losing_moves:
+        # whatever we play, the opponent wins on their next move.
+        return -(WIN_SCORE - (num_moves + 2))
+
+    if context.tablebase is not None:
+        tablebase_entry = context.tablebase.probe_position(
+            current_pieces, mask
+        )
+        if tablebase_entry is not None:
+            return get_tablebase_score(tablebase_entry, num_moves)
+
+    if depth == 0:
+        return evaluate_position(current_pieces, mask, layout)
+
+    transposition_table = context.transposition_table
+    original_alpha = alpha
+    previous_best_col_num = None
+    if transposition_table is not None:
+        key = get_position_key(current_pieces, mask)
+        entry = transposition_table.get(key)
+        if entry is not None:
+            previous_best_col_num = entry.best_col_num
+            if entry.depth >= depth:
+                if entry.flag == EXACT:
+                    return entry.score
+                if entry.flag == LOWER_BOUND:
+                    alpha = max(alpha, entry.score)
+                else:
+                    beta = min(beta, entry.score)
+                if alpha >= beta:
+                    return entry.score
+
+    best_col_num, value = search_moves(
+        current_pieces, mask, non_losing_moves, depth, alpha, beta,
+        previous_best_col_num, context
+    )
+
+    if transposition_table is not None:
+        if value <= original_alpha:
+            flag = UPPER_BOUND
+        elif value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        transposition_table.store(key, depth, value, flag, best_col_num)
+    return value
+
+
+def search_root(
+    current_pieces: int,
+    mask: int,
+    depth: int,
+    context: SearchContext,
+    alpha: int = -WIN_SCORE,
+    beta: int = WIN_SCORE
+) -> Tuple[Optional[int], int]:
+    """Searches every move of the player to move, with a given context (see
+    `search_best_move`).
+
+    With a narrower window than the default, a score at or below `alpha`
+    (or at or above `beta`) is only a bound, and the move that comes with
+    it isn't reliable: the caller should search again with a wider window
+    (see `iterative_deepening_search`).
+    """
+    layout = context.layout
+    num_empty_cells = popcount(layout.board_mask & ~mask)
+    if num_empty_cells == 0:
+        return None, 0
+    if num_empty_cells <= ENDGAME_SOLVE_NUM_EMPTY_CELLS:
+        depth = max(depth, num_empty_cells)
+
+    num_moves = popcount(mask)
+    winning_moves = get_immediate_threats(current_pieces, mask, layout)
+    non_losing_moves = get_non_losing_moves(current_pieces, mask, layout)
+    if winning_moves or not non_losing_moves:
+        # either we win now or we lose whatever we play: no need to search.
+        candidate_moves = winning_moves or get_playable_cells(mask, layout)
+        for col_num in context.column_order:
+            if candidate_moves & layout.column_masks[col_num]:
+                if winning_moves:
+                    return col_num, WIN_SCORE - (num_moves + 1)
+                return col_num, -(WIN_SCORE - (num_moves + 2))
+
+    if context.tablebase is not None:
+        tablebase_entry = context.tablebase.probe_position(
+            current_pieces, mask
+        )
+        if tablebase_entry is not None:
+            return (
+                tablebase_entry.best_col_num,
+                get_tablebase_score(tablebase_entry, num_moves)
+            )
+
+    transposition_table = context.transposition_table
+    previous_best_col_num = None
+    if transposition_table is not None:
+        key = get_position_key(current_pieces, mask)
+        entry = transposition_table.get(key)
+        if entry is not None:
+            previous_best_col_num = entry.best_col_num
+            # already searched at least this deep, e.g. while pondering.
+            if (
+                entry.depth >= depth and entry.flag == EXACT
+                and entry.best_col_num is not None
+            ):
+                return entry.best_col_num, entry.score
+
+    context.count_node()
+    best_col_num, best_score = search_moves(
+        current_pieces, mask, non_losing_moves, depth, alpha, beta,
+        previous_best_col_num, context
+    )
+
+    if transposition_table is not None:
+        if best_score <= alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        transposition_table.store(key, depth, best_score, flag, best_col_num)
+    return best_col_num, best_score
+
+
+def score_root_moves(
+    current_pieces: int,
+    mask: int,
+    depth: int,
+    context: SearchContext,
+    proved_scores: Optional[Dict[int, int]] = None
+) -> Dict[int, int]:
+    """Scores every move of the player to move, searched `depth` moves
+    ahead.
+
+    Unlike `search_root`, which only proves which move is best, every move
+    is searched with the full window, so that every score is exact: this
+    costs more nodes, but lets a caller pick among good moves (see
+    `strength.py`) or show every move's score (see `analysis.py`).
+
+    Args:
+        proved_scores (Dict[int, int] | None): scores of moves already
+        proved to win or lose, e.g. by a shallower search, which deeper
+        searches can't change: those moves aren't searched again.
+
+    Returns:
+        (Dict[int, int]): the score of every playable column (see
+        `negamax`), in the context's column order.
+    """
+    layout = context.layout
+    num_empty_cells = popcount(layout.board_mask & ~mask)
+    if num_empty_cells <= ENDGAME_SOLVE_NUM_EMPTY_CELLS:
+        depth = max(depth, num_empty_cells)
+
+    num_moves = popcount(mask)
+    winning_moves = get_immediate_threats(current_pieces, mask, layout)
+    non_losing_moves = get_non_losing_moves(current_pieces, mask, layout)
+    opponent_pieces = current_pieces ^ mask
+    scores = {}
+    for col_num in context.column_order:
+        if mask & layout.top_masks[col_num]:
+            continue
+        move_bit = get_move_bit(mask, col_num, layout)
+        if proved_scores is not None and col_num in proved_scores:
+            scores[col_num] = proved_scores[col_num]
+        elif winning_moves & move_bit:
+            scores[col_num] = WIN_SCORE - (num_moves + 1)
+        elif not non_losing_moves & move_bit:
+            # the opponent wins on their next move.
+            scores[col_num] = -(WIN_SCORE - (num_moves + 2))
+        else:
+            scores[col_num] = -negamax(
+                opponent_pieces, mask | move_bit, depth - 1, -WIN_SCORE,
+                WIN_SCORE, context
+            )
+    return scores
+
+
+def search_best_move(
+    current_pieces: int,
+    mask: int,
+    depth: int,
+    layout: BitboardLayout,
+    transposition_table: Optional[TranspositionTable] = None,
+    tablebase: Optional["Tablebase"] = None
+) -> Tuple[Optional[int], int]:
+    """Finds the best column for the player to move.
+
+    Once few enough empty cells are left, the search depth is extended so
+    that the rest of the game is solved exactly.
+
+    Returns:
+        best_col_num (int | None): the column to play, or None if the board
+        is full.
+        best_score (int): the score of that column (see `negamax`).
+    """
+    context = SearchContext(
+        layout=layout,
+        transposition_table=transposition_table,
+        tablebase=tablebase
+    )
+    return search_root(current_pieces, mask, depth, context)
+
+
+def iterative_deepening_search(
+    current_pieces: int,
+    mask: int,
+    max_depth: int,
+    context: SearchContext,
+    aspiration_window: int = ASPIRATION_WINDOW
+) -> Tuple[Optional[int], int, int]:
+    """Searches one move deeper at a time, until `max_depth` or until the
+    context says to stop.
+
+    With a transposition table, each iteration reuses the results (and best
+    moves, for move ordering) of the previous ones.
+
+    Every iteration after the first searches a window of
+    `aspiration_window` on either side of the previous iteration's score
+    (the full window if 0), which prunes more as long as the score doesn't
+    change much. If the score falls outside of the window, that side of
+    the window is opened up and the iteration is searched again.
+
+    Returns:
+        best_col_num (int | None): the best column found by the deepest
+        completed iteration, or None if none completed.
+        best_score (int): its score.
+        depth (int): the deepest completed iteration.
+    """
+    best_col_num, best_score, completed_depth = None, 0, 0
+    num_empty_cells = popcount(context.layout.board_mask & ~mask)
+    for depth in range(1, max_depth + 1):
+        alpha, beta = -WIN_SCORE, WIN_SCORE
+        if aspiration_window and completed_depth:
+            alpha = best_score - aspiration_window
+            beta = best_score + aspiration_window
+        try:
+            while True:
+                col_num, score = search_root(
+                    current_pieces, mask, depth, context, alpha, beta
+                )
+                if score <= alpha:
+                    alpha = -WIN_SCORE
+                elif score >= beta:
+                    beta = WIN_SCORE
+                else:
+                    break
+        except SearchAborted:
+            break
+        best_col_num, best_score = col_num, score
+        completed_depth = depth
+        if depth >= num_empty_cells or abs(best_score) > MIN_WIN_SCORE:
+            # solved: searching deeper can't change the result.
+            break
+    return best_col_num, best_score, completed_depth
+
+
+def make_move_alpha_beta_pruning(board: Board):
+    """Uses alpha-beta pruning to determine next move.
+
+    Searches `ALPHA_BETA_SEARCH_DEPTH` moves ahead on bitboards (see
+    `search_best_move`), then drops a piece for Player 2. Results are kept
+    in `ALPHA_BETA_TRANSPOSITION_TABLE` between moves, where they can also
+    be filled in ahead of time by a `ponder.Ponderer`. Endgames are looked
+    up in the endgame tablebase, if one has been generated.
+    """
+    layout = get_layout(board.num_rows, board.num_columns)
+    player_1_pieces, player_2_pieces = board_to_bitboards(board)
+    best_col_num, _ = search_best_move(
+        current_pieces=player_2_pieces,
+        mask=player_1_pieces | player_2_pieces,
+        depth=ALPHA_BETA_SEARCH_DEPTH,
+        layout=layout,
+        transposition_table=ALPHA_BETA_TRANSPOSITION_TABLE,
+        tablebase=get_endgame_tablebase()
+    )
+    if best_col_num is None:
+        return
+    board.drop_piece(col_num=best_col_num, value=PLAYER_2_VALUE)
+
+
+def get_value_policy_network() -> "ValuePolicyNetwork":
+    """Loads (once) the network used by `make_move_deep_q_learning`.
+
+    Raises:
+        FileNotFoundError: if there are no weights. Only looked for (and
+        warned about) the first time.
+    """
+    global VALUE_POLICY_NETWORK, HAS_NO_VALUE_POLICY_WEIGHTS
+    if HAS_NO_VALUE_POLICY_WEIGHTS:
+        raise FileNotFoundError(VALUE_POLICY_WEIGHTS_PATH)
+    if VALUE_POLICY_NETWORK is None:
+        # imported on first use, so that the rest of the engine doesn't pay
+        # for the network code.
+        from value_network import ValuePolicyNetwork
+        try:
+            VALUE_POLICY_NETWORK = ValuePolicyNetwork.from_file(
+                VALUE_POLICY_WEIGHTS_PATH
+            )
+        except FileNotFoundError:
+            HAS_NO_VALUE_POLICY_WEIGHTS = True
+            print(
+                f"No weights found at {VALUE_POLICY_WEIGHTS_PATH}: the deep "
+                "Q learning opponent makes random moves instead."
+            )
+            raise
+    return VALUE_POLICY_NETWORK
+
+
+def get_endgame_tablebase() -> Optional["Tablebase"]:
+    """Loads (once) the tablebase consulted by the computer's searches
+    (see `strength.choose_move`, `make_move_alpha_beta_pruning` and
+    `ponder.py`), or returns None if none has been generated."""
+    global ENDGAME_TABLEBASE
+    if ENDGAME_TABLEBASE is None and os.path.exists(ENDGAME_TABLEBASE_PATH):
+        # imported on first use, like the value network.
+        from tablebase import Tablebase
+        ENDGAME_TABLEBASE = Tablebase(ENDGAME_TABLEBASE_PATH)
+    return ENDGAME_TABLEBASE
+
+
+def make_move_deep_q_learning(
+    board: Board, rng: Optional[random.Random] = None
+):
+    """Uses deep Q learning in order to make next available move.
+
+    Takes an immediate win if there is one. Otherwise, every board that can
+    be reached in one move is evaluated by the value network in a single
+    batched forward pass, and the move that leaves Player 1 with the lowest
+    value is played. Falls back to a random move (picked by `rng`, see
+    `make_move_naive`) if no weights are found.
+    """
+    try:
+        network = get_value_policy_network()
+    except FileNotFoundError:
+        # still counted for every move: each is a fallback.
+        MOVE_METRICS.record_fallback("no_weights")
+        make_move_naive(board, rng=rng)
+        return
+
+    layout = get_layout(board.num_rows, board.num_columns)
+    player_1_pieces, player_2_pieces = board_to_bitboards(board)
+    mask = player_1_pieces | player_2_pieces
+    playable_columns = get_playable_columns(mask, layout)
+    if not playable_columns:
+        return
+
+    next_player_2_pieces = [
+        player_2_pieces | get_move_bit(mask, col_num, layout)
+        for col_num in playable_columns
+    ]
+    for col_num, pieces in zip(playable_columns, next_player_2_pieces):
+        if has_n_in_a_row(pieces, layout):
+            board.drop_piece(col_num=col_num, value=PLAYER_2_VALUE)
+            return
+
+    # after our move it's Player 1's turn, so encode from their view.
+    next_planes = bitboards_to_planes(
+        np.array([
+            [player_1_pieces, pieces] for pieces in next_player_2_pieces
+        ]),
+        layout
+    )
+    player_1_values = network.evaluate(next_planes)
+    best_col_num = playable_columns[int(np.argmin(player_1_values))]
+    board.drop_piece(col_num=best_col_num, value=PLAYER_2_VALUE)
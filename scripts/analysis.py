@@ -0,0 +1,204 @@
+"""Analysis of a position: a score, and a principal variation, for every
+column, for hints and coaching.
+
+Moves are searched one move deeper at a time, each depth with
+`algos.score_root_moves`, which gives every column an exact score rather
+than just proving which one is best. Every depth and every column share
+one transposition table, so each iteration reuses the work of the last
+(and its best moves, for move ordering and for the principal variations),
+and columns proved to win or lose aren't searched again. Analysing every
+column costs no more than searching each one on its own; that's a few
+times a search for the best move alone, which only needs bounds on the
+other columns' scores. Each completed depth is yielded (or passed to a
+callback) as soon as it's done, so that a UI can show evaluations that
+sharpen as the search goes deeper.
+
+The caller's board is never changed: positions are searched on bitboards.
+
+Part of the engine: nothing here imports pygame.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from algos import (
+    ENDGAME_SOLVE_NUM_EMPTY_CELLS, MIN_WIN_SCORE, SearchAborted,
+    SearchContext, score_root_moves
+)
+from bitboard import (
+    BitboardLayout, board_to_position, get_layout, get_move_bit
+)
+from components import Board
+from threats import get_immediate_threats, get_non_losing_moves, popcount
+from transposition import TranspositionTable, get_position_key
+
+DEFAULT_MAX_NUM_NODES = 200_000
+ANALYSIS_TRANSPOSITION_TABLE_SIZE = 1 << 18
+
+
+class ColumnAnalysis(NamedTuple):
+    """What playing a column leads to."""
+    # from the point of view of the player to move (see `algos.negamax`).
+    score: int
+    # the column, then the best moves after it, as far as the search saw.
+    principal_variation: List[int]
+
+
+class Analysis(NamedTuple):
+    """Every column's analysis, searched to a depth."""
+    depth: int
+    columns: Dict[int, ColumnAnalysis]
+    num_nodes: int
+
+    @property
+    def best_col_num(self) -> Optional[int]:
+        if not self.columns:
+            return None
+        return max(
+            self.columns, key=lambda col_num: self.columns[col_num].score
+        )
+
+
+def get_principal_variation(
+    current_pieces: int,
+    mask: int,
+    max_num_moves: int,
+    context: SearchContext
+) -> List[int]:
+    """The best moves from a position, by the transposition table's best
+    moves, until a win, the end of the game, a position that isn't in the
+    table or `max_num_moves`."""
+    layout = context.layout
+    transposition_table = context.transposition_table
+    principal_variation = []
+    while len(principal_variation) < max_num_moves and (
+        mask != layout.board_mask
+    ):
+        winning_moves = get_immediate_threats(current_pieces, mask, layout)
+        if winning_moves:
+            principal_variation.append(next(
+                col_num for col_num in context.column_order
+                if winning_moves & layout.column_masks[col_num]
+            ))
+            break
+        if not get_non_losing_moves(current_pieces, mask, layout):
+            # lost whatever is played (and not searched, so not in the
+            # table): play the first column, as `algos.search_root` does.
+            col_num = next(
+                col_num for col_num in context.column_order
+                if not mask & layout.top_masks[col_num]
+            )
+        else:
+            entry = transposition_table.get(
+                get_position_key(current_pieces, mask)
+            )
+            if entry is None or entry.best_col_num is None:
+                break
+            col_num = entry.best_col_num
+        principal_variation.append(col_num)
+        current_pieces, mask = (
+            current_pieces ^ mask, mask | get_move_bit(mask, col_num, layout)
+        )
+    return principal_variation
+
+
+def iter_analyses(
+    current_pieces: int,
+    mask: int,
+    layout: BitboardLayout,
+    max_depth: Optional[int] = None,
+    max_num_nodes: Optional[int] = DEFAULT_MAX_NUM_NODES,
+    deadline: Optional[float] = None,
+    stop_event: Optional[threading.Event] = None
+) -> Iterator[Analysis]:
+    """Lazily yields the analysis of every column, one depth deeper at a
+    time, until `max_depth` (the end of the game if None), until the rest
+    of the game is solved, or until the node budget, the deadline or the
+    stop event stops the search. The depth that's cut short isn't yielded.
+
+    With few enough empty cells, the first depth is already searched to
+    the end of the game (see `algos.score_root_moves`): then it's the only
+    one yielded, with the depth that was searched.
+
+    Args:
+        max_num_nodes (int | None): the most nodes to search over every
+        depth, or None for no limit.
+        deadline (float | None): compared against `time.perf_counter()`.
+    """
+    num_empty_cells = popcount(layout.board_mask & ~mask)
+    if max_depth is None:
+        max_depth = num_empty_cells
+    context = SearchContext(
+        layout=layout,
+        transposition_table=TranspositionTable(
+            max_num_entries=ANALYSIS_TRANSPOSITION_TABLE_SIZE
+        ),
+        stop_event=stop_event,
+        deadline=deadline,
+        max_num_nodes=max_num_nodes
+    )
+    proved_scores = {}
+    for depth in range(1, max_depth + 1):
+        try:
+            scores = score_root_moves(
+                current_pieces, mask, depth, context,
+                proved_scores=proved_scores
+            )
+        except SearchAborted:
+            return
+        if num_empty_cells <= ENDGAME_SOLVE_NUM_EMPTY_CELLS:
+            # searched to the end of the game, whatever the depth asked for.
+            depth = max(depth, num_empty_cells)
+        columns = {}
+        for col_num, score in scores.items():
+            next_mask = mask | get_move_bit(mask, col_num, layout)
+            columns[col_num] = ColumnAnalysis(
+                score,
+                [col_num] + get_principal_variation(
+                    current_pieces ^ mask, next_mask, depth - 1, context
+                )
+            )
+        yield Analysis(depth, columns, context.num_nodes)
+        proved_scores = {
+            col_num: score for col_num, score in scores.items()
+            if abs(score) > MIN_WIN_SCORE
+        }
+        if depth >= num_empty_cells or len(proved_scores) == len(scores):
+            # solved: searching deeper can't change any score.
+            return
+
+
+def analyze(
+    board: Board,
+    max_num_nodes: Optional[int] = DEFAULT_MAX_NUM_NODES,
+    max_seconds: Optional[float] = None,
+    max_depth: Optional[int] = None,
+    on_analysis: Optional[Callable[[Analysis], None]] = None,
+    stop_event: Optional[threading.Event] = None
+) -> Optional[Analysis]:
+    """Analyses every column of a `Board`, for the player to move, within
+    a budget of nodes and/or seconds (see `iter_analyses`), without
+    changing the board.
+
+    Args:
+        on_analysis (Callable[[Analysis], None] | None): called with every
+        depth's analysis as soon as it's done.
+
+    Returns:
+        (Analysis | None): the deepest analysis, or None if the budget ran
+        out before the first depth was done, or if the board is full.
+    """
+    layout = get_layout(board.num_rows, board.num_columns)
+    current_pieces, mask = board_to_position(board)
+    deadline = (
+        time.perf_counter() + max_seconds if max_seconds is not None
+        else None
+    )
+    analysis = None
+    for analysis in iter_analyses(
+        current_pieces, mask, layout, max_depth=max_depth,
+        max_num_nodes=max_num_nodes, deadline=deadline, stop_event=stop_event
+    ):
+        if on_analysis is not None:
+            on_analysis(analysis)
+    return analysis
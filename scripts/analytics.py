@@ -0,0 +1,509 @@
+"""Aggregate statistics of game record files, e.g. of every game played.
+
+For every board size in the files:
+- opening frequencies: how often every sequence of the first
+  `OPENING_NUM_MOVES` moves was played,
+- the results of the games by first move, hence win rates by first move,
+- the distribution of game lengths, hence the average game length,
+- heatmaps of winning lines: how often every cell was part of the line
+  (or lines) that won a game.
+
+Files are streamed in chunks of `DEFAULT_CHUNK_NUM_RECORDS` records: the
+main process only scans record headers to find where chunks start and end,
+and worker processes read their chunks, replay every game of a chunk at
+once on bitboards (one vectorized drop per move number, see
+`replay_chunk`) and add them up into NumPy counters, which are merged as
+they come back. Neither the counters nor the number of chunks in flight
+(see `MAX_NUM_PENDING_CHUNKS_PER_WORKER`) grow with the size of the
+archive, so neither does memory use.
+
+Run `python analytics.py --help` to analyze game record files.
+"""
+import argparse
+import collections
+import multiprocessing
+import os
+import struct
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+from bitboard import BitboardLayout, bitboards_to_planes, get_layout
+import constants
+from game_record import (
+    BITS_PER_MOVE, FILE_HEADER_SIZE, MAX_NUM_COLUMNS, RECORD_HEADER_SIZE,
+    RESULT_DRAW, RESULT_PLAYER_1_WINS, RESULT_PLAYER_2_WINS,
+    check_file_header, get_num_packed_bytes
+)
+
+OPENING_NUM_MOVES = 4
+NUM_RESULTS = 4
+# a board fits in a 64-bit bitboard (see `bitboard.MAX_NUM_BITS`), so no
+# valid game is longer.
+MAX_NUM_MOVES = 64
+DEFAULT_CHUNK_NUM_RECORDS = 1 << 16
+# read size when scanning record headers.
+SCAN_BLOCK_SIZE = 1 << 22
+# chunks scanned ahead of the workers, which bounds memory use.
+MAX_NUM_PENDING_CHUNKS_PER_WORKER = 2
+
+# fields of a record header, as laid out in `RECORD_HEADER_FORMAT`.
+RECORD_HEADER_DTYPE = np.dtype([
+    ("num_rows", "u1"),
+    ("num_columns", "u1"),
+    ("player_1", "u1"),
+    ("player_2", "u1"),
+    ("result", "u1"),
+    ("start_timestamp_ms", "<i8"),
+    ("end_timestamp_ms", "<i8"),
+    ("num_moves", "<u2")
+])
+# offset of num_moves in a record header.
+NUM_MOVES_OFFSET = RECORD_HEADER_SIZE - struct.calcsize("<H")
+
+
+class Chunk(NamedTuple):
+    """Whole records of a file, from byte `offset` to before byte `end`."""
+    path: str
+    offset: int
+    end: int
+    # int64 array of where every record starts, from `offset`: found while
+    # splitting the file, so that workers don't have to scan it again.
+    record_offsets: np.ndarray
+
+
+class GameStats:
+    """Counters of the games played on one board size (see the module
+    docstring)."""
+
+    def __init__(self, num_rows: int, num_columns: int):
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        # games that can't have been played on their board, e.g. with a
+        # move into a full column. Not counted anywhere else.
+        self.num_invalid_games = 0
+        # by number of moves.
+        self.game_length_counts = np.zeros(MAX_NUM_MOVES + 1, dtype=np.int64)
+        # by opening, numbered by its moves as the digits of a base
+        # MAX_NUM_COLUMNS number, the first move being the least significant
+        # (see `get_opening_num`).
+        self.opening_counts = np.zeros(
+            MAX_NUM_COLUMNS ** OPENING_NUM_MOVES, dtype=np.int64
+        )
+        # by first move and result.
+        self.first_move_result_counts = np.zeros(
+            (num_columns, NUM_RESULTS), dtype=np.int64
+        )
+        # by cell, of winning lines, with row 0 at the bottom.
+        self.winning_line_counts = np.zeros(
+            (num_rows, num_columns), dtype=np.int64
+        )
+
+    @property
+    def num_games(self) -> int:
+        return int(self.game_length_counts.sum())
+
+    def get_mean_game_length(self) -> float:
+        num_games = self.num_games
+        if not num_games:
+            return 0.0
+        return float(
+            self.game_length_counts @ np.arange(MAX_NUM_MOVES + 1) / num_games
+        )
+
+    def get_win_rates_by_first_move(self) -> Dict[int, Dict[str, float]]:
+        """The share of finished games won by each player, and drawn, by
+        first move, for the first moves of any finished game."""
+        win_rates = {}
+        for col_num, result_counts in enumerate(
+            self.first_move_result_counts
+        ):
+            num_finished_games = result_counts[
+                [RESULT_PLAYER_1_WINS, RESULT_PLAYER_2_WINS, RESULT_DRAW]
+            ].sum()
+            if not num_finished_games:
+                continue
+            win_rates[col_num] = {
+                "player_1": result_counts[RESULT_PLAYER_1_WINS]
+                / num_finished_games,
+                "player_2": result_counts[RESULT_PLAYER_2_WINS]
+                / num_finished_games,
+                "draw": result_counts[RESULT_DRAW] / num_finished_games
+            }
+        return win_rates
+
+    def get_top_openings(self, num_openings: int) -> List[Tuple[tuple, int]]:
+        """The most played openings, with how often they were played."""
+        opening_nums = np.argsort(self.opening_counts, kind="stable")[::-1]
+        return [
+            (
+                get_opening_moves(opening_num),
+                int(self.opening_counts[opening_num])
+            )
+            for opening_num in opening_nums[:num_openings]
+            if self.opening_counts[opening_num]
+        ]
+
+    def merge(self, other: "GameStats"):
+        """Adds the counters of games on the same board size."""
+        if (other.num_rows, other.num_columns) != (
+            self.num_rows, self.num_columns
+        ):
+            raise ValueError("Can't merge stats of different board sizes.")
+        self.num_invalid_games += other.num_invalid_games
+        self.game_length_counts += other.game_length_counts
+        self.opening_counts += other.opening_counts
+        self.first_move_result_counts += other.first_move_result_counts
+        self.winning_line_counts += other.winning_line_counts
+
+
+def get_opening_num(moves: Iterable[int]) -> int:
+    """Index of an opening in `GameStats.opening_counts`."""
+    return sum(
+        col_num * MAX_NUM_COLUMNS ** move_num
+        for move_num, col_num in enumerate(moves)
+    )
+
+
+def get_opening_moves(opening_num: int) -> Tuple[int, ...]:
+    """Inverse of `get_opening_num`."""
+    return tuple(
+        opening_num // MAX_NUM_COLUMNS ** move_num % MAX_NUM_COLUMNS
+        for move_num in range(OPENING_NUM_MOVES)
+    )
+
+
+def iter_chunks(
+    path: str, chunk_num_records: int = DEFAULT_CHUNK_NUM_RECORDS
+) -> Iterator[Chunk]:
+    """Splits a game record file into chunks of whole records, by scanning
+    the number of moves of every record.
+
+    Raises:
+        ValueError: if the file isn't a game record file, or ends with a
+        truncated record.
+    """
+    with open(path, "rb") as file_obj:
+        check_file_header(file_obj)
+        # file offset of the start of `block`.
+        block_offset = record_offset = FILE_HEADER_SIZE
+        block = b""
+        record_offsets = []
+        while True:
+            data = file_obj.read(SCAN_BLOCK_SIZE)
+            if not data:
+                break
+            block = block[record_offset - block_offset:] + data
+            block_offset = record_offset
+            block_end = block_offset + len(block)
+            # the hot loop of the scan: kept to plain int arithmetic.
+            while record_offset + RECORD_HEADER_SIZE <= block_end:
+                num_moves_index = (
+                    record_offset - block_offset + NUM_MOVES_OFFSET
+                )
+                num_moves = (
+                    block[num_moves_index] | block[num_moves_index + 1] << 8
+                )
+                record_end = (
+                    record_offset + RECORD_HEADER_SIZE
+                    + (num_moves * BITS_PER_MOVE + 7 >> 3)
+                )
+                if record_end > block_end:
+                    break
+                record_offsets.append(record_offset)
+                record_offset = record_end
+                if len(record_offsets) == chunk_num_records:
+                    yield _make_chunk(path, record_offsets, record_offset)
+                    record_offsets = []
+        if record_offset != block_offset + len(block):
+            raise ValueError("Truncated game record.")
+        if record_offsets:
+            yield _make_chunk(path, record_offsets, record_offset)
+
+
+def _make_chunk(path: str, record_offsets: List[int], end: int) -> Chunk:
+    offset = record_offsets[0]
+    return Chunk(
+        path, offset, end, np.array(record_offsets, dtype=np.int64) - offset
+    )
+
+
+def read_chunk(chunk: Chunk) -> Tuple[np.ndarray, np.ndarray]:
+    """Reads the records of a chunk.
+
+    Returns:
+        headers (numpy.ndarray): array of `RECORD_HEADER_DTYPE` of shape
+        (num_records,).
+        moves (numpy.ndarray): uint8 array of shape (num_records,
+        max_num_moves) of the moves of every record, padded with zeros.
+    """
+    with open(chunk.path, "rb") as file_obj:
+        file_obj.seek(chunk.offset)
+        data = file_obj.read(chunk.end - chunk.offset)
+    record_offsets = chunk.record_offsets
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    headers = buffer[
+        record_offsets[:, np.newaxis] + np.arange(RECORD_HEADER_SIZE)
+    ].view(RECORD_HEADER_DTYPE)[:, 0]
+
+    max_num_moves = int(headers["num_moves"].max(initial=0))
+    num_packed_bytes = get_num_packed_bytes(max_num_moves)
+    # the packed moves of shorter records are followed by the next record,
+    # or by the end of the chunk: pad, and mask off moves past the last.
+    padded_buffer = np.concatenate(
+        [buffer, np.zeros(num_packed_bytes, dtype=np.uint8)]
+    )
+    packed_moves = padded_buffer[
+        (record_offsets + RECORD_HEADER_SIZE)[:, np.newaxis]
+        + np.arange(num_packed_bytes)
+    ]
+    move_bits = np.unpackbits(packed_moves, axis=1, bitorder="little")
+    moves = move_bits[:, :max_num_moves * BITS_PER_MOVE].reshape(
+        len(record_offsets), max_num_moves, BITS_PER_MOVE
+    ) @ (1 << np.arange(BITS_PER_MOVE, dtype=np.uint8))
+    moves[
+        np.arange(max_num_moves) >= headers["num_moves"][:, np.newaxis]
+    ] = 0
+    return headers, moves
+
+
+def replay_chunk(
+    moves: np.ndarray, num_moves: np.ndarray, layout: BitboardLayout
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Replays many games on the same board size at once, on bitboards:
+    every move is `bitboard.get_move_bit`, vectorized over games.
+
+    Args:
+        moves (numpy.ndarray): array of shape (num_games, max_num_moves)
+        of the moves of every game, as returned by `read_chunk`.
+        num_moves (numpy.ndarray): array of shape (num_games,) of the
+        number of moves of every game.
+
+    Returns:
+        player_1_pieces (numpy.ndarray): uint64 array of shape (num_games,)
+        of the bitboards of each player's pieces (see `bitboard.py`) at the
+        end of every game.
+        player_2_pieces (numpy.ndarray): as player_1_pieces.
+        is_valid (numpy.ndarray): bool array of shape (num_games,) of
+        whether every move of a game was into a column with an empty cell.
+    """
+    # per column value that fits in the packed moves: columns past the
+    # board have no cells, so moves into them are invalid.
+    bottom_masks = np.zeros(MAX_NUM_COLUMNS, dtype=np.uint64)
+    column_masks = np.zeros(MAX_NUM_COLUMNS, dtype=np.uint64)
+    bottom_masks[:layout.num_columns] = layout.bottom_masks
+    column_masks[:layout.num_columns] = layout.column_masks
+
+    num_games = len(moves)
+    pieces = np.zeros((2, num_games), dtype=np.uint64)
+    mask = np.zeros(num_games, dtype=np.uint64)
+    is_valid = np.ones(num_games, dtype=bool)
+    for move_num in range(moves.shape[1]):
+        col_nums = moves[:, move_num]
+        move_bits = (mask + bottom_masks[col_nums]) & column_masks[col_nums]
+        move_bits[move_num >= num_moves] = 0
+        is_valid &= (move_bits != 0) | (move_num >= num_moves)
+        pieces[move_num % 2] |= move_bits
+        mask |= move_bits
+    return pieces[0], pieces[1], is_valid
+
+
+def get_winning_line_cells(
+    pieces: np.ndarray,
+    layout: BitboardLayout,
+    num_in_a_row: int = constants.NUM_IN_A_ROW_TO_WIN
+) -> np.ndarray:
+    """Vectorized: the cells of every line of `num_in_a_row` connected
+    pieces in a uint64 array of bitboards."""
+    cells = np.zeros_like(pieces)
+    for shift in layout.direction_shifts:
+        shift = np.uint64(shift)
+        # first cells of the lines.
+        starts = pieces.copy()
+        for offset in range(1, num_in_a_row):
+            starts &= pieces >> (np.uint64(offset) * shift)
+        for offset in range(num_in_a_row):
+            cells |= starts << (np.uint64(offset) * shift)
+    return cells
+
+
+def aggregate_chunk(chunk: Chunk) -> Dict[Tuple[int, int], GameStats]:
+    """Counts the games of a chunk, by board size."""
+    headers, moves = read_chunk(chunk)
+    stats_by_size = {}
+    # (num_rows, num_columns) as one number, which is quicker to unique.
+    board_size_nums = (
+        headers["num_rows"].astype(np.int64) << 8 | headers["num_columns"]
+    )
+    for board_size_num in np.unique(board_size_nums).tolist():
+        num_rows, num_columns = board_size_num >> 8, board_size_num & 0xff
+        stats = GameStats(num_rows, num_columns)
+        stats_by_size[(num_rows, num_columns)] = stats
+        is_of_size = board_size_nums == board_size_num
+        try:
+            layout = get_layout(num_rows, num_columns)
+        except ValueError:
+            stats.num_invalid_games += int(is_of_size.sum())
+            continue
+        size_headers = headers[is_of_size]
+        num_moves = size_headers["num_moves"].astype(np.int64)
+        player_1_pieces, player_2_pieces, is_valid = replay_chunk(
+            moves[is_of_size], num_moves, layout
+        )
+        stats.num_invalid_games += int((~is_valid).sum())
+
+        size_moves = moves[is_of_size][is_valid].astype(np.int64)
+        num_moves = num_moves[is_valid]
+        results = size_headers["result"][is_valid].astype(np.int64)
+        stats.game_length_counts += np.bincount(
+            num_moves, minlength=MAX_NUM_MOVES + 1
+        )
+
+        has_opening = num_moves >= OPENING_NUM_MOVES
+        opening_nums = size_moves[has_opening, :OPENING_NUM_MOVES] @ (
+            MAX_NUM_COLUMNS ** np.arange(OPENING_NUM_MOVES)
+        )
+        stats.opening_counts += np.bincount(
+            opening_nums, minlength=len(stats.opening_counts)
+        )
+
+        has_first_move = (num_moves > 0) & (results < NUM_RESULTS)
+        np.add.at(
+            stats.first_move_result_counts,
+            (size_moves[has_first_move, 0], results[has_first_move]),
+            1
+        )
+
+        winner_pieces = np.concatenate([
+            player_1_pieces[is_valid][results == RESULT_PLAYER_1_WINS],
+            player_2_pieces[is_valid][results == RESULT_PLAYER_2_WINS]
+        ])
+        stats.winning_line_counts += bitboards_to_planes(
+            get_winning_line_cells(winner_pieces, layout), layout
+        ).sum(axis=0, dtype=np.int64)
+    return stats_by_size
+
+
+def analyze_record_files(
+    paths: Iterable[str],
+    num_workers: int = os.cpu_count() or 1,
+    chunk_num_records: int = DEFAULT_CHUNK_NUM_RECORDS
+) -> dict:
+    """Aggregates every game in game record files (see the module
+    docstring).
+
+    Returns:
+        (dict): "stats", the `GameStats` of every board size, the number of
+        games analyzed, elapsed seconds and games per second.
+    """
+    start_time = time.perf_counter()
+    chunks = (
+        chunk for path in paths
+        for chunk in iter_chunks(path, chunk_num_records)
+    )
+    stats_by_size: Dict[Tuple[int, int], GameStats] = {}
+
+    def merge(chunk_stats_by_size: Dict[Tuple[int, int], GameStats]):
+        for board_size, stats in chunk_stats_by_size.items():
+            if board_size in stats_by_size:
+                stats_by_size[board_size].merge(stats)
+            else:
+                stats_by_size[board_size] = stats
+
+    pool = multiprocessing.Pool(num_workers) if num_workers > 1 else None
+    try:
+        # chunks are handed out as workers take them, rather than all at
+        # once as `imap` would: scanning is faster than aggregating, and
+        # the chunks waiting for a worker would pile up.
+        pending_results = collections.deque()
+        max_num_pending_chunks = (
+            MAX_NUM_PENDING_CHUNKS_PER_WORKER * num_workers
+        )
+        for chunk in chunks:
+            if pool is None:
+                merge(aggregate_chunk(chunk))
+                continue
+            pending_results.append(
+                pool.apply_async(aggregate_chunk, (chunk,))
+            )
+            if len(pending_results) > max_num_pending_chunks:
+                merge(pending_results.popleft().get())
+        while pending_results:
+            merge(pending_results.popleft().get())
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    elapsed_seconds = time.perf_counter() - start_time
+    num_games = sum(
+        stats.num_games + stats.num_invalid_games
+        for stats in stats_by_size.values()
+    )
+    return {
+        "stats": stats_by_size,
+        "num_games": num_games,
+        "elapsed_seconds": elapsed_seconds,
+        "games_per_second": (
+            num_games / elapsed_seconds if elapsed_seconds else 0.0
+        )
+    }
+
+
+def print_stats(stats: GameStats, num_openings: int):
+    print(f"{stats.num_rows} x {stats.num_columns} board:")
+    print(f"  games: {stats.num_games:,}")
+    if stats.num_invalid_games:
+        print(f"  invalid games (not counted): {stats.num_invalid_games:,}")
+    print(f"  mean game length: {stats.get_mean_game_length():.2f} moves")
+    print("  top openings:")
+    for moves, count in stats.get_top_openings(num_openings):
+        share = count / stats.num_games
+        print(f"    {' '.join(map(str, moves))}  {count:,} ({share:.1%})")
+    print("  win rates by first move (player 1 / player 2 / draw):")
+    for col_num, win_rates in stats.get_win_rates_by_first_move().items():
+        print(
+            f"    {col_num}  {win_rates['player_1']:.1%} / "
+            f"{win_rates['player_2']:.1%} / {win_rates['draw']:.1%}"
+        )
+    print("  winning lines per cell (per 1000 won games):")
+    num_won_games = stats.first_move_result_counts[
+        :, [RESULT_PLAYER_1_WINS, RESULT_PLAYER_2_WINS]
+    ].sum()
+    heatmap = stats.winning_line_counts * 1000 // max(num_won_games, 1)
+    # the top row first, as on screen.
+    for row in heatmap[::-1]:
+        print("    " + " ".join(f"{count:4d}" for count in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "records", nargs="*", default=[constants.GAME_RECORDS_PATH],
+        help="game record files to analyze"
+    )
+    parser.add_argument(
+        "--num-workers", type=int, default=os.cpu_count() or 1
+    )
+    parser.add_argument(
+        "--chunk-num-records", type=int, default=DEFAULT_CHUNK_NUM_RECORDS
+    )
+    parser.add_argument("--num-openings", type=int, default=10)
+    args = parser.parse_args()
+    summary = analyze_record_files(
+        args.records, num_workers=args.num_workers,
+        chunk_num_records=args.chunk_num_records
+    )
+    for _, stats in sorted(summary["stats"].items()):
+        print_stats(stats, args.num_openings)
+    print(
+        f"{summary['num_games']:,} games in "
+        f"{summary['elapsed_seconds']:.2f}s "
+        f"({summary['games_per_second']:,.0f} games/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
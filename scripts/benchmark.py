@@ -0,0 +1,667 @@
+"""Benchmark harness for the engine.
+
+Run `python benchmark.py --help` for the available benchmarks.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from algos import (
+    ALPHA_BETA_SEARCH_DEPTH, ASPIRATION_WINDOW, MIN_WIN_SCORE, SearchContext,
+    iterative_deepening_search, search_best_move
+)
+from bitboard import (
+    BitboardLayout, bitboards_to_planes, get_layout, get_playable_columns,
+    play_column
+)
+import constants
+from openings import load_opening_suite, play_moves
+from proof_search import UNKNOWN, prove
+from render import encode_png, render_boards
+from search_service import BatchedSearchService
+from self_play import (
+    _new_transitions, _transitions_to_chunk, encode_chunk,
+    play_self_play_game, random_policy
+)
+from strength import STRENGTH_LEVELS, choose_move
+from threats import get_immediate_threats, get_non_losing_moves
+from transposition import TranspositionTable
+from value_network import (
+    ValuePolicyNetwork, init_random_weights, load_weights
+)
+
+DEFAULT_BATCH_SIZES = (1, 8, 64, 512)
+DEFAULT_CELL_SIZES = (16, 32, 64)
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# modules that make up the headless engine: board, search and evaluation.
+ENGINE_MODULES = (
+    "constants", "components", "bitboard", "threats", "metrics", "move_log",
+    "algos", "strength", "opponents", "proof_search", "analysis"
+)
+# optional backends that importing the engine must never pull in. They're
+# imported lazily, when (and if) they're used.
+ENGINE_FORBIDDEN_IMPORTS = (
+    "pygame", "helper_play_game", "value_network", "self_play", "kernels"
+)
+# cold-start budget for importing every engine module in a fresh
+# interpreter.
+ENGINE_IMPORT_BUDGET_SECONDS = 0.5
+NUM_SLOWEST_IMPORTS = 5
+
+
+def get_sample_planes(num_positions: int, seed: int = 0) -> np.ndarray:
+    """Positions from random self-play games, encoded as planes, to use as
+    a realistic workload."""
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    rng = random.Random(seed)
+    transitions = _new_transitions()
+    while len(transitions["action"]) < num_positions:
+        play_self_play_game(
+            random_policy, random_policy, layout, rng, transitions
+        )
+    chunk = _transitions_to_chunk(transitions)
+    return encode_chunk(chunk, layout, augment=False)["states"][
+        :num_positions
+    ]
+
+
+def benchmark_inference(
+    network: ValuePolicyNetwork,
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    min_seconds: float = 0.5
+) -> List[Dict[str, float]]:
+    """Times batched forward passes of the value/policy network.
+
+    Returns:
+        (List[Dict[str, float]]): for every batch size, the latency of one
+        forward pass, the latency per position and positions per second.
+    """
+    planes = get_sample_planes(max(batch_sizes))
+    results = []
+    for batch_size in batch_sizes:
+        batch = planes[:batch_size]
+        # warm up, so that the weights are paged in before timing.
+        network.forward(batch)
+        num_passes = 0
+        start_time = time.perf_counter()
+        while True:
+            network.forward(batch)
+            num_passes += 1
+            elapsed_seconds = time.perf_counter() - start_time
+            if elapsed_seconds >= min_seconds:
+                break
+        seconds_per_pass = elapsed_seconds / num_passes
+        results.append({
+            "batch_size": batch_size,
+            "ms_per_batch": seconds_per_pass * 1e3,
+            "us_per_position": seconds_per_pass * 1e6 / batch_size,
+            "positions_per_second": batch_size / seconds_per_pass
+        })
+    return results
+
+
+def get_sample_positions(
+    num_positions: int,
+    layout: BitboardLayout,
+    seed: int = 0,
+    max_num_moves: int = 16,
+    min_num_moves: int = 0,
+    include_decided: bool = False
+) -> List[Tuple[int, int]]:
+    """Random positions, as (current_pieces, mask) tuples, to use as move
+    requests.
+
+    Games are played at random from the empty board, for between
+    `min_num_moves` and `max_num_moves` moves, and never through a win.
+    Positions that the threat masks already decide (a win on the next move,
+    or no move that doesn't lose) are left out unless `include_decided`.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        current_pieces, mask = 0, 0
+        for _ in range(rng.randint(min_num_moves, max_num_moves)):
+            if get_immediate_threats(current_pieces, mask, layout):
+                break
+            col_num = rng.choice(get_playable_columns(mask, layout))
+            current_pieces, mask = play_column(
+                current_pieces, mask, col_num, layout
+            )
+            current_pieces ^= mask
+        else:
+            is_decided = (
+                mask == layout.board_mask
+                or get_immediate_threats(current_pieces, mask, layout)
+                or not get_non_losing_moves(current_pieces, mask, layout)
+            )
+            if include_decided or not is_decided:
+                positions.append((current_pieces, mask))
+    return positions
+
+
+def benchmark_search_service(
+    num_games: int,
+    depth: int = ALPHA_BETA_SEARCH_DEPTH,
+    seed: int = 0,
+    opening_suite_path: Optional[str] = None
+) -> List[Dict[str, float]]:
+    """Times answering one move request for each of `num_games` games, one
+    game at a time with `search_best_move`, and all games together with the
+    batched search service.
+
+    Games are at the positions after the openings of an opening suite (see
+    `openings.py`), if one is given, and random positions otherwise.
+
+    Returns:
+        (List[Dict[str, float]]): for both modes, the total time, moves
+        answered per second and the mean number of positions per evaluator
+        call.
+    """
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    if opening_suite_path is None:
+        positions = get_sample_positions(num_games, layout, seed=seed)
+    else:
+        positions = [
+            play_moves(moves, layout)
+            for moves in load_opening_suite(opening_suite_path)[:num_games]
+        ]
+        num_games = len(positions)
+
+    start_time = time.perf_counter()
+    for current_pieces, mask in positions:
+        search_best_move(current_pieces, mask, depth, layout)
+    sequential_seconds = time.perf_counter() - start_time
+
+    service = BatchedSearchService()
+    start_time = time.perf_counter()
+    for current_pieces, mask in positions:
+        service.submit(current_pieces, mask, layout, max_depth=depth)
+    service.run_until_idle()
+    batched_seconds = time.perf_counter() - start_time
+
+    return [
+        {
+            "mode": "sequential",
+            "seconds": sequential_seconds,
+            "moves_per_second": num_games / sequential_seconds,
+            "mean_batch_size": 1.0
+        },
+        {
+            "mode": "batched",
+            "seconds": batched_seconds,
+            "moves_per_second": num_games / batched_seconds,
+            "mean_batch_size": service.get_stats()["mean_batch_size"]
+        }
+    ]
+
+
+def benchmark_search_nodes(
+    num_positions: int,
+    depth: int = ALPHA_BETA_SEARCH_DEPTH,
+    seed: int = 0
+) -> List[Dict[str, float]]:
+    """Counts the nodes that iterative deepening searches to the same depth,
+    with plain alpha-beta, with principal variation search and with
+    aspiration windows on top, each with a fresh transposition table per
+    position.
+
+    Returns:
+        (List[Dict[str, float]]): per variant, the total time, nodes
+        searched, and nodes relative to plain alpha-beta.
+    """
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    positions = get_sample_positions(num_positions, layout, seed=seed)
+    variants = (
+        ("alpha_beta", False, 0),
+        ("pvs", True, 0),
+        ("pvs+aspiration", True, ASPIRATION_WINDOW)
+    )
+    rows = []
+    for name, use_principal_variation_search, aspiration_window in variants:
+        num_nodes = 0
+        start_time = time.perf_counter()
+        for current_pieces, mask in positions:
+            context = SearchContext(
+                layout=layout,
+                transposition_table=TranspositionTable(),
+                use_principal_variation_search=use_principal_variation_search
+            )
+            iterative_deepening_search(
+                current_pieces, mask, depth, context,
+                aspiration_window=aspiration_window
+            )
+            num_nodes += context.num_nodes
+        rows.append({
+            "variant": name,
+            "seconds": time.perf_counter() - start_time,
+            "num_nodes": num_nodes,
+            "relative_nodes": (
+                num_nodes / rows[0]["num_nodes"] if rows else 1.0
+            )
+        })
+    return rows
+
+
+def benchmark_search_backends(
+    num_positions: int,
+    depth: int = ALPHA_BETA_SEARCH_DEPTH,
+    seed: int = 0
+) -> List[Dict[str, float]]:
+    """Times the same searches on every backend of `kernels.py` that can run
+    at full speed here.
+
+    Returns:
+        (List[Dict[str, float]]): per backend, the total time, nodes
+        searched and nodes per second.
+    """
+    # imported here: importing Numba takes a while.
+    from kernels import HAS_NUMBA, search_root_with_stats
+
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    positions = get_sample_positions(num_positions, layout, seed=seed)
+    backends = ["compiled", "python"] if HAS_NUMBA else ["python"]
+    if HAS_NUMBA:
+        # compile outside of the timings.
+        search_root_with_stats(*positions[0], 1, layout, backend="compiled")
+
+    rows = []
+    for backend in backends:
+        num_nodes = 0
+        start_time = time.perf_counter()
+        for current_pieces, mask in positions:
+            num_nodes += search_root_with_stats(
+                current_pieces, mask, depth, layout, backend=backend
+            )[2]
+        seconds = time.perf_counter() - start_time
+        rows.append({
+            "backend": backend,
+            "seconds": seconds,
+            "num_nodes": num_nodes,
+            "nodes_per_second": num_nodes / seconds
+        })
+    return rows
+
+
+def benchmark_strength_levels(
+    num_positions: int, seed: int = 0
+) -> List[Dict[str, float]]:
+    """Measures the cost of a move at every strength level (see
+    `strength.py`), on the same positions.
+
+    Returns:
+        (List[Dict[str, float]]): per level, its budgets, and the mean and
+        worst CPU time and nodes of a move.
+    """
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    positions = get_sample_positions(num_positions, layout, seed=seed)
+    rows = []
+    for level_num, strength_level in STRENGTH_LEVELS.items():
+        rng = random.Random(seed)
+        cpu_seconds, num_nodes = [], []
+        for current_pieces, mask in positions:
+            start_cpu_seconds = time.process_time()
+            num_nodes.append(choose_move(
+                current_pieces, mask, layout, strength_level, rng=rng
+            )[1])
+            cpu_seconds.append(time.process_time() - start_cpu_seconds)
+        rows.append({
+            "level": level_num,
+            "max_num_nodes": strength_level.max_num_nodes,
+            "max_seconds": strength_level.max_seconds,
+            "mean_cpu_ms": 1e3 * sum(cpu_seconds) / len(cpu_seconds),
+            "max_cpu_ms": 1e3 * max(cpu_seconds),
+            "mean_nodes": sum(num_nodes) / len(num_nodes),
+            "max_nodes": max(num_nodes)
+        })
+    return rows
+
+
+def benchmark_proof_search(
+    num_positions: int, depth: int = 8, seed: int = 0
+) -> List[Dict[str, float]]:
+    """Compares proof-number search (see `proof_search.py`) with iterative
+    deepening on forced wins: random positions where iterative deepening to
+    `depth` finds a win for either player.
+
+    Returns:
+        (List[Dict[str, float]]): per search, the total time, nodes searched
+        and positions proved, and nodes relative to iterative deepening.
+    """
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    rng = random.Random(seed)
+    positions = []
+    num_nodes, seconds = 0, 0.0
+    while len(positions) < num_positions:
+        current_pieces, mask = get_sample_positions(
+            1, layout, seed=rng.getrandbits(32), max_num_moves=24
+        )[0]
+        context = SearchContext(
+            layout=layout, transposition_table=TranspositionTable()
+        )
+        start_time = time.perf_counter()
+        _, score, _ = iterative_deepening_search(
+            current_pieces, mask, depth, context
+        )
+        if abs(score) > MIN_WIN_SCORE:
+            positions.append((current_pieces, mask))
+            num_nodes += context.num_nodes
+            seconds += time.perf_counter() - start_time
+    rows = [{
+        "search": "iterative_deepening",
+        "seconds": seconds,
+        "num_nodes": num_nodes,
+        "num_proved": len(positions),
+        "relative_nodes": 1.0
+    }]
+
+    num_proved, proof_num_nodes = 0, 0
+    start_time = time.perf_counter()
+    for current_pieces, mask in positions:
+        result = prove(current_pieces, mask, layout)
+        num_proved += result.result != UNKNOWN
+        proof_num_nodes += result.num_nodes
+    rows.append({
+        "search": "proof_number",
+        "seconds": time.perf_counter() - start_time,
+        "num_nodes": proof_num_nodes,
+        "num_proved": num_proved,
+        "relative_nodes": proof_num_nodes / num_nodes
+    })
+    return rows
+
+
+def benchmark_render(
+    num_positions: int,
+    cell_sizes: Sequence[int] = DEFAULT_CELL_SIZES,
+    batch_size: int = 64,
+    seed: int = 0
+) -> List[Dict[str, float]]:
+    """Measures how many boards are rendered to images per second (see
+    `render.py`), one per call and `batch_size` per call, and encoded as
+    PNGs.
+
+    Returns:
+        (List[Dict[str, float]]): per cell size, frames per second rendered
+        one board per call, a batch per call, and encoded as PNGs.
+    """
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    positions = np.array(
+        get_sample_positions(num_positions, layout, seed=seed),
+        dtype=np.uint64
+    )
+    current_pieces, masks = positions[:, 0], positions[:, 1]
+    boards = (
+        bitboards_to_planes(current_pieces, layout)
+        + 2 * bitboards_to_planes(current_pieces ^ masks, layout)
+    )
+    rows = []
+    for cell_size in cell_sizes:
+        # draws the sprites, which is done once per cell size.
+        render_boards(boards[:1], cell_size)
+
+        start_time = time.perf_counter()
+        for board in boards:
+            render_boards(board, cell_size)
+        single_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for start in range(0, num_positions, batch_size):
+            render_boards(boards[start:start + batch_size], cell_size)
+        batch_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for start in range(0, num_positions, batch_size):
+            for image in render_boards(
+                boards[start:start + batch_size], cell_size
+            ):
+                encode_png(image)
+        png_seconds = time.perf_counter() - start_time
+
+        rows.append({
+            "cell_size": cell_size,
+            "single_frames_per_second": num_positions / single_seconds,
+            "batch_frames_per_second": num_positions / batch_seconds,
+            "png_per_second": num_positions / png_seconds
+        })
+    return rows
+
+
+def profile_engine_import(
+    modules: Sequence[str] = ENGINE_MODULES
+) -> Dict[str, object]:
+    """Imports the engine in a fresh interpreter (so nothing is cached) and
+    times it with `-X importtime`.
+
+    Returns:
+        (Dict[str, object]): "elapsed_seconds" to import every module,
+        "forbidden_imports" (any of `ENGINE_FORBIDDEN_IMPORTS` that got
+        imported) and "slowest_imports", the top-level imports with the
+        highest cumulative import time, as (module, seconds) tuples.
+    """
+    code = "\n".join([
+        "import sys, time",
+        "start_time = time.perf_counter()",
+        f"import {', '.join(modules)}",
+        "print(time.perf_counter() - start_time)",
+        "print(','.join(sys.modules))"
+    ])
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (SCRIPTS_DIR, env.get("PYTHONPATH")) if path
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, check=True
+    )
+    elapsed_line, modules_line = result.stdout.splitlines()[:2]
+    imported_modules = set(modules_line.split(","))
+
+    # lines look like "import time: <self us> | <cumulative us> | <name>",
+    # with nested imports indented under the import that triggered them.
+    top_level_imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if name.startswith("  ") or not cumulative_us.strip().isdigit():
+            continue
+        top_level_imports.append(
+            (name.strip(), int(cumulative_us) / 1e6)
+        )
+
+    return {
+        "elapsed_seconds": float(elapsed_line),
+        "forbidden_imports": sorted(
+            imported_modules & set(ENGINE_FORBIDDEN_IMPORTS)
+        ),
+        "slowest_imports": sorted(
+            top_level_imports, key=lambda item: item[1], reverse=True
+        )[:NUM_SLOWEST_IMPORTS]
+    }
+
+
+def check_engine_import(
+    budget_seconds: float = ENGINE_IMPORT_BUDGET_SECONDS
+) -> bool:
+    """Prints an import profile of the engine and checks it against the
+    cold-start budget.
+
+    Returns:
+        (bool): True if the engine imports within budget, without pulling
+        in any of `ENGINE_FORBIDDEN_IMPORTS`.
+    """
+    profile = profile_engine_import()
+    print(
+        f"engine import: {profile['elapsed_seconds'] * 1e3:.1f} ms "
+        f"(budget {budget_seconds * 1e3:.1f} ms)"
+    )
+    print_table([
+        {"module": name, "cumulative_ms": seconds * 1e3}
+        for name, seconds in profile["slowest_imports"]
+    ])
+
+    is_ok = True
+    if profile["elapsed_seconds"] > budget_seconds:
+        print("FAILED: engine import is over budget.")
+        is_ok = False
+    if profile["forbidden_imports"]:
+        print(
+            "FAILED: engine imports optional backends: "
+            f"{', '.join(profile['forbidden_imports'])}"
+        )
+        is_ok = False
+    return is_ok
+
+
+def print_table(rows: List[Dict[str, float]]):
+    """Prints benchmark results as an aligned table."""
+    headers = list(rows[0].keys())
+    formatted_rows = [
+        [
+            f"{row[header]:,.2f}" if isinstance(row[header], float)
+            else str(row[header])
+            for header in headers
+        ]
+        for row in rows
+    ]
+    widths = [
+        max(len(header), *(len(row[i]) for row in formatted_rows))
+        for i, header in enumerate(headers)
+    ]
+    print("  ".join(
+        header.rjust(width) for header, width in zip(headers, widths)
+    ))
+    for row in formatted_rows:
+        print("  ".join(
+            value.rjust(width) for value, width in zip(row, widths)
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--profile-import", action="store_true",
+        help="check the engine's cold-start import time and exit"
+    )
+    parser.add_argument(
+        "--import-budget-ms", type=float,
+        default=ENGINE_IMPORT_BUDGET_SECONDS * 1e3
+    )
+    subparsers = parser.add_subparsers(dest="benchmark")
+
+    inference_parser = subparsers.add_parser(
+        "inference",
+        help="latency and throughput of the value/policy network"
+    )
+    inference_parser.add_argument(
+        "--weights",
+        help="path to an .npz of weights; random weights are used if unset"
+    )
+    inference_parser.add_argument(
+        "--batch-sizes", type=int, nargs="+",
+        default=list(DEFAULT_BATCH_SIZES)
+    )
+
+    service_parser = subparsers.add_parser(
+        "service",
+        help="move requests answered per second by the batched search "
+        "service, against one search per request"
+    )
+    service_parser.add_argument("--num-games", type=int, default=64)
+    service_parser.add_argument(
+        "--depth", type=int, default=ALPHA_BETA_SEARCH_DEPTH
+    )
+    service_parser.add_argument(
+        "--opening-suite",
+        help="game record file of openings to search from (see openings.py)"
+    )
+
+    search_parser = subparsers.add_parser(
+        "search",
+        help="nodes searched by iterative deepening with and without "
+        "principal variation search and aspiration windows"
+    )
+    search_parser.add_argument("--num-positions", type=int, default=32)
+    search_parser.add_argument(
+        "--depth", type=int, default=ALPHA_BETA_SEARCH_DEPTH + 2
+    )
+
+    backends_parser = subparsers.add_parser(
+        "backends",
+        help="nodes searched per second by each search backend (see "
+        "kernels.py)"
+    )
+    backends_parser.add_argument("--num-positions", type=int, default=32)
+    backends_parser.add_argument(
+        "--depth", type=int, default=ALPHA_BETA_SEARCH_DEPTH
+    )
+
+    levels_parser = subparsers.add_parser(
+        "levels",
+        help="CPU cost per move of every strength level (see strength.py)"
+    )
+    levels_parser.add_argument("--num-positions", type=int, default=32)
+
+    proof_parser = subparsers.add_parser(
+        "proof",
+        help="nodes searched to prove forced wins, by proof-number search "
+        "and by iterative deepening (see proof_search.py)"
+    )
+    proof_parser.add_argument("--num-positions", type=int, default=16)
+    proof_parser.add_argument("--depth", type=int, default=8)
+
+    render_parser = subparsers.add_parser(
+        "render",
+        help="boards rendered to images per second (see render.py)"
+    )
+    render_parser.add_argument("--num-positions", type=int, default=1024)
+    render_parser.add_argument(
+        "--cell-sizes", type=int, nargs="+", default=list(DEFAULT_CELL_SIZES)
+    )
+    render_parser.add_argument("--batch-size", type=int, default=64)
+
+    args = parser.parse_args()
+
+    if args.profile_import:
+        is_ok = check_engine_import(args.import_budget_ms / 1e3)
+        sys.exit(0 if is_ok else 1)
+
+    if args.benchmark is None:
+        parser.error("choose a benchmark to run, or --profile-import")
+    if args.benchmark == "inference":
+        weights = (
+            load_weights(args.weights) if args.weights
+            else init_random_weights()
+        )
+        print_table(benchmark_inference(
+            ValuePolicyNetwork(weights), batch_sizes=args.batch_sizes
+        ))
+    elif args.benchmark == "service":
+        print_table(benchmark_search_service(
+            args.num_games, args.depth,
+            opening_suite_path=args.opening_suite
+        ))
+    elif args.benchmark == "search":
+        print_table(benchmark_search_nodes(args.num_positions, args.depth))
+    elif args.benchmark == "backends":
+        print_table(benchmark_search_backends(args.num_positions, args.depth))
+    elif args.benchmark == "levels":
+        print_table(benchmark_strength_levels(args.num_positions))
+    elif args.benchmark == "proof":
+        print_table(benchmark_proof_search(args.num_positions, args.depth))
+    elif args.benchmark == "render":
+        print_table(benchmark_render(
+            args.num_positions, args.cell_sizes, batch_size=args.batch_size
+        ))
+
+
+if __name__ == "__main__":
+    main()
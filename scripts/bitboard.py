@@ -0,0 +1,251 @@
+"""Bitboard representation of the board, for headless engine code.
+
+A position is stored as two Python ints: `mask`, with a bit set for every
+occupied cell, and the pieces of one of the players. Cells are numbered
+column by column, from the bottom of each column (row 0) upwards, with one
+extra sentinel bit on top of every column so that pieces in different
+columns never line up when shifting:
+
+    bit index of (row_num, col_num) = col_num * (num_rows + 1) + row_num
+
+Dropping a piece into a column is a single addition (see `play_column`),
+and checking for a win is a handful of shifts (see `has_n_in_a_row`).
+"""
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+import constants
+
+MAX_NUM_BITS = 64
+
+# number of set bits in every byte value, for `popcount_array`.
+BYTE_POPCOUNTS = np.array(
+    [bin(byte).count("1") for byte in range(256)], dtype=np.uint8
+)
+
+
+class BitboardLayout(NamedTuple):
+    """Precomputed masks for a given board size."""
+    num_rows: int
+    num_columns: int
+    # number of bits used per column (num_rows + 1, for the sentinel bit).
+    column_height: int
+    # one bit at the bottom of every column.
+    bottom_mask: int
+    # every playable cell on the board.
+    board_mask: int
+    # per column: all playable cells, the bottom cell and the top cell.
+    column_masks: Tuple[int, ...]
+    bottom_masks: Tuple[int, ...]
+    top_masks: Tuple[int, ...]
+    # shifts that move a bit one cell along each direction that a line of
+    # pieces can be made in: vertical, horizontal and both diagonals.
+    direction_shifts: Tuple[int, ...]
+
+
+@lru_cache(maxsize=None)
+def get_layout(
+    num_rows: int = constants.ROW_COUNT,
+    num_columns: int = constants.COLUMN_COUNT
+) -> BitboardLayout:
+    """Builds (once per board size) the masks used by the bitboard code."""
+    column_height = num_rows + 1
+    if column_height * num_columns > MAX_NUM_BITS:
+        raise ValueError(
+            f"A {num_rows} x {num_columns} board doesn't fit in "
+            f"{MAX_NUM_BITS} bits."
+        )
+
+    bottom_masks = tuple(
+        1 << (col_num * column_height) for col_num in range(num_columns)
+    )
+    column_masks = tuple(
+        ((1 << num_rows) - 1) << (col_num * column_height)
+        for col_num in range(num_columns)
+    )
+    top_masks = tuple(
+        1 << (num_rows - 1 + col_num * column_height)
+        for col_num in range(num_columns)
+    )
+
+    return BitboardLayout(
+        num_rows=num_rows,
+        num_columns=num_columns,
+        column_height=column_height,
+        bottom_mask=sum(bottom_masks),
+        board_mask=sum(column_masks),
+        column_masks=column_masks,
+        bottom_masks=bottom_masks,
+        top_masks=top_masks,
+        direction_shifts=(
+            1, column_height, column_height - 1, column_height + 1
+        )
+    )
+
+
+def get_bit_index(row_num: int, col_num: int, layout: BitboardLayout) -> int:
+    """Index of the bit that represents a given cell."""
+    return col_num * layout.column_height + row_num
+
+
+@lru_cache(maxsize=None)
+def get_bit_index_array(layout: BitboardLayout) -> np.ndarray:
+    """(num_rows, num_columns) array of the bit index of every cell."""
+    row_nums, col_nums = np.indices((layout.num_rows, layout.num_columns))
+    bit_index_array = (
+        col_nums * layout.column_height + row_nums
+    ).astype(np.uint64)
+    bit_index_array.setflags(write=False)
+    return bit_index_array
+
+
+def can_play_column(mask: int, col_num: int, layout: BitboardLayout) -> bool:
+    """Whether a column still has an empty cell."""
+    return not mask & layout.top_masks[col_num]
+
+
+def get_playable_columns(mask: int, layout: BitboardLayout) -> list:
+    """List of columns that still have an empty cell, from left to right."""
+    return [
+        col_num for col_num, top_mask in enumerate(layout.top_masks)
+        if not mask & top_mask
+    ]
+
+
+def get_move_bit(mask: int, col_num: int, layout: BitboardLayout) -> int:
+    """Bit of the cell that a piece dropped into a column would land on."""
+    return (mask + layout.bottom_masks[col_num]) & layout.column_masks[col_num]
+
+
+def play_column(
+    pieces: int, mask: int, col_num: int, layout: BitboardLayout
+) -> Tuple[int, int]:
+    """Drops a piece for the player owning `pieces` into a column.
+
+    Assumes that the column isn't full.
+
+    Returns:
+        (Tuple[int, int]): the player's pieces and the mask after the move.
+    """
+    move_bit = get_move_bit(mask, col_num, layout)
+    return pieces | move_bit, mask | move_bit
+
+
+def has_n_in_a_row(
+    pieces: int,
+    layout: BitboardLayout,
+    num_in_a_row: int = constants.NUM_IN_A_ROW_TO_WIN
+) -> bool:
+    """Whether a player's pieces contain `num_in_a_row` connected pieces in
+    any direction."""
+    for shift in layout.direction_shifts:
+        connected = pieces
+        for offset in range(1, num_in_a_row):
+            connected &= pieces >> (offset * shift)
+            if not connected:
+                break
+        if connected:
+            return True
+    return False
+
+
+def board_to_bitboards(board) -> Tuple[int, int]:
+    """Converts a `Board` into bitboards.
+
+    Boards keep their bitboards up to date as moves are made (see
+    `Board.push`), so those are returned if there are any.
+
+    Returns:
+        (Tuple[int, int]): the bitboards of Player 1's and Player 2's pieces.
+    """
+    player_pieces = getattr(board, "player_pieces", None)
+    if player_pieces is not None:
+        return player_pieces[0], player_pieces[1]
+    layout = get_layout(board.num_rows, board.num_columns)
+    bit_values = np.left_shift(
+        np.uint64(1), get_bit_index_array(layout)
+    )
+    player_1_pieces = int(
+        np.bitwise_or.reduce(bit_values[board.board == 1], initial=0)
+    )
+    player_2_pieces = int(
+        np.bitwise_or.reduce(bit_values[board.board == 2], initial=0)
+    )
+    return player_1_pieces, player_2_pieces
+
+
+def board_to_position(board) -> Tuple[int, int]:
+    """Converts a `Board` into the bitboards of a position, for whichever
+    player is to move. Player 1 moves first, so the player to move is the
+    one with as many pieces as the other.
+
+    Returns:
+        (Tuple[int, int]): the pieces of the player to move, and every
+        piece.
+    """
+    player_1_pieces, player_2_pieces = board_to_bitboards(board)
+    is_player_1_to_move = (
+        bin(player_1_pieces).count("1") == bin(player_2_pieces).count("1")
+    )
+    return (
+        player_1_pieces if is_player_1_to_move else player_2_pieces,
+        player_1_pieces | player_2_pieces
+    )
+
+
+def bitboards_to_planes(
+    pieces_array: np.ndarray, layout: BitboardLayout
+) -> np.ndarray:
+    """Decodes an array of bitboards into 0/1 planes in one vectorized pass.
+
+    Args:
+        pieces_array (numpy.ndarray): array of any shape of bitboards,
+        storable as uint64.
+
+    Returns:
+        (numpy.ndarray): uint8 array of shape
+        pieces_array.shape + (num_rows, num_columns).
+    """
+    pieces_array = np.asarray(pieces_array, dtype=np.uint64)
+    expanded = pieces_array[..., np.newaxis, np.newaxis]
+    return (
+        np.right_shift(expanded, get_bit_index_array(layout)) & np.uint64(1)
+    ).astype(np.uint8)
+
+
+def popcount_array(bits_array: np.ndarray) -> np.ndarray:
+    """Number of set bits in every element of a uint64 array."""
+    bits_array = np.ascontiguousarray(bits_array, dtype=np.uint64)
+    byte_popcounts = BYTE_POPCOUNTS[bits_array.view(np.uint8)]
+    return byte_popcounts.reshape(bits_array.shape + (8,)).sum(
+        axis=-1, dtype=np.int64
+    )
+
+
+def mirror_bitboard(bits: int, layout: BitboardLayout) -> int:
+    """Mirrors a bitboard left to right."""
+    column_bits = (1 << layout.column_height) - 1
+    mirrored_bits = 0
+    for col_num in range(layout.num_columns):
+        mirrored_col_num = layout.num_columns - 1 - col_num
+        mirrored_bits |= (
+            (bits >> (col_num * layout.column_height)) & column_bits
+        ) << (mirrored_col_num * layout.column_height)
+    return mirrored_bits
+
+
+def mirror_bitboard_array(
+    bits_array: np.ndarray, layout: BitboardLayout
+) -> np.ndarray:
+    """Vectorized `mirror_bitboard`, over a uint64 array of bitboards."""
+    column_bits = np.uint64((1 << layout.column_height) - 1)
+    mirrored_bits_array = np.zeros_like(bits_array, dtype=np.uint64)
+    for col_num in range(layout.num_columns):
+        mirrored_col_num = layout.num_columns - 1 - col_num
+        mirrored_bits_array |= (
+            (bits_array >> np.uint64(col_num * layout.column_height))
+            & column_bits
+        ) << np.uint64(mirrored_col_num * layout.column_height)
+    return mirrored_bits_array
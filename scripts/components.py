@@ -1,13 +1,78 @@
 """Components needed to create game."""
-from typing import Literal, Tuple
+from functools import lru_cache
+from typing import Dict, Literal, Optional, Sequence, Tuple, Union
 
 import numpy as np
 
+from bitboard import bitboards_to_planes, get_layout, popcount_array
 import constants
 
+PLAYER_VALUES = (1, 2)
+# directions that runs of connected pieces are counted in (see
+# `Board.get_run_lengths`).
+RUN_DIRECTIONS = ("row", "column", "diagonal", "anti_diagonal")
+
+# diagonals through every cell (see `Board.all_possible_diagonals`), keyed on
+# (num_rows, num_columns).
+_ALL_POSSIBLE_DIAGONALS: Dict[Tuple[int, int], Dict] = {}
+
+
+def _get_run_lengths_along_rows(is_piece: np.ndarray) -> np.ndarray:
+    """Length of the run of connected pieces ending at every cell, counting
+    along the rows axis (axis -2), for all columns at once.
+
+    For every cell, the run length is the distance to the last cell without
+    a piece below it, which `np.maximum.accumulate` finds in one pass.
+    """
+    row_nums = np.arange(is_piece.shape[-2])[:, np.newaxis]
+    last_gap_row_nums = np.maximum.accumulate(
+        np.where(is_piece, -1, row_nums), axis=-2
+    )
+    return np.where(is_piece, row_nums - last_gap_row_nums, 0)
+
+
+def _get_line_winner(line: np.ndarray, num_in_a_row: int) -> Optional[int]:
+    """Player with the first run of `num_in_a_row` connected pieces along a
+    line of cells, if any."""
+    is_piece = line == np.array(PLAYER_VALUES)[:, np.newaxis]
+    run_lengths = _get_run_lengths_along_rows(is_piece[..., np.newaxis])
+    cell_nums = np.flatnonzero(
+        (run_lengths[..., 0] >= num_in_a_row).any(axis=0)
+    )
+    if not cell_nums.size:
+        return None
+    return PLAYER_VALUES[int(np.argmax(run_lengths[:, cell_nums[0], 0]))]
+
+
+@lru_cache(maxsize=None)
+def _get_diagonal_shear_indices(
+    num_rows: int, num_columns: int, is_anti_diagonal: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices that shear a board so that its diagonals become columns.
+
+    Cell (row_num, col_num) moves to column `col_num + row_num` (or
+    `col_num + num_rows - 1 - row_num` for anti-diagonals) of an array with
+    `num_columns + num_rows - 1` columns.
+    """
+    row_nums, col_nums = np.indices((num_rows, num_columns))
+    if is_anti_diagonal:
+        return row_nums, col_nums + (num_rows - 1 - row_nums)
+    return row_nums, col_nums + row_nums
+
 
 class Board:
-    """Used to define the board that the players are playing on."""
+    """Used to define the board that the players are playing on.
+
+    Alongside the `board` array, the board keeps the height of every column
+    and the bitboards of both players (see `bitboard.py`), and a stack of
+    the moves made with `push`, so that a move is made (`push`) or taken
+    back (`pop`) in O(1), without copying the board. Setting `board` (or
+    cells, through indexing) recomputes them from the array and starts a
+    new history, since the order of the moves isn't known.
+
+    `board` is a read-only view, so that the array can't be changed behind
+    the board's back: set cells through indexing (`board[row, col] = v`).
+    """
 
     def __init__(
         self,
@@ -16,10 +81,210 @@ class Board:
     ):
         self.num_rows = num_rows
         self.num_columns = num_columns
-        self.board = np.zeros((self.num_rows, self.num_columns))
-        self.all_possible_diagonals = (
-            self._define_all_possible_diagonals_from_all_points()
+        self.column_height = num_rows + 1
+        # columns played by `push`, in order; the first `num_moves` are set.
+        self.move_stack = np.zeros(num_rows * num_columns, dtype=np.int8)
+        self.init_board()
+
+    @property
+    def board(self) -> np.ndarray:
+        return self._board_view
+
+    @board.setter
+    def board(self, array: np.ndarray):
+        # copied: the caller's array (or another board's read-only view)
+        # mustn't change with this board's moves.
+        self._set_array(np.array(array, dtype=float))
+        self._sync_from_array()
+
+    def _set_array(self, array: np.ndarray):
+        self._board = array
+        # follows the array through `push` and `pop`.
+        self._board_view = array.view()
+        self._board_view.flags.writeable = False
+
+    def _sync_from_array(self):
+        """Recomputes the heights, bitboards and piece count from the
+        array, and clears the history."""
+        is_empty = self._board == 0
+        # the lowest empty cell of every column, as in
+        # `get_next_valid_row_in_column`.
+        self.heights = np.where(
+            is_empty.any(axis=0), is_empty.argmax(axis=0), self.num_rows
+        ).tolist()
+        self.player_pieces = [0, 0]
+        for player_num, value in enumerate(PLAYER_VALUES):
+            row_nums, col_nums = np.nonzero(self._board == value)
+            for row_num, col_num in zip(row_nums.tolist(), col_nums.tolist()):
+                self.player_pieces[player_num] |= 1 << (
+                    col_num * self.column_height + row_num
+                )
+        self.num_pieces = int(np.count_nonzero(~is_empty))
+        self.num_moves = 0
+
+    @classmethod
+    def from_moves(
+        cls,
+        moves: Union[str, Sequence[int]],
+        num_rows: int = constants.ROW_COUNT,
+        num_columns: int = constants.COLUMN_COUNT
+    ) -> "Board":
+        """Builds the board after a sequence of moves, Player 1 first.
+
+        Args:
+            moves (str | Sequence[int]): a move string of 1-indexed column
+            digits (e.g. "4453"), or 0-indexed column numbers.
+
+        Raises:
+            ValueError: if a move isn't a column of the board, or is into a
+            full column. No win checks are done.
+        """
+        if isinstance(moves, str):
+            if moves and not moves.isdigit():
+                raise ValueError(f"Invalid move string: {moves!r}")
+            moves = [int(char) - 1 for char in moves]
+        board = cls(num_rows=num_rows, num_columns=num_columns)
+        for move_num, col_num in enumerate(moves):
+            if not 0 <= col_num < num_columns or (
+                board.heights[col_num] == num_rows
+            ):
+                raise ValueError(f"Invalid move {move_num}: {col_num}")
+            board.push(col_num)
+        return board
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "Board":
+        """Builds a board from a (num_rows, num_columns) array of 0 (empty),
+        1 and 2 (the players' pieces). The array is copied."""
+        num_rows, num_columns = np.shape(array)
+        board = cls(num_rows=num_rows, num_columns=num_columns)
+        board.board = np.array(array, dtype=float)
+        return board
+
+    @classmethod
+    def from_key(
+        cls,
+        key: int,
+        num_rows: int = constants.ROW_COUNT,
+        num_columns: int = constants.COLUMN_COUNT
+    ) -> "Board":
+        """Inverse of `to_key`.
+
+        Raises:
+            ValueError: if `key` isn't the key of a board of this size.
+        """
+        layout = get_layout(num_rows, num_columns)
+        column_bits = (1 << layout.column_height) - 1
+        mask = 0
+        for col_num in range(num_columns):
+            shift = col_num * layout.column_height
+            column_key = (key >> shift) & column_bits
+            # a column with n pieces has a key in [2^n - 1, 2^(n+1) - 2].
+            num_pieces = (column_key + 1).bit_length() - 1
+            if num_pieces > num_rows:
+                raise ValueError(f"Invalid key: {key}")
+            mask |= ((1 << num_pieces) - 1) << shift
+        current_pieces = key - mask
+        if key >> (num_columns * layout.column_height) or current_pieces < 0:
+            raise ValueError(f"Invalid key: {key}")
+
+        current_planes = bitboards_to_planes(
+            np.array([current_pieces, current_pieces ^ mask]), layout
         )
+        current_value = 1 if popcount_array(
+            np.array([mask], dtype=np.uint64)
+        )[0] % 2 == 0 else 2
+        board = cls(num_rows=num_rows, num_columns=num_columns)
+        board.board = (
+            current_planes[0] * float(current_value)
+            + current_planes[1] * float(3 - current_value)
+        )
+        return board
+
+    def to_key(self) -> int:
+        """Unique key of the position: the bitboard of the player to move
+        plus the mask (see `bitboard.py`). Player 1 is to move when the
+        number of pieces is even.
+
+        Fits in 64 bits on boards up to the size of the standard one.
+        """
+        player_1_pieces, player_2_pieces = self.player_pieces
+        return (
+            player_1_pieces if self.num_pieces % 2 == 0 else player_2_pieces
+        ) + (player_1_pieces | player_2_pieces)
+
+    def push(self, col_num: int, value: Optional[Literal[1, 2]] = None) -> int:
+        """Drops a piece into a column and adds the move to the history.
+
+        Args:
+            value (1 | 2 | None): the piece to drop. Defaults to the player
+            to move: Player 1 when the number of pieces is even.
+
+        Returns:
+            row_num (int): the row that the piece landed in.
+
+        Raises:
+            ValueError: if the column isn't on the board, or is full.
+        """
+        if not 0 <= col_num < self.num_columns:
+            raise ValueError(f"Column {col_num} isn't on the board.")
+        row_num = self.heights[col_num]
+        if row_num == self.num_rows:
+            raise ValueError(f"Column {col_num} is full.")
+        if value is None:
+            value = 1 if self.num_pieces % 2 == 0 else 2
+        self._board[row_num, col_num] = value
+        self.heights[col_num] = row_num + 1
+        self.player_pieces[value - 1] |= 1 << (
+            col_num * self.column_height + row_num
+        )
+        self.num_pieces += 1
+        self.move_stack[self.num_moves] = col_num
+        self.num_moves += 1
+        return row_num
+
+    def pop(self) -> int:
+        """Takes back the last move made with `push`.
+
+        Returns:
+            col_num (int): the column that the move was made in.
+
+        Raises:
+            IndexError: if there are no moves to take back.
+        """
+        if not self.num_moves:
+            raise IndexError("No moves to take back.")
+        self.num_moves -= 1
+        col_num = int(self.move_stack[self.num_moves])
+        row_num = self.heights[col_num] - 1
+        value = int(self._board[row_num, col_num])
+        self._board[row_num, col_num] = 0
+        self.heights[col_num] = row_num
+        self.player_pieces[value - 1] &= ~(
+            1 << (col_num * self.column_height + row_num)
+        )
+        self.num_pieces -= 1
+        return col_num
+
+    def history(self) -> np.ndarray:
+        """The columns of the moves made with `push` since the board was
+        last set, oldest first (a copy)."""
+        return self.move_stack[:self.num_moves].copy()
+
+    @property
+    def all_possible_diagonals(self) -> Dict:
+        """Diagonals through every cell (see
+        `_define_all_possible_diagonals_from_all_points`).
+
+        Computed on first use and shared between all boards of the same
+        size, so that building a board stays cheap.
+        """
+        size = (self.num_rows, self.num_columns)
+        if size not in _ALL_POSSIBLE_DIAGONALS:
+            _ALL_POSSIBLE_DIAGONALS[size] = (
+                self._define_all_possible_diagonals_from_all_points()
+            )
+        return _ALL_POSSIBLE_DIAGONALS[size]
 
     def __getitem__(self, row_col_tuple: Tuple[int, int]):
         """Provides dunder so that slicing on the board object automatically
@@ -65,7 +330,8 @@ class Board:
         if isinstance(col_num, int) and col_num > self.num_columns - 1:
             return None
 
-        self.board[row_num, col_num] = new_value
+        self._board[row_num, col_num] = new_value
+        self._sync_from_array()
 
     def __repr__(self):
         """Print board state when printing object."""
@@ -73,7 +339,12 @@ class Board:
 
     def init_board(self):
         """Initialize an empty board."""
-        self.board = np.zeros((self.num_rows, self.num_columns))
+        # the state of an empty board is known: no need to sync it.
+        self._set_array(np.zeros((self.num_rows, self.num_columns)))
+        self.heights = [0] * self.num_columns
+        self.player_pieces = [0, 0]
+        self.num_pieces = 0
+        self.num_moves = 0
 
     # TODO(mark): add test + refactor
     def drop_piece(self, col_num: int, value: Literal[1, 2]):
@@ -89,12 +360,11 @@ class Board:
             print("A piece can't be moved there.")
             return False
 
-        next_valid_row_num = self.get_next_valid_row_in_column(col_num)
-        if next_valid_row_num is None:
+        if self.heights[col_num] == self.num_rows:
             print("A piece can't be moved there.")
             return False
 
-        self.board[next_valid_row_num, col_num] = value
+        self.push(col_num, value)
 
         return True
 
@@ -143,16 +413,8 @@ class Board:
 
         If no valid row, return None.
         """
-        column = self.board[:, col_num]
-
-        row_num = None
-
-        for i in range(column.size):
-            if column[i] == 0:
-                row_num = i
-                break
-
-        return row_num
+        row_num = self.heights[col_num]
+        return row_num if row_num < self.num_rows else None
 
     def get_dict_next_valid_moves(self):
         """Get a dict of the next possible valid moves, keyed on the column.
@@ -185,44 +447,7 @@ class Board:
             winner (int | None): corresponds to Player 1 or Player 2,
             depending on the winner (if any). If no winner, return None
         """
-        # 0.0 = nobody is there, 1 = player 1, 2 = player 2
-        val_to_player_counter_dict = {
-            0: 0,
-            1: 0,
-            2: 0
-        }
-
-        first_value = self.board[row_num, 0]
-        last_val_seen = first_value
-        val_to_player_counter_dict[last_val_seen] += 1
-
-        row = self.board[row_num, :]
-
-        # start comparisons at second value
-        for val in row[1:]:
-            if val not in [0, 1, 2]:
-                continue
-            # update counter if current value == previous value
-            if val == last_val_seen:
-                val_to_player_counter_dict[val] += 1
-                # if 4 values are in a row (and they're not 0),
-                # return the value
-                if (
-                    val_to_player_counter_dict[val] == num_in_a_row
-                    and val != 0.0
-                ):
-                    return val
-            else:
-                # reset all counters to 0. Update count of most recent value
-                for key in val_to_player_counter_dict.keys():
-                    val_to_player_counter_dict[key] = 0
-                val_to_player_counter_dict[val] += 1
-
-            # set last seen value to current first_value
-            last_val_seen = val
-
-        # no matches -> return None
-        return None
+        return _get_line_winner(self.board[row_num, :], num_in_a_row)
 
     def check_win_any_row(
         self,
@@ -234,22 +459,7 @@ class Board:
             winner (int | None): corresponds to Player 1 or Player 2,
             depending on the winner (if any). If no winner, return None
         """
-        row_winners = [
-            self.check_win_connected_in_a_row(
-                row_num, num_in_a_row=num_in_a_row
-            )
-            for row_num in range(self.num_rows)
-        ]
-
-        if any(row_winners):
-            # assumes that there's only one instance where a row can be a
-            # winner and that multiple rows can't simultaneously all
-            # be winners.
-            for val in row_winners:
-                if val is not None:
-                    return val
-        else:
-            return None
+        return self._check_win_in_directions(("row",), num_in_a_row)
 
     def check_win_connected_in_a_column(
         self,
@@ -263,44 +473,7 @@ class Board:
             winner (int | None): corresponds to Player 1 or Player 2,
             depending on the winner (if any). If no winner, return None
         """
-        # 0.0 = nobody is there, 1 = player 1, 2 = player 2
-        val_to_player_counter_dict = {
-            0: 0,
-            1: 0,
-            2: 0
-        }
-
-        first_value = self.board[0, col_num]
-        last_val_seen = first_value
-        val_to_player_counter_dict[last_val_seen] += 1
-
-        column = self.board[:, col_num]
-
-        # start comparisons at second value
-        for val in column[1:]:
-            if val not in [0, 1, 2]:
-                continue
-            # update counter if current value == previous value
-            if val == last_val_seen:
-                val_to_player_counter_dict[val] += 1
-                # if 4 values are in a column (and they're not 0),
-                # return the value
-                if (
-                    val_to_player_counter_dict[val] == num_in_a_row
-                    and val != 0.0
-                ):
-                    return val
-            else:
-                # reset all counters to 0. Update count of most recent value
-                for key in val_to_player_counter_dict.keys():
-                    val_to_player_counter_dict[key] = 0
-                val_to_player_counter_dict[val] += 1
-
-            # set last seen value to current first_value
-            last_val_seen = val
-
-        # no matches -> return None
-        return None
+        return _get_line_winner(self.board[:, col_num], num_in_a_row)
 
     def check_win_any_column(
         self, num_in_a_row: int = constants.NUM_IN_A_ROW_TO_WIN
@@ -312,22 +485,7 @@ class Board:
             winner (int | None): corresponds to Player 1 or Player 2,
             depending on the winner (if any). If no winner, return None
         """
-        column_winners = [
-            self.check_win_connected_in_a_column(
-                col_num, num_in_a_row=num_in_a_row
-            )
-            for col_num in range(self.num_columns)
-        ]
-
-        if any(column_winners):
-            # assumes that there's only one instance where a column can be a
-            # winner and that multiple columns can't simultaneously all
-            # be winners.
-            for val in column_winners:
-                if val is not None:
-                    return val
-        else:
-            return None
+        return self._check_win_in_directions(("column",), num_in_a_row)
 
     def _define_diagonal_from_endpoint(
         self,
@@ -666,8 +824,8 @@ class Board:
     def _define_all_possible_diagonals_from_all_points(self):
         """Define all possible diagonals across the board.
 
-        Run as part of class instantiation so that the dict of all possible
-        diagonals is available as an object attribute.
+        Run on first use of `all_possible_diagonals`, which caches the dict
+        of all possible diagonals for every board of the same size.
 
         Returns:
             dict_point_to_diagonals: Dict[
@@ -741,51 +899,141 @@ class Board:
             winner (int | None): corresponds to Player 1 or Player 2,
             depending on the winner (if any). If no winner, return None
         """
-        for (row_num, col_num) in self.all_possible_diagonals.keys():
-            winner = self.check_win_connected_in_a_diagonal(
-                row_num, col_num, num_in_a_row=num_in_a_row
-            )
-            if winner is not None:
-                return winner
+        return self._check_win_in_directions(
+            ("diagonal", "anti_diagonal"), num_in_a_row
+        )
 
-        return None
+    def get_run_lengths(
+        self, directions: Sequence[str] = RUN_DIRECTIONS
+    ) -> Dict[str, np.ndarray]:
+        """Computes, for both players at once, the length of the run of
+        connected pieces ending at every cell, in the given directions.
 
-    def get_max_num_in_a_row_dict(self):
-        """Given a certain game state, get the maximum number of pieces in a row
-        as well as which player has that."""
-        num_in_a_row_to_player_dict = {}
+        Args:
+            directions (Sequence[str]): any of "row", "column", "diagonal"
+            and "anti_diagonal". Only these are computed.
 
-        for num_in_a_row in range(constants.NUM_IN_A_ROW_TO_WIN):
-            row_winner = self.check_win_any_row(num_in_a_row=num_in_a_row)
-            column_winner = self.check_win_any_column(
-                num_in_a_row=num_in_a_row
+        Returns:
+            (Dict[str, numpy.ndarray]): keyed on direction, arrays of shape
+            (2, ...) where index 0 is Player 1 and index 1 is Player 2.
+        """
+        is_piece = self.board == np.array(PLAYER_VALUES)[
+            :, np.newaxis, np.newaxis
+        ]
+
+        run_lengths = {}
+        if "column" in directions:
+            run_lengths["column"] = _get_run_lengths_along_rows(is_piece)
+        if "row" in directions:
+            run_lengths["row"] = _get_run_lengths_along_rows(
+                is_piece.swapaxes(-1, -2)
+            )
+        for direction, is_anti_diagonal in (
+            ("diagonal", False), ("anti_diagonal", True)
+        ):
+            if direction not in directions:
+                continue
+            row_nums, sheared_col_nums = _get_diagonal_shear_indices(
+                self.num_rows, self.num_columns, is_anti_diagonal
             )
-            diagonal_winner = self.check_win_any_diagonal(
-                num_in_a_row=num_in_a_row
+            sheared = np.zeros(
+                (2, self.num_rows, self.num_columns + self.num_rows - 1),
+                dtype=bool
             )
+            sheared[:, row_nums, sheared_col_nums] = is_piece
+            run_lengths[direction] = _get_run_lengths_along_rows(sheared)
+
+        return run_lengths
 
-            has_winner = any([row_winner, column_winner, diagonal_winner])
+    def get_max_run_lengths(
+        self,
+        num_in_a_row: int = constants.NUM_IN_A_ROW_TO_WIN
+    ) -> Tuple[Optional[int], Dict[int, int]]:
+        """Gets the winner and the longest run of connected pieces for each
+        player, in one pass over rows, columns and both diagonals.
 
-            if has_winner:
-                set_winners = set(
-                    elem for elem in
-                    [row_winner, column_winner, diagonal_winner]
-                    if elem is not None
+        Returns:
+            winner (int | None): the player with `num_in_a_row` or more
+            connected pieces, if any. If both players have one, the player
+            with the longer run wins (Player 1 on ties).
+            max_run_lengths (Dict[int, int]): longest run of connected
+            pieces, keyed on player.
+        """
+        max_run_lengths = self._get_max_run_lengths_in_directions(
+            RUN_DIRECTIONS
+        )
+        return (
+            self._get_winner_from_max_run_lengths(
+                max_run_lengths, num_in_a_row
+            ),
+            {
+                player: int(max_run_length)
+                for player, max_run_length in zip(
+                    PLAYER_VALUES, max_run_lengths
                 )
-                num_in_a_row_to_player_dict[num_in_a_row] = list(set_winners)
+            }
+        )
+
+    def _get_max_run_lengths_in_directions(
+        self, directions: Tuple[str, ...]
+    ) -> np.ndarray:
+        """Longest run of connected pieces of each player along the given
+        directions (see `get_run_lengths`), as a 2-length array."""
+        run_lengths = self.get_run_lengths(directions)
+        return np.max(
+            [
+                run_lengths[direction].reshape(2, -1).max(axis=1)
+                for direction in directions
+            ],
+            axis=0
+        )
+
+    def _check_win_in_directions(
+        self,
+        directions: Tuple[str, ...],
+        num_in_a_row: int
+    ) -> Optional[int]:
+        """Vectorized win check along the given directions."""
+        return self._get_winner_from_max_run_lengths(
+            self._get_max_run_lengths_in_directions(directions),
+            num_in_a_row
+        )
 
-        max_num_in_a_row = -1
+    @staticmethod
+    def _get_winner_from_max_run_lengths(
+        max_run_lengths: np.ndarray, num_in_a_row: int
+    ) -> Optional[int]:
+        """Player whose longest run reaches `num_in_a_row`, if any."""
+        if max(max_run_lengths) < num_in_a_row:
+            return None
+        return PLAYER_VALUES[int(np.argmax(max_run_lengths))]
+
+    def get_max_num_in_a_row_dict(self):
+        """Given a certain game state, get the maximum number of pieces in a row
+        as well as which player has that.
 
-        for key, list_vals in num_in_a_row_to_player_dict:
-            if len(list_vals) > 0 and key > max_num_in_a_row:
-                max_num_in_a_row = key
+        Runs longer than `NUM_IN_A_ROW_TO_WIN` count as
+        `NUM_IN_A_ROW_TO_WIN`.
 
-        if max_num_in_a_row == -1:
+        Returns:
+            (Dict[int, List[int]]): maps the maximum number of pieces in a
+            row to the players that have it, or {} if the board is empty.
+        """
+        _, max_run_lengths = self.get_max_run_lengths()
+        capped_max_run_lengths = {
+            player: min(max_run_length, constants.NUM_IN_A_ROW_TO_WIN)
+            for player, max_run_length in max_run_lengths.items()
+        }
+        max_num_in_a_row = max(capped_max_run_lengths.values())
+        if max_num_in_a_row == 0:
             return {}
-        else:
-            return {
-                max_num_in_a_row: num_in_a_row_to_player_dict[max_num_in_a_row]
-            }
+        return {
+            max_num_in_a_row: [
+                player
+                for player, max_run_length in capped_max_run_lengths.items()
+                if max_run_length == max_num_in_a_row
+            ]
+        }
 
     def is_game_over(self):
         """Checks to see if the game is over.
@@ -795,22 +1043,10 @@ class Board:
             winner (int): corresponds to Player 1 or Player 2, depending on
             the winner.
         """
-        # check if there is a winner
-
-        row_winner = self.check_win_any_row()
-        column_winner = self.check_win_any_column()
-        diagonal_winner = self.check_win_any_diagonal()
-
-        has_winner = any([row_winner, column_winner, diagonal_winner])
-
-        winner = None
-
-        if has_winner:
-            for elem in [row_winner, column_winner, diagonal_winner]:
-                if elem is not None:
-                    winner = elem
+        # check if there is a winner, in all directions at once.
+        winner, _ = self.get_max_run_lengths()
 
-        if has_winner and winner:
+        if winner:
             return True, winner
 
         # if there is no winner, check if the game is over or if additional
@@ -36,3 +36,19 @@ VALUE_TO_COLOR_DICT = {
     1: "red",
     2: "yellow"
 }
+
+# file that finished games are appended to, in the compact game record format
+# (see `game_record.py`).
+GAME_RECORDS_PATH = "game_records.c4r"
+
+# weights of the value/policy network used by the "hard" computer opponent
+# (see `value_network.py`).
+VALUE_POLICY_WEIGHTS_PATH = "value_policy_weights.npz"
+
+# endgame tablebase consulted by the alpha-beta search, if it exists (see
+# `tablebase.py`).
+ENDGAME_TABLEBASE_PATH = "endgame_tablebase.c4tb"
+
+# suite of balanced openings that benchmarks and tournaments start games
+# from, in the compact game record format (see `openings.py`).
+OPENING_SUITE_PATH = "opening_suite.c4r"
@@ -0,0 +1,249 @@
+"""Compact binary format for recording finished games.
+
+A game record file starts with a short file header, followed by any number
+of game records written back to back. Each game record is a fixed-size
+header (board dimensions, players, result, timestamps, number of moves)
+followed by the moves, packed at 3 bits per move (the column that the piece
+was dropped into).
+
+Records are written and read one at a time, so that files can be appended
+to while games are being played and iterated over without ever loading the
+whole file into memory.
+"""
+import struct
+import time
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+from components import Board
+
+FILE_MAGIC = b"C4GR"
+FILE_VERSION = 1
+# magic, version
+FILE_HEADER_FORMAT = "<4sB"
+FILE_HEADER_SIZE = struct.calcsize(FILE_HEADER_FORMAT)
+
+# num_rows, num_columns, player_1, player_2, result, start_ts_ms, end_ts_ms,
+# num_moves
+RECORD_HEADER_FORMAT = "<BBBBBqqH"
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER_FORMAT)
+
+BITS_PER_MOVE = 3
+MOVE_BIT_MASK = (1 << BITS_PER_MOVE) - 1
+MAX_NUM_COLUMNS = 1 << BITS_PER_MOVE
+
+# maps who played each side of the game to the code stored in the header.
+PLAYER_TYPE_TO_CODE = {
+    "unknown": 0,
+    "human": 1,
+    "easy": 2,
+    "medium": 3,
+    "hard": 4
+}
+CODE_TO_PLAYER_TYPE = {
+    code: player_type for player_type, code in PLAYER_TYPE_TO_CODE.items()
+}
+
+# result codes stored in the header. 1 and 2 match the player values used
+# on the board.
+RESULT_UNFINISHED = 0
+RESULT_PLAYER_1_WINS = 1
+RESULT_PLAYER_2_WINS = 2
+RESULT_DRAW = 3
+
+
+class GameRecord(NamedTuple):
+    """A single recorded game.
+
+    Moves are the (0-indexed) columns that pieces were dropped into, in the
+    order that they were played. Player 1 always moves first.
+    """
+    num_rows: int
+    num_columns: int
+    moves: Tuple[int, ...]
+    player_1: str = "unknown"
+    player_2: str = "unknown"
+    result: int = RESULT_UNFINISHED
+    start_timestamp_ms: int = 0
+    end_timestamp_ms: int = 0
+
+
+def get_timestamp_ms() -> int:
+    """Current wall-clock time in milliseconds, as stored in the header."""
+    return int(time.time() * 1000)
+
+
+def pack_moves(moves: List[int]) -> bytes:
+    """Packs a sequence of columns into bytes, at 3 bits per move.
+
+    Move i occupies bits [3i, 3i + 3) of a little-endian bitstream.
+    """
+    packed_value = 0
+    for move_num, col_num in enumerate(moves):
+        if col_num < 0 or col_num >= MAX_NUM_COLUMNS:
+            raise ValueError(
+                f"Column {col_num} can't be packed into {BITS_PER_MOVE} bits."
+            )
+        packed_value |= col_num << (move_num * BITS_PER_MOVE)
+    num_bytes = get_num_packed_bytes(len(moves))
+    return packed_value.to_bytes(num_bytes, "little")
+
+
+def unpack_moves(packed_moves: bytes, num_moves: int) -> Tuple[int, ...]:
+    """Inverse of `pack_moves`."""
+    packed_value = int.from_bytes(packed_moves, "little")
+    return tuple(
+        (packed_value >> (move_num * BITS_PER_MOVE)) & MOVE_BIT_MASK
+        for move_num in range(num_moves)
+    )
+
+
+def get_num_packed_bytes(num_moves: int) -> int:
+    """Number of bytes needed to store `num_moves` packed moves."""
+    return (num_moves * BITS_PER_MOVE + 7) // 8
+
+
+def encode_record(record: GameRecord) -> bytes:
+    """Serializes a game record (header + packed moves) into bytes."""
+    if record.num_columns > MAX_NUM_COLUMNS:
+        raise ValueError(
+            f"Boards with more than {MAX_NUM_COLUMNS} columns can't be "
+            "recorded."
+        )
+    header = struct.pack(
+        RECORD_HEADER_FORMAT,
+        record.num_rows,
+        record.num_columns,
+        PLAYER_TYPE_TO_CODE[record.player_1],
+        PLAYER_TYPE_TO_CODE[record.player_2],
+        record.result,
+        record.start_timestamp_ms,
+        record.end_timestamp_ms,
+        len(record.moves)
+    )
+    return header + pack_moves(record.moves)
+
+
+def read_record(file_obj: BinaryIO) -> Optional[GameRecord]:
+    """Reads the next game record from an open file.
+
+    Returns:
+        record (GameRecord | None): the next record, or None at end of file.
+    """
+    header = file_obj.read(RECORD_HEADER_SIZE)
+    if not header:
+        return None
+    if len(header) != RECORD_HEADER_SIZE:
+        raise ValueError("Truncated game record header.")
+
+    (
+        num_rows, num_columns, player_1_code, player_2_code, result,
+        start_timestamp_ms, end_timestamp_ms, num_moves
+    ) = struct.unpack(RECORD_HEADER_FORMAT, header)
+
+    num_bytes = get_num_packed_bytes(num_moves)
+    packed_moves = file_obj.read(num_bytes)
+    if len(packed_moves) != num_bytes:
+        raise ValueError("Truncated game record moves.")
+
+    return GameRecord(
+        num_rows=num_rows,
+        num_columns=num_columns,
+        moves=unpack_moves(packed_moves, num_moves),
+        player_1=CODE_TO_PLAYER_TYPE.get(player_1_code, "unknown"),
+        player_2=CODE_TO_PLAYER_TYPE.get(player_2_code, "unknown"),
+        result=result,
+        start_timestamp_ms=start_timestamp_ms,
+        end_timestamp_ms=end_timestamp_ms
+    )
+
+
+def check_file_header(file_obj: BinaryIO):
+    """Validates the file header at the start of a game record file.
+
+    Raises:
+        ValueError: if the file doesn't start with the header of a game
+        record file of this version.
+    """
+    header = file_obj.read(FILE_HEADER_SIZE)
+    if len(header) != FILE_HEADER_SIZE:
+        raise ValueError("Not a game record file: missing header.")
+    magic, version = struct.unpack(FILE_HEADER_FORMAT, header)
+    if magic != FILE_MAGIC:
+        raise ValueError("Not a game record file: bad magic bytes.")
+    if version != FILE_VERSION:
+        raise ValueError(f"Unsupported game record version: {version}")
+
+
+class GameRecordWriter:
+    """Appends game records to a file, one record at a time.
+
+    Writes the file header if the file is new or empty. Can be used as a
+    context manager:
+
+        with GameRecordWriter(path) as writer:
+            writer.write(record)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file_obj = open(path, "ab")
+        if self.file_obj.tell() == 0:
+            self.file_obj.write(
+                struct.pack(FILE_HEADER_FORMAT, FILE_MAGIC, FILE_VERSION)
+            )
+        self.num_records_written = 0
+
+    def write(self, record: GameRecord):
+        """Appends a single record to the file."""
+        self.file_obj.write(encode_record(record))
+        self.num_records_written += 1
+
+    def flush(self):
+        """Flushes buffered records to disk."""
+        self.file_obj.flush()
+
+    def close(self):
+        """Flushes and closes the underlying file."""
+        self.file_obj.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iter_records(path: str) -> Iterator[GameRecord]:
+    """Lazily yields every game record in a file, in order.
+
+    Only one record is held in memory at a time.
+    """
+    with open(path, "rb") as file_obj:
+        check_file_header(file_obj)
+        while True:
+            record = read_record(file_obj)
+            if record is None:
+                return
+            yield record
+
+
+def iter_moves(path: str) -> Iterator[Tuple[int, int, int]]:
+    """Lazily yields every move in a file.
+
+    Returns:
+        (Iterator[Tuple[int, int, int]]): tuples of (record index, move
+        number within the game, column).
+    """
+    for record_num, record in enumerate(iter_records(path)):
+        for move_num, col_num in enumerate(record.moves):
+            yield record_num, move_num, col_num
+
+
+def replay(record: GameRecord) -> Board:
+    """Rebuilds the final board of a recorded game.
+
+    Only drops pieces; no win checks are done along the way.
+    """
+    return Board.from_moves(
+        record.moves, num_rows=record.num_rows, num_columns=record.num_columns
+    )
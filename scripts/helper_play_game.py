@@ -1,22 +1,13 @@
 """Helper file for gameplay. Manages functions such as setting up the board
 using pygame."""
-import copy
-from typing import Literal
-
 import numpy as np
 import pygame
 
-from algos import (
-    make_move_alpha_beta_pruning, make_move_deep_q_learning, make_move_naive
-)
 import constants as constants
 from components import Board
-
-COMPUTER_OPPONENT_TO_ALGO = {
-    "easy": make_move_naive,
-    "medium": make_move_alpha_beta_pruning,
-    "hard": make_move_deep_q_learning
-}
+# the opponents live in the (pygame-free) engine; re-exported here for
+# existing callers.
+from opponents import OPPONENT_REGISTRY, computer_make_move  # noqa: F401
 
 
 def init_game():
@@ -27,13 +18,11 @@ def init_game():
 def draw_board(board: Board, screen: pygame.Surface):
     """Draws and displays board of current game state using pygame."""
 
-    # flip board to correctly display pieces (upside down)
-    # TODO(mark): find cleaner implementation. We want the display to go
-    # from bottom to top, but board implementation is easiest from top to
-    # bottom (since 0th row is first row). As temporary workaround, currently
-    # just flipping the board.
-    new_board = copy.deepcopy(board)
-    new_board.board = np.flip(new_board.board, axis=0)
+    # flip board to correctly display pieces (upside down). We want the
+    # display to go from bottom to top, but board implementation is easiest
+    # from top to bottom (since 0th row is first row). `np.flip` is a view,
+    # so nothing is copied.
+    flipped_board = np.flip(board.board, axis=0)
 
     # draw Connect Four slots
     for col_num in range(constants.COLUMN_COUNT):
@@ -68,7 +57,7 @@ def draw_board(board: Board, screen: pygame.Surface):
     for col_num in range(constants.COLUMN_COUNT):
         for row_num in range(constants.ROW_COUNT):
             # draw Player 1's pieces:
-            if new_board[row_num, col_num] == 1:
+            if flipped_board[row_num, col_num] == 1:
                 pygame.draw.circle(
                     screen,
                     constants.COLOR_TO_CODE_DICT[
@@ -87,7 +76,7 @@ def draw_board(board: Board, screen: pygame.Surface):
                     constants.SLOT_RADIUS
                 )
             # draw Player 2's pieces:
-            elif new_board[row_num, col_num] == 2:
+            elif flipped_board[row_num, col_num] == 2:
                 pygame.draw.circle(
                     screen,
                     constants.COLOR_TO_CODE_DICT[
@@ -108,15 +97,3 @@ def draw_board(board: Board, screen: pygame.Surface):
 
     # update display
     pygame.display.update()
-
-
-def computer_make_move(
-    board: Board, difficulty_level: Literal["easy", "medium", "hard"]
-):
-    """Computer opponent makes a move.
-
-    Wrapper function around the actual function that makes the move and updates
-    the board.
-    """
-    func = COMPUTER_OPPONENT_TO_ALGO[difficulty_level]
-    func(board)
@@ -0,0 +1,701 @@
+"""Compiled search kernels: the alpha-beta search of `algos.py` over plain
+uint64 bitboards and arrays, JIT-compiled with Numba when it's installed.
+
+Numba is optional. Without it, `search_best_move` falls back to the pure
+Python search of `algos.py`, and the kernels themselves still run (slowly)
+in the interpreter, which is how their results are checked against the
+Python search when Numba isn't installed.
+
+The kernels search exactly like `algos.search_root` and `algos.negamax`:
+same threat pruning, principal variation search, move ordering, evaluation
+and transposition table rules, so both backends give the same moves, scores
+and node counts. The kernels' transposition table keeps full keys with
+linear probing, so it behaves like `transposition.TranspositionTable` until
+it is full; it then stops storing new entries, where the Python table
+evicts its oldest entries. Node budgets and aspiration windows are
+supported (see `CompiledSearchContext`); endgame tablebases, stop events
+and deadlines are only supported by the Python search.
+
+`strength.choose_move` searches with the kernels when Numba is installed
+and the search only needs a node budget: deterministic moves, without a
+tablebase or a kept transposition table, e.g. in tournaments and replays.
+Install Numba with `pip install -r requirements-optional.txt`.
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from algos import (
+    ASPIRATION_WINDOW, CENTER_SCORE, ENDGAME_SOLVE_NUM_EMPTY_CELLS,
+    GOOD_THREAT_SCORE, MIN_WIN_SCORE, THREAT_SCORE, WIN_SCORE,
+    SearchAborted, SearchContext, get_center_mask, get_column_order,
+    get_good_row_masks, search_root
+)
+from bitboard import BitboardLayout
+import constants
+from threats import popcount
+from transposition import (
+    EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+)
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAS_NUMBA = numba is not None
+# "compiled" runs the kernels: compiled by Numba if it's installed, in the
+# interpreter otherwise (only fast enough for tests). "python" runs the
+# search of `algos.py`.
+BACKENDS = ("compiled", "python")
+DEFAULT_BACKEND = "compiled" if HAS_NUMBA else "python"
+
+# slots per entry of the kernels' transposition table, to keep probe
+# sequences short.
+TABLE_SLOTS_PER_ENTRY = 4
+# the table is allocated for every search, so it's smaller by default than
+# the long-lived tables of the Python search.
+DEFAULT_MAX_NUM_TABLE_ENTRIES = 1 << 16
+EMPTY_KEY = np.uint64(2 ** 64 - 1)
+NO_COLUMN = -1
+NUM_IN_A_ROW = constants.NUM_IN_A_ROW_TO_WIN
+
+# indices into the `masks` array passed to the kernels.
+BOARD_MASK = 0
+BOTTOM_MASK = 1
+PLAYER_1_GOOD_ROWS = 2
+PLAYER_2_GOOD_ROWS = 3
+CENTER_MASK = 4
+# columns of the kernels' transposition table values.
+TABLE_DEPTH = 0
+TABLE_SCORE = 1
+TABLE_FLAG = 2
+TABLE_BEST_COL_NUM = 3
+# indices into the `counters` array passed to the kernels.
+NUM_NODES = 0
+NUM_TABLE_ENTRIES = 1
+MAX_NUM_TABLE_ENTRIES = 2
+# -1 for no node budget.
+MAX_NUM_NODES = 3
+# set once the node budget is spent: the search unwinds without storing
+# anything, like `algos.SearchAborted`.
+IS_ABORTED = 4
+NO_MAX_NUM_NODES = -1
+
+ZERO = np.uint64(0)
+ONE = np.uint64(1)
+
+
+def _jit(func):
+    if numba is None:
+        return func
+    return numba.njit(func)
+
+
+@_jit
+def _popcount(bits):
+    num_bits = 0
+    while bits:
+        bits &= bits - ONE
+        num_bits += 1
+    return num_bits
+
+
+@_jit
+def _count_node(counters):
+    """`algos.SearchContext.count_node`, for the node budget only: returns
+    False, and aborts the search, once the budget is spent."""
+    if counters[MAX_NUM_NODES] != NO_MAX_NUM_NODES and (
+        counters[NUM_NODES] >= counters[MAX_NUM_NODES]
+    ):
+        counters[IS_ABORTED] = 1
+        return False
+    counters[NUM_NODES] += 1
+    return True
+
+
+@_jit
+def _get_winning_cells(pieces, mask, masks, shifts):
+    """`threats.get_winning_cells`."""
+    winning_cells = ZERO
+    for shift_num in range(shifts.size):
+        shift = shifts[shift_num]
+        for empty_index in range(NUM_IN_A_ROW):
+            cells = masks[BOARD_MASK]
+            for piece_index in range(NUM_IN_A_ROW):
+                if piece_index > empty_index:
+                    cells &= pieces >> (
+                        np.uint64(piece_index - empty_index) * shift
+                    )
+                elif piece_index < empty_index:
+                    cells &= pieces << (
+                        np.uint64(empty_index - piece_index) * shift
+                    )
+            winning_cells |= cells
+    return winning_cells & masks[BOARD_MASK] & ~mask
+
+
+@_jit
+def _get_playable_cells(mask, masks):
+    return (mask + masks[BOTTOM_MASK]) & masks[BOARD_MASK]
+
+
+@_jit
+def _get_non_losing_moves(current_pieces, mask, masks, shifts):
+    """`threats.get_non_losing_moves`."""
+    playable_cells = _get_playable_cells(mask, masks)
+    opponent_winning_cells = _get_winning_cells(
+        current_pieces ^ mask, mask, masks, shifts
+    )
+    forced_cells = playable_cells & opponent_winning_cells
+    if forced_cells:
+        if forced_cells & (forced_cells - ONE):
+            return ZERO
+        playable_cells = forced_cells
+    return playable_cells & ~(opponent_winning_cells >> ONE)
+
+
+@_jit
+def _evaluate_position(current_pieces, mask, masks, shifts):
+    """`algos.evaluate_position`."""
+    opponent_pieces = current_pieces ^ mask
+    if _popcount(mask) % 2 == 0:
+        current_good_rows = masks[PLAYER_1_GOOD_ROWS]
+        opponent_good_rows = masks[PLAYER_2_GOOD_ROWS]
+    else:
+        current_good_rows = masks[PLAYER_2_GOOD_ROWS]
+        opponent_good_rows = masks[PLAYER_1_GOOD_ROWS]
+    current_threats = _get_winning_cells(current_pieces, mask, masks, shifts)
+    opponent_threats = _get_winning_cells(
+        opponent_pieces, mask, masks, shifts
+    )
+    center_mask = masks[CENTER_MASK]
+    return (
+        THREAT_SCORE * (
+            _popcount(current_threats) - _popcount(opponent_threats)
+        )
+        + GOOD_THREAT_SCORE * (
+            _popcount(current_threats & current_good_rows)
+            - _popcount(opponent_threats & opponent_good_rows)
+        )
+        + CENTER_SCORE * (
+            _popcount(current_pieces & center_mask)
+            - _popcount(opponent_pieces & center_mask)
+        )
+    )
+
+
+@_jit
+def _find_slot(key, table_keys):
+    """Slot holding `key`, or the empty slot where it would go, or -1 if
+    the table is empty-sized or full."""
+    num_slots = table_keys.size
+    if num_slots == 0:
+        return -1
+    slot = np.int64(
+        (key ^ (key >> np.uint64(23)) ^ (key >> np.uint64(41)))
+        & np.uint64(num_slots - 1)
+    )
+    for _ in range(num_slots):
+        if table_keys[slot] == key or table_keys[slot] == EMPTY_KEY:
+            return slot
+        slot = (slot + 1) & (num_slots - 1)
+    return -1
+
+
+@_jit
+def _store(
+    key, depth, score, flag, best_col_num, table_keys, table_values,
+    counters
+):
+    """`transposition.TranspositionTable.store`, without eviction."""
+    slot = _find_slot(key, table_keys)
+    if slot < 0:
+        return
+    if table_keys[slot] == key:
+        if table_values[slot, TABLE_DEPTH] > depth:
+            return
+    elif counters[NUM_TABLE_ENTRIES] >= counters[MAX_NUM_TABLE_ENTRIES]:
+        return
+    else:
+        table_keys[slot] = key
+        counters[NUM_TABLE_ENTRIES] += 1
+    table_values[slot, TABLE_DEPTH] = depth
+    table_values[slot, TABLE_SCORE] = score
+    table_values[slot, TABLE_FLAG] = flag
+    table_values[slot, TABLE_BEST_COL_NUM] = best_col_num
+
+
+@_jit
+def _search_move(
+    opponent_pieces, next_mask, depth, alpha, beta, is_first_move, masks,
+    shifts, column_masks, column_order, table_keys, table_values, counters
+):
+    """Score of one move, within `algos.search_moves`: the full window for
+    the first move, and a null window first for the others."""
+    if is_first_move:
+        return -_negamax(
+            opponent_pieces, next_mask, depth - 1, -beta, -alpha, masks,
+            shifts, column_masks, column_order, table_keys, table_values,
+            counters
+        )
+    score = -_negamax(
+        opponent_pieces, next_mask, depth - 1, -alpha - 1, -alpha, masks,
+        shifts, column_masks, column_order, table_keys, table_values,
+        counters
+    )
+    if counters[IS_ABORTED]:
+        return 0
+    if alpha < score < beta:
+        score = -_negamax(
+            opponent_pieces, next_mask, depth - 1, -beta, -alpha, masks,
+            shifts, column_masks, column_order, table_keys, table_values,
+            counters
+        )
+    return score
+
+
+@_jit
+def _negamax(
+    current_pieces, mask, depth, alpha, beta, masks, shifts, column_masks,
+    column_order, table_keys, table_values, counters
+):
+    """`algos.negamax`. Returns 0, without storing anything, if the node
+    budget runs out."""
+    if not _count_node(counters):
+        return 0
+    if mask == masks[BOARD_MASK]:
+        return 0
+
+    num_moves = _popcount(mask)
+    if _get_winning_cells(
+        current_pieces, mask, masks, shifts
+    ) & _get_playable_cells(mask, masks):
+        return WIN_SCORE - (num_moves + 1)
+
+    non_losing_moves = _get_non_losing_moves(
+        current_pieces, mask, masks, shifts
+    )
+    if not non_losing_moves:
+        return -(WIN_SCORE - (num_moves + 2))
+
+    if depth == 0:
+        return _evaluate_position(current_pieces, mask, masks, shifts)
+
+    original_alpha = alpha
+    previous_best_col_num = NO_COLUMN
+    key = current_pieces + mask
+    slot = _find_slot(key, table_keys)
+    if slot >= 0 and table_keys[slot] == key:
+        previous_best_col_num = table_values[slot, TABLE_BEST_COL_NUM]
+        if table_values[slot, TABLE_DEPTH] >= depth:
+            score = table_values[slot, TABLE_SCORE]
+            flag = table_values[slot, TABLE_FLAG]
+            if flag == EXACT:
+                return score
+            if flag == LOWER_BOUND:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+    opponent_pieces = current_pieces ^ mask
+    value = -WIN_SCORE
+    best_col_num = NO_COLUMN
+    for order_num in range(-1, column_order.size):
+        # the previous best move first, then the others from the center out.
+        if order_num < 0:
+            col_num = previous_best_col_num
+            if col_num == NO_COLUMN:
+                continue
+        else:
+            col_num = column_order[order_num]
+            if col_num == previous_best_col_num:
+                continue
+        move_bit = non_losing_moves & column_masks[col_num]
+        if not move_bit:
+            continue
+        score = _search_move(
+            opponent_pieces, mask | move_bit, depth, alpha, beta,
+            best_col_num == NO_COLUMN, masks, shifts, column_masks,
+            column_order, table_keys, table_values, counters
+        )
+        if counters[IS_ABORTED]:
+            return 0
+        if best_col_num == NO_COLUMN or score > value:
+            value = score
+            best_col_num = col_num
+        if value > alpha:
+            alpha = value
+        if alpha >= beta:
+            break
+
+    if value <= original_alpha:
+        flag = UPPER_BOUND
+    elif value >= beta:
+        flag = LOWER_BOUND
+    else:
+        flag = EXACT
+    _store(
+        key, depth, value, flag, best_col_num, table_keys, table_values,
+        counters
+    )
+    return value
+
+
+@_jit
+def _search_root(
+    current_pieces, mask, depth, alpha, beta, masks, shifts, column_masks,
+    column_order, table_keys, table_values, counters
+):
+    """`algos.search_root`.
+
+    Returns:
+        best_col_num (int): the column to play, or `NO_COLUMN` if the board
+        is full or the node budget ran out.
+        best_score (int): its score.
+    """
+    num_empty_cells = _popcount(masks[BOARD_MASK] & ~mask)
+    if num_empty_cells == 0:
+        return NO_COLUMN, 0
+    if num_empty_cells <= ENDGAME_SOLVE_NUM_EMPTY_CELLS:
+        depth = max(depth, num_empty_cells)
+
+    num_moves = _popcount(mask)
+    playable_cells = _get_playable_cells(mask, masks)
+    winning_moves = _get_winning_cells(
+        current_pieces, mask, masks, shifts
+    ) & playable_cells
+    non_losing_moves = _get_non_losing_moves(
+        current_pieces, mask, masks, shifts
+    )
+    if winning_moves or not non_losing_moves:
+        candidate_moves = winning_moves if winning_moves else playable_cells
+        for order_num in range(column_order.size):
+            col_num = column_order[order_num]
+            if candidate_moves & column_masks[col_num]:
+                if winning_moves:
+                    return col_num, WIN_SCORE - (num_moves + 1)
+                return col_num, -(WIN_SCORE - (num_moves + 2))
+
+    previous_best_col_num = NO_COLUMN
+    key = current_pieces + mask
+    slot = _find_slot(key, table_keys)
+    if slot >= 0 and table_keys[slot] == key:
+        previous_best_col_num = table_values[slot, TABLE_BEST_COL_NUM]
+        if (
+            table_values[slot, TABLE_DEPTH] >= depth
+            and table_values[slot, TABLE_FLAG] == EXACT
+            and previous_best_col_num != NO_COLUMN
+        ):
+            return previous_best_col_num, table_values[slot, TABLE_SCORE]
+
+    if not _count_node(counters):
+        return NO_COLUMN, 0
+    opponent_pieces = current_pieces ^ mask
+    best_col_num = NO_COLUMN
+    value = -WIN_SCORE
+    # the window of the moves; the root's own is kept for the flag.
+    moves_alpha = alpha
+    for order_num in range(-1, column_order.size):
+        if order_num < 0:
+            col_num = previous_best_col_num
+            if col_num == NO_COLUMN:
+                continue
+        else:
+            col_num = column_order[order_num]
+            if col_num == previous_best_col_num:
+                continue
+        move_bit = non_losing_moves & column_masks[col_num]
+        if not move_bit:
+            continue
+        score = _search_move(
+            opponent_pieces, mask | move_bit, depth, moves_alpha, beta,
+            best_col_num == NO_COLUMN, masks, shifts, column_masks,
+            column_order, table_keys, table_values, counters
+        )
+        if counters[IS_ABORTED]:
+            return NO_COLUMN, 0
+        if best_col_num == NO_COLUMN or score > value:
+            value = score
+            best_col_num = col_num
+        if value > moves_alpha:
+            moves_alpha = value
+        if moves_alpha >= beta:
+            break
+
+    if value <= alpha:
+        flag = UPPER_BOUND
+    elif value >= beta:
+        flag = LOWER_BOUND
+    else:
+        flag = EXACT
+    _store(
+        key, depth, value, flag, best_col_num, table_keys, table_values,
+        counters
+    )
+    return best_col_num, value
+
+
+@_jit
+def _score_root_moves(
+    current_pieces, mask, depth, masks, shifts, column_masks, column_order,
+    table_keys, table_values, counters, scores
+):
+    """`algos.score_root_moves`, without proved scores: fills in the score
+    of every playable column of `scores`, and leaves the others as they
+    are. Stops, leaving the scores unfinished, if the node budget runs
+    out."""
+    num_empty_cells = _popcount(masks[BOARD_MASK] & ~mask)
+    if num_empty_cells <= ENDGAME_SOLVE_NUM_EMPTY_CELLS:
+        depth = max(depth, num_empty_cells)
+
+    num_moves = _popcount(mask)
+    playable_cells = _get_playable_cells(mask, masks)
+    winning_moves = _get_winning_cells(
+        current_pieces, mask, masks, shifts
+    ) & playable_cells
+    non_losing_moves = _get_non_losing_moves(
+        current_pieces, mask, masks, shifts
+    )
+    opponent_pieces = current_pieces ^ mask
+    for order_num in range(column_order.size):
+        col_num = column_order[order_num]
+        move_bit = playable_cells & column_masks[col_num]
+        if not move_bit:
+            continue
+        if winning_moves & move_bit:
+            scores[col_num] = WIN_SCORE - (num_moves + 1)
+        elif not non_losing_moves & move_bit:
+            scores[col_num] = -(WIN_SCORE - (num_moves + 2))
+        else:
+            scores[col_num] = -_negamax(
+                opponent_pieces, mask | move_bit, depth - 1, -WIN_SCORE,
+                WIN_SCORE, masks, shifts, column_masks, column_order,
+                table_keys, table_values, counters
+            )
+            if counters[IS_ABORTED]:
+                return
+
+
+@lru_cache(maxsize=None)
+def _get_layout_arrays(
+    layout: BitboardLayout
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """The masks, direction shifts, column masks and column order of a
+    layout, as the arrays taken by the kernels."""
+    player_1_good_rows, player_2_good_rows = get_good_row_masks(layout)
+    masks = np.zeros(5, dtype=np.uint64)
+    masks[BOARD_MASK] = layout.board_mask
+    masks[BOTTOM_MASK] = layout.bottom_mask
+    masks[PLAYER_1_GOOD_ROWS] = player_1_good_rows
+    masks[PLAYER_2_GOOD_ROWS] = player_2_good_rows
+    masks[CENTER_MASK] = get_center_mask(layout)
+    return (
+        masks,
+        np.array(layout.direction_shifts, dtype=np.uint64),
+        np.array(layout.column_masks, dtype=np.uint64),
+        np.array(get_column_order(layout.num_columns), dtype=np.int64)
+    )
+
+
+class CompiledSearchContext:
+    """State shared by the compiled searches of one move, like an
+    `algos.SearchContext`: a fresh transposition table, the number of
+    nodes searched and a node budget. Searches with it are stopped by the
+    node budget only: there's no tablebase, stop event or deadline, so
+    `is_past_deadline` is always False.
+    """
+
+    def __init__(
+        self,
+        layout: BitboardLayout,
+        max_num_table_entries: int = DEFAULT_MAX_NUM_TABLE_ENTRIES,
+        max_num_nodes: Optional[int] = None
+    ):
+        self.layout = layout
+        self.column_order = get_column_order(layout.num_columns)
+        self.layout_arrays = _get_layout_arrays(layout)
+        num_slots = 0
+        if max_num_table_entries:
+            num_slots = 1 << (
+                TABLE_SLOTS_PER_ENTRY * max_num_table_entries - 1
+            ).bit_length()
+        self.table_keys = np.full(num_slots, EMPTY_KEY, dtype=np.uint64)
+        self.table_values = np.zeros((num_slots, 4), dtype=np.int64)
+        self.counters = np.array([
+            0, 0, max_num_table_entries,
+            NO_MAX_NUM_NODES if max_num_nodes is None else max_num_nodes, 0
+        ], dtype=np.int64)
+        self.is_past_deadline = False
+
+    @property
+    def num_nodes(self) -> int:
+        return int(self.counters[NUM_NODES])
+
+    def _check_aborted(self):
+        if self.counters[IS_ABORTED]:
+            # the budget stays spent: a later search aborts too.
+            raise SearchAborted()
+
+
+def compiled_search_root(
+    current_pieces: int,
+    mask: int,
+    depth: int,
+    context: CompiledSearchContext,
+    alpha: int = -WIN_SCORE,
+    beta: int = WIN_SCORE
+) -> Tuple[Optional[int], int]:
+    """`algos.search_root` on the compiled kernels.
+
+    Raises:
+        SearchAborted: if the node budget runs out.
+    """
+    context._check_aborted()
+    best_col_num, best_score = _search_root(
+        np.uint64(current_pieces), np.uint64(mask), depth, alpha, beta,
+        *context.layout_arrays, context.table_keys, context.table_values,
+        context.counters
+    )
+    context._check_aborted()
+    return (
+        None if best_col_num == NO_COLUMN else int(best_col_num),
+        int(best_score)
+    )
+
+
+def compiled_score_root_moves(
+    current_pieces: int,
+    mask: int,
+    depth: int,
+    context: CompiledSearchContext
+) -> Dict[int, int]:
+    """`algos.score_root_moves` on the compiled kernels.
+
+    Raises:
+        SearchAborted: if the node budget runs out.
+    """
+    context._check_aborted()
+    layout = context.layout
+    scores = np.zeros(layout.num_columns, dtype=np.int64)
+    _score_root_moves(
+        np.uint64(current_pieces), np.uint64(mask), depth,
+        *context.layout_arrays, context.table_keys, context.table_values,
+        context.counters, scores
+    )
+    context._check_aborted()
+    return {
+        col_num: int(scores[col_num]) for col_num in context.column_order
+        if not mask & layout.top_masks[col_num]
+    }
+
+
+def compiled_iterative_deepening_search(
+    current_pieces: int,
+    mask: int,
+    max_depth: int,
+    context: CompiledSearchContext,
+    aspiration_window: int = ASPIRATION_WINDOW
+) -> Tuple[Optional[int], int, int]:
+    """`algos.iterative_deepening_search` on the compiled kernels: the same
+    iterations and aspiration windows, so the same move, score, depth and
+    number of nodes."""
+    best_col_num, best_score, completed_depth = None, 0, 0
+    num_empty_cells = popcount(context.layout.board_mask & ~mask)
+    for depth in range(1, max_depth + 1):
+        alpha, beta = -WIN_SCORE, WIN_SCORE
+        if aspiration_window and completed_depth:
+            alpha = best_score - aspiration_window
+            beta = best_score + aspiration_window
+        try:
+            while True:
+                col_num, score = compiled_search_root(
+                    current_pieces, mask, depth, context, alpha, beta
+                )
+                if score <= alpha:
+                    alpha = -WIN_SCORE
+                elif score >= beta:
+                    beta = WIN_SCORE
+                else:
+                    break
+        except SearchAborted:
+            break
+        best_col_num, best_score = col_num, score
+        completed_depth = depth
+        if depth >= num_empty_cells or abs(best_score) > MIN_WIN_SCORE:
+            # solved: searching deeper can't change the result.
+            break
+    return best_col_num, best_score, completed_depth
+
+
+def search_root_with_stats(
+    current_pieces: int,
+    mask: int,
+    depth: int,
+    layout: BitboardLayout,
+    max_num_table_entries: int = 0,
+    backend: str = DEFAULT_BACKEND
+) -> Tuple[Optional[int], int, int]:
+    """Finds the best column for the player to move, like
+    `algos.search_root`, with either backend.
+
+    Args:
+        max_num_table_entries (int): size of a fresh transposition table
+        for this search, or 0 for none.
+        backend (str): one of `BACKENDS`.
+
+    Returns:
+        best_col_num (int | None): the column to play, or None if the board
+        is full.
+        best_score (int): the score of that column (see `algos.negamax`).
+        num_nodes (int): the number of nodes searched.
+    """
+    if backend == "python":
+        context = SearchContext(
+            layout=layout,
+            transposition_table=(
+                TranspositionTable(max_num_table_entries)
+                if max_num_table_entries else None
+            )
+        )
+        best_col_num, best_score = search_root(
+            current_pieces, mask, depth, context
+        )
+        return best_col_num, best_score, context.num_nodes
+    if backend != "compiled":
+        raise ValueError(
+            f"Unknown backend {backend!r}: expected one of {BACKENDS}."
+        )
+
+    context = CompiledSearchContext(
+        layout, max_num_table_entries=max_num_table_entries
+    )
+    best_col_num, best_score = compiled_search_root(
+        current_pieces, mask, depth, context
+    )
+    return best_col_num, best_score, context.num_nodes
+
+
+def search_best_move(
+    current_pieces: int,
+    mask: int,
+    depth: int,
+    layout: BitboardLayout,
+    max_num_table_entries: int = DEFAULT_MAX_NUM_TABLE_ENTRIES
+) -> Tuple[Optional[int], int]:
+    """`algos.search_best_move` on the fastest available backend, with a
+    fresh transposition table.
+
+    Returns:
+        best_col_num (int | None): the column to play, or None if the board
+        is full.
+        best_score (int): the score of that column (see `algos.negamax`).
+    """
+    best_col_num, best_score, _ = search_root_with_stats(
+        current_pieces, mask, depth, layout,
+        max_num_table_entries=max_num_table_entries
+    )
+    return best_col_num, best_score
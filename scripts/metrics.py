@@ -0,0 +1,329 @@
+"""Move-level metrics of the computer opponents, in the Prometheus text
+exposition format.
+
+Every move made through `opponents.computer_make_move` is timed and added
+to a latency histogram labelled by difficulty level and board phase (see
+`get_board_phase`), so that p99 move latency can be alerted on per level
+and per phase. Two counters go with it:
+- timeouts: moves slower than their time budget: the time cap of their
+  strength level (see `MoveMetrics.set_move_timeout`), or for opponents
+  without one, `CONNECT4_MOVE_TIMEOUT_SECONDS`
+  (`DEFAULT_MOVE_TIMEOUT_SECONDS` if unset). A timeout is a move that kept
+  the player waiting too long, not an aborted one: a move stopped by its
+  time cap is still made.
+- fallbacks: moves that an opponent made some other way than it should
+  have, e.g. a random move for lack of network weights, labelled by
+  reason (see `MoveMetrics.record_fallback`).
+
+The metrics of a process are kept in `MOVE_METRICS`, and exposed either
+over HTTP (`start_metrics_server`, e.g. `play_game.py --metrics-port`) or
+as a file (`MoveMetrics.write`, e.g. `play_game.py --metrics-file`), in the
+format read by node_exporter's textfile collector.
+
+Part of the engine: nothing here imports the rest of it, so any module can
+record metrics.
+"""
+import bisect
+import contextlib
+import os
+import threading
+import time
+from typing import (
+    TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+)
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+MOVE_TIMEOUT_ENV_VAR = "CONNECT4_MOVE_TIMEOUT_SECONDS"
+DEFAULT_MOVE_TIMEOUT_SECONDS = 1.0
+
+# upper bounds of the latency buckets, in seconds.
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0
+)
+
+# boards with fewer pieces than this are in the opening.
+OPENING_NUM_PIECES = 8
+# boards with at most this many empty cells are in the endgame, which is
+# where the alpha-beta search starts solving positions exactly (see
+# `algos.ENDGAME_SOLVE_NUM_EMPTY_CELLS`).
+ENDGAME_NUM_EMPTY_CELLS = 12
+
+METRIC_PREFIX = "connect4_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def get_board_phase(num_pieces: int, num_cells: int) -> str:
+    """Phase of a board, from its ply count: "opening", "middlegame" or
+    "endgame"."""
+    if num_cells - num_pieces <= ENDGAME_NUM_EMPTY_CELLS:
+        return "endgame"
+    if num_pieces < OPENING_NUM_PIECES:
+        return "opening"
+    return "middlegame"
+
+
+def get_move_timeout_seconds() -> float:
+    """The move time budget, from the environment."""
+    return float(
+        os.environ.get(MOVE_TIMEOUT_ENV_VAR, DEFAULT_MOVE_TIMEOUT_SECONDS)
+    )
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n")
+        )
+        for name, value in labels
+    ) + "}"
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum, as in a
+    Prometheus histogram (buckets are cumulative once formatted)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # the last count is of observations above every bucket.
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_quantile(self, quantile: float) -> float:
+        """Estimates a quantile by interpolating within its bucket, like
+        PromQL's `histogram_quantile`. Observations above every bucket are
+        reported at the largest bucket."""
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        num_below = 0
+        for bucket_num, bucket_count in enumerate(self.bucket_counts):
+            if bucket_count and num_below + bucket_count >= rank:
+                if bucket_num == len(self.buckets):
+                    return self.buckets[-1]
+                lower_bound = self.buckets[bucket_num - 1] if bucket_num else 0
+                upper_bound = self.buckets[bucket_num]
+                return lower_bound + (upper_bound - lower_bound) * (
+                    (rank - num_below) / bucket_count
+                )
+            num_below += bucket_count
+        return self.buckets[-1]
+
+    def format_lines(
+        self, name: str, labels: Sequence[Tuple[str, str]]
+    ) -> List[str]:
+        lines = []
+        cumulative_count = 0
+        for bucket_num, bucket_count in enumerate(self.bucket_counts):
+            cumulative_count += bucket_count
+            upper_bound = (
+                f"{self.buckets[bucket_num]:g}"
+                if bucket_num < len(self.buckets) else "+Inf"
+            )
+            bucket_labels = _format_labels((*labels, ("le", upper_bound)))
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative_count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {self.sum!r}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self.count}")
+        return lines
+
+
+class MoveMetrics:
+    """Latency, timeouts and fallbacks of computer moves (see the module
+    docstring). Safe to record from several threads at once.
+
+    Usage:
+        with MOVE_METRICS.time_move("medium", "opening"):
+            ...  # make the move
+        print(MOVE_METRICS.format_prometheus())
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: Optional[float] = None,
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        self.timeout_seconds = (
+            get_move_timeout_seconds()
+            if timeout_seconds is None else timeout_seconds
+        )
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # (difficulty_level, phase) to latencies.
+        self.latencies: Dict[Tuple[str, str], Histogram] = {}
+        # difficulty_level to count.
+        self.num_timeouts: Dict[str, int] = {}
+        # (difficulty_level, reason) to count.
+        self.num_fallbacks: Dict[Tuple[str, str], int] = {}
+        # the difficulty level of the move being timed in each thread, that
+        # fallbacks are recorded against.
+        self.current_move = threading.local()
+
+    def record_move(
+        self,
+        difficulty_level: str,
+        phase: str,
+        latency_seconds: float,
+        timeout_seconds: Optional[float] = None
+    ):
+        """Records a move, as a timeout if slower than `timeout_seconds`
+        (`self.timeout_seconds` if None)."""
+        if timeout_seconds is None:
+            timeout_seconds = self.timeout_seconds
+        with self.lock:
+            histogram = self.latencies.get((difficulty_level, phase))
+            if histogram is None:
+                histogram = Histogram(self.buckets)
+                self.latencies[(difficulty_level, phase)] = histogram
+            histogram.observe(latency_seconds)
+            if latency_seconds > timeout_seconds:
+                self.num_timeouts[difficulty_level] = (
+                    self.num_timeouts.get(difficulty_level, 0) + 1
+                )
+
+    def record_fallback(
+        self, reason: str, difficulty_level: Optional[str] = None
+    ):
+        """Counts a fallback, against the difficulty level of the move being
+        timed in this thread unless given ("unknown" outside of a move)."""
+        if difficulty_level is None:
+            difficulty_level = getattr(
+                self.current_move, "difficulty_level", "unknown"
+            )
+        with self.lock:
+            key = (difficulty_level, reason)
+            self.num_fallbacks[key] = self.num_fallbacks.get(key, 0) + 1
+
+    def set_move_timeout(self, timeout_seconds: float):
+        """Sets the time budget of the move being timed in this thread, in
+        place of `self.timeout_seconds` (outside of a move, does nothing)."""
+        if hasattr(self.current_move, "difficulty_level"):
+            self.current_move.timeout_seconds = timeout_seconds
+
+    @contextlib.contextmanager
+    def time_move(self, difficulty_level: str, phase: str) -> Iterator[None]:
+        """Records the latency of the block as a move. A move that raises
+        isn't recorded."""
+        self.current_move.difficulty_level = difficulty_level
+        self.current_move.timeout_seconds = None
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            timeout_seconds = self.current_move.timeout_seconds
+            del self.current_move.difficulty_level
+            del self.current_move.timeout_seconds
+        self.record_move(
+            difficulty_level, phase, time.perf_counter() - start_time,
+            timeout_seconds=timeout_seconds
+        )
+
+    def get_latency_quantile(
+        self, quantile: float, difficulty_level: str, phase: str
+    ) -> float:
+        with self.lock:
+            histogram = self.latencies.get((difficulty_level, phase))
+            return histogram.get_quantile(quantile) if histogram else 0.0
+
+    def reset(self):
+        with self.lock:
+            self.latencies.clear()
+            self.num_timeouts.clear()
+            self.num_fallbacks.clear()
+
+    def format_prometheus(self) -> str:
+        """Every metric, in the Prometheus text exposition format."""
+        latency_name = f"{METRIC_PREFIX}move_latency_seconds"
+        timeouts_name = f"{METRIC_PREFIX}move_timeouts_total"
+        fallbacks_name = f"{METRIC_PREFIX}move_fallbacks_total"
+        lines = [
+            f"# HELP {latency_name} Time taken by a computer opponent to "
+            "make a move.",
+            f"# TYPE {latency_name} histogram"
+        ]
+        with self.lock:
+            for (difficulty_level, phase), histogram in sorted(
+                self.latencies.items()
+            ):
+                lines.extend(histogram.format_lines(
+                    latency_name,
+                    (("difficulty", difficulty_level), ("phase", phase))
+                ))
+            lines.extend([
+                f"# HELP {timeouts_name} Moves that took longer than "
+                "their time budget (the time cap of their strength level, "
+                f"or else {self.timeout_seconds:g} seconds).",
+                f"# TYPE {timeouts_name} counter"
+            ])
+            for difficulty_level, count in sorted(self.num_timeouts.items()):
+                labels = _format_labels((("difficulty", difficulty_level),))
+                lines.append(f"{timeouts_name}{labels} {count}")
+            lines.extend([
+                f"# HELP {fallbacks_name} Moves made by falling back from "
+                "the opponent's own algorithm.",
+                f"# TYPE {fallbacks_name} counter"
+            ])
+            for (difficulty_level, reason), count in sorted(
+                self.num_fallbacks.items()
+            ):
+                labels = _format_labels(
+                    (("difficulty", difficulty_level), ("reason", reason))
+                )
+                lines.append(f"{fallbacks_name}{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Writes the metrics to a file, atomically, so that a scraper
+        never reads a partial file."""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as metrics_file:
+            metrics_file.write(self.format_prometheus())
+        os.replace(temp_path, path)
+
+
+MOVE_METRICS = MoveMetrics()
+
+
+def start_metrics_server(
+    port: int, host: str = "", metrics: MoveMetrics = MOVE_METRICS
+) -> "ThreadingHTTPServer":
+    """Serves the metrics at `/metrics` from a background thread.
+
+    Returns:
+        (ThreadingHTTPServer): the server, to `shutdown` when done. Its
+        `server_port` is the port picked by the OS if `port` is 0.
+    """
+    # imported on first use, so that the engine doesn't pay for it.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.format_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # scrapes would otherwise be logged on stderr.
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
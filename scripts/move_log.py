@@ -0,0 +1,78 @@
+"""Logs of the move requests served by the search engine, to replay them.
+
+Every move that the strength-level engine makes (see `strength.py`) draws
+its own seed from its opponent's random number generator, so that the move
+only depends on the position, the seed and the strength level. With
+`MOVE_LOG` set, each move is appended to a JSON lines file as a
+`MoveRequest`: all of that, and what the engine answered, at what cost.
+`replay.py` re-runs logged requests and compares the moves, node counts
+and timings with those recorded.
+
+A search is reproducible, node for node, when nothing but the request
+decides it: when it's made with a fresh transposition table, and the clock
+didn't stop it: either it had no time cap (see `strength.choose_move`'s
+`deterministic`), or it finished within the cap. Requests record whether
+they were.
+
+Part of the engine: nothing here imports the rest of it.
+"""
+import json
+import threading
+from typing import Iterator, NamedTuple, Optional
+
+
+class MoveRequest(NamedTuple):
+    """A move made by the engine."""
+    level_num: int
+    num_rows: int
+    num_columns: int
+    # the position, as bitboards (see `bitboard.py`): the pieces of the
+    # player to move, and every piece.
+    current_pieces: int
+    mask: int
+    seed: int
+    # searched with a transposition table kept from earlier moves, and/or
+    # with the clock as well as the node budget: the search may not replay
+    # the same.
+    keeps_transposition_table: bool
+    deterministic: bool
+    # whether the clock stopped the search (and so, it may not replay the
+    # same).
+    is_past_deadline: bool
+    col_num: Optional[int]
+    num_nodes: int
+    elapsed_seconds: float
+    cpu_seconds: float
+
+    @property
+    def is_reproducible(self) -> bool:
+        if self.keeps_transposition_table:
+            return False
+        return self.deterministic or not self.is_past_deadline
+
+
+class MoveLog:
+    """Appends move requests to a JSON lines file. Safe to log to from
+    several threads at once."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def log(self, request: MoveRequest):
+        line = json.dumps(request._asdict()) + "\n"
+        with self.lock:
+            with open(self.path, "a") as log_file:
+                log_file.write(line)
+
+
+def read_move_requests(path: str) -> Iterator[MoveRequest]:
+    """Lazily yields every move request of a log, in order."""
+    with open(path) as log_file:
+        for line in log_file:
+            if line.strip():
+                yield MoveRequest(**json.loads(line))
+
+
+# where the moves of this process are logged, if anywhere.
+MOVE_LOG: Optional[MoveLog] = None
@@ -0,0 +1,201 @@
+"""Suites of balanced opening positions, for benchmarks and tournaments.
+
+Games between computer opponents from the empty board are nearly
+deterministic, so they keep repeating the same few games. An opening suite
+is a fixed set of short, distinct move sequences to start games from
+instead:
+- openings are random games of a fixed number of moves;
+- an opening and its mirror image are the same opening, so only one of
+  them is kept;
+- only roughly even openings are kept: neither player can win right away,
+  and a short search scores the position close to 0.
+
+Suites are stored in the compact game record format (see
+`game_record.py`), as unfinished games. Openings are also written as move
+strings: the 1-indexed column of each move, e.g. "4453".
+
+Run `python openings.py --help` for usage.
+"""
+import argparse
+import random
+from typing import List, Optional, Tuple
+
+from algos import WIN_SCORE, search_best_move
+from bitboard import (
+    BitboardLayout, get_layout, get_playable_columns, mirror_bitboard,
+    play_column
+)
+from components import Board
+import constants
+from game_record import GameRecord, GameRecordWriter, iter_records, replay
+from threats import get_immediate_threats
+
+DEFAULT_NUM_OPENINGS = 64
+DEFAULT_NUM_OPENING_MOVES = 4
+# openings are scored by a search this deep, from the point of view of the
+# player to move ...
+DEFAULT_EVAL_DEPTH = 6
+# ... and kept if the score is at most this far from 0: about two threats
+# (see `algos.evaluate_position`).
+DEFAULT_MAX_ABS_SCORE = 10
+# give up after this many random openings per opening asked for, when there
+# are fewer even openings than that.
+MAX_NUM_ATTEMPTS_PER_OPENING = 100
+
+
+def moves_to_string(moves: Tuple[int, ...]) -> str:
+    """Move string of 0-indexed columns, e.g. (3, 3, 4, 2) -> "4453"."""
+    return "".join(str(col_num + 1) for col_num in moves)
+
+
+def string_to_moves(move_string: str) -> Tuple[int, ...]:
+    """Inverse of `moves_to_string`.
+
+    Raises:
+        ValueError: if a character isn't a column number from 1 to 9.
+    """
+    if not all(char in "123456789" for char in move_string):
+        raise ValueError(f"Invalid move string: {move_string!r}")
+    return tuple(int(char) - 1 for char in move_string)
+
+
+def play_moves(
+    moves: Tuple[int, ...], layout: BitboardLayout
+) -> Tuple[int, int]:
+    """Plays moves from the empty board, without any win checks.
+
+    Returns:
+        (Tuple[int, int]): the pieces of the player to move and the mask.
+
+    Raises:
+        ValueError: if a move is into a full or missing column.
+    """
+    current_pieces, mask = 0, 0
+    for col_num in moves:
+        if col_num not in get_playable_columns(mask, layout):
+            raise ValueError(f"Invalid move: {col_num}")
+        current_pieces, mask = play_column(
+            current_pieces, mask, col_num, layout
+        )
+        current_pieces ^= mask
+    return current_pieces, mask
+
+
+def get_canonical_key(
+    current_pieces: int, mask: int, layout: BitboardLayout
+) -> int:
+    """Key of a position that is shared with its mirror image."""
+    return min(
+        current_pieces + mask,
+        mirror_bitboard(current_pieces, layout)
+        + mirror_bitboard(mask, layout)
+    )
+
+
+def generate_opening_suite(
+    num_openings: int = DEFAULT_NUM_OPENINGS,
+    num_moves: int = DEFAULT_NUM_OPENING_MOVES,
+    layout: Optional[BitboardLayout] = None,
+    eval_depth: int = DEFAULT_EVAL_DEPTH,
+    max_abs_score: int = DEFAULT_MAX_ABS_SCORE,
+    seed: int = 0
+) -> List[Tuple[int, ...]]:
+    """Random, distinct, roughly even openings (see the module docstring).
+
+    Returns:
+        (List[Tuple[int, ...]]): up to `num_openings` openings, as 0-indexed
+        columns. Fewer are returned if there aren't enough even openings of
+        `num_moves` moves.
+    """
+    if layout is None:
+        layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    rng = random.Random(seed)
+    openings = []
+    seen_keys = set()
+    for _ in range(MAX_NUM_ATTEMPTS_PER_OPENING * num_openings):
+        if len(openings) == num_openings:
+            break
+        current_pieces, mask = 0, 0
+        moves = []
+        for _ in range(num_moves):
+            if get_immediate_threats(current_pieces, mask, layout):
+                break
+            col_num = rng.choice(get_playable_columns(mask, layout))
+            current_pieces, mask = play_column(
+                current_pieces, mask, col_num, layout
+            )
+            current_pieces ^= mask
+            moves.append(col_num)
+        else:
+            key = get_canonical_key(current_pieces, mask, layout)
+            if key in seen_keys or get_immediate_threats(
+                current_pieces, mask, layout
+            ):
+                continue
+            seen_keys.add(key)
+            _, score = search_best_move(
+                current_pieces, mask, eval_depth, layout
+            )
+            if abs(score) <= max_abs_score:
+                openings.append(tuple(moves))
+    return openings
+
+
+def write_opening_suite(
+    path: str, openings: List[Tuple[int, ...]], layout: BitboardLayout
+):
+    """Appends openings to a game record file, as unfinished games."""
+    with GameRecordWriter(path) as writer:
+        for moves in openings:
+            writer.write(GameRecord(
+                num_rows=layout.num_rows,
+                num_columns=layout.num_columns,
+                moves=tuple(moves)
+            ))
+
+
+def load_opening_suite(path: str) -> List[Tuple[int, ...]]:
+    """Openings of a suite written by `write_opening_suite`, as 0-indexed
+    columns."""
+    return [record.moves for record in iter_records(path)]
+
+
+def load_opening_boards(path: str) -> List[Board]:
+    """Boards after each opening of a suite."""
+    return [replay(record) for record in iter_records(path)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--output", default=constants.OPENING_SUITE_PATH,
+        help="game record file to append the openings to"
+    )
+    parser.add_argument(
+        "--num-openings", type=int, default=DEFAULT_NUM_OPENINGS
+    )
+    parser.add_argument(
+        "--num-moves", type=int, default=DEFAULT_NUM_OPENING_MOVES
+    )
+    parser.add_argument("--eval-depth", type=int, default=DEFAULT_EVAL_DEPTH)
+    parser.add_argument(
+        "--max-abs-score", type=int, default=DEFAULT_MAX_ABS_SCORE,
+        help=f"keep openings scored within this of 0 (a win is {WIN_SCORE})"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    openings = generate_opening_suite(
+        args.num_openings, args.num_moves, layout,
+        eval_depth=args.eval_depth, max_abs_score=args.max_abs_score,
+        seed=args.seed
+    )
+    write_opening_suite(args.output, openings, layout)
+    print(f"Wrote {len(openings)} openings to {args.output}:")
+    for moves in openings:
+        print(moves_to_string(moves))
+
+
+if __name__ == "__main__":
+    main()
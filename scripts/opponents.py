@@ -0,0 +1,439 @@
+"""Computer opponents, by name: the difficulty levels of the game, and any
+opponent registered by a plugin.
+
+Opponents are kept in `OPPONENT_REGISTRY` as `OpponentSpec`s: the factory
+that builds the opponent, and the resources that it needs to serve moves
+(see `ResourceProfile`), so that a server can plan capacity without loading
+anything. An opponent is only built the first time that it's used, or when
+it's warmed up ahead of traffic (see `OpponentRegistry.warm_up`). Building
+an opponent warms it up: factories open the books, tables and network
+weights that the opponent plays with (memory-mapped, where they're files)
+before returning it, so that its first move doesn't pay for them.
+
+The built-in factories take a `seed`, for the random number generator that
+picks their moves, so that a game against them can be played again move
+for move (see also `move_log.py`).
+
+Besides the built-in opponents, opponents are registered (the first time
+that `OPPONENT_REGISTRY` is used, not when this module is imported):
+- by installed packages, as entry points in the `ENTRY_POINT_GROUP` group.
+  Each loads to an `OpponentSpec`, so a plugin's top-level module should
+  name its factory as a "module:attribute" path rather than import it;
+- in a JSON config file, read from `CONFIG_ENV_VAR` if set, e.g.
+
+    {"opponents": [{
+        "name": "experimental",
+        "factory": "my_engine:make_opponent",
+        "kwargs": {"depth": 10},
+        "profile": {
+            "num_cpus": 1, "memory_mb": 200, "expected_latency_ms": 300
+        }
+    }]}
+
+`OpponentRegistry.reload` swaps in new builds of opponents without a
+restart: the plugins are registered again, the modules of factories named
+by path are re-imported, and the opponents rebuilt. Each new build is
+warmed up before it replaces the old one, so moves never wait on a load.
+Modules are re-imported in place (see `importlib.reload`), so an engine
+should keep its state in what its factory builds, not in module globals.
+
+Part of the engine: nothing here (or in the modules it imports) depends on
+pygame, so headless workers can make computer moves without paying for the
+GUI. See `ENGINE_MODULES` in `benchmark.py` for the import-time check.
+"""
+import importlib
+import importlib.metadata
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from components import Board
+import constants
+from metrics import MOVE_METRICS, get_board_phase
+
+ENTRY_POINT_GROUP = "connect4.opponents"
+CONFIG_ENV_VAR = "CONNECT4_OPPONENTS_CONFIG"
+
+# drops a piece for Player 2.
+Opponent = Callable[[Board], None]
+
+
+class ResourceProfile(NamedTuple):
+    """What an opponent needs to serve moves, declared up front."""
+    # cores kept busy while it makes a move.
+    num_cpus: float
+    # resident memory once built, in MB.
+    memory_mb: float
+    # typical time to make a move, in ms.
+    expected_latency_ms: float
+
+
+class OpponentSpec(NamedTuple):
+    """How to build an opponent, and what it needs."""
+    name: str
+    # a callable that returns the opponent, or its "module:attribute" path,
+    # imported when the opponent is first built.
+    factory: Union[str, Callable[..., Opponent]]
+    profile: ResourceProfile
+    # passed to the factory.
+    kwargs: Optional[Dict[str, object]] = None
+
+
+def resolve_factory(factory: Union[str, Callable[..., Opponent]]):
+    """The factory named by a "module:attribute" path (or the factory
+    itself, if not a path)."""
+    if not isinstance(factory, str):
+        return factory
+    module_name, _, attribute_name = factory.partition(":")
+    if not module_name or not attribute_name:
+        raise ValueError(
+            f"Expected a 'module:attribute' path, got {factory!r}."
+        )
+    return getattr(importlib.import_module(module_name), attribute_name)
+
+
+def read_config(path: str) -> List[OpponentSpec]:
+    """The opponents of a config file (see the module docstring).
+
+    Raises:
+        ValueError: if an opponent is missing a field.
+    """
+    with open(path) as config_file:
+        config = json.load(config_file)
+    specs = []
+    for opponent_config in config.get("opponents", []):
+        try:
+            specs.append(OpponentSpec(
+                name=opponent_config["name"],
+                factory=opponent_config["factory"],
+                profile=ResourceProfile(**opponent_config["profile"]),
+                kwargs=opponent_config.get("kwargs")
+            ))
+        except (KeyError, TypeError) as error:
+            raise ValueError(
+                f"Invalid opponent in {path}: {opponent_config!r}"
+            ) from error
+    return specs
+
+
+def read_entry_points(group: str = ENTRY_POINT_GROUP) -> List[OpponentSpec]:
+    """The opponents registered by installed packages, named after their
+    entry points."""
+    if sys.version_info >= (3, 10):
+        entry_points = importlib.metadata.entry_points(group=group)
+    else:
+        # before 3.10, every group's entry points come back in a dict.
+        entry_points = importlib.metadata.entry_points().get(group, [])
+    return [
+        entry_point.load()._replace(name=entry_point.name)
+        for entry_point in entry_points
+    ]
+
+
+class OpponentRegistry:
+    """Opponents by name, built on first use (see the module docstring).
+    Safe to use from several threads at once.
+
+    Usage:
+        registry = OpponentRegistry()
+        registry.register(OpponentSpec("easy", make_easy_opponent, profile))
+        registry.warm_up(["easy"])  # optional: before serving traffic
+        registry.get("easy")(board)
+    """
+
+    def __init__(self):
+        self.specs: Dict[str, OpponentSpec] = {}
+        # the built opponents, by name.
+        self.opponents: Dict[str, Opponent] = {}
+        # held while building, so that an opponent is built once.
+        self.lock = threading.Lock()
+        # where plugins were last registered from, to re-register them on
+        # reload.
+        self.config_path: Optional[str] = None
+        self.entry_point_group: Optional[str] = None
+        # set while plugins are to be registered on first use (see
+        # `register_plugins`).
+        self.has_pending_plugins = False
+        self.plugins_lock = threading.Lock()
+
+    def register(self, spec: OpponentSpec):
+        """Adds an opponent, replacing any of the same name. An opponent
+        that was already built keeps being used until `reload`."""
+        with self.lock:
+            self.specs[spec.name] = spec
+
+    def register_plugins(
+        self,
+        config_path: Optional[str] = None,
+        entry_point_group: Optional[str] = ENTRY_POINT_GROUP,
+        lazy: bool = False
+    ):
+        """Registers the opponents of installed packages and of a config
+        file.
+
+        Args:
+            lazy (bool): whether to wait until the registry is first used
+            (to get an opponent, or its name or profile) to look for them,
+            rather than look for them now.
+        """
+        self.config_path = config_path
+        self.entry_point_group = entry_point_group
+        if lazy:
+            self.has_pending_plugins = True
+        else:
+            self._register_plugins()
+
+    def _register_plugins(self):
+        specs = []
+        config_path = self.config_path
+        entry_point_group = self.entry_point_group
+        if entry_point_group is not None:
+            specs.extend(read_entry_points(entry_point_group))
+        if config_path is not None:
+            specs.extend(read_config(config_path))
+        for spec in specs:
+            self.register(spec)
+
+    def _register_pending_plugins(self):
+        if not self.has_pending_plugins:
+            return
+        with self.plugins_lock:
+            if self.has_pending_plugins:
+                self._register_plugins()
+                self.has_pending_plugins = False
+
+    def __contains__(self, name: str) -> bool:
+        self._register_pending_plugins()
+        return name in self.specs
+
+    def get_names(self) -> List[str]:
+        self._register_pending_plugins()
+        return sorted(self.specs)
+
+    def get_profile(self, name: str) -> ResourceProfile:
+        self._register_pending_plugins()
+        return self.specs[name].profile
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self.opponents
+
+    def _build(self, spec: OpponentSpec, **kwargs) -> Opponent:
+        factory = resolve_factory(spec.factory)
+        kwargs = {**(spec.kwargs or {}), **kwargs}
+        parameters = inspect.signature(factory).parameters.values()
+        if not any(
+            parameter.kind == inspect.Parameter.VAR_KEYWORD
+            for parameter in parameters
+        ):
+            names = {parameter.name for parameter in parameters}
+            kwargs = {
+                name: value for name, value in kwargs.items() if name in names
+            }
+        return factory(**kwargs)
+
+    def build(self, name: str, **kwargs) -> Opponent:
+        """A new build of an opponent, of its own: not the one that `get`
+        returns, and not kept. `kwargs` are passed to its factory, over
+        those of its spec, if the factory takes them, e.g.
+
+            registry.build("hard", seed=0, deterministic=True)
+
+        plays the same moves every game, as far as the opponent can (see
+        `make_level_opponent`).
+
+        Raises:
+            KeyError: if no opponent has that name.
+        """
+        self._register_pending_plugins()
+        return self._build(self.specs[name], **kwargs)
+
+    def get(self, name: str) -> Opponent:
+        """The opponent of a name, built (and warmed up) if it hasn't been
+        yet.
+
+        Raises:
+            KeyError: if no opponent has that name.
+        """
+        opponent = self.opponents.get(name)
+        if opponent is not None:
+            return opponent
+        self._register_pending_plugins()
+        with self.lock:
+            if name not in self.opponents:
+                self.opponents[name] = self._build(self.specs[name])
+            return self.opponents[name]
+
+    def warm_up(self, names: Optional[List[str]] = None):
+        """Builds opponents (every one if None) before they're first
+        used."""
+        for name in self.get_names() if names is None else names:
+            self.get(name)
+
+    def reload(self, names: Optional[List[str]] = None) -> List[str]:
+        """Swaps in new builds of opponents (see the module docstring):
+        those given, or every opponent that has been built.
+
+        Returns:
+            (List[str]): the names of the opponents rebuilt.
+        """
+        if self.config_path is not None or self.entry_point_group is not None:
+            with self.plugins_lock:
+                self._register_plugins()
+                self.has_pending_plugins = False
+        if names is None:
+            names = sorted(self.opponents)
+
+        reloaded_modules = set()
+        new_opponents = {}
+        for name in names:
+            spec = self.specs[name]
+            if isinstance(spec.factory, str):
+                module_name = spec.factory.partition(":")[0]
+                if (
+                    module_name in sys.modules
+                    and module_name not in reloaded_modules
+                ):
+                    importlib.reload(sys.modules[module_name])
+                    reloaded_modules.add(module_name)
+            # built outside of the lock: the old builds keep serving moves
+            # meanwhile.
+            new_opponents[name] = self._build(spec)
+        with self.lock:
+            self.opponents.update(new_opponents)
+        return names
+
+
+def make_level_opponent(
+    level_num: int,
+    keeps_transposition_table: bool = False,
+    seed: Optional[int] = None,
+    deterministic: bool = False
+) -> Opponent:
+    """An opponent playing at one of the strength levels of `strength.py`.
+
+    Args:
+        keeps_transposition_table (bool): whether to search with the table
+        kept between moves (and filled in by pondering, see `ponder.py`),
+        rather than a fresh one every move.
+        seed (int | None): see `strength.make_strength_opponent`.
+        deterministic (bool): whether to search by node budget only, so
+        that moves can be replayed (see `move_log.py`).
+    """
+    # imported here, like every engine that an opponent plays with, so that
+    # only the opponents used are paid for.
+    from algos import ALPHA_BETA_TRANSPOSITION_TABLE
+    from strength import make_strength_opponent
+    return make_strength_opponent(
+        level_num,
+        transposition_table=(
+            ALPHA_BETA_TRANSPOSITION_TABLE if keeps_transposition_table
+            else None
+        ),
+        seed=seed,
+        deterministic=deterministic
+    )
+
+
+def make_naive_opponent(seed: Optional[int] = None) -> Opponent:
+    """An opponent that plays a random column, picked by a random number
+    generator seeded with `seed` (from the OS if None)."""
+    from algos import make_move_naive
+    rng = random.Random(seed)
+
+    def make_move(board: Board):
+        make_move_naive(board, rng=rng)
+
+    return make_move
+
+
+def make_deep_q_opponent(seed: Optional[int] = None) -> Opponent:
+    """An opponent that plays the move valued best by the value network,
+    whose weights are memory-mapped and paged in here (if there are any:
+    otherwise it plays random moves, seeded with `seed`, see
+    `make_move_deep_q_learning`)."""
+    from algos import get_value_policy_network, make_move_deep_q_learning
+    rng = random.Random(seed)
+
+    def make_move(board: Board):
+        make_move_deep_q_learning(board, rng=rng)
+
+    try:
+        network = get_value_policy_network()
+    except FileNotFoundError:
+        return make_move
+    # one empty board, in the planes that moves are evaluated in.
+    network.evaluate(np.zeros(
+        (1, 2, constants.ROW_COUNT, constants.COLUMN_COUNT), dtype=np.uint8
+    ))
+    return make_move
+
+
+def _make_default_registry() -> OpponentRegistry:
+    registry = OpponentRegistry()
+    # every difficulty level is the same engine at a different strength
+    # (see `strength.STRENGTH_LEVELS`, and the costs measured there). The
+    # hardest keeps its table between moves.
+    for spec in (
+        OpponentSpec(
+            "easy", make_level_opponent, ResourceProfile(1, 1, 1),
+            kwargs={"level_num": 2}
+        ),
+        OpponentSpec(
+            "medium", make_level_opponent, ResourceProfile(1, 15, 30),
+            kwargs={"level_num": 5}
+        ),
+        OpponentSpec(
+            "hard", make_level_opponent, ResourceProfile(1, 60, 1800),
+            kwargs={"level_num": 8, "keeps_transposition_table": True}
+        ),
+        OpponentSpec("naive", make_naive_opponent, ResourceProfile(1, 1, 1)),
+        OpponentSpec(
+            "deep_q", make_deep_q_opponent, ResourceProfile(1, 20, 5)
+        )
+    ):
+        registry.register(spec)
+    # looked for on first use: importing this module doesn't scan the
+    # installed packages.
+    registry.register_plugins(
+        config_path=os.environ.get(CONFIG_ENV_VAR), lazy=True
+    )
+    return registry
+
+
+OPPONENT_REGISTRY = _make_default_registry()
+
+
+def computer_make_move(board: Board, difficulty_level: str):
+    """Computer opponent makes a move.
+
+    Wrapper function around the actual function that makes the move and updates
+    the board. The move is timed into `metrics.MOVE_METRICS`.
+
+    Args:
+        difficulty_level (str): the name of an opponent of
+        `OPPONENT_REGISTRY`, e.g. "easy", "medium" or "hard".
+
+    Returns:
+        col_num (int | None): the column that the computer dropped a piece
+        into, or None if the board wasn't changed.
+    """
+    pieces_per_column_before = np.count_nonzero(board.board, axis=0)
+    func = OPPONENT_REGISTRY.get(difficulty_level)
+    phase = get_board_phase(
+        int(pieces_per_column_before.sum()), board.board.size
+    )
+    with MOVE_METRICS.time_move(difficulty_level, phase):
+        func(board)
+    pieces_per_column_after = np.count_nonzero(board.board, axis=0)
+    changed_columns = np.flatnonzero(
+        pieces_per_column_after != pieces_per_column_before
+    )
+    if changed_columns.size == 0:
+        return None
+    return int(changed_columns[0])
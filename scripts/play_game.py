@@ -1,4 +1,5 @@
 """Main file, to manage gameplay."""
+import argparse
 import math
 import sys
 
@@ -8,33 +9,128 @@ from components import Board
 from constants import (
     COLOR_TO_CODE_DICT,
     COLUMN_COUNT,
+    GAME_RECORDS_PATH,
     GAME_WIDTH,
     ROW_COUNT,
     SLOT_RADIUS,
     SQUARESIZE,
     VALUE_TO_COLOR_DICT
 )
-from helper_play_game import (
-    computer_make_move, draw_board, init_game
+from game_record import (
+    PLAYER_TYPE_TO_CODE, RESULT_DRAW, GameRecord, GameRecordWriter,
+    get_timestamp_ms
+)
+from helper_play_game import draw_board, init_game
+from metrics import MOVE_METRICS, start_metrics_server
+import move_log
+from opponents import OPPONENT_REGISTRY, computer_make_move
+from ponder import Ponderer
+from profiling import (
+    add_profile_arguments, configure_from_args, profile_session
 )
 
-pygame.init()
-pygame.font.init()
-
-GAME_STATUS_FONT = pygame.font.SysFont("monospace", 80)
+# created in `play_game`, once pygame has been initialized. Initializing
+# pygame (and scanning system fonts) is slow, so it isn't done at import.
+GAME_STATUS_FONT = None
 
 GAME_OVER_BOOL = False
 
 IS_PLAYER_1_TURN = True
 
+DEFAULT_DIFFICULTY_LEVEL = "easy"
+
+# difficulty levels whose search keeps thinking while the human does (see
+# `ponder.py`).
+PONDER_DIFFICULTY_LEVELS = ("hard",)
+
+# keys that take back a move.
+TAKEBACK_KEYS = (pygame.K_u, pygame.K_BACKSPACE)
+
+# if set, the move metrics (see `metrics.py`) are written here after every
+# computer move.
+METRICS_PATH = None
+
+
+def record_game(
+    board: Board, winner, start_timestamp_ms: int, difficulty_level: str
+):
+    """Appends a finished game to the game records file. The moves are
+    those of the board's history."""
+    record = GameRecord(
+        num_rows=board.num_rows,
+        num_columns=board.num_columns,
+        moves=tuple(board.history().tolist()),
+        player_1="human",
+        # opponents registered by plugins have no code of their own.
+        player_2=(
+            difficulty_level if difficulty_level in PLAYER_TYPE_TO_CODE
+            else "unknown"
+        ),
+        result=int(winner) if winner else RESULT_DRAW,
+        start_timestamp_ms=start_timestamp_ms,
+        end_timestamp_ms=get_timestamp_ms()
+    )
+    with GameRecordWriter(GAME_RECORDS_PATH) as writer:
+        writer.write(record)
+
+
+def finish_game(
+    board: Board,
+    screen,
+    winner,
+    start_timestamp_ms: int,
+    difficulty_level: str
+):
+    """Shows the result of a finished game, whoever made the last move, and
+    records the game (see `record_game`)."""
+    if winner:
+        label = pygame.font.Font.render(
+            GAME_STATUS_FONT,
+            f"Player {int(winner)} wins!",
+            COLOR_TO_CODE_DICT[VALUE_TO_COLOR_DICT[winner]],
+            COLOR_TO_CODE_DICT["white"]
+        )
+    else:
+        label = pygame.font.Font.render(
+            GAME_STATUS_FONT,
+            "It's a draw!",
+            COLOR_TO_CODE_DICT["white"],
+            COLOR_TO_CODE_DICT["black"]
+        )
+    screen.blit(label, (40, 10))
+
+    draw_board(board=board, screen=screen)
+    record_game(
+        board=board,
+        winner=winner,
+        start_timestamp_ms=start_timestamp_ms,
+        difficulty_level=difficulty_level
+    )
+    pygame.time.wait(3000)
+
+
+def play_game(difficulty_level: str = DEFAULT_DIFFICULTY_LEVEL):
+    """Main function to play game.
+
+    Args:
+        difficulty_level (str): the computer opponent, by its name in
+        `OPPONENT_REGISTRY`.
+    """
+    global GAME_STATUS_FONT
+    # before the window opens, rather than on the computer's first move.
+    OPPONENT_REGISTRY.warm_up([difficulty_level])
+    pygame.init()
+    pygame.font.init()
+    GAME_STATUS_FONT = pygame.font.SysFont("monospace", 80)
 
-def play_game():
-    """Main function to play game."""
     screen = init_game()
     board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
     board.init_board()
+    start_timestamp_ms = get_timestamp_ms()
+    ponderer = (
+        Ponderer() if difficulty_level in PONDER_DIFFICULTY_LEVELS else None
+    )
     global IS_PLAYER_1_TURN
-    global GAME_STATUS_FONT
     global GAME_OVER_BOOL
     draw_board(board=board, screen=screen)
     pygame.display.update()
@@ -48,15 +144,44 @@ def play_game():
 
             # computer makes move if it is its turn
             # NOTE(mark): assumes that user is Player 1.
-            # TODO(mark): need to update the opponent function used, and to do
-            # so as param.
-            if not IS_PLAYER_1_TURN:
+            if not IS_PLAYER_1_TURN and not GAME_OVER_BOOL:
                 computer_make_move(
                     board=board,
-                    difficulty_level="easy"
+                    difficulty_level=difficulty_level
                 )
+                if METRICS_PATH is not None:
+                    MOVE_METRICS.write(METRICS_PATH)
                 draw_board(board=board, screen=screen)
                 IS_PLAYER_1_TURN = not IS_PLAYER_1_TURN
+                is_game_over, winner = board.is_game_over()
+                if is_game_over:
+                    finish_game(
+                        board=board,
+                        screen=screen,
+                        winner=winner,
+                        start_timestamp_ms=start_timestamp_ms,
+                        difficulty_level=difficulty_level
+                    )
+                    GAME_OVER_BOOL = True
+                elif ponderer is not None:
+                    ponderer.start(board)
+                continue
+
+            # take back the human's last move (and the computer's reply).
+            if (
+                event.type == pygame.KEYDOWN
+                and event.key in TAKEBACK_KEYS
+                and IS_PLAYER_1_TURN
+                and not GAME_OVER_BOOL
+                and board.num_moves >= 2
+            ):
+                board.pop()
+                board.pop()
+                draw_board(board=board, screen=screen)
+                # the human is to move again, in the position before: ponder
+                # on it (`start` stops pondering on the one taken back).
+                if ponderer is not None:
+                    ponderer.start(board)
                 continue
 
             # render piece while user is hovering on screen.
@@ -92,6 +217,9 @@ def play_game():
                     draw_board(board=board, screen=screen)
 
                 else:
+                    # the human has moved: stop thinking on their time.
+                    if ponderer is not None:
+                        ponderer.stop()
                     pygame.draw.rect(
                         screen,
                         COLOR_TO_CODE_DICT["black"],
@@ -118,25 +246,44 @@ def play_game():
                         is_game_over, winner = board.is_game_over()
 
                         if is_game_over:
-                            if winner:
-                                label = pygame.font.Font.render(
-                                    GAME_STATUS_FONT,
-                                    f"Player {int(winner)} wins!",
-                                    COLOR_TO_CODE_DICT[
-                                        VALUE_TO_COLOR_DICT[winner]
-                                    ],
-                                    COLOR_TO_CODE_DICT["white"]
-                                )
-                                screen.blit(label, (40, 10))
-                            else:
-                                screen.blit("It's a draw!", (40, 10))
-
-                            draw_board(board=board, screen=screen)
-                            pygame.time.wait(3000)
-
+                            finish_game(
+                                board=board,
+                                screen=screen,
+                                winner=winner,
+                                start_timestamp_ms=start_timestamp_ms,
+                                difficulty_level=difficulty_level
+                            )
                             GAME_OVER_BOOL = True
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--difficulty", choices=OPPONENT_REGISTRY.get_names(),
+        default=DEFAULT_DIFFICULTY_LEVEL,
+        help="the computer opponent to play against"
+    )
+    parser.add_argument(
+        "--metrics-port", type=int,
+        help="serve the move metrics at http://localhost:<port>/metrics"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="write the move metrics to this file after every computer move"
+    )
+    parser.add_argument(
+        "--move-log",
+        help="append every computer move to this file, to replay it with "
+        "replay.py"
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    METRICS_PATH = args.metrics_file
+    if args.move_log is not None:
+        move_log.MOVE_LOG = move_log.MoveLog(args.move_log)
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port)
     # TODO(mark): need to handle game resets
-    play_game()
+    with profile_session("game"):
+        play_game(difficulty_level=args.difficulty)
@@ -0,0 +1,148 @@
+"""Pondering: searching on the opponent's time.
+
+After the computer moves, a background thread searches the position after
+every possible reply of the human player, one move deeper at a time across
+all replies, filling in the transposition table that the computer's own
+search uses. When the human drops a piece, pondering is stopped (the
+search in progress is aborted at its next check) and the computer's search
+finds the position already searched, often deeper than it would have
+searched by itself.
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+from algos import (
+    ALPHA_BETA_TRANSPOSITION_TABLE, MIN_WIN_SCORE, SearchAborted,
+    SearchContext, get_endgame_tablebase, search_root
+)
+from bitboard import (
+    BitboardLayout, board_to_bitboards, get_layout, get_move_bit
+)
+from components import Board
+from threats import popcount
+from transposition import TranspositionTable, get_position_key
+
+PONDER_MAX_DEPTH = 12
+
+
+class Ponderer:
+    """Searches likely replies in a background thread.
+
+    Usage:
+        ponderer = Ponderer()
+        ponderer.start(board)  # after the computer's move
+        ...                    # human thinks
+        ponderer.stop()        # as soon as the human drops a piece
+    """
+
+    def __init__(
+        self,
+        transposition_table: TranspositionTable = (
+            ALPHA_BETA_TRANSPOSITION_TABLE
+        ),
+        max_depth: int = PONDER_MAX_DEPTH
+    ):
+        self.transposition_table = transposition_table
+        self.max_depth = max_depth
+        self.stop_event = threading.Event()
+        self.thread = None
+        # keyed on position (see `get_position_key`): the best column, its
+        # score and the depth it was searched to.
+        self.results: Dict[int, Tuple[int, int, int]] = {}
+        self.num_nodes = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, board: Board):
+        """Starts pondering on a board where it's the human's (Player 1's)
+        turn."""
+        self.stop()
+        self.stop_event.clear()
+        self.results = {}
+        self.num_nodes = 0
+        self.thread = threading.Thread(
+            target=self._ponder,
+            args=(
+                board_to_bitboards(board),
+                get_layout(board.num_rows, board.num_columns)
+            ),
+            daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        """Stops pondering and waits for the background thread to finish."""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def get_result(self, board: Board) -> Optional[Tuple[int, int, int]]:
+        """Pondering result for a board where it's the computer's (Player
+        2's) turn, if that position was pondered.
+
+        Returns:
+            (Tuple[int, int, int] | None): the best column, its score and the
+            depth it was searched to.
+        """
+        player_1_pieces, player_2_pieces = board_to_bitboards(board)
+        return self.results.get(
+            get_position_key(
+                player_2_pieces, player_1_pieces | player_2_pieces
+            )
+        )
+
+    def _ponder(self, bitboards: Tuple[int, int], layout: BitboardLayout):
+        """Runs in the background thread: deepens the search of every reply
+        in turn, so that the likeliest replies (searched first, in column
+        order) are never left unsearched."""
+        player_1_pieces, player_2_pieces = bitboards
+        mask = player_1_pieces | player_2_pieces
+        context = SearchContext(
+            layout=layout,
+            transposition_table=self.transposition_table,
+            stop_event=self.stop_event,
+            tablebase=get_endgame_tablebase()
+        )
+
+        # positions after each reply, with the computer to move.
+        positions = []
+        for col_num in context.column_order:
+            if mask & layout.top_masks[col_num]:
+                continue
+            next_mask = mask | get_move_bit(mask, col_num, layout)
+            positions.append((player_2_pieces, next_mask))
+
+        try:
+            for depth in range(1, self.max_depth + 1):
+                unsolved_positions = []
+                for current_pieces, next_mask in positions:
+                    best_col_num, score = search_root(
+                        current_pieces, next_mask, depth, context
+                    )
+                    if best_col_num is None:
+                        continue
+                    self.results[
+                        get_position_key(current_pieces, next_mask)
+                    ] = (best_col_num, score, depth)
+                    num_empty_cells = popcount(
+                        layout.board_mask & ~next_mask
+                    )
+                    is_solved = (
+                        depth >= num_empty_cells
+                        or abs(score) > MIN_WIN_SCORE
+                    )
+                    if not is_solved:
+                        unsolved_positions.append(
+                            (current_pieces, next_mask)
+                        )
+                positions = unsolved_positions
+                if not positions:
+                    break
+        except SearchAborted:
+            pass
+        finally:
+            self.num_nodes = context.num_nodes
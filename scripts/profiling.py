@@ -0,0 +1,288 @@
+"""Opt-in sampling profiler for the engine.
+
+A background thread samples the call stack of the profiled thread at a
+fixed interval (`sys._current_frames`), so the profiled code itself runs
+untouched: the cost is one stack walk per sample, a few percent at the
+default interval. That makes it safe to turn on in production, for a
+random fraction of sessions (games, self-play workers, search service
+threads).
+
+Each profiled session writes two files to the profile directory:
+- `<name>-<pid>-<timestamp>-<session num>.collapsed`: one line per
+  distinct stack, "outermost;...;innermost <num samples>", the input format
+  of flame graph tools (e.g. `flamegraph.pl` or speedscope).
+- `<name>-<pid>-<timestamp>-<session num>.summary.txt`: per function, the
+  samples spent in the function itself ("self") and in it or anything it
+  called ("total").
+
+Profiling is off unless a profile directory is set, with the
+`CONNECT4_PROFILE_DIR` environment variable or the `--profile-dir` flag of
+the entry points (which sets the variable, so that worker processes
+inherit it). `CONNECT4_PROFILE_RATE` is the fraction of sessions profiled
+and `CONNECT4_PROFILE_INTERVAL_MS` the sampling interval.
+"""
+import argparse
+from collections import Counter
+import contextlib
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+PROFILE_DIR_ENV_VAR = "CONNECT4_PROFILE_DIR"
+PROFILE_RATE_ENV_VAR = "CONNECT4_PROFILE_RATE"
+PROFILE_INTERVAL_MS_ENV_VAR = "CONNECT4_PROFILE_INTERVAL_MS"
+
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_INTERVAL_SECONDS = 0.005
+# deeper frames (e.g. of a very deep recursion) are cut off at the root end.
+MAX_STACK_DEPTH = 128
+NUM_SUMMARY_ROWS = 40
+
+# numbers the profiled sessions of this process, to keep file names unique.
+SESSION_NUMS = itertools.count()
+
+
+class ProfileConfig(NamedTuple):
+    """Where and how often to profile."""
+    output_dir: str
+    # fraction of sessions that are profiled.
+    sample_rate: float
+    interval_seconds: float
+
+
+def get_profile_config() -> Optional[ProfileConfig]:
+    """Reads the profiling settings from the environment, or returns None
+    if profiling is off."""
+    output_dir = os.environ.get(PROFILE_DIR_ENV_VAR)
+    if not output_dir:
+        return None
+    return ProfileConfig(
+        output_dir=output_dir,
+        sample_rate=float(
+            os.environ.get(PROFILE_RATE_ENV_VAR, DEFAULT_SAMPLE_RATE)
+        ),
+        interval_seconds=float(
+            os.environ.get(
+                PROFILE_INTERVAL_MS_ENV_VAR, DEFAULT_INTERVAL_SECONDS * 1e3
+            )
+        ) / 1e3
+    )
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Adds the profiling flags to an entry point's parser (see
+    `configure_from_args`)."""
+    parser.add_argument(
+        "--profile-dir",
+        help="write sampling profiles of this run to this directory"
+    )
+    parser.add_argument(
+        "--profile-rate", type=float,
+        help="fraction of sessions to profile (default: all)"
+    )
+    parser.add_argument("--profile-interval-ms", type=float)
+
+
+def configure_from_args(args: argparse.Namespace):
+    """Applies the profiling flags by setting the environment variables, so
+    that worker processes started afterwards are profiled the same way."""
+    for env_var, value in (
+        (PROFILE_DIR_ENV_VAR, args.profile_dir),
+        (PROFILE_RATE_ENV_VAR, args.profile_rate),
+        (PROFILE_INTERVAL_MS_ENV_VAR, args.profile_interval_ms)
+    ):
+        if value is not None:
+            os.environ[env_var] = str(value)
+
+
+def _get_frame_name(frame) -> str:
+    code = frame.f_code
+    module_name = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module_name}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SamplingProfiler:
+    """Samples the call stack of one thread from a background thread.
+
+    Usage:
+        profiler = SamplingProfiler()
+        profiler.start()
+        ...  # code to profile, in the thread that called `start`
+        profiler.stop()
+        profiler.write("profiles/game")
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = DEFAULT_INTERVAL_SECONDS,
+        thread_id: Optional[int] = None
+    ):
+        self.interval_seconds = interval_seconds
+        # the thread that calls `start`, unless set.
+        self.thread_id = thread_id
+        # collapsed stacks, from the outermost frame in, to sample counts.
+        self.stack_counts: Counter = Counter()
+        self.num_samples = 0
+        self.elapsed_seconds = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def _sample(self):
+        start_time = time.perf_counter()
+        while not self.stop_event.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                # the profiled thread has exited.
+                break
+            frame_names = []
+            while frame is not None and len(frame_names) < MAX_STACK_DEPTH:
+                frame_names.append(_get_frame_name(frame))
+                frame = frame.f_back
+            del frame
+            self.stack_counts[";".join(reversed(frame_names))] += 1
+            self.num_samples += 1
+        self.elapsed_seconds += time.perf_counter() - start_time
+
+    def get_collapsed_stacks(self) -> List[str]:
+        """Lines of the collapsed-stack format (see the module docstring),
+        most sampled first."""
+        return [
+            f"{stack} {count}"
+            for stack, count in self.stack_counts.most_common()
+        ]
+
+    def get_function_summary(self) -> List[Dict[str, object]]:
+        """Per function: samples in the function itself ("self") and in it
+        or its callees ("total"), most total samples first."""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stack_counts.items():
+            frame_names = stack.split(";")
+            self_counts[frame_names[-1]] += count
+            # a recursive function is only counted once per sample.
+            for frame_name in set(frame_names):
+                total_counts[frame_name] += count
+        num_samples = max(self.num_samples, 1)
+        return [
+            {
+                "function": frame_name,
+                "self_samples": self_counts[frame_name],
+                "self_percent": 100 * self_counts[frame_name] / num_samples,
+                "total_samples": total_count,
+                "total_percent": 100 * total_count / num_samples
+            }
+            for frame_name, total_count in sorted(
+                total_counts.items(),
+                key=lambda item: (-item[1], -self_counts[item[0]], item[0])
+            )
+        ]
+
+    def format_summary(self, num_rows: int = NUM_SUMMARY_ROWS) -> str:
+        """The function summary as an aligned text table."""
+        headers = ("total_%", "self_%", "total", "self", "function")
+        rows = [
+            (
+                f"{row['total_percent']:.1f}", f"{row['self_percent']:.1f}",
+                str(row["total_samples"]), str(row["self_samples"]),
+                row["function"]
+            )
+            for row in self.get_function_summary()[:num_rows]
+        ]
+        widths = [
+            max(len(header), *(len(row[i]) for row in rows))
+            if rows else len(header)
+            for i, header in enumerate(headers)
+        ]
+        lines = [
+            f"{self.num_samples} samples every "
+            f"{self.interval_seconds * 1e3:g} ms over "
+            f"{self.elapsed_seconds:.2f} s"
+        ]
+        for row in (headers, *rows):
+            lines.append("  ".join(
+                [value.rjust(width) for value, width in zip(row[:-1], widths)]
+                + [row[-1]]
+            ))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path_prefix: str) -> Tuple[str, str]:
+        """Writes the collapsed stacks and the function summary.
+
+        Returns:
+            (Tuple[str, str]): the paths of the collapsed-stack file and of
+            the summary.
+        """
+        collapsed_path = f"{path_prefix}.collapsed"
+        summary_path = f"{path_prefix}.summary.txt"
+        with open(collapsed_path, "w") as collapsed_file:
+            for line in self.get_collapsed_stacks():
+                collapsed_file.write(line + "\n")
+        with open(summary_path, "w") as summary_file:
+            summary_file.write(self.format_summary())
+        return collapsed_path, summary_path
+
+
+@contextlib.contextmanager
+def profile_session(
+    name: str,
+    config: Optional[ProfileConfig] = None,
+    rng: Optional[random.Random] = None
+) -> Iterator[Optional[SamplingProfiler]]:
+    """Profiles the current thread for the duration of the block, if
+    profiling is on (see `get_profile_config`) and this session is picked
+    at the configured rate.
+
+    Failing to write the profile never fails the session: the error is
+    reported on stderr.
+
+    Yields:
+        (SamplingProfiler | None): the profiler, or None if this session
+        isn't profiled.
+    """
+    if config is None:
+        config = get_profile_config()
+    if config is None or (rng or random).random() >= config.sample_rate:
+        yield None
+        return
+
+    profiler = SamplingProfiler(interval_seconds=config.interval_seconds)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        path_prefix = os.path.join(
+            config.output_dir,
+            f"{name}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-"
+            f"{next(SESSION_NUMS)}"
+        )
+        try:
+            os.makedirs(config.output_dir, exist_ok=True)
+            profiler.write(path_prefix)
+        except OSError as error:
+            print(
+                f"Couldn't write profile {path_prefix}: {error}",
+                file=sys.stderr
+            )
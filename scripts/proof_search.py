@@ -0,0 +1,338 @@
+"""Proof-number search: proves whether a position is a forced win.
+
+Alpha-beta (see `algos.py`) scores positions, to a depth, with a heuristic;
+proving that a position is won can take it a search to the end of the
+game. Depth-first proof-number search (df-pn) instead grows the search
+towards whichever moves look cheapest to prove or refute, by the number of
+positions left to prove (the proof number) and to refute (the disproof
+number), and stops as soon as the question is answered. Forced wins, which
+are narrow (the defender's moves are mostly forced), are proved after far
+fewer nodes than a full-width search takes.
+
+The search is for one player, the attacker, whose win is proved or
+refuted. Moves are played on bitboards, and threat detection (see
+`threats.py`) decides most positions without searching them: a player
+with an immediate win wins, a player who can't stop the opponent's
+immediate wins loses, and only moves that don't hand the opponent a win
+are searched. New positions start with their number of such moves as their
+proof number (where the defender is to move) or disproof number (where the
+attacker is), so that forcing lines are tried first.
+
+Proof and disproof numbers are kept in a bounded `ProofTable`, which can be
+shared between searches (and kept between the moves of a game).
+"""
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+from algos import SearchAborted, SearchContext
+from bitboard import BitboardLayout, board_to_position, get_layout
+from components import Board
+from threats import get_immediate_threats, get_non_losing_moves, popcount
+from transposition import DEFAULT_MAX_NUM_ENTRIES, get_position_key
+
+PROVED_WIN = "proved_win"
+PROVED_LOSS = "proved_loss"
+# neither player can force a win.
+PROVED_DRAW = "proved_draw"
+UNKNOWN = "unknown"
+
+# larger than any proof or disproof number of a search that isn't over.
+INFINITY = 1 << 40
+DEFAULT_MAX_NUM_NODES = 100_000
+
+
+class ProofResult(NamedTuple):
+    """What a proof search found, for the player to move."""
+    result: str
+    # a winning move, if the position is a proved win.
+    col_num: Optional[int]
+    num_nodes: int
+
+
+class ProofTable:
+    """Bounded table of proof and disproof numbers, keyed on position and
+    on whether the attacker is to move.
+
+    When the table is full, the oldest entry is evicted to make room.
+    """
+
+    def __init__(self, max_num_entries: int = DEFAULT_MAX_NUM_ENTRIES):
+        self.max_num_entries = max_num_entries
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: int) -> Optional[Tuple[int, int]]:
+        return self.entries.get(key)
+
+    def store(self, key: int, proof_number: int, disproof_number: int):
+        if key not in self.entries and (
+            len(self.entries) >= self.max_num_entries
+        ):
+            # dicts keep insertion order, so the first key is the oldest.
+            del self.entries[next(iter(self.entries))]
+        self.entries[key] = (proof_number, disproof_number)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def _get_key(current_pieces: int, mask: int, is_attacker_to_move: bool) -> int:
+    return get_position_key(current_pieces, mask) << 1 | is_attacker_to_move
+
+
+def _get_moves(
+    current_pieces: int, mask: int, layout: BitboardLayout
+) -> Optional[int]:
+    """The moves worth searching for the player to move, as landing cells,
+    or None if the player to move wins right away. No moves means that the
+    player to move loses (or, on a full board, draws)."""
+    if get_immediate_threats(current_pieces, mask, layout):
+        return None
+    return get_non_losing_moves(current_pieces, mask, layout)
+
+
+def _evaluate(
+    current_pieces: int,
+    mask: int,
+    is_attacker_to_move: bool,
+    layout: BitboardLayout
+) -> Tuple[int, int]:
+    """Proof and disproof numbers of a position that hasn't been searched:
+    exact if it's decided by threats, otherwise its number of moves for the
+    player to move."""
+    moves = _get_moves(current_pieces, mask, layout)
+    if moves is None:
+        is_attacker_win = is_attacker_to_move
+    elif mask == layout.board_mask:
+        # a draw isn't a win for the attacker.
+        return INFINITY, 0
+    elif not moves:
+        is_attacker_win = not is_attacker_to_move
+    else:
+        num_moves = popcount(moves)
+        return (1, num_moves) if is_attacker_to_move else (num_moves, 1)
+    return (0, INFINITY) if is_attacker_win else (INFINITY, 0)
+
+
+def _search(
+    current_pieces: int,
+    mask: int,
+    is_attacker_to_move: bool,
+    proof_threshold: int,
+    disproof_threshold: int,
+    context: SearchContext,
+    table: ProofTable
+) -> Tuple[int, int]:
+    """Searches a position until its proof number reaches
+    `proof_threshold`, or its disproof number `disproof_threshold`.
+
+    Returns:
+        (Tuple[int, int]): the proof and disproof numbers of the position.
+    """
+    context.count_node()
+    layout = context.layout
+    key = _get_key(current_pieces, mask, is_attacker_to_move)
+    moves = _get_moves(current_pieces, mask, layout)
+    if moves is None or not moves or mask == layout.board_mask:
+        numbers = _evaluate(current_pieces, mask, is_attacker_to_move, layout)
+        table.store(key, *numbers)
+        return numbers
+
+    # children in column order, as (key, next_current_pieces, next_mask).
+    children = []
+    next_current_pieces = current_pieces ^ mask
+    for col_num in context.column_order:
+        move_bit = moves & layout.column_masks[col_num]
+        if move_bit:
+            next_mask = mask | move_bit
+            children.append((
+                _get_key(
+                    next_current_pieces, next_mask, not is_attacker_to_move
+                ),
+                next_current_pieces,
+                next_mask
+            ))
+
+    while True:
+        # the numbers of every child, from the table or evaluated.
+        child_numbers = []
+        for child_key, child_current_pieces, child_mask in children:
+            numbers = table.get(child_key)
+            if numbers is None:
+                numbers = _evaluate(
+                    child_current_pieces, child_mask,
+                    not is_attacker_to_move, layout
+                )
+                table.store(child_key, *numbers)
+            child_numbers.append(numbers)
+
+        # where the attacker is to move, one move has to be proved and
+        # every move refuted; where the defender is, the reverse. `select`
+        # is the number to pick the child by, `total` is summed over them.
+        select_index = 0 if is_attacker_to_move else 1
+        total_index = 1 - select_index
+        best_child_num = 0
+        best_number = second_best_number = INFINITY
+        total_number = 0
+        for child_num, numbers in enumerate(child_numbers):
+            total_number = min(total_number + numbers[total_index], INFINITY)
+            number = numbers[select_index]
+            if number < best_number:
+                second_best_number = best_number
+                best_number = number
+                best_child_num = child_num
+            elif number < second_best_number:
+                second_best_number = number
+
+        if is_attacker_to_move:
+            proof_number, disproof_number = best_number, total_number
+        else:
+            proof_number, disproof_number = total_number, best_number
+        if (
+            proof_number >= proof_threshold
+            or disproof_number >= disproof_threshold
+        ):
+            table.store(key, proof_number, disproof_number)
+            return proof_number, disproof_number
+
+        # search the best child until it's no longer the best, or until
+        # this position's numbers would reach their thresholds.
+        child_proof_number, child_disproof_number = (
+            child_numbers[best_child_num]
+        )
+        if is_attacker_to_move:
+            child_proof_threshold = min(
+                proof_threshold, second_best_number + 1
+            )
+            child_disproof_threshold = (
+                disproof_threshold - disproof_number + child_disproof_number
+            )
+        else:
+            child_proof_threshold = (
+                proof_threshold - proof_number + child_proof_number
+            )
+            child_disproof_threshold = min(
+                disproof_threshold, second_best_number + 1
+            )
+        _, child_current_pieces, child_mask = children[best_child_num]
+        _search(
+            child_current_pieces, child_mask, not is_attacker_to_move,
+            child_proof_threshold, child_disproof_threshold, context, table
+        )
+
+
+def _prove_attacker_win(
+    current_pieces: int,
+    mask: int,
+    is_attacker_to_move: bool,
+    context: SearchContext,
+    table: ProofTable
+) -> bool:
+    """Whether the attacker can force a win. Raises `SearchAborted` if the
+    context says to stop first."""
+    proof_number, _ = _search(
+        current_pieces, mask, is_attacker_to_move, INFINITY, INFINITY,
+        context, table
+    )
+    return proof_number == 0
+
+
+def _find_proof_move(
+    current_pieces: int,
+    mask: int,
+    context: SearchContext,
+    table: ProofTable
+) -> int:
+    """A winning move for the player to move, in a position proved to be a
+    win for them."""
+    layout = context.layout
+    winning_moves = get_immediate_threats(current_pieces, mask, layout)
+    moves = winning_moves or get_non_losing_moves(current_pieces, mask, layout)
+    next_current_pieces = current_pieces ^ mask
+    col_nums = [
+        col_num for col_num in context.column_order
+        if moves & layout.column_masks[col_num]
+    ]
+    if winning_moves:
+        return col_nums[0]
+    for col_num in col_nums:
+        next_mask = mask | moves & layout.column_masks[col_num]
+        numbers = table.get(_get_key(next_current_pieces, next_mask, False))
+        if numbers is not None and numbers[0] == 0:
+            return col_num
+    # evicted from the table since it was proved: prove it again.
+    for col_num in col_nums:
+        next_mask = mask | moves & layout.column_masks[col_num]
+        if _prove_attacker_win(
+            next_current_pieces, next_mask, False, context, table
+        ):
+            return col_num
+    raise AssertionError("no winning move in a position proved to be won")
+
+
+def prove(
+    current_pieces: int,
+    mask: int,
+    layout: BitboardLayout,
+    max_num_nodes: Optional[int] = DEFAULT_MAX_NUM_NODES,
+    table: Optional[ProofTable] = None,
+    deadline: Optional[float] = None,
+    stop_event: Optional[threading.Event] = None
+) -> ProofResult:
+    """Proves whether the player to move can force a win and, if not,
+    whether the opponent can.
+
+    Both proofs share the node budget (and the deadline): if they run out
+    before the position is proved either way, the result is `UNKNOWN`.
+
+    Args:
+        max_num_nodes (int | None): the most nodes to search, or None for
+        no limit.
+        table (ProofTable | None): proof and disproof numbers to start from
+        and add to; a fresh table if None.
+        deadline (float | None): compared against `time.perf_counter()`.
+
+    Returns:
+        (ProofResult): `PROVED_WIN` (with a winning move), `PROVED_LOSS`,
+        `PROVED_DRAW` or `UNKNOWN`, and the nodes searched.
+    """
+    context = SearchContext(
+        layout=layout,
+        stop_event=stop_event,
+        deadline=deadline,
+        max_num_nodes=max_num_nodes
+    )
+    if table is None:
+        table = ProofTable()
+    try:
+        if _prove_attacker_win(current_pieces, mask, True, context, table):
+            col_num = _find_proof_move(current_pieces, mask, context, table)
+            return ProofResult(PROVED_WIN, col_num, context.num_nodes)
+        result = (
+            PROVED_LOSS
+            if _prove_attacker_win(
+                current_pieces, mask, False, context, table
+            )
+            else PROVED_DRAW
+        )
+    except SearchAborted:
+        result = UNKNOWN
+    return ProofResult(result, None, context.num_nodes)
+
+
+def prove_board(
+    board: Board,
+    max_num_nodes: Optional[int] = DEFAULT_MAX_NUM_NODES,
+    table: Optional[ProofTable] = None,
+    deadline: Optional[float] = None
+) -> ProofResult:
+    """Proves a `Board` for the player to move (see `prove`), without
+    changing it."""
+    layout = get_layout(board.num_rows, board.num_columns)
+    current_pieces, mask = board_to_position(board)
+    return prove(
+        current_pieces, mask, layout, max_num_nodes=max_num_nodes,
+        table=table, deadline=deadline
+    )
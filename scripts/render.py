@@ -0,0 +1,280 @@
+"""Headless rendering of boards to images, many boards at a time.
+
+Boards look as they do in the game (see `helper_play_game.draw_board`):
+blue slots with the empty cells in black and the pieces in the players'
+colors, with the bottom row at the bottom. Unlike the game, nothing is
+drawn cell by cell: a sprite of every cell value (empty, Player 1, Player
+2) is drawn once per cell size, and a whole batch of boards is rendered
+with one gather of the sprites by cell value. No display (or pygame) is
+needed, and PNGs are encoded with zlib, so nothing beyond NumPy is either.
+
+Boards come as arrays of cell values (stacked `Board.board`s), as
+bitboards, or as the positions of recorded games (see `game_record.py`):
+every position of one game, for replays, or the final position of many,
+for thumbnails.
+
+Run `python render.py --help` to render a game record file to PNGs.
+"""
+import argparse
+from functools import lru_cache
+import os
+import struct
+import time
+from typing import Iterable, Optional
+import zlib
+
+import numpy as np
+
+from bitboard import BitboardLayout, bitboards_to_planes
+import constants
+from game_record import GameRecord, iter_records
+
+DEFAULT_CELL_SIZE = 32
+SLOT_COLOR = "blue"
+EMPTY_COLOR = "black"
+# level 1 of zlib's 0-9: board images are mostly flat color, which
+# compresses well even at the fastest level.
+PNG_COMPRESSION_LEVEL = 1
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# boards are rendered a few at a time, so that the tiles gathered for them
+# stay in cache until they're copied into the images.
+RENDER_BATCH_NUM_BYTES = 1 << 18
+
+
+@lru_cache(maxsize=None)
+def get_cell_sprites(cell_size: int = DEFAULT_CELL_SIZE) -> np.ndarray:
+    """The image of a cell of every value.
+
+    Returns:
+        (numpy.ndarray): uint8 array of shape (3, cell_size, cell_size, 3):
+        the RGB images of an empty cell, and of a cell with a piece of
+        Player 1 and of Player 2.
+    """
+    # pixel centers, in pixels from the center of the cell.
+    offsets = np.arange(cell_size) + 0.5 - cell_size / 2
+    radius = cell_size * constants.SLOT_RADIUS / constants.SQUARESIZE
+    is_in_slot = offsets[:, np.newaxis] ** 2 + offsets ** 2 <= radius ** 2
+
+    sprites = np.empty((3, cell_size, cell_size, 3), dtype=np.uint8)
+    sprites[:] = constants.COLOR_TO_CODE_DICT[SLOT_COLOR]
+    colors = (
+        EMPTY_COLOR,
+        constants.VALUE_TO_COLOR_DICT[1],
+        constants.VALUE_TO_COLOR_DICT[2]
+    )
+    for value, color in enumerate(colors):
+        sprites[value][is_in_slot] = constants.COLOR_TO_CODE_DICT[color]
+    # shared between callers: keep it from being drawn on.
+    sprites.flags.writeable = False
+    return sprites
+
+
+def render_boards(
+    boards: np.ndarray, cell_size: int = DEFAULT_CELL_SIZE
+) -> np.ndarray:
+    """Renders boards to RGB images.
+
+    Args:
+        boards (numpy.ndarray): array of shape (..., num_rows, num_columns)
+        of cell values: 0 (empty), 1 and 2 (the players' pieces), with row
+        0 at the bottom, as in `Board.board`.
+
+    Returns:
+        (numpy.ndarray): uint8 array of shape
+        (..., num_rows * cell_size, num_columns * cell_size, 3).
+
+    Raises:
+        ValueError: if a cell value isn't 0, 1 or 2.
+    """
+    cells = np.asarray(boards)
+    if cells.size and (cells.min() < 0 or cells.max() > 2):
+        raise ValueError("Cell values must be 0, 1 or 2.")
+    # the top row comes first in an image.
+    cells = cells[..., ::-1, :].astype(np.intp)
+    batch_shape = cells.shape[:-2]
+    num_rows, num_columns = cells.shape[-2:]
+    cells = cells.reshape((-1, num_rows, num_columns))
+    num_boards = len(cells)
+    sprites = get_cell_sprites(cell_size)
+
+    images = np.empty(
+        (num_boards, num_rows * cell_size, num_columns * cell_size, 3),
+        dtype=np.uint8
+    )
+    # (boards, row, pixel row, column, pixel column, channel) view of the
+    # images, that the tiles of every cell are copied into.
+    tiled_images = images.reshape(
+        num_boards, num_rows, cell_size, num_columns, cell_size, 3
+    )
+    board_num_bytes = images[0].nbytes if num_boards else 1
+    batch_size = max(1, RENDER_BATCH_NUM_BYTES // board_num_bytes)
+    for start in range(0, num_boards, batch_size):
+        end = start + batch_size
+        # (boards, row, column, pixel row, pixel column, channel)
+        tiles = sprites[cells[start:end]]
+        tiled_images[start:end] = tiles.transpose(0, 1, 3, 2, 4, 5)
+    return images.reshape(batch_shape + images.shape[1:])
+
+
+def render_bitboards(
+    player_1_pieces_array: np.ndarray,
+    player_2_pieces_array: np.ndarray,
+    layout: BitboardLayout,
+    cell_size: int = DEFAULT_CELL_SIZE
+) -> np.ndarray:
+    """Renders boards given as arrays of bitboards of each player's pieces
+    (see `render_boards`)."""
+    player_1_planes = bitboards_to_planes(player_1_pieces_array, layout)
+    player_2_planes = bitboards_to_planes(player_2_pieces_array, layout)
+    return render_boards(player_1_planes + 2 * player_2_planes, cell_size)
+
+
+def get_record_positions(record: GameRecord) -> np.ndarray:
+    """Every position of a recorded game, from the empty board to the
+    final one.
+
+    Returns:
+        (numpy.ndarray): uint8 array of shape
+        (num_moves + 1, num_rows, num_columns) of cell values.
+
+    Raises:
+        ValueError: if a move is into a full column.
+    """
+    num_moves = len(record.moves)
+    heights = [0] * record.num_columns
+    row_nums = []
+    for move_num, col_num in enumerate(record.moves):
+        if heights[col_num] == record.num_rows:
+            raise ValueError(f"Invalid move {move_num}: {col_num}")
+        row_nums.append(heights[col_num])
+        heights[col_num] += 1
+
+    move_nums = np.arange(num_moves)
+    # position i has the pieces of the first i moves.
+    is_placed = np.arange(num_moves + 1)[:, np.newaxis] > move_nums
+    positions = np.zeros(
+        (num_moves + 1, record.num_rows, record.num_columns), dtype=np.uint8
+    )
+    positions[:, row_nums, list(record.moves)] = (
+        is_placed * (move_nums % 2 + 1)
+    )
+    return positions
+
+
+def render_record(
+    record: GameRecord, cell_size: int = DEFAULT_CELL_SIZE
+) -> np.ndarray:
+    """Renders every position of a recorded game, e.g. to replay it (see
+    `get_record_positions`)."""
+    return render_boards(get_record_positions(record), cell_size)
+
+
+def render_final_positions(
+    records: Iterable[GameRecord], cell_size: int = DEFAULT_CELL_SIZE
+) -> np.ndarray:
+    """Renders the final position of every recorded game, e.g. as
+    thumbnails. The games must all be played on boards of the same size."""
+    final_positions = [
+        get_record_positions(record)[-1] for record in records
+    ]
+    return render_boards(np.array(final_positions), cell_size)
+
+
+def _make_png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data)) + chunk_type + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Encodes an RGB image (a (height, width, 3) uint8 array) as a PNG."""
+    height, width, num_channels = image.shape
+    if num_channels != 3 or image.dtype != np.uint8:
+        raise ValueError("Expected a (height, width, 3) uint8 array.")
+    # every scanline starts with its filter type: 0, no filtering.
+    scanlines = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+    scanlines[:, 1:] = image.reshape(height, width * 3)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join([
+        PNG_SIGNATURE,
+        _make_png_chunk(b"IHDR", header),
+        _make_png_chunk(
+            b"IDAT",
+            zlib.compress(scanlines.tobytes(), PNG_COMPRESSION_LEVEL)
+        ),
+        _make_png_chunk(b"IEND", b"")
+    ])
+
+
+def write_png(path: str, image: np.ndarray):
+    with open(path, "wb") as png_file:
+        png_file.write(encode_png(image))
+
+
+def render_record_file(
+    path: str,
+    output_dir: str,
+    cell_size: int = DEFAULT_CELL_SIZE,
+    all_positions: bool = False,
+    max_num_records: Optional[int] = None
+) -> dict:
+    """Writes a PNG of the final position of every game in a game record
+    file (or, with `all_positions`, of every position, numbered by move).
+
+    Returns:
+        (dict): the number of images written, and the images rendered per
+        second, without and with PNG encoding.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    render_seconds = 0.0
+    start_time = time.perf_counter()
+    num_images = 0
+    for record_num, record in enumerate(iter_records(path)):
+        if record_num == max_num_records:
+            break
+        render_start_time = time.perf_counter()
+        images = render_record(record, cell_size)
+        if not all_positions:
+            images = images[-1:]
+        render_seconds += time.perf_counter() - render_start_time
+        for image_num, image in enumerate(images):
+            name = (
+                f"game_{record_num:06d}_{image_num:02d}.png" if all_positions
+                else f"game_{record_num:06d}.png"
+            )
+            write_png(os.path.join(output_dir, name), image)
+        num_images += len(images)
+    elapsed_seconds = time.perf_counter() - start_time
+    return {
+        "num_images": num_images,
+        "rendered_per_second": num_images / max(render_seconds, 1e-9),
+        "written_per_second": num_images / max(elapsed_seconds, 1e-9)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "records", nargs="?", default=constants.GAME_RECORDS_PATH,
+        help="game record file to render"
+    )
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--cell-size", type=int, default=DEFAULT_CELL_SIZE)
+    parser.add_argument(
+        "--all-positions", action="store_true",
+        help="render every position of every game, not just the last"
+    )
+    parser.add_argument("--max-num-records", type=int)
+    args = parser.parse_args()
+    stats = render_record_file(
+        args.records, args.output_dir, cell_size=args.cell_size,
+        all_positions=args.all_positions,
+        max_num_records=args.max_num_records
+    )
+    for name, value in stats.items():
+        print(f"{name}: {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
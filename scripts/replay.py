@@ -0,0 +1,117 @@
+"""Replays logged move requests (see `move_log.py`): checks that the engine
+still makes the same move, after as many nodes, and compares its speed with
+when the move was logged.
+
+Requests are replayed single-threaded, with a fresh transposition table and
+without the time cap, which reproduces a request node for node if it was
+made that way (see `MoveRequest.is_reproducible`). Other requests are
+replayed too, for their timings, but their moves and node counts may
+differ.
+
+To log the moves of a game, and replay them:
+
+    python play_game.py --difficulty medium --move-log moves.jsonl
+    python replay.py moves.jsonl
+
+Run `python replay.py --help` for usage.
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+from bitboard import get_layout
+from move_log import MoveRequest, read_move_requests
+from strength import STRENGTH_LEVELS, choose_move
+
+
+def replay_move_request(
+    request: MoveRequest, num_repeats: int = 1
+) -> Dict[str, object]:
+    """Re-runs a move request, `num_repeats` times for its best time.
+
+    Returns:
+        (Dict[str, object]): the move, nodes and time, recorded and replayed,
+        and whether they match (the move and nodes; None if the request
+        isn't reproducible).
+    """
+    layout = get_layout(request.num_rows, request.num_columns)
+    strength_level = STRENGTH_LEVELS[request.level_num]
+    elapsed_seconds = []
+    for _ in range(num_repeats):
+        start_time = time.perf_counter()
+        col_num, num_nodes, _ = choose_move(
+            request.current_pieces, request.mask, layout, strength_level,
+            rng=random.Random(request.seed), deterministic=True
+        )
+        elapsed_seconds.append(time.perf_counter() - start_time)
+    is_same = col_num == request.col_num and num_nodes == request.num_nodes
+    return {
+        "level": request.level_num,
+        "recorded_col": request.col_num,
+        "replayed_col": col_num,
+        "recorded_nodes": request.num_nodes,
+        "replayed_nodes": num_nodes,
+        "recorded_ms": 1e3 * request.elapsed_seconds,
+        "replayed_ms": 1e3 * min(elapsed_seconds),
+        "matches": is_same if request.is_reproducible else None
+    }
+
+
+def replay_move_log(
+    path: str,
+    request_nums: Optional[Sequence[int]] = None,
+    num_repeats: int = 1
+) -> List[Dict[str, object]]:
+    """Replays the requests of a move log (every one if `request_nums` is
+    None), numbered from 0 in the order they were logged."""
+    results = []
+    for request_num, request in enumerate(read_move_requests(path)):
+        if request_nums is not None and request_num not in request_nums:
+            continue
+        result = replay_move_request(request, num_repeats=num_repeats)
+        results.append({"request": request_num, **result})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("move_log", help="JSON lines file of move requests")
+    parser.add_argument(
+        "--requests", type=int, nargs="+",
+        help="numbers of the requests to replay, from 0; all if unset"
+    )
+    parser.add_argument(
+        "--num-repeats", type=int, default=1,
+        help="replay every request this many times, for its best time"
+    )
+    args = parser.parse_args()
+    results = replay_move_log(
+        args.move_log, request_nums=args.requests,
+        num_repeats=args.num_repeats
+    )
+    if not results:
+        print("No move requests to replay.")
+        return
+
+    # imported here: the benchmark harness pulls in more than the engine.
+    from benchmark import print_table
+    print_table([
+        {
+            name: "-" if value is None else value
+            for name, value in result.items()
+        }
+        for result in results
+    ])
+
+    num_mismatches = sum(result["matches"] is False for result in results)
+    if num_mismatches:
+        print(
+            f"{num_mismatches} reproducible request(s) replayed differently."
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,582 @@
+"""Batched search service: one scheduler searching moves for many games.
+
+Searching a move for one game at a time spends most of its time on the
+threat checks and evaluation of every node, one node at a time. The
+service instead runs the searches of every pending move request side by
+side: each search is a generator that, whenever it enters a node, yields
+the node's children instead of checking them itself. Every tick, the
+scheduler advances a set of searches to their next node, gathers the
+children of all of them and checks and scores them with a single
+vectorized call (see `expand_positions`, which scores with
+`evaluate_positions` or with the value network, see
+`make_network_evaluator`), then sends each search its results back.
+
+Searches are picked earliest deadline first, then least recently advanced
+first, so a burst of requests from one game can't starve the others. A
+request whose deadline passes is answered with the best move of its
+deepest completed iteration.
+
+Usage:
+    service = BatchedSearchService()
+    service.start()
+    request = service.submit_board(board, time_limit=0.5)
+    col_num = request.wait()
+    service.stop()
+"""
+import itertools
+import queue
+import threading
+import time
+from typing import (
+    TYPE_CHECKING, Callable, Dict, Generator, List, Optional, Tuple
+)
+
+import numpy as np
+
+from algos import (
+    ALPHA_BETA_SEARCH_DEPTH, ENDGAME_SOLVE_NUM_EMPTY_CELLS, MIN_WIN_SCORE,
+    WIN_SCORE, evaluate_positions, get_column_order
+)
+from bitboard import (
+    BitboardLayout, bitboards_to_planes, board_to_bitboards, get_layout,
+    popcount_array
+)
+from components import Board
+from profiling import profile_session
+from threats import (
+    get_immediate_threats, get_non_losing_moves, get_playable_cells,
+    get_winning_cells_array, popcount
+)
+
+if TYPE_CHECKING:
+    from value_network import ValuePolicyNetwork
+
+# scores a batch of positions, from the point of view of the player to move
+# in each: (current_pieces_array, mask_array, layout) -> scores array.
+Evaluator = Callable[[np.ndarray, np.ndarray, BitboardLayout], np.ndarray]
+
+# a search yields the positions it needs expanded, as (current_pieces, mask)
+# tuples, is sent back their (scores, non_losing_moves) (see
+# `expand_positions`), and returns its (score, best_col_num).
+SearchGenerator = Generator[
+    List[Tuple[int, int]],
+    Tuple[List[int], List[int]],
+    Tuple[int, Optional[int]]
+]
+
+# leaf positions scored per tick, across every game.
+DEFAULT_MAX_BATCH_SIZE = 4096
+# network values in [-1, 1] are scaled to this, well below `MIN_WIN_SCORE`
+# so that they're never mistaken for a won position.
+NETWORK_VALUE_SCALE = 100
+# how long the background thread waits for new requests when idle.
+IDLE_WAIT_SECONDS = 0.05
+
+
+def make_network_evaluator(network: "ValuePolicyNetwork") -> Evaluator:
+    """Wraps the value network as an `Evaluator`, so that every leaf of a
+    tick is scored in one batched forward pass."""
+    def evaluate_with_network(
+        current_pieces_array: np.ndarray,
+        mask_array: np.ndarray,
+        layout: BitboardLayout
+    ) -> np.ndarray:
+        planes = bitboards_to_planes(
+            np.stack(
+                [current_pieces_array, current_pieces_array ^ mask_array],
+                axis=1
+            ),
+            layout
+        )
+        _, values = network.forward(planes)
+        return np.rint(values * NETWORK_VALUE_SCALE).astype(np.int64)
+    return evaluate_with_network
+
+
+def expand_positions(
+    current_pieces_array: np.ndarray,
+    mask_array: np.ndarray,
+    layout: BitboardLayout,
+    evaluator: Evaluator = evaluate_positions
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized version of the checks `negamax` makes on entering a node,
+    for a batch of positions.
+
+    Returns:
+        scores (numpy.ndarray): the exact score of positions decided by the
+        threat masks (a full board, an immediate win, or no non-losing
+        moves), and the `evaluator` score of the others.
+        non_losing_moves (numpy.ndarray): the non-losing moves of every
+        position that isn't decided yet, and 0 for the others.
+    """
+    board_mask = np.uint64(layout.board_mask)
+    playable_cells = (mask_array + np.uint64(layout.bottom_mask)) & board_mask
+    current_winning_cells = get_winning_cells_array(
+        current_pieces_array, mask_array, layout
+    )
+    opponent_winning_cells = get_winning_cells_array(
+        current_pieces_array ^ mask_array, mask_array, layout
+    )
+    # same as `get_non_losing_moves`.
+    forced_cells = playable_cells & opponent_winning_cells
+    has_many_forced_cells = (
+        forced_cells & (forced_cells - np.uint64(1))
+    ) != 0
+    non_losing_moves = np.where(
+        forced_cells != 0, forced_cells, playable_cells
+    ) & ~(opponent_winning_cells >> np.uint64(1))
+
+    num_moves = popcount_array(mask_array)
+    is_full = mask_array == board_mask
+    is_win = (current_winning_cells & playable_cells) != 0
+    is_loss = has_many_forced_cells | (non_losing_moves == 0)
+    scores = np.select(
+        [is_full, is_win, is_loss],
+        [0, WIN_SCORE - (num_moves + 1), -(WIN_SCORE - (num_moves + 2))],
+        default=0
+    )
+    is_open = ~(is_full | is_win | is_loss)
+    if is_open.any():
+        scores[is_open] = evaluator(
+            current_pieces_array[is_open], mask_array[is_open], layout
+        )
+    non_losing_moves[~is_open] = 0
+    return scores, non_losing_moves
+
+
+def _search_moves(
+    current_pieces: int,
+    mask: int,
+    non_losing_moves: int,
+    depth: int,
+    alpha: int,
+    beta: int,
+    first_col_num: Optional[int],
+    search: "_ActiveSearch"
+) -> SearchGenerator:
+    """Alpha-beta search of the non-losing moves of a position, as a
+    generator (see `SearchGenerator`).
+
+    Same scores as `negamax`. Instead of entering the children one at a
+    time, every child is yielded at once to be expanded in a batch (see
+    `expand_positions`); the children's scores then serve as their scores
+    one move from the frontier, and to order them further up the tree.
+    """
+    layout = search.layout
+    opponent_pieces = current_pieces ^ mask
+    children = [
+        (col_num, mask | (non_losing_moves & layout.column_masks[col_num]))
+        for col_num in search.column_order
+        if non_losing_moves & layout.column_masks[col_num]
+    ]
+    search.num_nodes += len(children)
+    child_scores, child_non_losing_moves = yield [
+        (opponent_pieces, child_mask) for _, child_mask in children
+    ]
+
+    if depth == 1:
+        best_index = min(
+            range(len(children)), key=child_scores.__getitem__
+        )
+        return -child_scores[best_index], children[best_index][0]
+
+    # most promising children first (the stable sort keeps the column order
+    # between equal scores).
+    child_indices = sorted(
+        range(len(children)),
+        key=lambda index: (
+            children[index][0] != first_col_num, child_scores[index]
+        )
+    )
+    value = -WIN_SCORE
+    best_col_num = None
+    for index in child_indices:
+        col_num, child_mask = children[index]
+        if child_non_losing_moves[index]:
+            child_value, _ = yield from _search_moves(
+                opponent_pieces, child_mask, child_non_losing_moves[index],
+                depth - 1, -beta, -alpha, None, search
+            )
+            score = -child_value
+        else:
+            score = -child_scores[index]
+        if score > value:
+            value = score
+            best_col_num = col_num
+        if value > alpha:
+            alpha = value
+        if alpha >= beta:
+            break
+    return value, best_col_num
+
+
+class MoveRequest:
+    """A request for the best move of one position, answered by the
+    service.
+
+    The best move so far is kept up to date as the search deepens, so that
+    a request can be answered at any time.
+    """
+
+    def __init__(
+        self,
+        request_id: int,
+        current_pieces: int,
+        mask: int,
+        layout: BitboardLayout,
+        max_depth: int,
+        deadline: Optional[float]
+    ):
+        self.request_id = request_id
+        self.current_pieces = current_pieces
+        self.mask = mask
+        self.layout = layout
+        self.max_depth = max_depth
+        # compared against `time.perf_counter()`.
+        self.deadline = deadline
+        self.submit_time = time.perf_counter()
+        self.finish_time = None
+        self.best_col_num = None
+        self.score = 0
+        self.completed_depth = 0
+        self.num_nodes = 0
+        self.is_timed_out = False
+        self.done_event = threading.Event()
+
+    @property
+    def is_done(self) -> bool:
+        return self.done_event.is_set()
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from submitting the request to answering it."""
+        if self.finish_time is None:
+            return None
+        return self.finish_time - self.submit_time
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Waits for the request to be answered.
+
+        Returns:
+            (int | None): the best column, or None if the board is full (or
+            if `timeout` runs out first).
+        """
+        self.done_event.wait(timeout)
+        return self.best_col_num
+
+
+class _ActiveSearch:
+    """A request being searched: its search generator and the positions
+    it's waiting on."""
+
+    def __init__(self, request: MoveRequest):
+        self.request = request
+        self.layout = request.layout
+        self.column_order = get_column_order(request.layout.num_columns)
+        self.num_nodes = 0
+        self.last_advanced_tick = -1
+        self.pending_positions: List[Tuple[int, int]] = []
+        self.generator = self._iterative_deepening()
+
+    @property
+    def sort_key(self) -> Tuple[float, int, int]:
+        deadline = self.request.deadline
+        return (
+            float("inf") if deadline is None else deadline,
+            self.last_advanced_tick,
+            self.request.request_id
+        )
+
+    def _iterative_deepening(self) -> Generator[
+        List[Tuple[int, int]], Tuple[List[int], List[int]], None
+    ]:
+        """Searches one move deeper at a time, like
+        `iterative_deepening_search`, recording each completed iteration on
+        the request."""
+        request = self.request
+        layout = self.layout
+        current_pieces, mask = request.current_pieces, request.mask
+        num_empty_cells = popcount(layout.board_mask & ~mask)
+        if num_empty_cells == 0:
+            return
+        max_depth = request.max_depth
+        if num_empty_cells <= ENDGAME_SOLVE_NUM_EMPTY_CELLS:
+            max_depth = max(max_depth, num_empty_cells)
+
+        num_moves = popcount(mask)
+        winning_moves = get_immediate_threats(current_pieces, mask, layout)
+        non_losing_moves = get_non_losing_moves(current_pieces, mask, layout)
+        if winning_moves or not non_losing_moves:
+            candidate_moves = winning_moves or get_playable_cells(
+                mask, layout
+            )
+            request.best_col_num = next(
+                col_num for col_num in self.column_order
+                if candidate_moves & layout.column_masks[col_num]
+            )
+            request.score = (
+                WIN_SCORE - (num_moves + 1) if winning_moves
+                else -(WIN_SCORE - (num_moves + 2))
+            )
+            request.completed_depth = 1
+            return
+
+        # answer with the first non-losing move if no iteration completes.
+        request.best_col_num = next(
+            col_num for col_num in self.column_order
+            if non_losing_moves & layout.column_masks[col_num]
+        )
+        for depth in range(1, max_depth + 1):
+            score, best_col_num = yield from _search_moves(
+                current_pieces, mask, non_losing_moves, depth, -WIN_SCORE,
+                WIN_SCORE, request.best_col_num, self
+            )
+            request.best_col_num = best_col_num
+            request.score = score
+            request.completed_depth = depth
+            if depth >= num_empty_cells or abs(score) > MIN_WIN_SCORE:
+                break
+
+    def advance(
+        self, results: Optional[Tuple[List[int], List[int]]]
+    ) -> bool:
+        """Runs the search up to the next positions it needs expanded,
+        sending it the results of expanding the previous ones.
+
+        Returns:
+            (bool): True if the search is finished.
+        """
+        try:
+            if results is None:
+                self.pending_positions = next(self.generator)
+            else:
+                self.pending_positions = self.generator.send(results)
+        except StopIteration:
+            self.pending_positions = []
+            return True
+        finally:
+            self.request.num_nodes = self.num_nodes
+        return False
+
+
+class BatchedSearchService:
+    """Searches moves for many games at once, scoring the leaves of every
+    search together (see the module docstring).
+
+    Requests can be submitted from any thread. Searches are run either by
+    calling `tick` (or `run_until_idle`) directly, or by the background
+    thread started by `start`, which is profiled if profiling is on (see
+    `profiling.py`).
+    """
+
+    def __init__(
+        self,
+        evaluator: Evaluator = evaluate_positions,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE
+    ):
+        self.evaluator = evaluator
+        self.max_batch_size = max_batch_size
+        self.new_requests: "queue.Queue[MoveRequest]" = queue.Queue()
+        self.active_searches: List[_ActiveSearch] = []
+        self.request_ids = itertools.count()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.num_ticks = 0
+        self.num_evaluations = 0
+        self.num_evaluation_calls = 0
+        self.num_timeouts = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def submit(
+        self,
+        current_pieces: int,
+        mask: int,
+        layout: BitboardLayout,
+        max_depth: int = ALPHA_BETA_SEARCH_DEPTH,
+        time_limit: Optional[float] = None
+    ) -> MoveRequest:
+        """Requests the best move for the player to move.
+
+        Args:
+            time_limit (float | None): seconds after which the request is
+            answered with the best move found so far.
+        """
+        deadline = None
+        if time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        request = MoveRequest(
+            next(self.request_ids), current_pieces, mask, layout, max_depth,
+            deadline
+        )
+        self.new_requests.put(request)
+        return request
+
+    def submit_board(
+        self,
+        board: Board,
+        max_depth: int = ALPHA_BETA_SEARCH_DEPTH,
+        time_limit: Optional[float] = None
+    ) -> MoveRequest:
+        """Requests the best move for the computer (Player 2) on a
+        `Board`."""
+        player_1_pieces, player_2_pieces = board_to_bitboards(board)
+        return self.submit(
+            player_2_pieces,
+            player_1_pieces | player_2_pieces,
+            get_layout(board.num_rows, board.num_columns),
+            max_depth=max_depth,
+            time_limit=time_limit
+        )
+
+    def _finish(self, search: _ActiveSearch, is_timed_out: bool = False):
+        request = search.request
+        request.is_timed_out = is_timed_out
+        request.finish_time = time.perf_counter()
+        request.done_event.set()
+
+    def _take_new_requests(self):
+        while True:
+            try:
+                request = self.new_requests.get_nowait()
+            except queue.Empty:
+                return
+            search = _ActiveSearch(request)
+            if search.advance(None):
+                self._finish(search)
+            else:
+                self.active_searches.append(search)
+
+    def _expire_searches(self):
+        now = time.perf_counter()
+        active_searches = []
+        for search in self.active_searches:
+            deadline = search.request.deadline
+            if deadline is not None and now > deadline:
+                search.generator.close()
+                self.num_timeouts += 1
+                self._finish(search, is_timed_out=True)
+            else:
+                active_searches.append(search)
+        self.active_searches = active_searches
+
+    def tick(self) -> int:
+        """Advances a batch of searches to the next positions they need
+        expanded, expanding all of them together.
+
+        Returns:
+            (int): the number of searches still in progress.
+        """
+        self._take_new_requests()
+        self._expire_searches()
+        if not self.active_searches:
+            return 0
+
+        # earliest deadline first, then least recently advanced first.
+        self.active_searches.sort(key=lambda search: search.sort_key)
+        selected_searches = []
+        num_positions = 0
+        for search in self.active_searches:
+            if selected_searches and (
+                num_positions + len(search.pending_positions)
+                > self.max_batch_size
+            ):
+                break
+            selected_searches.append(search)
+            num_positions += len(search.pending_positions)
+
+        # boards of different sizes can't share an evaluator call.
+        searches_by_layout: Dict[BitboardLayout, List[_ActiveSearch]] = {}
+        for search in selected_searches:
+            searches_by_layout.setdefault(search.layout, []).append(search)
+        results_by_search = {}
+        for layout, searches in searches_by_layout.items():
+            positions = [
+                position for search in searches
+                for position in search.pending_positions
+            ]
+            current_pieces_array = np.array(
+                [current_pieces for current_pieces, _ in positions],
+                dtype=np.uint64
+            )
+            mask_array = np.array(
+                [mask for _, mask in positions], dtype=np.uint64
+            )
+            scores, non_losing_moves = expand_positions(
+                current_pieces_array, mask_array, layout, self.evaluator
+            )
+            self.num_evaluations += len(positions)
+            self.num_evaluation_calls += 1
+            scores = scores.tolist()
+            non_losing_moves = non_losing_moves.tolist()
+            start_index = 0
+            for search in searches:
+                end_index = start_index + len(search.pending_positions)
+                results_by_search[id(search)] = (
+                    scores[start_index:end_index],
+                    non_losing_moves[start_index:end_index]
+                )
+                start_index = end_index
+
+        finished_ids = set()
+        for search in selected_searches:
+            search.last_advanced_tick = self.num_ticks
+            if search.advance(results_by_search[id(search)]):
+                self._finish(search)
+                finished_ids.add(id(search))
+        self.active_searches = [
+            search for search in self.active_searches
+            if id(search) not in finished_ids
+        ]
+        self.num_ticks += 1
+        return len(self.active_searches)
+
+    def run_until_idle(self):
+        """Ticks until every submitted request is answered."""
+        while self.tick() or not self.new_requests.empty():
+            pass
+
+    def _serve(self):
+        with profile_session("search_service"):
+            while not self.stop_event.is_set():
+                if self.tick():
+                    continue
+                try:
+                    request = self.new_requests.get(
+                        timeout=IDLE_WAIT_SECONDS
+                    )
+                except queue.Empty:
+                    continue
+                self.new_requests.put(request)
+
+    def start(self):
+        """Starts answering requests in a background thread."""
+        self.stop()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the background thread. Requests still in progress are left
+        unanswered."""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def get_stats(self) -> Dict[str, float]:
+        """Number of ticks and evaluator calls, and the average number of
+        positions scored per call."""
+        return {
+            "num_ticks": self.num_ticks,
+            "num_evaluation_calls": self.num_evaluation_calls,
+            "num_evaluations": self.num_evaluations,
+            "mean_batch_size": (
+                self.num_evaluations / self.num_evaluation_calls
+                if self.num_evaluation_calls else 0.0
+            ),
+            "num_timeouts": self.num_timeouts
+        }
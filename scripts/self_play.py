@@ -0,0 +1,507 @@
+"""Generates training data for the deep Q learning opponent from headless
+self-play.
+
+Worker processes play games between the computer opponents on bitboards
+and push chunks of (state, action, reward, next_state, done) transitions
+onto a bounded queue. The main process drains the queue, decodes the
+bitboards into planes (with symmetry augmentation) and writes them out in
+`.npz` shards. Workers block when the queue is full, so memory use stays
+bounded no matter how much data is requested.
+
+Boards are encoded as uint8 planes of shape (2, num_rows, num_columns):
+plane 0 holds the pieces of the player to move and plane 1 the pieces of
+their opponent. `next_state` is the position after the move, from the point
+of view of the player who moves next, so that a negamax-style target is
+`reward - gamma * max(Q(next_state))` for non-terminal transitions. The
+reward is 1 if the move wins the game and 0 otherwise.
+
+Run `python self_play.py --help` for usage.
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from algos import ALPHA_BETA_SEARCH_DEPTH, search_best_move
+from bitboard import (
+    BitboardLayout, bitboards_to_planes, get_layout, get_move_bit,
+    get_playable_columns, has_n_in_a_row
+)
+from components import Board
+import constants
+from profiling import (
+    add_profile_arguments, configure_from_args, profile_session
+)
+from transposition import SharedTranspositionTable
+
+DEFAULT_CHUNK_SIZE = 8192
+DEFAULT_SHARD_SIZE = 1 << 20
+DEFAULT_QUEUE_SIZE = 16
+QUEUE_POLL_SECONDS = 0.1
+
+# used by `alpha_beta_policy`: set in each worker process when the workers
+# share a transposition table (see `generate_self_play_data`).
+SELF_PLAY_TRANSPOSITION_TABLE = None
+
+# a policy picks a column given the pieces of the player to move and the
+# mask of all pieces on the board.
+Policy = Callable[[int, int, BitboardLayout, random.Random], int]
+
+
+def random_policy(
+    current_pieces: int,
+    mask: int,
+    layout: BitboardLayout,
+    rng: random.Random
+) -> int:
+    """Picks a random column that isn't full. Bitboard equivalent of
+    `algos.make_move_naive`."""
+    return rng.choice(get_playable_columns(mask, layout))
+
+
+def alpha_beta_policy(
+    current_pieces: int,
+    mask: int,
+    layout: BitboardLayout,
+    rng: random.Random
+) -> int:
+    """Picks the column found by the alpha-beta search. Bitboard equivalent
+    of `algos.make_move_alpha_beta_pruning`."""
+    return search_best_move(
+        current_pieces, mask, ALPHA_BETA_SEARCH_DEPTH, layout,
+        transposition_table=SELF_PLAY_TRANSPOSITION_TABLE
+    )[0]
+
+
+def make_board_policy(make_move_func: Callable[[Board], None]) -> Policy:
+    """Wraps an opponent from `algos.py` so that it can be used in
+    self-play.
+
+    The opponents in `algos.py` always play as Player 2, so the board is
+    built with the player to move as 2 and their opponent as 1. This is much
+    slower than the bitboard policies since a `Board` is built every move.
+    """
+    def board_policy(
+        current_pieces: int,
+        mask: int,
+        layout: BitboardLayout,
+        rng: random.Random
+    ) -> int:
+        planes = bitboards_to_planes(
+            np.array([current_pieces, mask ^ current_pieces]), layout
+        )
+        board = Board(
+            num_rows=layout.num_rows, num_columns=layout.num_columns
+        )
+        board.board = planes[0] * 2.0 + planes[1] * 1.0
+        pieces_per_column_before = np.count_nonzero(board.board, axis=0)
+        make_move_func(board)
+        changed_columns = np.flatnonzero(
+            np.count_nonzero(board.board, axis=0) != pieces_per_column_before
+        )
+        if changed_columns.size == 0:
+            raise ValueError(
+                f"{make_move_func.__name__} didn't make a move."
+            )
+        return int(changed_columns[0])
+
+    return board_policy
+
+
+SELF_PLAY_POLICIES: Dict[str, Policy] = {
+    "easy": random_policy,
+    "medium": alpha_beta_policy
+}
+
+
+def play_self_play_game(
+    policy_1: Policy,
+    policy_2: Policy,
+    layout: BitboardLayout,
+    rng: random.Random,
+    transitions: Dict[str, list]
+) -> int:
+    """Plays one game and appends its transitions to `transitions`.
+
+    `transitions` is a dict of lists keyed on "current", "opponent",
+    "action", "reward", "next_current", "next_opponent" and "done", where
+    positions are stored as bitboards.
+
+    Returns:
+        (int): the number of moves played.
+    """
+    current_pieces = 0
+    opponent_pieces = 0
+    mask = 0
+    policies = (policy_1, policy_2)
+
+    for move_num in range(layout.num_rows * layout.num_columns):
+        col_num = policies[move_num % 2](current_pieces, mask, layout, rng)
+        move_bit = get_move_bit(mask, col_num, layout)
+        new_current_pieces = current_pieces | move_bit
+        mask |= move_bit
+
+        has_won = has_n_in_a_row(new_current_pieces, layout)
+        is_done = has_won or mask == layout.board_mask
+
+        transitions["current"].append(current_pieces)
+        transitions["opponent"].append(opponent_pieces)
+        transitions["action"].append(col_num)
+        transitions["reward"].append(1 if has_won else 0)
+        transitions["next_current"].append(opponent_pieces)
+        transitions["next_opponent"].append(new_current_pieces)
+        transitions["done"].append(is_done)
+
+        if is_done:
+            return move_num + 1
+
+        current_pieces, opponent_pieces = opponent_pieces, new_current_pieces
+
+    return layout.num_rows * layout.num_columns
+
+
+def _new_transitions() -> Dict[str, list]:
+    """Empty transition buffers, as filled in by `play_self_play_game`."""
+    return {
+        "current": [],
+        "opponent": [],
+        "action": [],
+        "reward": [],
+        "next_current": [],
+        "next_opponent": [],
+        "done": []
+    }
+
+
+def _transitions_to_chunk(
+    transitions: Dict[str, list]
+) -> Dict[str, np.ndarray]:
+    """Converts transition buffers into compact arrays to send between
+    processes."""
+    return {
+        "current": np.array(transitions["current"], dtype=np.uint64),
+        "opponent": np.array(transitions["opponent"], dtype=np.uint64),
+        "action": np.array(transitions["action"], dtype=np.int8),
+        "reward": np.array(transitions["reward"], dtype=np.int8),
+        "next_current": np.array(
+            transitions["next_current"], dtype=np.uint64
+        ),
+        "next_opponent": np.array(
+            transitions["next_opponent"], dtype=np.uint64
+        ),
+        "done": np.array(transitions["done"], dtype=bool)
+    }
+
+
+def encode_chunk(
+    chunk: Dict[str, np.ndarray],
+    layout: BitboardLayout,
+    augment: bool = True
+) -> Dict[str, np.ndarray]:
+    """Decodes a chunk of bitboard transitions into planes.
+
+    If `augment` is set, the left-right mirror image of every transition is
+    appended (Connect Four is symmetric around the middle column).
+
+    Returns:
+        (Dict[str, numpy.ndarray]): "states" and "next_states" of shape
+        (N, 2, num_rows, num_columns), plus "actions", "rewards" and "dones"
+        of shape (N,).
+    """
+    states = bitboards_to_planes(
+        np.stack([chunk["current"], chunk["opponent"]], axis=1), layout
+    )
+    next_states = bitboards_to_planes(
+        np.stack([chunk["next_current"], chunk["next_opponent"]], axis=1),
+        layout
+    )
+    actions = chunk["action"]
+    rewards = chunk["reward"]
+    dones = chunk["done"]
+
+    if augment:
+        states = np.concatenate([states, states[..., ::-1]])
+        next_states = np.concatenate([next_states, next_states[..., ::-1]])
+        actions = np.concatenate(
+            [actions, (layout.num_columns - 1 - actions).astype(np.int8)]
+        )
+        rewards = np.concatenate([rewards, rewards])
+        dones = np.concatenate([dones, dones])
+
+    return {
+        "states": states,
+        "actions": actions,
+        "rewards": rewards,
+        "next_states": next_states,
+        "dones": dones
+    }
+
+
+def _self_play_worker(
+    seed: int,
+    policy_names: Tuple[str, str],
+    layout: BitboardLayout,
+    chunk_size: int,
+    output_queue: multiprocessing.Queue,
+    stop_event,
+    shared_table_name: Optional[str] = None,
+    worker_num: int = 0
+):
+    """Plays self-play games until told to stop, putting chunks of
+    transitions onto `output_queue`.
+
+    Searches with the shared transposition table called
+    `shared_table_name`, as worker `worker_num`, if set. Profiled if
+    profiling is on (see `profiling.py`).
+    """
+    global SELF_PLAY_TRANSPOSITION_TABLE
+    if shared_table_name is not None:
+        SELF_PLAY_TRANSPOSITION_TABLE = SharedTranspositionTable.attach(
+            shared_table_name, worker_num
+        )
+    with profile_session("self_play_worker"):
+        rng = random.Random(seed)
+        policy_1 = SELF_PLAY_POLICIES[policy_names[0]]
+        policy_2 = SELF_PLAY_POLICIES[policy_names[1]]
+        transitions = _new_transitions()
+
+        while not stop_event.is_set():
+            play_self_play_game(policy_1, policy_2, layout, rng, transitions)
+            if len(transitions["action"]) < chunk_size:
+                continue
+
+            chunk = _transitions_to_chunk(transitions)
+            transitions = _new_transitions()
+            # block while the queue is full, but keep checking whether we've
+            # been told to stop so that the worker can always be joined.
+            while not stop_event.is_set():
+                try:
+                    output_queue.put(chunk, timeout=QUEUE_POLL_SECONDS)
+                    break
+                except queue.Full:
+                    continue
+    if SELF_PLAY_TRANSPOSITION_TABLE is not None:
+        SELF_PLAY_TRANSPOSITION_TABLE.close()
+        SELF_PLAY_TRANSPOSITION_TABLE = None
+
+
+class ShardWriter:
+    """Buffers encoded transitions and writes them out as fixed-size
+    `.npz` shards."""
+
+    def __init__(self, output_dir: str, shard_size: int):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.buffered_chunks: List[Dict[str, np.ndarray]] = []
+        self.num_buffered = 0
+        self.num_shards_written = 0
+        os.makedirs(output_dir, exist_ok=True)
+
+    def add(self, encoded_chunk: Dict[str, np.ndarray]):
+        """Buffers a chunk, writing out any full shards."""
+        self.buffered_chunks.append(encoded_chunk)
+        self.num_buffered += len(encoded_chunk["actions"])
+        while self.num_buffered >= self.shard_size:
+            self._write_shard(self.shard_size)
+
+    def close(self):
+        """Writes out whatever is left in the buffer as a final shard."""
+        if self.num_buffered > 0:
+            self._write_shard(self.num_buffered)
+
+    def _write_shard(self, num_positions: int):
+        """Writes the first `num_positions` buffered positions to disk."""
+        merged = {
+            key: np.concatenate([chunk[key] for chunk in self.buffered_chunks])
+            for key in self.buffered_chunks[0]
+        }
+        shard = {key: value[:num_positions] for key, value in merged.items()}
+        remainder = {
+            key: value[num_positions:] for key, value in merged.items()
+        }
+        path = os.path.join(
+            self.output_dir, f"shard_{self.num_shards_written:05d}.npz"
+        )
+        # uncompressed, so that shards can be read back quickly.
+        np.savez(path, **shard)
+        self.num_shards_written += 1
+
+        self.num_buffered -= num_positions
+        self.buffered_chunks = [remainder] if self.num_buffered else []
+
+
+def _get_chunk(
+    output_queue: multiprocessing.Queue,
+    workers: List[multiprocessing.Process]
+) -> Dict[str, np.ndarray]:
+    """The next chunk of transitions from the workers.
+
+    Raises:
+        RuntimeError: if every worker has exited (workers only exit once
+        told to stop, unless they fail), so no chunk will ever come.
+    """
+    while True:
+        try:
+            return output_queue.get(timeout=QUEUE_POLL_SECONDS)
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                raise RuntimeError(
+                    "Every self-play worker exited: see their errors above."
+                )
+
+
+def generate_self_play_data(
+    output_dir: str,
+    num_positions: int,
+    num_workers: int = os.cpu_count() or 1,
+    policy_names: Tuple[str, str] = ("easy", "easy"),
+    num_rows: int = constants.ROW_COUNT,
+    num_columns: int = constants.COLUMN_COUNT,
+    augment: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    shared_table_size: int = 0,
+    seed: int = 0
+) -> Dict[str, float]:
+    """Runs self-play across worker processes and writes sharded training
+    data to `output_dir`.
+
+    `num_positions` counts positions reached in self-play; with `augment`
+    set, twice as many positions are written. With a `shared_table_size`,
+    the alpha-beta searches of every worker share one transposition table
+    of that many entries, so that workers reuse each other's results.
+
+    Returns:
+        stats (Dict[str, float]): positions generated, positions written,
+        shards written, elapsed seconds and positions per second, and with
+        a shared table, the hit rate of every worker.
+
+    Raises:
+        ValueError: if a policy isn't one of `SELF_PLAY_POLICIES`.
+        RuntimeError: if every worker exits before enough positions are
+        generated.
+    """
+    for policy_name in policy_names:
+        if policy_name not in SELF_PLAY_POLICIES:
+            raise ValueError(
+                f"Unknown self-play policy {policy_name!r}: expected one of "
+                f"{sorted(SELF_PLAY_POLICIES)}."
+            )
+    layout = get_layout(num_rows, num_columns)
+    output_queue = multiprocessing.Queue(maxsize=queue_size)
+    stop_event = multiprocessing.Event()
+    shared_table = None
+    shared_table_name = None
+    if shared_table_size:
+        shared_table = SharedTranspositionTable.create(
+            shared_table_size, max_num_workers=num_workers + 1
+        )
+        shared_table_name = shared_table.name
+    workers = [
+        multiprocessing.Process(
+            target=_self_play_worker,
+            args=(
+                seed + worker_num, policy_names, layout, chunk_size,
+                output_queue, stop_event,
+                shared_table_name, worker_num + 1
+            ),
+            daemon=True
+        )
+        for worker_num in range(num_workers)
+    ]
+
+    shard_writer = ShardWriter(output_dir=output_dir, shard_size=shard_size)
+    num_generated = 0
+    num_written = 0
+    start_time = time.perf_counter()
+
+    for worker in workers:
+        worker.start()
+
+    try:
+        while num_generated < num_positions:
+            chunk = _get_chunk(output_queue, workers)
+            num_wanted = num_positions - num_generated
+            if len(chunk["action"]) > num_wanted:
+                chunk = {
+                    key: value[:num_wanted] for key, value in chunk.items()
+                }
+            encoded_chunk = encode_chunk(chunk, layout, augment=augment)
+            shard_writer.add(encoded_chunk)
+            num_generated += len(chunk["action"])
+            num_written += len(encoded_chunk["actions"])
+    finally:
+        stop_event.set()
+        # drain the queue so that no worker is left blocked on a put.
+        while any(worker.is_alive() for worker in workers):
+            try:
+                output_queue.get(timeout=QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        for worker in workers:
+            worker.join()
+        shard_writer.close()
+        worker_table_stats = []
+        if shared_table is not None:
+            worker_table_stats = shared_table.get_worker_stats()[1:]
+            shared_table.close()
+            shared_table.unlink()
+
+    elapsed_seconds = time.perf_counter() - start_time
+    stats = {
+        "num_positions_generated": num_generated,
+        "num_positions_written": num_written,
+        "num_shards_written": shard_writer.num_shards_written,
+        "elapsed_seconds": elapsed_seconds,
+        "positions_per_second": num_generated / elapsed_seconds
+    }
+    for table_stats in worker_table_stats:
+        stats[f"worker_{table_stats['worker_num']}_table_hit_rate"] = (
+            table_stats["hit_rate"]
+        )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--num-positions", type=int, default=1_000_000)
+    parser.add_argument("--num-workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--policies", nargs=2, default=["easy", "easy"],
+        choices=sorted(SELF_PLAY_POLICIES)
+    )
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--no-augment", action="store_true")
+    parser.add_argument(
+        "--shared-table-size", type=int, default=0,
+        help="entries of a transposition table shared by every worker's "
+        "alpha-beta searches (none if 0)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    stats = generate_self_play_data(
+        output_dir=args.output_dir,
+        num_positions=args.num_positions,
+        num_workers=args.num_workers,
+        policy_names=tuple(args.policies),
+        augment=not args.no_augment,
+        shard_size=args.shard_size,
+        shared_table_size=args.shared_table_size,
+        seed=args.seed
+    )
+    for key, value in stats.items():
+        print(f"{key}: {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
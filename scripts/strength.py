@@ -0,0 +1,330 @@
+"""Strength levels: one engine whose playing strength, and cost, is set by
+a node budget, a depth cap and noise.
+
+At every level, the engine deepens its search one move at a time, up to
+the level's depth cap, and stops as soon as the level's node budget runs
+out, keeping the deepest completed iteration. Positions in the endgame
+tablebase (see `algos.get_endgame_tablebase`), if one has been generated,
+are scored from it rather than searched. Levels with a temperature then
+pick a move at random, by a softmax over the scores of every move (see
+`algos.score_root_moves`), so that they sometimes play a move that's worse
+than the best; the others play the best move.
+
+The node budget bounds the work of a move on any machine. The time cap
+bounds its CPU cost even on a slow one: a move never takes longer, on one
+core, than `max_seconds` (up to one stop check, see
+`algos.STOP_CHECK_INTERVAL_NUM_NODES`), which is what capacity plans can be
+based on. Without the time cap (see `choose_move`'s `deterministic`), a
+move is reproducible, node for node, from its seed and the tablebase
+(see `move_log.py`).
+
+`STRENGTH_LEVELS` is calibrated with `python benchmark.py levels`, which
+measures the CPU cost per move of every level, and the tournament runner,
+which rates every level against the one below it:
+
+    python tournament.py level:1 level:2 --num-openings 32 \\
+        --checkpoint levels_1_2.jsonl
+
+Part of the engine: nothing here imports pygame.
+"""
+import math
+import random
+import time
+from typing import TYPE_CHECKING, Callable, Dict, NamedTuple, Optional, Tuple
+
+from algos import (
+    ENDGAME_SOLVE_NUM_EMPTY_CELLS, MIN_WIN_SCORE, PLAYER_2_VALUE,
+    SearchAborted, SearchContext, get_endgame_tablebase,
+    iterative_deepening_search, score_root_moves
+)
+from bitboard import (
+    BitboardLayout, board_to_bitboards, get_layout, get_playable_columns
+)
+from components import Board
+from metrics import MOVE_METRICS
+import move_log
+from threats import popcount
+from transposition import TranspositionTable
+
+if TYPE_CHECKING:
+    from kernels import CompiledSearchContext
+
+# a fresh table per move: a move's cost and strength don't depend on what
+# was searched before.
+MOVE_TRANSPOSITION_TABLE_SIZE = 1 << 16
+MOVE_SEED_NUM_BITS = 64
+
+
+class StrengthLevel(NamedTuple):
+    """How strongly, and at what cost, the engine plays."""
+    max_depth: int
+    max_num_nodes: int
+    # of the softmax over root scores: a move scoring `temperature` less
+    # than another is e times less likely. 0 always plays the best move.
+    temperature: float
+    # hard cap on the time of a move, whatever the node budget.
+    max_seconds: float
+
+
+# calibrated with `benchmark.py levels --num-positions 64` (the worst CPU
+# cost of a move, on one core) and, for every pair of neighbouring levels,
+# a tournament on 32 openings, each played with both colours (64 games;
+# Elo of the level over the one below it, with a 95% interval of about
+# +-60):
+#   level  max CPU ms  Elo over level below
+#   1              1
+#   2              1  103
+#   3             14  145
+#   4             14  157
+#   5             94  164
+#   6            162  344
+#   7            650   86
+#   8           2620   97
+STRENGTH_LEVELS: Dict[int, StrengthLevel] = {
+    1: StrengthLevel(
+        max_depth=1, max_num_nodes=100, temperature=20, max_seconds=0.05
+    ),
+    2: StrengthLevel(
+        max_depth=1, max_num_nodes=100, temperature=1, max_seconds=0.05
+    ),
+    3: StrengthLevel(
+        max_depth=3, max_num_nodes=1000, temperature=4, max_seconds=0.1
+    ),
+    4: StrengthLevel(
+        max_depth=3, max_num_nodes=1000, temperature=1, max_seconds=0.1
+    ),
+    5: StrengthLevel(
+        max_depth=5, max_num_nodes=3000, temperature=1, max_seconds=0.3
+    ),
+    6: StrengthLevel(
+        max_depth=8, max_num_nodes=2500, temperature=0, max_seconds=0.5
+    ),
+    7: StrengthLevel(
+        max_depth=12, max_num_nodes=10000, temperature=0, max_seconds=1.5
+    ),
+    8: StrengthLevel(
+        max_depth=42, max_num_nodes=40000, temperature=0, max_seconds=4.0
+    )
+}
+
+
+def sample_move(
+    scores: Dict[int, int], temperature: float, rng: random.Random
+) -> int:
+    """Picks a column by a softmax over the scores of every column."""
+    best_score = max(scores.values())
+    col_nums = list(scores)
+    weights = [
+        math.exp((scores[col_num] - best_score) / temperature)
+        for col_num in col_nums
+    ]
+    return rng.choices(col_nums, weights=weights)[0]
+
+
+def _get_compiled_search_context(
+    layout: BitboardLayout,
+    strength_level: StrengthLevel,
+    transposition_table: Optional[TranspositionTable],
+    deterministic: bool
+) -> Optional["CompiledSearchContext"]:
+    """A context to search a move with the compiled kernels (see
+    `kernels.py`), if Numba is installed and the search only needs what
+    they support: a node budget and a fresh table. None otherwise.
+
+    The kernels search like the Python search, so the move, and its
+    number of nodes, are the same either way.
+    """
+    tablebase = get_endgame_tablebase()
+    if not deterministic or transposition_table is not None or (
+        tablebase is not None and tablebase.layout == layout
+    ):
+        return None
+    # imported on first use: Numba is slow to import.
+    import kernels
+    if not kernels.HAS_NUMBA:
+        return None
+    return kernels.CompiledSearchContext(
+        layout,
+        # one entry at most per node: neither table ever fills up, so both
+        # keep every entry and search alike.
+        max_num_table_entries=min(
+            MOVE_TRANSPOSITION_TABLE_SIZE, strength_level.max_num_nodes
+        ),
+        max_num_nodes=strength_level.max_num_nodes
+    )
+
+
+def choose_move(
+    current_pieces: int,
+    mask: int,
+    layout: BitboardLayout,
+    strength_level: StrengthLevel,
+    rng: Optional[random.Random] = None,
+    transposition_table: Optional[TranspositionTable] = None,
+    deterministic: bool = False
+) -> Tuple[Optional[int], int, bool]:
+    """Picks a move for the player to move, at a strength level (see the
+    module docstring).
+
+    Args:
+        rng (random.Random | None): picks among the moves, at levels with a
+        temperature. The `random` module if None.
+        transposition_table (TranspositionTable | None): searched with, and
+        kept. A fresh one for this move if None.
+        deterministic (bool): whether to stop the search by the node budget
+        only, not by the level's time cap too, so that the same rng state
+        and table always give the same move after as many nodes, on any
+        machine. Such moves are searched with the compiled kernels if Numba
+        is installed and there's no table to keep (see `kernels.py`).
+
+    Returns:
+        col_num (int | None): the column to play, or None if the board is
+        full.
+        num_nodes (int): the number of nodes searched.
+        is_past_deadline (bool): whether the time cap stopped the search.
+        If not, the move is the same as a deterministic one.
+    """
+    if mask == layout.board_mask:
+        return None, 0, False
+    context = _get_compiled_search_context(
+        layout, strength_level, transposition_table, deterministic
+    )
+    if context is not None:
+        import kernels
+        search_iteratively = kernels.compiled_iterative_deepening_search
+        search_root_moves = kernels.compiled_score_root_moves
+    else:
+        if transposition_table is None:
+            transposition_table = TranspositionTable(
+                max_num_entries=MOVE_TRANSPOSITION_TABLE_SIZE
+            )
+        context = SearchContext(
+            layout=layout,
+            transposition_table=transposition_table,
+            deadline=(
+                None if deterministic
+                else time.perf_counter() + strength_level.max_seconds
+            ),
+            max_num_nodes=strength_level.max_num_nodes,
+            tablebase=get_endgame_tablebase()
+        )
+        search_iteratively = iterative_deepening_search
+        search_root_moves = score_root_moves
+
+    col_num = None
+    if not strength_level.temperature:
+        col_num, _, _ = search_iteratively(
+            current_pieces, mask, strength_level.max_depth, context
+        )
+    else:
+        scores = {}
+        num_empty_cells = popcount(layout.board_mask & ~mask)
+        for depth in range(1, strength_level.max_depth + 1):
+            try:
+                scores = search_root_moves(
+                    current_pieces, mask, depth, context
+                )
+            except SearchAborted:
+                break
+            if num_empty_cells <= ENDGAME_SOLVE_NUM_EMPTY_CELLS:
+                # searched to the end of the game, whatever the depth asked
+                # for (see `algos.score_root_moves`).
+                break
+            if depth >= num_empty_cells or any(
+                abs(score) > MIN_WIN_SCORE for score in scores.values()
+            ):
+                # searching deeper can't change which moves win or lose.
+                break
+        if scores:
+            col_num = sample_move(
+                scores, strength_level.temperature, rng or random
+            )
+
+    if col_num is None:
+        # out of budget before the first iteration finished.
+        MOVE_METRICS.record_fallback("node_budget")
+        col_num = next(
+            col_num for col_num in context.column_order
+            if col_num in get_playable_columns(mask, layout)
+        )
+    return col_num, context.num_nodes, context.is_past_deadline
+
+
+def make_move_at_strength(
+    board: Board,
+    level_num: int,
+    seed: int,
+    transposition_table: Optional[TranspositionTable] = None,
+    deterministic: bool = False
+) -> Optional[int]:
+    """Drops a piece for Player 2, at a strength level (see `choose_move`),
+    and logs the move to `move_log.MOVE_LOG` if set.
+
+    Args:
+        seed (int): of the random number generator that picks the move.
+
+    Returns:
+        col_num (int | None): the column played, or None if the board is
+        full.
+    """
+    # timed against the level's own time cap (see `metrics.py`).
+    MOVE_METRICS.set_move_timeout(STRENGTH_LEVELS[level_num].max_seconds)
+    layout = get_layout(board.num_rows, board.num_columns)
+    player_1_pieces, player_2_pieces = board_to_bitboards(board)
+    mask = player_1_pieces | player_2_pieces
+    start_time = time.perf_counter()
+    start_cpu_seconds = time.thread_time()
+    col_num, num_nodes, is_past_deadline = choose_move(
+        player_2_pieces, mask, layout, STRENGTH_LEVELS[level_num],
+        rng=random.Random(seed), transposition_table=transposition_table,
+        deterministic=deterministic
+    )
+    if move_log.MOVE_LOG is not None:
+        move_log.MOVE_LOG.log(move_log.MoveRequest(
+            level_num=level_num,
+            num_rows=board.num_rows,
+            num_columns=board.num_columns,
+            current_pieces=player_2_pieces,
+            mask=mask,
+            seed=seed,
+            keeps_transposition_table=transposition_table is not None,
+            deterministic=deterministic,
+            is_past_deadline=is_past_deadline,
+            col_num=col_num,
+            num_nodes=num_nodes,
+            elapsed_seconds=time.perf_counter() - start_time,
+            cpu_seconds=time.thread_time() - start_cpu_seconds
+        ))
+    if col_num is not None:
+        board.drop_piece(col_num=col_num, value=PLAYER_2_VALUE)
+    return col_num
+
+
+def make_strength_opponent(
+    level_num: int,
+    transposition_table: Optional[TranspositionTable] = None,
+    seed: Optional[int] = None,
+    deterministic: bool = False
+) -> Callable[[Board], None]:
+    """An opponent (as in `opponents.OPPONENT_REGISTRY`) playing at one of
+    `STRENGTH_LEVELS`.
+
+    Args:
+        seed (int | None): of the random number generator that every move
+        draws its own seed from (see `move_log.py`). Seeded from the OS if
+        None.
+        deterministic (bool): see `choose_move`.
+    """
+    if level_num not in STRENGTH_LEVELS:
+        raise ValueError(f"Unknown strength level: {level_num}")
+    rng = random.Random(seed)
+
+    def make_move(board: Board):
+        make_move_at_strength(
+            board, level_num, rng.getrandbits(MOVE_SEED_NUM_BITS),
+            transposition_table=transposition_table,
+            deterministic=deterministic
+        )
+
+    make_move.__name__ = f"make_move_at_level_{level_num}"
+    return make_move
@@ -0,0 +1,724 @@
+"""Endgame tablebase: exact results of positions with few empty cells.
+
+Generation has two passes over "layers" of positions, where layer `n`
+holds every position with `n` empty cells:
+
+1. Enumeration, from the top layer down: each layer is every position
+   reachable in one move from the layer above (plus any seed positions
+   with that many empty cells). Positions where the player to move can win
+   right away are decided, and aren't expanded.
+2. Retrograde solving, from the bottom layer (full boards) up: a position
+   is solved from the results of its children, which are all in the layer
+   below.
+
+Every reachable position on the standard board is far too many to
+enumerate once more than a handful of cells are empty, so the table is
+built from seed positions (e.g. from recorded games, or random playouts
+stopped at `max_num_empty_cells`): it then holds every position reachable
+from the seeds. On small boards the seed can be the empty board, which
+enumerates every reachable position.
+
+Positions are stored as their canonical form: whichever of the position
+and its mirror image has the smaller key. Both passes split each layer
+across worker processes. Each finished layer is written to the work
+directory as it's done, so an interrupted generation picks up from the
+last finished layer.
+
+The finished table is a single file: a header followed by an
+open-addressing hash table of (key, packed result) entries, which is
+memory-mapped on load so that a probe reads a slot or two, whatever the
+size of the table.
+
+Run `python tablebase.py --help` for usage.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import struct
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from bitboard import (
+    BitboardLayout, board_to_bitboards, get_layout, get_playable_columns,
+    has_n_in_a_row, mirror_bitboard, mirror_bitboard_array, play_column,
+    popcount_array
+)
+from components import Board
+import constants
+from game_record import iter_records
+from threats import get_winning_cells_array, popcount
+
+FILE_MAGIC = b"C4TB"
+FILE_VERSION = 1
+# magic, version, num_rows, num_columns, max_num_empty_cells, num_entries,
+# num_slots
+FILE_HEADER_FORMAT = "<4sBBBBQQ"
+FILE_HEADER_SIZE = struct.calcsize(FILE_HEADER_FORMAT)
+
+ENTRY_DTYPE = np.dtype([("key", "<u8"), ("value", "<u2")])
+# no position has this key, since it doesn't fit on any board.
+EMPTY_KEY = (1 << 64) - 1
+# Fibonacci hashing: the top bits of key * 2^64 / golden ratio.
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+UINT64_MASK = (1 << 64) - 1
+# the table is kept at most half full, so probes stay short.
+MIN_NUM_SLOTS_PER_ENTRY = 2
+
+# results, from the point of view of the player to move.
+RESULT_LOSS = -1
+RESULT_DRAW = 0
+RESULT_WIN = 1
+# results are packed into 16 bits: the result (plus 1) in bits 10-11, the
+# distance in bits 4-9 and the best column in bits 0-3.
+RESULT_SHIFT = 10
+DISTANCE_SHIFT = 4
+DISTANCE_BITS = 0x3F
+COLUMN_BITS = 0xF
+# best column of full boards.
+NO_COLUMN = COLUMN_BITS
+# orders wins (faster first) above draws above losses (slower first).
+MAX_DISTANCE_SCORE = 100
+
+DEFAULT_MAX_NUM_EMPTY_CELLS = 12
+DEFAULT_CHUNK_SIZE = 1 << 16
+PARAMS_FILE_NAME = "params.json"
+
+
+class TablebaseEntry(NamedTuple):
+    """Exact result of a position, with perfect play from both sides."""
+    # `RESULT_WIN`, `RESULT_DRAW` or `RESULT_LOSS`, for the player to move.
+    result: int
+    # number of moves until the game ends: the winner wins as fast as they
+    # can, and the loser holds out as long as they can.
+    distance: int
+    # a column that achieves the result, or None on a full board.
+    best_col_num: Optional[int]
+
+
+def pack_entry(result: int, distance: int, best_col_num: int) -> int:
+    return (
+        ((result + 1) << RESULT_SHIFT) | (distance << DISTANCE_SHIFT)
+        | best_col_num
+    )
+
+
+def unpack_entry(value: int) -> TablebaseEntry:
+    best_col_num = value & COLUMN_BITS
+    return TablebaseEntry(
+        result=(value >> RESULT_SHIFT) - 1,
+        distance=(value >> DISTANCE_SHIFT) & DISTANCE_BITS,
+        best_col_num=None if best_col_num == NO_COLUMN else best_col_num
+    )
+
+
+def get_canonical_positions(
+    current_pieces_array: np.ndarray,
+    mask_array: np.ndarray,
+    layout: BitboardLayout
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Canonical form of a batch of positions: whichever of each position
+    and its mirror image has the smaller key.
+
+    Returns:
+        keys, current_pieces_array, mask_array (numpy.ndarray): the
+        canonical positions and their keys.
+    """
+    mirrored_current_pieces = mirror_bitboard_array(
+        current_pieces_array, layout
+    )
+    mirrored_mask = mirror_bitboard_array(mask_array, layout)
+    keys = current_pieces_array + mask_array
+    mirrored_keys = mirrored_current_pieces + mirrored_mask
+    is_mirrored = mirrored_keys < keys
+    return (
+        np.where(is_mirrored, mirrored_keys, keys),
+        np.where(is_mirrored, mirrored_current_pieces, current_pieces_array),
+        np.where(is_mirrored, mirrored_mask, mask_array)
+    )
+
+
+def _get_layer_path(work_dir: str, kind: str, num_empty_cells: int) -> str:
+    return os.path.join(work_dir, f"{kind}_{num_empty_cells:02d}.npy")
+
+
+def _save_atomically(path: str, array: np.ndarray):
+    """Saves an array so that an interrupted save never leaves a partial
+    file behind."""
+    temp_path = f"{path}.tmp.npy"
+    np.save(temp_path, array)
+    os.replace(temp_path, path)
+
+
+def _load_layer(work_dir: str, kind: str, num_empty_cells: int) -> np.ndarray:
+    return np.load(
+        _get_layer_path(work_dir, kind, num_empty_cells), mmap_mode="r"
+    )
+
+
+def _get_chunks(num_positions: int, chunk_size: int) -> List[Tuple[int, int]]:
+    return [
+        (start, min(start + chunk_size, num_positions))
+        for start in range(0, num_positions, chunk_size)
+    ]
+
+
+def _get_immediate_wins(
+    current_pieces_array: np.ndarray,
+    mask_array: np.ndarray,
+    layout: BitboardLayout
+) -> np.ndarray:
+    """Winning cells that the player to move can play right away."""
+    playable_cells = (
+        mask_array + np.uint64(layout.bottom_mask)
+    ) & np.uint64(layout.board_mask)
+    return get_winning_cells_array(
+        current_pieces_array, mask_array, layout
+    ) & playable_cells
+
+
+def _expand_chunk(
+    args: Tuple[str, int, int, int, BitboardLayout]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Canonical children of a chunk of a layer, for the enumeration pass.
+
+    Returns:
+        keys, positions (numpy.ndarray): the unique children's keys, and
+        their (current_pieces, mask) pairs.
+    """
+    work_dir, num_empty_cells, start, end, layout = args
+    positions = np.asarray(
+        _load_layer(work_dir, "positions", num_empty_cells)[start:end]
+    )
+    current_pieces_array, mask_array = positions[:, 0], positions[:, 1]
+    # decided positions aren't expanded.
+    is_open = _get_immediate_wins(
+        current_pieces_array, mask_array, layout
+    ) == 0
+    current_pieces_array = current_pieces_array[is_open]
+    mask_array = mask_array[is_open]
+
+    child_keys, child_positions = [], []
+    for col_num in range(layout.num_columns):
+        move_bits = (
+            mask_array + np.uint64(layout.bottom_masks[col_num])
+        ) & np.uint64(layout.column_masks[col_num])
+        is_legal = move_bits != 0
+        keys, child_current_pieces, child_mask = get_canonical_positions(
+            (current_pieces_array ^ mask_array)[is_legal],
+            (mask_array | move_bits)[is_legal],
+            layout
+        )
+        child_keys.append(keys)
+        child_positions.append(
+            np.stack([child_current_pieces, child_mask], axis=1)
+        )
+    return _unique_positions(
+        np.concatenate(child_keys), np.concatenate(child_positions)
+    )
+
+
+def _unique_positions(
+    keys: np.ndarray, positions: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Removes duplicates, sorting by key."""
+    keys, indices = np.unique(keys, return_index=True)
+    return keys, positions[indices].reshape(-1, 2)
+
+
+def _solve_chunk(
+    args: Tuple[str, int, int, int, BitboardLayout]
+) -> np.ndarray:
+    """Packed results of a chunk of a layer, from the results of the layer
+    below."""
+    work_dir, num_empty_cells, start, end, layout = args
+    positions = np.asarray(
+        _load_layer(work_dir, "positions", num_empty_cells)[start:end]
+    )
+    num_positions = len(positions)
+    if num_empty_cells == 0:
+        return np.full(
+            num_positions, pack_entry(RESULT_DRAW, 0, NO_COLUMN),
+            dtype=np.uint16
+        )
+
+    child_layer_keys = _load_layer(work_dir, "keys", num_empty_cells - 1)
+    child_layer_values = _load_layer(
+        work_dir, "values", num_empty_cells - 1
+    )
+    current_pieces_array, mask_array = positions[:, 0], positions[:, 1]
+    immediate_wins = _get_immediate_wins(
+        current_pieces_array, mask_array, layout
+    )
+    is_open = immediate_wins == 0
+
+    best_scores = np.full(num_positions, -2 * MAX_DISTANCE_SCORE)
+    best_results = np.zeros(num_positions, dtype=np.int64)
+    best_distances = np.zeros(num_positions, dtype=np.int64)
+    best_col_nums = np.full(num_positions, NO_COLUMN, dtype=np.int64)
+    # center columns first, so that ties go to the center.
+    for col_num in sorted(
+        range(layout.num_columns),
+        key=lambda col_num: abs(2 * col_num - (layout.num_columns - 1))
+    ):
+        column_mask = np.uint64(layout.column_masks[col_num])
+        move_bits = (
+            mask_array + np.uint64(layout.bottom_masks[col_num])
+        ) & column_mask
+        is_win = (immediate_wins & column_mask) != 0
+        is_searched = (move_bits != 0) & is_open
+
+        results = np.where(is_win, RESULT_WIN, RESULT_LOSS)
+        distances = np.ones(num_positions, dtype=np.int64)
+        child_keys, _, _ = get_canonical_positions(
+            (current_pieces_array ^ mask_array)[is_searched],
+            (mask_array | move_bits)[is_searched],
+            layout
+        )
+        child_indices = np.searchsorted(child_layer_keys, child_keys)
+        child_indices = np.minimum(child_indices, len(child_layer_keys) - 1)
+        if not np.array_equal(child_layer_keys[child_indices], child_keys):
+            raise RuntimeError(
+                f"Layer {num_empty_cells - 1} is missing children of layer "
+                f"{num_empty_cells}; delete the work directory and start "
+                "over."
+            )
+        child_values = child_layer_values[child_indices].astype(np.int64)
+        results[is_searched] = -((child_values >> RESULT_SHIFT) - 1)
+        distances[is_searched] = (
+            (child_values >> DISTANCE_SHIFT) & DISTANCE_BITS
+        ) + 1
+
+        scores = np.select(
+            [results == RESULT_WIN, results == RESULT_LOSS],
+            [MAX_DISTANCE_SCORE - distances, distances - MAX_DISTANCE_SCORE],
+            default=0
+        )
+        is_better = (is_searched | is_win) & (scores > best_scores)
+        best_scores[is_better] = scores[is_better]
+        best_results[is_better] = results[is_better]
+        best_distances[is_better] = distances[is_better]
+        best_col_nums[is_better] = col_num
+
+    return (
+        ((best_results + 1) << RESULT_SHIFT)
+        | (best_distances << DISTANCE_SHIFT)
+        | best_col_nums
+    ).astype(np.uint16)
+
+
+def _run_chunks(func, args_list: list, pool) -> list:
+    if pool is None:
+        return [func(args) for args in args_list]
+    return pool.map(func, args_list)
+
+
+def _check_params(work_dir: str, params: Dict[str, object]):
+    """Makes sure that a work directory is only resumed with the same
+    parameters it was started with."""
+    params_path = os.path.join(work_dir, PARAMS_FILE_NAME)
+    if os.path.exists(params_path):
+        with open(params_path) as params_file:
+            existing_params = json.load(params_file)
+        if existing_params != params:
+            raise ValueError(
+                f"{work_dir} was started with different parameters: "
+                f"{existing_params}"
+            )
+        return
+    with open(params_path, "w") as params_file:
+        json.dump(params, params_file)
+
+
+def generate_tablebase(
+    seeds: Iterable[Tuple[int, int]],
+    work_dir: str,
+    output_path: str,
+    max_num_empty_cells: int = DEFAULT_MAX_NUM_EMPTY_CELLS,
+    num_rows: int = constants.ROW_COUNT,
+    num_columns: int = constants.COLUMN_COUNT,
+    num_workers: int = os.cpu_count() or 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, int]:
+    """Enumerates and solves every position reachable from the seeds with
+    at most `max_num_empty_cells` empty cells (see the module docstring),
+    and writes the table to `output_path`.
+
+    Finished layers are kept in `work_dir`, so calling this again with the
+    same arguments resumes an interrupted generation.
+
+    Args:
+        seeds (Iterable[Tuple[int, int]]): positions, as (current_pieces,
+        mask) tuples, to enumerate from. They can have any number of empty
+        cells; layers above `max_num_empty_cells` are enumerated, but not
+        solved or stored.
+
+    Returns:
+        (Dict[str, int]): number of positions per layer.
+    """
+    layout = get_layout(num_rows, num_columns)
+    seeds = sorted(set(seeds))
+    if not seeds:
+        raise ValueError("At least one seed position is needed.")
+    os.makedirs(work_dir, exist_ok=True)
+    _check_params(work_dir, {
+        "num_rows": num_rows,
+        "num_columns": num_columns,
+        "max_num_empty_cells": max_num_empty_cells,
+        "seeds_digest": hashlib.sha256(
+            json.dumps(seeds).encode()
+        ).hexdigest()
+    })
+
+    seed_keys, seed_current_pieces, seed_mask = get_canonical_positions(
+        np.array([current for current, _ in seeds], dtype=np.uint64),
+        np.array([mask for _, mask in seeds], dtype=np.uint64),
+        layout
+    )
+    seed_num_empty_cells = layout.num_rows * layout.num_columns - (
+        popcount_array(seed_mask)
+    )
+    top_num_empty_cells = int(seed_num_empty_cells.max())
+
+    pool = multiprocessing.Pool(num_workers) if num_workers > 1 else None
+    try:
+        num_positions_per_layer = {}
+        for num_empty_cells in range(top_num_empty_cells, -1, -1):
+            keys_path = _get_layer_path(work_dir, "keys", num_empty_cells)
+            if not os.path.exists(keys_path):
+                is_seed = seed_num_empty_cells == num_empty_cells
+                keys = [seed_keys[is_seed]]
+                positions = [np.stack(
+                    [seed_current_pieces[is_seed], seed_mask[is_seed]],
+                    axis=1
+                )]
+                if num_empty_cells < top_num_empty_cells:
+                    parent_num_positions = num_positions_per_layer[
+                        num_empty_cells + 1
+                    ]
+                    for chunk_keys, chunk_positions in _run_chunks(
+                        _expand_chunk,
+                        [
+                            (work_dir, num_empty_cells + 1, start, end,
+                             layout)
+                            for start, end in _get_chunks(
+                                parent_num_positions, chunk_size
+                            )
+                        ],
+                        pool
+                    ):
+                        keys.append(chunk_keys)
+                        positions.append(chunk_positions)
+                keys, positions = _unique_positions(
+                    np.concatenate(keys), np.concatenate(positions)
+                )
+                # keys last: their presence marks a finished layer.
+                _save_atomically(
+                    _get_layer_path(work_dir, "positions", num_empty_cells),
+                    positions
+                )
+                _save_atomically(keys_path, keys)
+            num_positions_per_layer[num_empty_cells] = len(
+                _load_layer(work_dir, "keys", num_empty_cells)
+            )
+
+        top_solved_num_empty_cells = min(
+            max_num_empty_cells, top_num_empty_cells
+        )
+        for num_empty_cells in range(top_solved_num_empty_cells + 1):
+            values_path = _get_layer_path(work_dir, "values", num_empty_cells)
+            if os.path.exists(values_path):
+                continue
+            values = _run_chunks(
+                _solve_chunk,
+                [
+                    (work_dir, num_empty_cells, start, end, layout)
+                    for start, end in _get_chunks(
+                        num_positions_per_layer[num_empty_cells], chunk_size
+                    )
+                ],
+                pool
+            )
+            _save_atomically(
+                values_path,
+                np.concatenate(values) if values
+                else np.zeros(0, dtype=np.uint16)
+            )
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    write_tablebase(
+        output_path,
+        keys=np.concatenate([
+            _load_layer(work_dir, "keys", num_empty_cells)
+            for num_empty_cells in range(top_solved_num_empty_cells + 1)
+        ]),
+        values=np.concatenate([
+            _load_layer(work_dir, "values", num_empty_cells)
+            for num_empty_cells in range(top_solved_num_empty_cells + 1)
+        ]),
+        layout=layout,
+        max_num_empty_cells=top_solved_num_empty_cells
+    )
+    return {
+        f"num_positions_{num_empty_cells:02d}": num_positions
+        for num_empty_cells, num_positions in sorted(
+            num_positions_per_layer.items()
+        )
+        if num_empty_cells <= top_solved_num_empty_cells
+    }
+
+
+def _get_home_slots(keys: np.ndarray, num_slot_bits: int) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        hashes = keys * np.uint64(HASH_MULTIPLIER)
+    return (hashes >> np.uint64(64 - num_slot_bits)).astype(np.int64)
+
+
+def write_tablebase(
+    path: str,
+    keys: np.ndarray,
+    values: np.ndarray,
+    layout: BitboardLayout,
+    max_num_empty_cells: int
+):
+    """Writes (key, packed result) entries out as a hash table, with linear
+    probing."""
+    num_entries = len(keys)
+    num_slot_bits = max(
+        4, int(num_entries * MIN_NUM_SLOTS_PER_ENTRY - 1).bit_length()
+    )
+    num_slots = 1 << num_slot_bits
+    table = np.zeros(num_slots, dtype=ENTRY_DTYPE)
+    table["key"] = EMPTY_KEY
+
+    # inserts every entry at once: each round, every entry that's first in
+    # line for a free slot takes it, and the others move on to the next
+    # slot.
+    slots = _get_home_slots(np.asarray(keys, dtype=np.uint64), num_slot_bits)
+    remaining_indices = np.arange(num_entries)
+    while remaining_indices.size:
+        remaining_slots = slots[remaining_indices]
+        is_free = table["key"][remaining_slots] == EMPTY_KEY
+        free_slots, first_indices = np.unique(
+            remaining_slots[is_free], return_index=True
+        )
+        inserted_indices = remaining_indices[is_free][first_indices]
+        table["key"][free_slots] = keys[inserted_indices]
+        table["value"][free_slots] = values[inserted_indices]
+
+        is_remaining = np.ones(len(remaining_indices), dtype=bool)
+        is_remaining[np.flatnonzero(is_free)[first_indices]] = False
+        remaining_indices = remaining_indices[is_remaining]
+        slots[remaining_indices] = (slots[remaining_indices] + 1) & (
+            num_slots - 1
+        )
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as table_file:
+        table_file.write(struct.pack(
+            FILE_HEADER_FORMAT, FILE_MAGIC, FILE_VERSION, layout.num_rows,
+            layout.num_columns, max_num_empty_cells, num_entries, num_slots
+        ))
+        table.tofile(table_file)
+    os.replace(temp_path, path)
+
+
+class Tablebase:
+    """A tablebase file, memory-mapped for probing."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as table_file:
+            header = table_file.read(FILE_HEADER_SIZE)
+        if len(header) < FILE_HEADER_SIZE:
+            raise ValueError(f"{path} is not a tablebase file.")
+        (
+            magic, version, num_rows, num_columns, max_num_empty_cells,
+            num_entries, num_slots
+        ) = struct.unpack(FILE_HEADER_FORMAT, header)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a tablebase file.")
+        if version != FILE_VERSION:
+            raise ValueError(
+                f"{path} has unsupported version {version} (expected "
+                f"{FILE_VERSION})."
+            )
+        self.layout = get_layout(num_rows, num_columns)
+        self.max_num_empty_cells = max_num_empty_cells
+        self.num_entries = num_entries
+        self.num_slot_bits = num_slots.bit_length() - 1
+        self.slot_mask = num_slots - 1
+        table = np.memmap(
+            path, dtype=ENTRY_DTYPE, mode="r", offset=FILE_HEADER_SIZE,
+            shape=(num_slots,)
+        )
+        self.keys = table["key"]
+        self.values = table["value"]
+
+    def __len__(self):
+        return self.num_entries
+
+    def _lookup(self, key: int) -> Optional[int]:
+        slot = ((key * HASH_MULTIPLIER) & UINT64_MASK) >> (
+            64 - self.num_slot_bits
+        )
+        while True:
+            slot_key = int(self.keys[slot])
+            if slot_key == key:
+                return int(self.values[slot])
+            if slot_key == EMPTY_KEY:
+                return None
+            slot = (slot + 1) & self.slot_mask
+
+    def probe_position(
+        self, current_pieces: int, mask: int
+    ) -> Optional[TablebaseEntry]:
+        """Looks up a position, from the point of view of the player to
+        move, or returns None if it isn't in the table."""
+        layout = self.layout
+        if layout.num_rows * layout.num_columns - popcount(mask) > (
+            self.max_num_empty_cells
+        ):
+            return None
+        key = current_pieces + mask
+        mirrored_key = mirror_bitboard(key, layout)
+        value = self._lookup(min(key, mirrored_key))
+        if value is None:
+            return None
+        entry = unpack_entry(value)
+        if mirrored_key < key and entry.best_col_num is not None:
+            entry = entry._replace(
+                best_col_num=layout.num_columns - 1 - entry.best_col_num
+            )
+        return entry
+
+    def probe(self, board: Board) -> Optional[TablebaseEntry]:
+        """Looks up a `Board`, from the point of view of the player to move
+        (Player 1 moves first)."""
+        if (board.num_rows, board.num_columns) != (
+            self.layout.num_rows, self.layout.num_columns
+        ):
+            return None
+        player_1_pieces, player_2_pieces = board_to_bitboards(board)
+        mask = player_1_pieces | player_2_pieces
+        if popcount(mask) % 2 == 0:
+            return self.probe_position(player_1_pieces, mask)
+        return self.probe_position(player_2_pieces, mask)
+
+
+def get_record_seeds(
+    path: str, num_empty_cells: int, layout: BitboardLayout
+) -> List[Tuple[int, int]]:
+    """Positions with `num_empty_cells` empty cells reached in recorded
+    games, to seed a tablebase with."""
+    num_moves = layout.num_rows * layout.num_columns - num_empty_cells
+    seeds = []
+    for record in iter_records(path):
+        if (record.num_rows, record.num_columns) != (
+            layout.num_rows, layout.num_columns
+        ) or len(record.moves) < num_moves:
+            continue
+        current_pieces, mask = 0, 0
+        for col_num in record.moves[:num_moves]:
+            current_pieces, mask = play_column(
+                current_pieces, mask, col_num, layout
+            )
+            if has_n_in_a_row(current_pieces, layout):
+                break
+            current_pieces ^= mask
+        else:
+            seeds.append((current_pieces, mask))
+    return seeds
+
+
+def get_random_seeds(
+    num_seeds: int,
+    num_empty_cells: int,
+    layout: BitboardLayout,
+    seed: int = 0
+) -> List[Tuple[int, int]]:
+    """Positions with `num_empty_cells` empty cells reached by random play,
+    where neither player has won, to seed a tablebase with."""
+    rng = random.Random(seed)
+    num_moves = layout.num_rows * layout.num_columns - num_empty_cells
+    seeds = []
+    while len(seeds) < num_seeds:
+        current_pieces, mask = 0, 0
+        for _ in range(num_moves):
+            col_num = rng.choice(get_playable_columns(mask, layout))
+            current_pieces, mask = play_column(
+                current_pieces, mask, col_num, layout
+            )
+            if has_n_in_a_row(current_pieces, layout):
+                break
+            current_pieces ^= mask
+        else:
+            seeds.append((current_pieces, mask))
+    return seeds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--work-dir", required=True)
+    parser.add_argument(
+        "--output", default=constants.ENDGAME_TABLEBASE_PATH
+    )
+    parser.add_argument(
+        "--max-empty-cells", type=int, default=DEFAULT_MAX_NUM_EMPTY_CELLS
+    )
+    parser.add_argument("--num-rows", type=int, default=constants.ROW_COUNT)
+    parser.add_argument(
+        "--num-columns", type=int, default=constants.COLUMN_COUNT
+    )
+    parser.add_argument(
+        "--records",
+        help="seed with positions from a game record file"
+    )
+    parser.add_argument(
+        "--num-random-seeds", type=int, default=0,
+        help="seed with positions from random playouts"
+    )
+    parser.add_argument(
+        "--from-empty-board", action="store_true",
+        help="seed with the empty board (small boards only)"
+    )
+    parser.add_argument("--num-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    layout = get_layout(args.num_rows, args.num_columns)
+    seeds = []
+    if args.from_empty_board:
+        seeds.append((0, 0))
+    if args.records:
+        seeds += get_record_seeds(args.records, args.max_empty_cells, layout)
+    if args.num_random_seeds:
+        seeds += get_random_seeds(
+            args.num_random_seeds, args.max_empty_cells, layout, args.seed
+        )
+    if not seeds:
+        parser.error(
+            "choose seeds: --records, --num-random-seeds or "
+            "--from-empty-board"
+        )
+
+    stats = generate_tablebase(
+        seeds,
+        work_dir=args.work_dir,
+        output_path=args.output,
+        max_num_empty_cells=args.max_empty_cells,
+        num_rows=args.num_rows,
+        num_columns=args.num_columns,
+        num_workers=args.num_workers
+    )
+    for key, value in stats.items():
+        print(f"{key}: {value:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Tests for the computer opponents.
+
+Tested with pytest. Run `pytest` to test."""
+import pytest
+
+from scripts.algos import (
+    WIN_SCORE, SearchContext, iterative_deepening_search,
+    make_move_alpha_beta_pruning, score_game_state, search_best_move,
+    search_root
+)
+from scripts.benchmark import get_sample_positions
+from scripts.bitboard import (
+    get_layout, get_move_bit, get_playable_columns, has_n_in_a_row
+)
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+
+LAYOUT = get_layout(ROW_COUNT, COLUMN_COUNT)
+
+
+@pytest.fixture
+def base_board(scope="function"):
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    return board
+
+
+def _solve(current_pieces: int, mask: int) -> int:
+    """Plain minimax to the end of the game: 1 if the player to move wins,
+    -1 if they lose and 0 for a draw."""
+    playable_columns = get_playable_columns(mask, LAYOUT)
+    if not playable_columns:
+        return 0
+    best_result = -1
+    for col_num in playable_columns:
+        move_bit = get_move_bit(mask, col_num, LAYOUT)
+        if has_n_in_a_row(current_pieces | move_bit, LAYOUT):
+            return 1
+        best_result = max(
+            best_result, -_solve(current_pieces ^ mask, mask | move_bit)
+        )
+    return best_result
+
+
+def _random_positions(
+    num_positions: int, num_empty_cells: int, seed: int = 0
+):
+    """Random game positions, with nobody having won yet."""
+    num_moves = ROW_COUNT * COLUMN_COUNT - num_empty_cells
+    return get_sample_positions(
+        num_positions, LAYOUT, seed=seed, max_num_moves=num_moves,
+        min_num_moves=num_moves, include_decided=True
+    )
+
+
+class TestAlphaBetaPruning:
+    """Tests the bitboard alpha-beta search."""
+
+    def test_takes_immediate_win(self, base_board):
+        """Player 2 should complete a column of four."""
+        base_board[0:3, 4] = 2
+        base_board[0, 0:3] = 1
+        base_board[1, 0] = 1
+        make_move_alpha_beta_pruning(base_board)
+        assert base_board[3, 4] == 2
+
+    def test_blocks_immediate_loss(self, base_board):
+        """Player 2 should block Player 1's three in a row."""
+        base_board[0, 1:4] = 1
+        base_board[0, 0] = 2
+        base_board[1, 0] = 2
+        make_move_alpha_beta_pruning(base_board)
+        assert base_board[0, 4] == 2
+
+    def test_endgame_matches_minimax(self):
+        """With few empty cells, the search solves the position exactly."""
+        for current_pieces, mask in _random_positions(20, 7):
+            _, score = search_best_move(current_pieces, mask, 0, LAYOUT)
+            expected_result = _solve(current_pieces, mask)
+            result = (score > 0) - (score < 0)
+            assert result == expected_result
+            if result:
+                assert abs(score) > WIN_SCORE - ROW_COUNT * COLUMN_COUNT - 1
+
+    def test_principal_variation_search(self):
+        """Null-window searches and aspiration windows shouldn't change the
+        score."""
+        for num_empty_cells in (20, 24, 28, 32, 36):
+            current_pieces, mask = _random_positions(
+                1, num_empty_cells, seed=num_empty_cells
+            )[0]
+            contexts = [
+                SearchContext(LAYOUT, use_principal_variation_search=False),
+                SearchContext(LAYOUT)
+            ]
+            scores = [
+                search_root(current_pieces, mask, 5, context)[1]
+                for context in contexts
+            ]
+            assert scores[0] == scores[1]
+
+            for aspiration_window in (1, 10):
+                _, score, depth = iterative_deepening_search(
+                    current_pieces, mask, 5, SearchContext(LAYOUT),
+                    aspiration_window=aspiration_window
+                )
+                if depth == 5:
+                    assert score == scores[0]
+
+
+def test_score_game_state(base_board):
+    """Tests the 'score_game_state' function."""
+    assert score_game_state(base_board, 2) == 0
+
+    base_board[0, 0:2] = 1
+    base_board[1, 0:2] = 2
+    # tied on two in a row: score from the point of view of the given
+    # player.
+    assert score_game_state(base_board, 2) == 2
+    assert score_game_state(base_board, 1) == -2
+
+    base_board[0, 2] = 1
+    assert score_game_state(base_board, 2) == -5
@@ -0,0 +1,84 @@
+"""Tests for position analysis.
+
+Tested with pytest. Run `pytest` to test."""
+import pytest
+
+from scripts.algos import MIN_WIN_SCORE, search_best_move
+from scripts.analysis import analyze, iter_analyses
+from scripts.benchmark import get_sample_positions
+from scripts.bitboard import board_to_position, get_layout
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.openings import play_moves
+
+LAYOUT = get_layout(ROW_COUNT, COLUMN_COUNT)
+
+
+@pytest.fixture
+def base_board(scope="function"):
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    return board
+
+
+def test_analyze(base_board):
+    """Tests every column of a position with a win in two moves, and that
+    the board is left as it was."""
+    for col_num, value in ((1, 1), (5, 2), (2, 1), (5, 2)):
+        base_board.drop_piece(col_num=col_num, value=value)
+    history = base_board.history().tolist()
+
+    analyses = []
+    analysis = analyze(base_board, max_depth=6, on_analysis=analyses.append)
+    assert base_board.history().tolist() == history
+    assert [analysis.depth for analysis in analyses] == list(range(1, 7))
+    assert analyses[-1] == analysis
+    assert sorted(analysis.columns) == list(range(COLUMN_COUNT))
+
+    # three in a row, open on both ends: the opponent can only block one.
+    winning_column = analysis.columns[3]
+    assert winning_column.score > MIN_WIN_SCORE
+    assert winning_column.principal_variation[0] == 3
+    assert winning_column.principal_variation[-1] in (0, 4)
+    assert analysis.best_col_num == 3
+    assert all(
+        column.principal_variation[0] == col_num
+        for col_num, column in analysis.columns.items()
+    )
+
+
+def test_scores_match_search():
+    """Tests that the best column scores what a search for the best move
+    does."""
+    for moves in ((), (3, 3, 4, 2), (3, 3, 3, 3, 2, 4, 4, 1)):
+        current_pieces, mask = play_moves(moves, LAYOUT)
+        analysis = list(iter_analyses(
+            current_pieces, mask, LAYOUT, max_depth=4
+        ))[-1]
+        assert analysis.depth == 4
+        assert analysis.columns[analysis.best_col_num].score == (
+            search_best_move(current_pieces, mask, 4, LAYOUT)[1]
+        )
+
+
+def test_budget(base_board):
+    assert analyze(base_board, max_num_nodes=1) is None
+    analysis = analyze(base_board, max_num_nodes=2000)
+    assert analysis.num_nodes <= 2000
+    assert board_to_position(base_board) == (0, 0)
+
+
+def test_endgame_is_solved_once():
+    """Tests that a position that's solved at the first depth is only
+    analysed once, with the depth that was searched."""
+    current_pieces, mask = get_sample_positions(
+        1, LAYOUT, max_num_moves=32, min_num_moves=32
+    )[0]
+    analyses = list(iter_analyses(current_pieces, mask, LAYOUT))
+    assert [analysis.depth for analysis in analyses] == [
+        ROW_COUNT * COLUMN_COUNT - 32
+    ]
+    assert not all(
+        abs(column.score) > MIN_WIN_SCORE
+        for column in analyses[0].columns.values()
+    )
@@ -0,0 +1,154 @@
+"""Tests for the game record analytics.
+
+Tested with pytest. Run `pytest` to test."""
+import collections
+import random
+
+import numpy as np
+import pytest
+
+from scripts import analytics
+from scripts.analytics import (
+    aggregate_chunk, analyze_record_files, get_opening_moves,
+    get_opening_num, iter_chunks
+)
+from scripts.bitboard import (
+    get_layout, get_playable_columns, has_n_in_a_row, play_column
+)
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.game_record import (
+    RESULT_DRAW, RESULT_PLAYER_1_WINS, RESULT_PLAYER_2_WINS,
+    RESULT_UNFINISHED, GameRecord, GameRecordWriter, iter_records
+)
+
+
+def _play_random_game(rng: random.Random) -> GameRecord:
+    layout = get_layout()
+    pieces = [0, 0]
+    mask = 0
+    moves = []
+    while mask != layout.board_mask:
+        col_num = rng.choice(get_playable_columns(mask, layout))
+        player_num = len(moves) % 2
+        pieces[player_num], mask = play_column(
+            pieces[player_num], mask, col_num, layout
+        )
+        moves.append(col_num)
+        if has_n_in_a_row(pieces[player_num], layout):
+            return GameRecord(
+                ROW_COUNT, COLUMN_COUNT, tuple(moves), result=player_num + 1
+            )
+    return GameRecord(
+        ROW_COUNT, COLUMN_COUNT, tuple(moves), result=RESULT_DRAW
+    )
+
+
+@pytest.fixture
+def random_games_path(tmp_path):
+    rng = random.Random(0)
+    path = str(tmp_path / "games.c4r")
+    with GameRecordWriter(path) as writer:
+        for _ in range(500):
+            writer.write(_play_random_game(rng))
+    return path
+
+
+def test_opening_num():
+    assert get_opening_moves(get_opening_num((3, 0, 7, 2))) == (3, 0, 7, 2)
+
+
+def test_iter_chunks(random_games_path, monkeypatch):
+    """Tests that chunks cover every record once, whatever the blocks that
+    the file is scanned in."""
+    monkeypatch.setattr(analytics, "SCAN_BLOCK_SIZE", 100)
+    chunks = list(iter_chunks(random_games_path, chunk_num_records=64))
+    assert [len(chunk.record_offsets) for chunk in chunks] == [64] * 7 + [52]
+    assert all(
+        chunk.end == next_chunk.offset
+        for chunk, next_chunk in zip(chunks, chunks[1:])
+    )
+
+    with open(random_games_path, "ab") as record_file:
+        record_file.write(b"\0")
+    with pytest.raises(ValueError):
+        list(iter_chunks(random_games_path))
+
+
+def test_analyze_record_files(random_games_path):
+    """Tests the counters against counting the records one by one."""
+    records = list(iter_records(random_games_path))
+    summary = analyze_record_files(
+        [random_games_path], num_workers=1, chunk_num_records=100
+    )
+    assert summary["num_games"] == 500
+    stats = summary["stats"][(ROW_COUNT, COLUMN_COUNT)]
+    assert stats.num_invalid_games == 0
+    assert stats.get_mean_game_length() == pytest.approx(
+        np.mean([len(record.moves) for record in records])
+    )
+
+    opening_counts = collections.Counter(
+        record.moves[:analytics.OPENING_NUM_MOVES] for record in records
+    )
+    top_openings = stats.get_top_openings(3)
+    assert [count for _, count in top_openings] == [
+        count for _, count in opening_counts.most_common(3)
+    ]
+    assert all(
+        opening_counts[moves] == count for moves, count in top_openings
+    )
+
+    for col_num, win_rates in stats.get_win_rates_by_first_move().items():
+        results = [
+            record.result for record in records if record.moves[0] == col_num
+        ]
+        assert win_rates["player_1"] == pytest.approx(
+            results.count(RESULT_PLAYER_1_WINS) / len(results)
+        )
+
+    # as many games with worker processes.
+    summary = analyze_record_files(
+        [random_games_path], num_workers=2, chunk_num_records=100
+    )
+    parallel_stats = summary["stats"][(ROW_COUNT, COLUMN_COUNT)]
+    assert np.array_equal(
+        parallel_stats.winning_line_counts, stats.winning_line_counts
+    )
+    assert np.array_equal(parallel_stats.opening_counts, stats.opening_counts)
+
+
+def test_winning_lines_and_invalid_games(tmp_path):
+    path = str(tmp_path / "games.c4r")
+    with GameRecordWriter(path) as writer:
+        # a vertical line in column 3.
+        writer.write(GameRecord(
+            ROW_COUNT, COLUMN_COUNT, (3, 2, 3, 2, 3, 2, 3),
+            result=RESULT_PLAYER_1_WINS
+        ))
+        # a horizontal line along the bottom, by Player 2.
+        writer.write(GameRecord(
+            ROW_COUNT, COLUMN_COUNT, (0, 1, 0, 2, 0, 3, 5, 4),
+            result=RESULT_PLAYER_2_WINS
+        ))
+        # a move into a full column.
+        writer.write(GameRecord(
+            ROW_COUNT, COLUMN_COUNT, (0,) * (ROW_COUNT + 1),
+            result=RESULT_UNFINISHED
+        ))
+        writer.write(GameRecord(6, 7, (6,), result=RESULT_UNFINISHED))
+
+    chunk, = iter_chunks(path)
+    stats_by_size = aggregate_chunk(chunk)
+    assert stats_by_size[(6, 7)].num_games == 1
+
+    stats = stats_by_size[(ROW_COUNT, COLUMN_COUNT)]
+    assert stats.num_games == 2
+    assert stats.num_invalid_games == 1
+    expected_counts = np.zeros((ROW_COUNT, COLUMN_COUNT), dtype=np.int64)
+    expected_counts[0:4, 3] += 1
+    expected_counts[0, 1:5] += 1
+    assert np.array_equal(stats.winning_line_counts, expected_counts)
+    assert stats.get_win_rates_by_first_move() == {
+        3: {"player_1": 1.0, "player_2": 0.0, "draw": 0.0},
+        0: {"player_1": 0.0, "player_2": 1.0, "draw": 0.0}
+    }
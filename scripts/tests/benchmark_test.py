@@ -0,0 +1,14 @@
+"""Tests for the benchmark harness.
+
+Tested with pytest. Run `pytest` to test."""
+from scripts.benchmark import ENGINE_MODULES, profile_engine_import
+
+
+def test_engine_does_not_import_optional_backends():
+    """Importing the engine mustn't pull in pygame or the optional
+    backends."""
+    profile = profile_engine_import()
+    assert profile["forbidden_imports"] == []
+    assert profile["elapsed_seconds"] > 0
+    imported_names = {name for name, _ in profile["slowest_imports"]}
+    assert imported_names & set(ENGINE_MODULES)
@@ -0,0 +1,63 @@
+"""Tests for the bitboard helpers.
+
+Tested with pytest. Run `pytest` to test."""
+import numpy as np
+
+from scripts.bitboard import (
+    bitboards_to_planes, board_to_bitboards, get_layout,
+    get_playable_columns, has_n_in_a_row, play_column
+)
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+
+
+class TestBitboard:
+    """Tests the bitboard helpers."""
+
+    layout = get_layout(ROW_COUNT, COLUMN_COUNT)
+
+    def test_play_column(self):
+        """Tests that pieces stack up from the bottom of a column."""
+        pieces, mask = 0, 0
+        for _ in range(ROW_COUNT):
+            pieces, mask = play_column(pieces, mask, 2, self.layout)
+        assert mask == self.layout.column_masks[2]
+        assert 2 not in get_playable_columns(mask, self.layout)
+        assert len(get_playable_columns(mask, self.layout)) == (
+            COLUMN_COUNT - 1
+        )
+
+    def test_has_n_in_a_row(self):
+        """Tests win detection in every direction."""
+        board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+        board[0, 0:4] = 1
+        board[1, 1] = 2
+        board[2, 2] = 2
+        board[3, 3] = 2
+        player_1_pieces, player_2_pieces = board_to_bitboards(board)
+        assert has_n_in_a_row(player_1_pieces, self.layout)
+        assert not has_n_in_a_row(player_2_pieces, self.layout)
+
+        board[4, 4] = 2
+        _, player_2_pieces = board_to_bitboards(board)
+        assert has_n_in_a_row(player_2_pieces, self.layout)
+
+        # pieces at the top of one column and the bottom of the next one
+        # aren't connected.
+        board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+        board[ROW_COUNT - 2:ROW_COUNT, 0] = 1
+        board[0:2, 1] = 1
+        player_1_pieces, _ = board_to_bitboards(board)
+        assert not has_n_in_a_row(player_1_pieces, self.layout)
+
+    def test_bitboards_to_planes(self):
+        """Tests the round trip between boards and planes."""
+        board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+        board[0, 3] = 1
+        board[1, 3] = 2
+        board[0, 5] = 1
+        planes = bitboards_to_planes(
+            np.array(board_to_bitboards(board)), self.layout
+        )
+        assert planes.shape == (2, ROW_COUNT, COLUMN_COUNT)
+        assert np.array_equal(planes[0] * 1 + planes[1] * 2, board.board)
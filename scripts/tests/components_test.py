@@ -128,6 +128,13 @@ class TestBoard:
         assert base_board.check_win_connected_in_a_row(3) == 2
         assert base_board.check_win_connected_in_a_row(4) == 2
 
+        # the first run that's long enough wins.
+        base_board[5, :] = np.array([1, 1, 1, 2, 2, 2])
+        assert base_board.check_win_connected_in_a_row(5) is None
+        assert base_board.check_win_connected_in_a_row(
+            5, num_in_a_row=3
+        ) == 1
+
     def test_check_win_any_row(self, base_board):
         """Tests the 'check_win_any_row' method."""
         # base board, with all zeros, should have None
@@ -629,3 +636,184 @@ class TestBoard:
         has_winner, winner = base_board.is_game_over()
         assert has_winner
         assert winner == 1.0
+
+    def test_get_max_run_lengths(self, base_board):
+        """Tests the 'get_max_run_lengths' method."""
+        assert base_board.get_max_run_lengths() == (None, {1: 0, 2: 0})
+
+        # anti-diagonal of three for Player 2, column of two for Player 1.
+        base_board[0, 4] = 2
+        base_board[1, 3] = 2
+        base_board[2, 2] = 2
+        base_board[0:2, 0] = 1
+        assert base_board.get_max_run_lengths() == (None, {1: 2, 2: 3})
+
+        base_board[3, 1] = 2
+        assert base_board.get_max_run_lengths() == (2, {1: 2, 2: 4})
+
+    def test_get_run_lengths_matches_per_line_checks(self):
+        """Tests the vectorized run lengths against the per-line checks on
+        random boards."""
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            board = Board(num_rows=self.num_rows, num_columns=self.num_columns)
+            board.board = rng.choice(
+                [0.0, 1.0, 2.0], size=(self.num_rows, self.num_columns)
+            )
+            winner, max_run_lengths = board.get_max_run_lengths()
+            for player in (1, 2):
+                longest_line = 0
+                for row_num in range(self.num_rows):
+                    for col_num in range(self.num_columns):
+                        for row_step, col_step in (
+                            (0, 1), (1, 0), (1, 1), (1, -1)
+                        ):
+                            length = 0
+                            while (
+                                board.check_is_move_on_board(
+                                    row_num + length * row_step,
+                                    col_num + length * col_step
+                                )
+                                and board.board[
+                                    row_num + length * row_step,
+                                    col_num + length * col_step
+                                ] == player
+                            ):
+                                length += 1
+                            longest_line = max(longest_line, length)
+                assert max_run_lengths[player] == longest_line
+            if winner is not None:
+                assert max_run_lengths[winner] >= 4
+
+    def test_get_run_lengths_in_directions(self):
+        """Tests that only the requested directions are computed, and that
+        they're the same as when computing all of them."""
+        board = Board(num_rows=self.num_rows, num_columns=self.num_columns)
+        board.board = np.random.default_rng(1).choice(
+            [0.0, 1.0, 2.0], size=(self.num_rows, self.num_columns)
+        )
+        run_lengths = board.get_run_lengths()
+        for directions in (
+            ("row",), ("column",), ("diagonal", "anti_diagonal")
+        ):
+            some_run_lengths = board.get_run_lengths(directions)
+            assert set(some_run_lengths) == set(directions)
+            for direction in directions:
+                np.testing.assert_array_equal(
+                    some_run_lengths[direction], run_lengths[direction]
+                )
+
+    def test_get_max_num_in_a_row_dict(self, base_board):
+        """Tests the 'get_max_num_in_a_row_dict' method."""
+        assert base_board.get_max_num_in_a_row_dict() == {}
+
+        base_board[0, 0:2] = 1
+        base_board[1, 0:2] = 2
+        assert base_board.get_max_num_in_a_row_dict() == {2: [1, 2]}
+
+        base_board[0, 2:6] = 1
+        assert base_board.get_max_num_in_a_row_dict() == {4: [1]}
+
+    def test_from_moves(self, capsys):
+        """Tests the 'from_moves' method."""
+        board = Board.from_moves("4453")
+        assert board.board[0, 3] == 1 and board.board[1, 3] == 2
+        assert board.board[0, 4] == 1 and board.board[0, 2] == 2
+        assert np.count_nonzero(board.board) == 4
+        assert np.array_equal(
+            Board.from_moves([3, 3, 4, 2]).board, board.board
+        )
+        assert not np.any(Board.from_moves("").board)
+
+        for moves in ("40", "4a", "9", "1" * (self.num_rows + 1)):
+            with pytest.raises(ValueError):
+                Board.from_moves(moves)
+        assert capsys.readouterr().out == ""
+
+    def test_from_array(self):
+        """Tests the 'from_array' method."""
+        array = Board.from_moves("4453", num_rows=5, num_columns=6).board
+        board = Board.from_array(array)
+        assert (board.num_rows, board.num_columns) == (5, 6)
+        assert np.array_equal(board.board, array)
+        board[0, 0] = 2
+        assert array[0, 0] == 0
+        with pytest.raises(ValueError):
+            board.board[0, 1] = 2
+        assert board.board[0, 1] == 0
+
+    def test_key_round_trip(self):
+        """Tests that 'from_key' inverts 'to_key', and that keys are
+        unique."""
+        rng = np.random.default_rng(0)
+        keys = set()
+        for _ in range(200):
+            moves = []
+            heights = [0] * self.num_columns
+            for _ in range(rng.integers(0, self.num_rows * self.num_columns)):
+                col_num = int(rng.integers(self.num_columns))
+                if heights[col_num] < self.num_rows:
+                    moves.append(col_num)
+                    heights[col_num] += 1
+            board = Board.from_moves(moves)
+            key = board.to_key()
+            assert np.array_equal(Board.from_key(key).board, board.board)
+            keys.add((key, tuple(board.board.flatten())))
+        assert len({key for key, _ in keys}) == len(keys)
+
+        with pytest.raises(ValueError):
+            Board.from_key(1 << 63)
+
+    def test_push_and_pop(self):
+        """Tests that pushing and popping moves keeps the heights, bitboards
+        and key in step with the array, and undoes moves exactly."""
+        board = Board(num_rows=self.num_rows, num_columns=self.num_columns)
+        rng = np.random.default_rng(0)
+        arrays, keys = [], []
+        while board.check_if_any_valid_moves():
+            arrays.append(board.board.copy())
+            keys.append(board.to_key())
+            playable_columns = [
+                col_num for col_num in range(self.num_columns)
+                if board.get_next_valid_row_in_column(col_num) is not None
+            ]
+            board.push(int(rng.choice(playable_columns)))
+            rebuilt_board = Board.from_array(board.board)
+            assert board.heights == rebuilt_board.heights
+            assert board.player_pieces == rebuilt_board.player_pieces
+            assert board.to_key() == rebuilt_board.to_key()
+        history = board.history()
+        assert len(history) == self.num_rows * self.num_columns
+        assert np.array_equal(Board.from_moves(history).board, board.board)
+        with pytest.raises(ValueError):
+            board.push(int(history[-1]))
+
+        for array, key in zip(reversed(arrays), reversed(keys)):
+            board.pop()
+            assert np.array_equal(board.board, array)
+            assert board.to_key() == key
+        assert len(board.history()) == 0
+        # a copy, which taking moves back doesn't change.
+        assert len(history) == self.num_rows * self.num_columns
+        with pytest.raises(IndexError):
+            board.pop()
+
+    def test_setting_cells_clears_history(self):
+        board = Board.from_moves("4453")
+        board[0, 0] = 1
+        assert len(board.history()) == 0
+        assert board.get_next_valid_row_in_column(0) == 1
+        assert board.to_key() == Board.from_array(board.board).to_key()
+
+    def test_diagonals_are_shared(self):
+        """Tests that the diagonals are computed once per board size."""
+        board = Board(num_rows=self.num_rows, num_columns=self.num_columns)
+        other_board = Board(
+            num_rows=self.num_rows, num_columns=self.num_columns
+        )
+        assert board.all_possible_diagonals is (
+            other_board.all_possible_diagonals
+        )
+        assert len(board.all_possible_diagonals) == (
+            self.num_rows * self.num_columns
+        )
@@ -0,0 +1,80 @@
+"""Tests for the game record format.
+
+Tested with pytest. Run `pytest` to test."""
+import pytest
+
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.game_record import (
+    RESULT_PLAYER_1_WINS, GameRecord, GameRecordWriter, encode_record,
+    iter_moves, iter_records, pack_moves, replay, unpack_moves
+)
+
+
+@pytest.fixture
+def sample_record(scope="function"):
+    return GameRecord(
+        num_rows=ROW_COUNT,
+        num_columns=COLUMN_COUNT,
+        moves=(3, 2, 3, 2, 3, 2, 3),
+        player_1="human",
+        player_2="easy",
+        result=RESULT_PLAYER_1_WINS,
+        start_timestamp_ms=1_000,
+        end_timestamp_ms=2_000
+    )
+
+
+class TestGameRecord:
+    """Tests packing, writing and reading game records."""
+
+    def test_pack_moves(self):
+        """Tests the 'pack_moves' and 'unpack_moves' functions."""
+        moves = (0, 1, 2, 3, 4, 5, 7, 6, 0)
+        packed_moves = pack_moves(moves)
+        # 9 moves * 3 bits = 27 bits -> 4 bytes
+        assert len(packed_moves) == 4
+        assert unpack_moves(packed_moves, len(moves)) == moves
+
+        with pytest.raises(ValueError):
+            pack_moves([8])
+
+    def test_encode_record_size(self, sample_record):
+        """Tests that records stay compact."""
+        # header + 7 moves * 3 bits = 21 bits -> 3 bytes
+        encoded_record = encode_record(sample_record)
+        assert len(encoded_record) == 23 + 3
+
+    def test_write_and_iter_records(self, tmp_path, sample_record):
+        """Tests the round trip through 'GameRecordWriter' and
+        'iter_records'."""
+        path = str(tmp_path / "games.c4r")
+        empty_record = sample_record._replace(moves=())
+
+        with GameRecordWriter(path) as writer:
+            writer.write(sample_record)
+        # appending to an existing file shouldn't write a second file header
+        with GameRecordWriter(path) as writer:
+            writer.write(empty_record)
+
+        assert list(iter_records(path)) == [sample_record, empty_record]
+        assert list(iter_moves(path)) == [
+            (0, move_num, col_num)
+            for move_num, col_num in enumerate(sample_record.moves)
+        ]
+
+    def test_iter_records_bad_file(self, tmp_path):
+        """Tests that files which aren't game records are rejected."""
+        path = tmp_path / "not_games.c4r"
+        path.write_bytes(b"not a game record file")
+        with pytest.raises(ValueError):
+            list(iter_records(str(path)))
+
+    def test_replay(self, sample_record):
+        """Tests the 'replay' function."""
+        board = replay(sample_record)
+        assert list(board[0:4, 3]) == [1, 1, 1, 1]
+        assert list(board[0:3, 2]) == [2, 2, 2]
+        assert board.is_game_over() == (True, 1)
+
+        with pytest.raises(ValueError):
+            replay(sample_record._replace(moves=(0,) * (ROW_COUNT + 1)))
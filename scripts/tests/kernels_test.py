@@ -0,0 +1,127 @@
+"""Tests for the compiled search kernels.
+
+Tested with pytest. Run `pytest` to test. Without Numba, the kernels run in
+the interpreter, so the searches are kept shallow."""
+import random
+
+import pytest
+
+from scripts import strength
+from scripts.algos import SearchContext, iterative_deepening_search
+from scripts.benchmark import get_sample_positions
+from scripts.bitboard import get_layout
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.kernels import (
+    HAS_NUMBA, CompiledSearchContext, compiled_iterative_deepening_search,
+    search_best_move, search_root_with_stats
+)
+from scripts.strength import (
+    STRENGTH_LEVELS, _get_compiled_search_context, choose_move
+)
+from scripts.transposition import TranspositionTable
+
+LAYOUT = get_layout(ROW_COUNT, COLUMN_COUNT)
+DEPTH = 5 if HAS_NUMBA else 3
+
+
+@pytest.mark.parametrize("max_num_table_entries", [0, 1 << 12])
+def test_backends_match(max_num_table_entries):
+    """Tests that both backends find the same moves and scores, searching
+    the same number of nodes."""
+    positions = get_sample_positions(15, LAYOUT, seed=4, max_num_moves=30)
+    # solved exactly from here on.
+    positions.append(
+        get_sample_positions(1, get_layout(4, 5), seed=0, max_num_moves=9)[0]
+    )
+    layouts = [LAYOUT] * (len(positions) - 1) + [get_layout(4, 5)]
+    for (current_pieces, mask), layout in zip(positions, layouts):
+        results = [
+            search_root_with_stats(
+                current_pieces, mask, DEPTH, layout,
+                max_num_table_entries=max_num_table_entries, backend=backend
+            )
+            for backend in ("compiled", "python")
+        ]
+        assert results[0] == results[1]
+
+
+def test_search_best_move():
+    assert search_best_move(0, LAYOUT.board_mask, 4, LAYOUT) == (None, 0)
+    best_col_num, _ = search_best_move(0, 0, 2, LAYOUT)
+    assert 0 <= best_col_num < COLUMN_COUNT
+    with pytest.raises(ValueError):
+        search_root_with_stats(0, 0, 2, LAYOUT, backend="cython")
+
+
+@pytest.mark.parametrize("max_num_nodes", [1, 60, 500])
+def test_node_budgets_match(max_num_nodes):
+    """Tests that the compiled searches stop where the Python ones do under
+    a node budget, with the same results."""
+    positions = get_sample_positions(6, LAYOUT, seed=5, max_num_moves=30)
+    for current_pieces, mask in positions:
+        contexts = [
+            CompiledSearchContext(
+                LAYOUT, max_num_table_entries=max_num_nodes,
+                max_num_nodes=max_num_nodes
+            ),
+            SearchContext(
+                LAYOUT, TranspositionTable(max_num_nodes),
+                max_num_nodes=max_num_nodes
+            )
+        ]
+        results = [
+            search(current_pieces, mask, 8, context)
+            for search, context in zip(
+                (
+                    compiled_iterative_deepening_search,
+                    iterative_deepening_search
+                ),
+                contexts
+            )
+        ]
+        assert results[0] == results[1]
+        assert contexts[0].num_nodes == contexts[1].num_nodes
+
+
+def test_strength_levels_match(monkeypatch):
+    """Tests that every strength level, with a smaller node budget, picks
+    the same moves after as many nodes with either search."""
+    positions = get_sample_positions(6, LAYOUT, seed=6, max_num_moves=30)
+    for level_num, strength_level in STRENGTH_LEVELS.items():
+        strength_level = strength_level._replace(
+            max_num_nodes=min(strength_level.max_num_nodes, 300)
+        )
+        for current_pieces, mask in positions:
+            results = []
+            for get_context in (
+                lambda *args: None,
+                lambda layout, strength_level, *args: CompiledSearchContext(
+                    layout,
+                    max_num_table_entries=strength_level.max_num_nodes,
+                    max_num_nodes=strength_level.max_num_nodes
+                )
+            ):
+                monkeypatch.setattr(
+                    strength, "_get_compiled_search_context", get_context
+                )
+                results.append(choose_move(
+                    current_pieces, mask, LAYOUT, strength_level,
+                    rng=random.Random(level_num), deterministic=True
+                ))
+            assert results[0] == results[1]
+
+
+def test_strength_levels_use_kernels():
+    """Tests that only deterministic moves with a fresh table are searched
+    with the kernels, and only if they're compiled."""
+    strength_level = STRENGTH_LEVELS[8]
+    context = _get_compiled_search_context(
+        LAYOUT, strength_level, None, True
+    )
+    assert (context is not None) == HAS_NUMBA
+    assert _get_compiled_search_context(
+        LAYOUT, strength_level, None, False
+    ) is None
+    assert _get_compiled_search_context(
+        LAYOUT, strength_level, TranspositionTable(), True
+    ) is None
@@ -0,0 +1,119 @@
+"""Tests for the move metrics.
+
+Tested with pytest. Run `pytest` to test."""
+import urllib.request
+
+import pytest
+
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.metrics import (
+    Histogram, MoveMetrics, get_board_phase, start_metrics_server
+)
+from scripts.opponents import computer_make_move
+from scripts.strength import StrengthLevel, make_move_at_strength
+
+
+def test_get_board_phase():
+    num_cells = ROW_COUNT * COLUMN_COUNT
+    assert get_board_phase(0, num_cells) == "opening"
+    assert get_board_phase(20, num_cells) == "middlegame"
+    assert get_board_phase(num_cells - 2, num_cells) == "endgame"
+
+
+def test_histogram_quantile():
+    histogram = Histogram(buckets=(0.1, 0.2, 0.4))
+    for value in [0.05] * 90 + [0.3] * 9 + [1.0]:
+        histogram.observe(value)
+    assert histogram.get_quantile(0.5) == pytest.approx(0.1 * 50 / 90)
+    assert 0.2 < histogram.get_quantile(0.99) <= 0.4
+    assert histogram.get_quantile(1.0) == 0.4
+
+
+def test_move_metrics_exposition(tmp_path):
+    move_metrics = MoveMetrics(timeout_seconds=0.5)
+    move_metrics.record_move("medium", "opening", 0.002)
+    move_metrics.record_move("medium", "opening", 0.7)
+    with move_metrics.time_move("hard", "endgame"):
+        move_metrics.record_fallback("no_weights")
+    move_metrics.record_fallback("no_weights")
+
+    text = move_metrics.format_prometheus()
+    lines = text.splitlines()
+    assert "# TYPE connect4_move_latency_seconds histogram" in lines
+    assert (
+        'connect4_move_latency_seconds_bucket{difficulty="medium",'
+        'phase="opening",le="0.0025"} 1'
+    ) in lines
+    assert (
+        'connect4_move_latency_seconds_bucket{difficulty="medium",'
+        'phase="opening",le="+Inf"} 2'
+    ) in lines
+    assert (
+        'connect4_move_latency_seconds_count{difficulty="hard",'
+        'phase="endgame"} 1'
+    ) in lines
+    assert 'connect4_move_timeouts_total{difficulty="medium"} 1' in lines
+    assert (
+        'connect4_move_fallbacks_total{difficulty="hard",'
+        'reason="no_weights"} 1'
+    ) in lines
+    assert (
+        'connect4_move_fallbacks_total{difficulty="unknown",'
+        'reason="no_weights"} 1'
+    ) in lines
+
+    path = str(tmp_path / "connect4.prom")
+    move_metrics.write(path)
+    with open(path) as metrics_file:
+        assert metrics_file.read() == text
+
+
+def test_move_timeouts(monkeypatch):
+    """Tests that a move at a strength level times out past the level's
+    time cap, rather than the default budget."""
+    move_metrics = MoveMetrics(timeout_seconds=0.5)
+    move_metrics.record_move("hard", "opening", 2.6, timeout_seconds=4.0)
+    move_metrics.record_move("hard", "opening", 4.5, timeout_seconds=4.0)
+    move_metrics.record_move("naive", "opening", 0.7)
+    assert move_metrics.num_timeouts == {"hard": 1, "naive": 1}
+
+    move_metrics = MoveMetrics(timeout_seconds=0.0)
+    monkeypatch.setattr("scripts.strength.MOVE_METRICS", move_metrics)
+    monkeypatch.setattr(
+        "scripts.strength.STRENGTH_LEVELS",
+        {1: StrengthLevel(
+            max_depth=1, max_num_nodes=100, temperature=0, max_seconds=60.0
+        )}
+    )
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    with move_metrics.time_move("easy", "opening"):
+        make_move_at_strength(board, 1, seed=0)
+    assert move_metrics.latencies[("easy", "opening")].count == 1
+    assert move_metrics.num_timeouts == {}
+    # outside of a move, there's no budget to set.
+    move_metrics.set_move_timeout(1.0)
+    assert not hasattr(move_metrics.current_move, "timeout_seconds")
+
+
+def test_computer_moves_are_timed(monkeypatch):
+    """Tests that moves are recorded and served over HTTP."""
+    move_metrics = MoveMetrics()
+    monkeypatch.setattr("scripts.opponents.MOVE_METRICS", move_metrics)
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    assert computer_make_move(board, "easy") is not None
+    assert move_metrics.latencies[("easy", "opening")].count == 1
+
+    server = start_metrics_server(0, host="127.0.0.1", metrics=move_metrics)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert response.read().decode() == (
+                move_metrics.format_prometheus()
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,60 @@
+"""Tests for opening suites.
+
+Tested with pytest. Run `pytest` to test."""
+import pytest
+
+from scripts.algos import search_best_move
+from scripts.bitboard import get_layout
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.openings import (
+    DEFAULT_MAX_ABS_SCORE, generate_opening_suite, get_canonical_key,
+    load_opening_boards, load_opening_suite, moves_to_string, play_moves,
+    string_to_moves, write_opening_suite
+)
+from scripts.threats import get_immediate_threats
+
+LAYOUT = get_layout(ROW_COUNT, COLUMN_COUNT)
+
+
+def test_move_strings():
+    assert moves_to_string((3, 3, 4, 2)) == "4453"
+    assert string_to_moves("4453") == (3, 3, 4, 2)
+    for move_string in ("40", "4a"):
+        with pytest.raises(ValueError):
+            string_to_moves(move_string)
+    with pytest.raises(ValueError):
+        play_moves(string_to_moves("1" * (ROW_COUNT + 1)), LAYOUT)
+
+
+def test_generate_opening_suite():
+    """Tests that openings are distinct up to mirroring, and even."""
+    openings = generate_opening_suite(20, 4, LAYOUT, eval_depth=4)
+    assert len(openings) == 20
+    keys = set()
+    for moves in openings:
+        assert len(moves) == 4
+        current_pieces, mask = play_moves(moves, LAYOUT)
+        assert not get_immediate_threats(current_pieces, mask, LAYOUT)
+        _, score = search_best_move(current_pieces, mask, 4, LAYOUT)
+        assert abs(score) <= DEFAULT_MAX_ABS_SCORE
+        keys.add(get_canonical_key(current_pieces, mask, LAYOUT))
+
+        mirrored_moves = tuple(COLUMN_COUNT - 1 - col for col in moves)
+        assert get_canonical_key(
+            *play_moves(mirrored_moves, LAYOUT), LAYOUT
+        ) == get_canonical_key(current_pieces, mask, LAYOUT)
+    assert len(keys) == len(openings)
+
+    assert generate_opening_suite(20, 4, LAYOUT, eval_depth=4) == openings
+
+
+def test_write_and_load_opening_suite(tmp_path):
+    path = str(tmp_path / "openings.c4r")
+    openings = [(3, 3, 4, 2), (0, 5)]
+    write_opening_suite(path, openings, LAYOUT)
+    assert load_opening_suite(path) == openings
+
+    boards = load_opening_boards(path)
+    assert len(boards) == 2
+    assert boards[0].board[0, 3] == 1 and boards[0].board[1, 3] == 2
+    assert boards[1].board[0, 0] == 1 and boards[1].board[0, 5] == 2
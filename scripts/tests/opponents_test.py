@@ -0,0 +1,139 @@
+"""Tests for the opponent registry.
+
+Tested with pytest. Run `pytest` to test."""
+import importlib.metadata
+import json
+import sys
+import textwrap
+
+import pytest
+
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.opponents import (
+    OPPONENT_REGISTRY, OpponentRegistry, OpponentSpec, ResourceProfile,
+    computer_make_move, read_config
+)
+
+PLUGIN_SOURCE = """
+NUM_BUILDS = [0]
+COL_NUM = {col_num}
+
+
+def make_opponent(value=2):
+    NUM_BUILDS[0] += 1
+
+    def make_move(board):
+        board.drop_piece(col_num=COL_NUM, value=value)
+
+    return make_move
+"""
+
+
+def _write_plugin(plugin_dir, col_num: int):
+    (plugin_dir / "plugin_engine.py").write_text(
+        textwrap.dedent(PLUGIN_SOURCE.format(col_num=col_num))
+    )
+
+
+@pytest.fixture
+def plugin_config_path(tmp_path, monkeypatch):
+    _write_plugin(tmp_path, col_num=1)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # the plugin is rewritten within the second: don't let a cached
+    # bytecode file of the old version be reloaded.
+    monkeypatch.setattr("sys.dont_write_bytecode", True)
+    monkeypatch.delitem(sys.modules, "plugin_engine", raising=False)
+    config_path = tmp_path / "opponents.json"
+    config_path.write_text(json.dumps({"opponents": [{
+        "name": "plugin",
+        "factory": "plugin_engine:make_opponent",
+        "kwargs": {"value": 2},
+        "profile": {
+            "num_cpus": 1, "memory_mb": 1, "expected_latency_ms": 0.1
+        }
+    }]}))
+    return str(config_path)
+
+
+def _make_board() -> Board:
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    return board
+
+
+def test_default_registry():
+    assert {"easy", "medium", "hard"} <= set(OPPONENT_REGISTRY.get_names())
+    assert OPPONENT_REGISTRY.get_profile("hard").expected_latency_ms > (
+        OPPONENT_REGISTRY.get_profile("easy").expected_latency_ms
+    )
+    assert computer_make_move(_make_board(), "easy") is not None
+
+
+def test_plugins_load_lazily_and_reload(plugin_config_path, tmp_path):
+    registry = OpponentRegistry()
+    registry.register_plugins(
+        config_path=plugin_config_path, entry_point_group=None
+    )
+    assert registry.get_profile("plugin").memory_mb == 1
+    assert not registry.is_loaded("plugin")
+
+    board = _make_board()
+    registry.get("plugin")(board)
+    assert board.history().tolist() == [1]
+    import plugin_engine
+    assert plugin_engine.NUM_BUILDS == [1]
+    registry.warm_up()
+    assert plugin_engine.NUM_BUILDS == [1]
+
+    # builds of their own: factory arguments that the plugin's factory
+    # doesn't take are left out.
+    assert registry.build("plugin", seed=0) is not registry.get("plugin")
+    assert plugin_engine.NUM_BUILDS == [2]
+
+    # a new build of the engine, swapped in without a restart.
+    old_opponent = registry.get("plugin")
+    _write_plugin(tmp_path, col_num=4)
+    assert registry.reload() == ["plugin"]
+    assert registry.get("plugin") is not old_opponent
+    registry.get("plugin")(board)
+    assert board.history().tolist() == [1, 4]
+    assert plugin_engine.NUM_BUILDS == [1]
+
+
+def test_entry_points(monkeypatch):
+    class EntryPoint:
+        name = "from_package"
+
+        def load(self):
+            return OpponentSpec(
+                "", "plugin_engine:make_opponent", ResourceProfile(1, 1, 1)
+            )
+
+    def entry_points(group=None):
+        entry_points = {"connect4.opponents": [EntryPoint()]}
+        # before Python 3.10, every group comes back at once.
+        if group is None:
+            return entry_points
+        return entry_points.get(group, [])
+
+    monkeypatch.setattr(importlib.metadata, "entry_points", entry_points)
+    for version_info in ((3, 8, 0), sys.version_info):
+        monkeypatch.setattr(sys, "version_info", version_info)
+        registry = OpponentRegistry()
+        registry.register_plugins()
+        assert registry.get_names() == ["from_package"]
+        assert not registry.is_loaded("from_package")
+
+    # looked for on first use.
+    registry = OpponentRegistry()
+    registry.register_plugins(lazy=True)
+    assert registry.specs == {}
+    assert "from_package" in registry
+
+
+def test_invalid_config(tmp_path):
+    config_path = tmp_path / "opponents.json"
+    config_path.write_text(json.dumps({"opponents": [{"name": "plugin"}]}))
+    with pytest.raises(ValueError):
+        read_config(str(config_path))
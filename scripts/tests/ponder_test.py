@@ -0,0 +1,51 @@
+"""Tests for pondering.
+
+Tested with pytest. Run `pytest` to test."""
+import time
+
+from scripts.algos import SearchContext, search_root
+from scripts.bitboard import board_to_bitboards, get_layout
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.ponder import Ponderer
+from scripts.transposition import TranspositionTable
+
+
+def test_ponderer():
+    """Tests that pondering stops cleanly and that its results are reused
+    by the computer's search."""
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.drop_piece(col_num=2, value=1)
+    board.drop_piece(col_num=3, value=2)
+
+    transposition_table = TranspositionTable()
+    ponderer = Ponderer(transposition_table=transposition_table)
+    ponderer.start(board)
+    assert ponderer.is_running
+    time.sleep(0.5)
+
+    thread = ponderer.thread
+    ponderer.stop()
+    # `stop` only returns once the search has seen the stop event and the
+    # thread is done.
+    assert ponderer.stop_event.is_set()
+    assert not thread.is_alive()
+    assert not ponderer.is_running
+    assert ponderer.num_nodes > 0
+
+    # the human replies in the center: the most likely reply, so it has been
+    # pondered.
+    board.drop_piece(col_num=2, value=1)
+    best_col_num, score, depth = ponderer.get_result(board)
+    assert depth >= 1
+
+    player_1_pieces, player_2_pieces = board_to_bitboards(board)
+    context = SearchContext(
+        layout=get_layout(ROW_COUNT, COLUMN_COUNT),
+        transposition_table=transposition_table
+    )
+    assert search_root(
+        player_2_pieces, player_1_pieces | player_2_pieces, depth, context
+    ) == (best_col_num, score)
+    # answered straight from the transposition table.
+    assert context.num_nodes == 0
@@ -0,0 +1,69 @@
+"""Tests for the sampling profiler.
+
+Tested with pytest. Run `pytest` to test."""
+import random
+
+from scripts.algos import search_best_move
+from scripts.bitboard import get_layout
+from scripts.profiling import (
+    PROFILE_DIR_ENV_VAR, PROFILE_RATE_ENV_VAR, ProfileConfig,
+    SamplingProfiler, get_profile_config, profile_session
+)
+
+LAYOUT = get_layout()
+
+
+def test_sampling_profiler(tmp_path):
+    """Tests that searching shows up in the collapsed stacks and in the
+    summary."""
+    profiler = SamplingProfiler(interval_seconds=0.001)
+    profiler.start()
+    search_best_move(0, 0, 7, LAYOUT)
+    profiler.stop()
+    assert not profiler.is_running
+    assert profiler.num_samples > 0
+
+    collapsed_path, summary_path = profiler.write(str(tmp_path / "search"))
+    with open(collapsed_path) as collapsed_file:
+        lines = collapsed_file.read().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == (
+        profiler.num_samples
+    )
+    assert any("algos:search_best_move;algos:search_root" in line
+               for line in lines)
+
+    summary = {
+        row["function"]: row for row in profiler.get_function_summary()
+    }
+    assert summary["algos:search_best_move"]["total_percent"] > 90
+    assert summary["algos:negamax"]["self_samples"] <= (
+        summary["algos:negamax"]["total_samples"]
+    )
+    with open(summary_path) as summary_file:
+        assert "algos:negamax" in summary_file.read()
+
+
+def test_profile_session(tmp_path, monkeypatch):
+    """Tests that sessions are only profiled when profiling is on, at the
+    configured rate."""
+    monkeypatch.delenv(PROFILE_DIR_ENV_VAR, raising=False)
+    assert get_profile_config() is None
+    with profile_session("off") as profiler:
+        assert profiler is None
+
+    monkeypatch.setenv(PROFILE_DIR_ENV_VAR, str(tmp_path))
+    monkeypatch.setenv(PROFILE_RATE_ENV_VAR, "0")
+    with profile_session("skipped") as profiler:
+        assert profiler is None
+    assert not list(tmp_path.iterdir())
+
+    config = ProfileConfig(
+        output_dir=str(tmp_path), sample_rate=0.5, interval_seconds=0.001
+    )
+    num_profiled = 0
+    rng = random.Random(0)
+    for _ in range(20):
+        with profile_session("sampled", config, rng) as profiler:
+            num_profiled += profiler is not None
+    assert 0 < num_profiled < 20
+    assert len(list(tmp_path.glob("sampled-*.collapsed"))) == num_profiled
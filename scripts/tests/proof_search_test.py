@@ -0,0 +1,84 @@
+"""Tests for proof-number search.
+
+Tested with pytest. Run `pytest` to test."""
+import pytest
+
+from scripts.algos import search_best_move
+from scripts.benchmark import get_sample_positions
+from scripts.bitboard import get_layout, play_column
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.proof_search import (
+    PROVED_DRAW, PROVED_LOSS, PROVED_WIN, UNKNOWN, ProofTable, prove,
+    prove_board
+)
+
+LAYOUT = get_layout(ROW_COUNT, COLUMN_COUNT)
+
+
+@pytest.fixture
+def base_board(scope="function"):
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    return board
+
+
+def _get_late_positions(num_positions: int, seed: int = 0):
+    """Random positions late enough in the game to be solved outright."""
+    return get_sample_positions(
+        num_positions, LAYOUT, seed=seed, min_num_moves=28, max_num_moves=32
+    )
+
+
+def test_prove_board(base_board):
+    """Tests a win in two moves, then the loss that it leaves."""
+    base_board.drop_piece(col_num=1, value=1)
+    base_board.drop_piece(col_num=5, value=2)
+    base_board.drop_piece(col_num=2, value=1)
+    base_board.drop_piece(col_num=5, value=2)
+    history = base_board.history().tolist()
+
+    result = prove_board(base_board)
+    assert result.result == PROVED_WIN
+    # three in a row, open on both ends.
+    assert result.col_num == 3
+    assert base_board.history().tolist() == history
+
+    base_board.drop_piece(col_num=3, value=1)
+    result = prove_board(base_board)
+    assert result.result == PROVED_LOSS
+    assert result.col_num is None
+
+
+def test_prove_matches_alpha_beta():
+    """Tests proofs, and proof moves, against alpha-beta solving the rest
+    of the game."""
+    table = ProofTable()
+    for current_pieces, mask in _get_late_positions(6):
+        result = prove(current_pieces, mask, LAYOUT, table=table)
+        _, score = search_best_move(
+            current_pieces, mask, depth=ROW_COUNT * COLUMN_COUNT,
+            layout=LAYOUT
+        )
+        expected_result = (
+            PROVED_WIN if score > 0 else PROVED_LOSS if score < 0
+            else PROVED_DRAW
+        )
+        assert result.result == expected_result
+        if result.result == PROVED_WIN:
+            next_current_pieces, next_mask = play_column(
+                current_pieces, mask, result.col_num, LAYOUT
+            )
+            assert prove(
+                next_current_pieces ^ next_mask, next_mask, LAYOUT
+            ).result == PROVED_LOSS
+
+
+def test_node_budget():
+    """Tests that running out of nodes stops the search, and that a
+    bounded table stays within its size."""
+    current_pieces, mask = _get_late_positions(1)[0]
+    table = ProofTable(max_num_entries=16)
+    result = prove(current_pieces, mask, LAYOUT, max_num_nodes=2, table=table)
+    assert result == (UNKNOWN, None, 2)
+    assert len(table) <= 16
@@ -0,0 +1,102 @@
+"""Tests for the headless board renderer.
+
+Tested with pytest. Run `pytest` to test."""
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from scripts.bitboard import board_to_bitboards, get_layout
+from scripts.components import Board
+from scripts.constants import (
+    COLOR_TO_CODE_DICT, COLUMN_COUNT, ROW_COUNT, VALUE_TO_COLOR_DICT
+)
+from scripts.game_record import GameRecord, GameRecordWriter
+from scripts.render import (
+    encode_png, get_record_positions, render_bitboards, render_boards,
+    render_final_positions, render_record, render_record_file
+)
+
+CELL_SIZE = 10
+
+
+def _get_cell_center_color(image: np.ndarray, row_num: int, col_num: int):
+    """Color at the center of a cell, with row 0 at the bottom."""
+    num_rows = image.shape[0] // CELL_SIZE
+    return tuple(image[
+        (num_rows - 1 - row_num) * CELL_SIZE + CELL_SIZE // 2,
+        col_num * CELL_SIZE + CELL_SIZE // 2
+    ])
+
+
+def test_render_boards():
+    board = Board.from_moves("4453")
+    image = render_boards(board.board, CELL_SIZE)
+    assert image.shape == (ROW_COUNT * CELL_SIZE, COLUMN_COUNT * CELL_SIZE, 3)
+    assert image.dtype == np.uint8
+    player_1_color = COLOR_TO_CODE_DICT[VALUE_TO_COLOR_DICT[1]]
+    player_2_color = COLOR_TO_CODE_DICT[VALUE_TO_COLOR_DICT[2]]
+    assert _get_cell_center_color(image, 0, 3) == player_1_color
+    assert _get_cell_center_color(image, 1, 3) == player_2_color
+    assert _get_cell_center_color(image, 0, 2) == player_2_color
+    assert _get_cell_center_color(image, 0, 0) == COLOR_TO_CODE_DICT["black"]
+    assert tuple(image[0, 0]) == COLOR_TO_CODE_DICT["blue"]
+
+    batch = np.stack([board.board, np.zeros_like(board.board)])
+    images = render_boards(batch, CELL_SIZE)
+    assert np.array_equal(images[0], image)
+    player_1_pieces, player_2_pieces = board_to_bitboards(board)
+    assert np.array_equal(
+        render_bitboards(
+            np.array([player_1_pieces]), np.array([player_2_pieces]),
+            get_layout(ROW_COUNT, COLUMN_COUNT), CELL_SIZE
+        ),
+        images[:1]
+    )
+
+    with pytest.raises(ValueError):
+        render_boards(np.full((2, 2), 3))
+
+
+def test_render_records(tmp_path):
+    record = GameRecord(
+        num_rows=ROW_COUNT, num_columns=COLUMN_COUNT, moves=(3, 3, 4, 2)
+    )
+    positions = get_record_positions(record)
+    assert len(positions) == 5
+    assert not positions[0].any()
+    assert np.array_equal(positions[-1], Board.from_moves("4453").board)
+    assert np.array_equal(
+        render_record(record, CELL_SIZE), render_boards(positions, CELL_SIZE)
+    )
+    assert np.array_equal(
+        render_final_positions([record, record], CELL_SIZE)[1],
+        render_boards(positions[-1], CELL_SIZE)
+    )
+
+    path = str(tmp_path / "games.c4r")
+    with GameRecordWriter(path) as writer:
+        writer.write(record)
+        writer.write(record._replace(moves=(0,)))
+    stats = render_record_file(
+        path, str(tmp_path / "images"), cell_size=CELL_SIZE,
+        all_positions=True
+    )
+    assert stats["num_images"] == 5 + 2
+    assert len(list((tmp_path / "images").glob("*.png"))) == 7
+
+
+def test_encode_png():
+    """Tests that the PNG decodes back to the image."""
+    image = render_boards(Board.from_moves("4453").board, CELL_SIZE)
+    png = encode_png(image)
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height = struct.unpack(">II", png[16:24])
+    assert (height, width) == image.shape[:2]
+    idat_length = struct.unpack(">I", png[33:37])[0]
+    scanlines = np.frombuffer(
+        zlib.decompress(png[41:41 + idat_length]), dtype=np.uint8
+    ).reshape(height, 1 + width * 3)
+    assert not scanlines[:, 0].any()
+    assert np.array_equal(scanlines[:, 1:].reshape(image.shape), image)
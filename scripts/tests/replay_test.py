@@ -0,0 +1,74 @@
+"""Tests for seeded opponents, move logs and their replay.
+
+Tested with pytest. Run `pytest` to test."""
+import random
+
+from scripts import strength
+from scripts.algos import make_move_naive
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.move_log import MoveLog, read_move_requests
+from scripts.opponents import make_level_opponent, make_naive_opponent
+from scripts.replay import replay_move_log
+
+
+def _play_game(opponent, num_moves: int, seed: int = 0) -> Board:
+    """Plays random moves for Player 1 against an opponent."""
+    rng = random.Random(seed)
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    for _ in range(num_moves):
+        board.drop_piece(col_num=rng.randrange(COLUMN_COUNT - 1), value=1)
+        opponent(board)
+    return board
+
+
+def test_seeded_opponents_play_the_same_moves():
+    for make_opponent in (
+        make_naive_opponent,
+        lambda seed: make_level_opponent(1, seed=seed, deterministic=True)
+    ):
+        histories = [
+            _play_game(make_opponent(seed), num_moves=5).history().tolist()
+            for seed in (7, 7, 8)
+        ]
+        assert histories[0] == histories[1]
+        assert histories[0] != histories[2]
+
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    make_move_naive(board, rng=random.Random(0))
+    assert board.history().tolist() == [random.Random(0).randint(0, 5)]
+
+
+def test_replay_move_log(tmp_path, monkeypatch):
+    """Tests that logged moves replay node for node."""
+    path = str(tmp_path / "moves.jsonl")
+    monkeypatch.setattr(strength.move_log, "MOVE_LOG", MoveLog(path))
+    _play_game(
+        make_level_opponent(5, seed=0, deterministic=True), num_moves=3
+    )
+    # kept tables don't replay the same: they're only replayed for timings.
+    _play_game(
+        make_level_opponent(3, keeps_transposition_table=True), num_moves=1
+    )
+    # with a time cap that was never reached, as played in the game.
+    _play_game(make_level_opponent(2, seed=0), num_moves=1)
+
+    requests = list(read_move_requests(path))
+    assert [request.level_num for request in requests] == [5, 5, 5, 3, 2]
+    assert all(request.num_nodes > 0 for request in requests)
+    assert not requests[-1].deterministic
+    assert requests[-1].is_past_deadline is False
+
+    results = replay_move_log(path)
+    assert [result["matches"] for result in results] == (
+        [True] * 3 + [None, True]
+    )
+    assert all(
+        result["replayed_nodes"] == result["recorded_nodes"]
+        for result in results[:3]
+    )
+    assert [
+        result["request"] for result in replay_move_log(path, [1])
+    ] == [1]
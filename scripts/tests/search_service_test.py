@@ -0,0 +1,96 @@
+"""Tests for the batched search service.
+
+Tested with pytest. Run `pytest` to test."""
+import numpy as np
+
+from scripts.algos import evaluate_position, search_best_move
+from scripts.benchmark import get_sample_positions
+from scripts.bitboard import get_layout
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.search_service import (
+    BatchedSearchService, expand_positions, make_network_evaluator
+)
+from scripts.threats import get_non_losing_moves
+from scripts.value_network import ValuePolicyNetwork, init_random_weights
+
+LAYOUT = get_layout(ROW_COUNT, COLUMN_COUNT)
+
+
+def test_expand_positions():
+    """Tests that the batched node checks match the scalar ones."""
+    positions = get_sample_positions(50, LAYOUT, seed=1, max_num_moves=30)
+    scores, non_losing_moves = expand_positions(
+        np.array([current for current, _ in positions], dtype=np.uint64),
+        np.array([mask for _, mask in positions], dtype=np.uint64),
+        LAYOUT
+    )
+    for (current, mask), score, moves in zip(
+        positions, scores.tolist(), non_losing_moves.tolist()
+    ):
+        assert score == evaluate_position(current, mask, LAYOUT)
+        assert moves == get_non_losing_moves(current, mask, LAYOUT)
+
+
+def test_service_matches_search_best_move():
+    """Tests that searching many games together gives the same scores as
+    searching them one at a time, with leaves batched across games."""
+    positions = get_sample_positions(30, LAYOUT, seed=2)
+    service = BatchedSearchService()
+    requests = [
+        service.submit(current, mask, LAYOUT, max_depth=4)
+        for current, mask in positions
+    ]
+    service.run_until_idle()
+
+    for (current, mask), request in zip(positions, requests):
+        assert request.is_done and not request.is_timed_out
+        _, score = search_best_move(current, mask, 4, LAYOUT)
+        assert request.score == score
+        assert not mask & LAYOUT.top_masks[request.best_col_num]
+    # more positions per call than the children of any single node.
+    assert service.get_stats()["mean_batch_size"] > COLUMN_COUNT
+
+
+def test_fairness_and_deadlines():
+    """Tests that every search advances even when the batch can't hold all
+    of them, and that an expired request is answered with a legal move."""
+    positions = get_sample_positions(4, LAYOUT, seed=3)
+    service = BatchedSearchService(max_batch_size=1)
+    requests = [
+        service.submit(current, mask, LAYOUT, max_depth=6)
+        for current, mask in positions
+    ]
+    for _ in range(len(requests)):
+        service.tick()
+    assert all(request.num_nodes > 0 for request in requests)
+
+    current, mask = positions[0]
+    urgent_request = service.submit(
+        current, mask, LAYOUT, max_depth=30, time_limit=0.05
+    )
+    service.run_until_idle()
+    assert urgent_request.is_timed_out
+    assert not mask & LAYOUT.top_masks[urgent_request.best_col_num]
+    assert not any(request.is_timed_out for request in requests)
+
+
+def test_background_service_with_network():
+    """Tests answering a `Board` from the background thread, with leaves
+    scored by the value network."""
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.drop_piece(col_num=2, value=1)
+    service = BatchedSearchService(
+        evaluator=make_network_evaluator(
+            ValuePolicyNetwork(init_random_weights())
+        )
+    )
+    service.start()
+    try:
+        request = service.submit_board(board, max_depth=2)
+        col_num = request.wait(timeout=10)
+    finally:
+        service.stop()
+    assert request.is_done
+    assert 0 <= col_num < COLUMN_COUNT
+    assert not service.is_running
@@ -0,0 +1,124 @@
+"""Tests for self-play data generation.
+
+Tested with pytest. Run `pytest` to test."""
+import multiprocessing
+import random
+
+import numpy as np
+import pytest
+
+from scripts import self_play
+from scripts.bitboard import get_layout
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.self_play import (
+    _new_transitions, _transitions_to_chunk, encode_chunk,
+    generate_self_play_data, play_self_play_game, random_policy
+)
+
+
+class TestSelfPlay:
+    """Tests self-play games and the data pipeline."""
+
+    layout = get_layout(ROW_COUNT, COLUMN_COUNT)
+
+    def test_play_self_play_game(self):
+        """Tests that a game's transitions chain together."""
+        transitions = _new_transitions()
+        num_moves = play_self_play_game(
+            random_policy, random_policy, self.layout, random.Random(0),
+            transitions
+        )
+        assert len(transitions["action"]) == num_moves
+        assert transitions["done"] == [False] * (num_moves - 1) + [True]
+        # each next state is the following state.
+        assert transitions["next_current"][:-1] == transitions["current"][1:]
+        assert (
+            transitions["next_opponent"][:-1] == transitions["opponent"][1:]
+        )
+
+    def test_encode_chunk(self):
+        """Tests plane encoding and mirror augmentation."""
+        transitions = _new_transitions()
+        play_self_play_game(
+            random_policy, random_policy, self.layout, random.Random(1),
+            transitions
+        )
+        chunk = _transitions_to_chunk(transitions)
+        num_positions = len(chunk["action"])
+
+        encoded_chunk = encode_chunk(chunk, self.layout, augment=True)
+        states = encoded_chunk["states"]
+        actions = encoded_chunk["actions"]
+        assert states.shape == (
+            2 * num_positions, 2, ROW_COUNT, COLUMN_COUNT
+        )
+        assert states.dtype == np.uint8
+        assert np.array_equal(
+            states[num_positions:], states[:num_positions, ..., ::-1]
+        )
+        assert np.array_equal(
+            actions[num_positions:],
+            COLUMN_COUNT - 1 - actions[:num_positions]
+        )
+        # the player to move has as many pieces as their opponent, or one
+        # fewer.
+        piece_counts = states.sum(axis=(2, 3))
+        assert np.all(piece_counts[:, 1] - piece_counts[:, 0] >= 0)
+        assert np.all(piece_counts[:, 1] - piece_counts[:, 0] <= 1)
+
+    def test_generate_self_play_data(self, tmp_path):
+        """Tests the multi-process pipeline end to end."""
+        stats = generate_self_play_data(
+            output_dir=str(tmp_path),
+            num_positions=1000,
+            num_workers=2,
+            chunk_size=256,
+            shard_size=600
+        )
+        assert stats["num_positions_generated"] == 1000
+        assert stats["num_positions_written"] == 2000
+        shard_sizes = [
+            len(np.load(path)["actions"])
+            for path in sorted(tmp_path.glob("shard_*.npz"))
+        ]
+        assert shard_sizes == [600, 600, 600, 200]
+
+    def test_generate_self_play_data_with_shared_table(self, tmp_path):
+        """Tests that alpha-beta workers share a transposition table."""
+        stats = generate_self_play_data(
+            output_dir=str(tmp_path),
+            num_positions=200,
+            policy_names=("medium", "easy"),
+            num_workers=2,
+            chunk_size=64,
+            shared_table_size=1 << 12
+        )
+        assert stats["num_positions_generated"] == 200
+        hit_rates = [
+            value for key, value in stats.items()
+            if key.endswith("_table_hit_rate")
+        ]
+        assert len(hit_rates) == 2
+        assert all(0 < hit_rate <= 1 for hit_rate in hit_rates)
+
+    def test_generate_self_play_data_fails(self, tmp_path, monkeypatch):
+        """Tests that failing workers fail the run rather than hang it."""
+        with pytest.raises(ValueError):
+            generate_self_play_data(
+                output_dir=str(tmp_path), num_positions=10,
+                policy_names=("hard", "easy")
+            )
+
+        if multiprocessing.get_start_method() != "fork":
+            pytest.skip("workers only inherit the patch when forked")
+
+        def play_self_play_game(*args):
+            raise KeyError("failed")
+
+        monkeypatch.setattr(
+            self_play, "play_self_play_game", play_self_play_game
+        )
+        with pytest.raises(RuntimeError):
+            generate_self_play_data(
+                output_dir=str(tmp_path), num_positions=10, num_workers=2
+            )
@@ -0,0 +1,134 @@
+"""Tests for the strength levels.
+
+Tested with pytest. Run `pytest` to test."""
+import random
+
+from scripts.algos import SearchContext, score_root_moves, search_best_move
+from scripts.benchmark import get_sample_positions
+from scripts.bitboard import get_layout
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.openings import play_moves
+from scripts import strength
+from scripts.strength import (
+    MOVE_TRANSPOSITION_TABLE_SIZE, STRENGTH_LEVELS, StrengthLevel,
+    choose_move, sample_move
+)
+from scripts.tablebase import Tablebase, generate_tablebase, get_random_seeds
+from scripts.transposition import TranspositionTable
+
+LAYOUT = get_layout(ROW_COUNT, COLUMN_COUNT)
+OPENINGS = [(), (3, 3, 4, 2), (3, 3, 3, 3, 2, 4, 4, 1)]
+
+
+def test_score_root_moves():
+    """Tests that the best root score is the score of the search."""
+    for moves in OPENINGS:
+        current_pieces, mask = play_moves(moves, LAYOUT)
+        context = SearchContext(LAYOUT, TranspositionTable())
+        scores = score_root_moves(current_pieces, mask, 4, context)
+        assert len(scores) == COLUMN_COUNT
+        assert max(scores.values()) == search_best_move(
+            current_pieces, mask, 4, LAYOUT
+        )[1]
+
+
+def test_levels_stay_within_budget():
+    for level_num in range(1, 6):
+        strength_level = STRENGTH_LEVELS[level_num]
+        for moves in OPENINGS:
+            col_num, num_nodes, _ = choose_move(
+                *play_moves(moves, LAYOUT), LAYOUT, strength_level,
+                rng=random.Random(0)
+            )
+            assert col_num is not None
+            assert num_nodes <= strength_level.max_num_nodes
+
+    # too small a budget for any iteration: falls back to the center.
+    tiny_level = StrengthLevel(
+        max_depth=8, max_num_nodes=2, temperature=0, max_seconds=1.0
+    )
+    col_num, num_nodes, _ = choose_move(0, 0, LAYOUT, tiny_level)
+    assert num_nodes <= 2
+    assert col_num in (2, 3)
+
+
+def test_noise():
+    """Tests that the softmax picks moves at the expected rates, and that
+    the levels without a temperature always play the same move."""
+    rng = random.Random(0)
+    picks = [sample_move({0: 10, 1: 0}, 10, rng) for _ in range(4000)]
+    assert 2.4 < picks.count(0) / picks.count(1) < 3.1
+
+    # a winning move is taken even at the noisiest level.
+    current_pieces, mask = play_moves((3, 0, 3, 0, 3, 1), LAYOUT)
+    assert all(
+        choose_move(
+            current_pieces, mask, LAYOUT, STRENGTH_LEVELS[1],
+            rng=random.Random(seed)
+        )[0] == 3
+        for seed in range(20)
+    )
+
+    current_pieces, mask = play_moves((3, 3, 4, 2), LAYOUT)
+    assert len({
+        choose_move(
+            current_pieces, mask, LAYOUT, STRENGTH_LEVELS[6],
+            rng=random.Random(seed)
+        )[0]
+        for seed in range(3)
+    }) == 1
+
+
+def test_endgame_is_solved_once():
+    """Tests that a level with a temperature solves an endgame at the first
+    depth, and doesn't search it again deeper."""
+    current_pieces, mask = get_sample_positions(
+        1, LAYOUT, seed=7, max_num_moves=32, min_num_moves=32
+    )[0]
+    context = SearchContext(
+        LAYOUT,
+        TranspositionTable(max_num_entries=MOVE_TRANSPOSITION_TABLE_SIZE)
+    )
+    scores = score_root_moves(current_pieces, mask, 1, context)
+    # no move wins or loses, which would stop the deepening anyway.
+    assert not any(score for score in scores.values())
+    strength_level = StrengthLevel(
+        max_depth=5, max_num_nodes=100_000, temperature=1, max_seconds=10.0
+    )
+    _, num_nodes, _ = choose_move(
+        current_pieces, mask, LAYOUT, strength_level, rng=random.Random(0),
+        deterministic=True
+    )
+    assert num_nodes == context.num_nodes
+
+
+def test_levels_consult_the_tablebase(tmp_path, monkeypatch):
+    """Tests that every level scores positions in the endgame tablebase
+    from it."""
+    layout = get_layout(4, 5)
+    seeds = get_random_seeds(1, 10, layout)
+    path = str(tmp_path / "tablebase.c4tb")
+    generate_tablebase(
+        seeds, str(tmp_path / "work"), path, max_num_empty_cells=10,
+        num_rows=4, num_columns=5, num_workers=1
+    )
+    tablebase = Tablebase(path)
+    entries = []
+    probe_position = tablebase.probe_position
+
+    def record_probe(current_pieces, mask):
+        entry = probe_position(current_pieces, mask)
+        if entry is not None:
+            entries.append(entry)
+        return entry
+
+    monkeypatch.setattr(tablebase, "probe_position", record_probe)
+    monkeypatch.setattr(strength, "get_endgame_tablebase", lambda: tablebase)
+    for level_num in (2, 5, 8):
+        entries.clear()
+        col_num, _, _ = choose_move(
+            *seeds[0], layout, STRENGTH_LEVELS[level_num],
+            rng=random.Random(0), deterministic=True
+        )
+        assert col_num is not None
+        assert entries
@@ -0,0 +1,157 @@
+"""Tests for the endgame tablebase.
+
+Tested with pytest. Run `pytest` to test."""
+import pytest
+
+from scripts.algos import (
+    WIN_SCORE, SearchContext, search_best_move, search_root
+)
+from scripts.benchmark import get_sample_positions
+from scripts.bitboard import get_layout, play_column
+from scripts.components import Board
+from scripts.tablebase import (
+    RESULT_DRAW, RESULT_LOSS, RESULT_WIN, Tablebase, generate_tablebase
+)
+from scripts.threats import popcount
+
+# small enough that every reachable position can be enumerated.
+NUM_ROWS = 4
+NUM_COLUMNS = 5
+MAX_NUM_EMPTY_CELLS = 10
+LAYOUT = get_layout(NUM_ROWS, NUM_COLUMNS)
+
+
+@pytest.fixture(scope="module")
+def tablebase_path(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("tablebase")
+    path = str(tmp_path / "tablebase.c4tb")
+    generate_tablebase(
+        [(0, 0)], str(tmp_path / "work"), path,
+        max_num_empty_cells=MAX_NUM_EMPTY_CELLS, num_rows=NUM_ROWS,
+        num_columns=NUM_COLUMNS, num_workers=1
+    )
+    return path
+
+
+def _get_random_positions(
+    num_positions: int,
+    min_num_empty_cells: int = 1,
+    max_num_empty_cells: int = MAX_NUM_EMPTY_CELLS,
+    seed: int = 0
+):
+    """Positions from random games where wins are never passed up."""
+    num_cells = NUM_ROWS * NUM_COLUMNS
+    return get_sample_positions(
+        num_positions, LAYOUT, seed=seed,
+        max_num_moves=num_cells - min_num_empty_cells,
+        min_num_moves=num_cells - max_num_empty_cells, include_decided=True
+    )
+
+
+def test_probe_matches_search(tablebase_path):
+    """Tests that results match solving the position with the search, and
+    that best moves keep the result."""
+    tablebase = Tablebase(tablebase_path)
+    for current_pieces, mask in _get_random_positions(200):
+        entry = tablebase.probe_position(current_pieces, mask)
+        num_moves = popcount(mask)
+        num_empty_cells = NUM_ROWS * NUM_COLUMNS - num_moves
+        _, score = search_best_move(
+            current_pieces, mask, num_empty_cells, LAYOUT
+        )
+        if score > 0:
+            assert entry.result == RESULT_WIN
+            assert entry.distance == WIN_SCORE - score - num_moves
+        elif score < 0:
+            assert entry.result == RESULT_LOSS
+            assert entry.distance == WIN_SCORE + score - num_moves
+        else:
+            assert entry.result == RESULT_DRAW
+            assert entry.distance == num_empty_cells
+
+        if entry.result == RESULT_WIN and entry.distance == 1:
+            continue
+        next_pieces, next_mask = play_column(
+            current_pieces, mask, entry.best_col_num, LAYOUT
+        )
+        next_entry = tablebase.probe_position(
+            next_pieces ^ next_mask, next_mask
+        )
+        assert next_entry.result == -entry.result
+        assert next_entry.distance == entry.distance - 1
+
+
+def test_probe_board(tablebase_path):
+    """Tests probing a `Board`, and that mirrored positions share entries."""
+    tablebase = Tablebase(tablebase_path)
+    board = Board(num_rows=NUM_ROWS, num_columns=NUM_COLUMNS)
+    mirrored_board = Board(num_rows=NUM_ROWS, num_columns=NUM_COLUMNS)
+    moves = [0, 1, 0, 1, 2, 3, 3, 1, 4, 4]
+    for move_num, col_num in enumerate(moves):
+        board.drop_piece(col_num=col_num, value=move_num % 2 + 1)
+        mirrored_board.drop_piece(
+            col_num=NUM_COLUMNS - 1 - col_num, value=move_num % 2 + 1
+        )
+    entry = tablebase.probe(board)
+    mirrored_entry = tablebase.probe(mirrored_board)
+    assert entry.result == mirrored_entry.result
+    assert entry.distance == mirrored_entry.distance
+    assert mirrored_entry.best_col_num == NUM_COLUMNS - 1 - entry.best_col_num
+
+    # too many empty cells.
+    assert tablebase.probe(
+        Board(num_rows=NUM_ROWS, num_columns=NUM_COLUMNS)
+    ) is None
+
+
+def test_search_with_tablebase(tablebase_path):
+    """Tests that solving positions just outside the tablebase gives the same
+    scores when the search consults it, in fewer nodes."""
+    tablebase = Tablebase(tablebase_path)
+    for current_pieces, mask in _get_random_positions(
+        20, MAX_NUM_EMPTY_CELLS + 1, MAX_NUM_EMPTY_CELLS + 3, seed=1
+    ):
+        assert tablebase.probe_position(current_pieces, mask) is None
+        num_empty_cells = NUM_ROWS * NUM_COLUMNS - popcount(mask)
+        contexts = [
+            SearchContext(LAYOUT),
+            SearchContext(LAYOUT, tablebase=tablebase)
+        ]
+        scores = [
+            search_root(current_pieces, mask, num_empty_cells, context)[1]
+            for context in contexts
+        ]
+        assert scores[0] == scores[1]
+        assert contexts[1].num_nodes <= contexts[0].num_nodes
+
+
+def test_parallel_and_resumed_generation(tablebase_path, tmp_path):
+    """Tests that generating across processes, and resuming an interrupted
+    generation, give the same table."""
+    work_dir = tmp_path / "work"
+    path = str(tmp_path / "tablebase.c4tb")
+    generate_tablebase(
+        [(0, 0)], str(work_dir), path,
+        max_num_empty_cells=MAX_NUM_EMPTY_CELLS, num_rows=NUM_ROWS,
+        num_columns=NUM_COLUMNS, num_workers=2, chunk_size=4096
+    )
+    with open(tablebase_path, "rb") as expected_file:
+        expected_bytes = expected_file.read()
+    with open(path, "rb") as table_file:
+        assert table_file.read() == expected_bytes
+
+    (work_dir / "keys_05.npy").unlink()
+    (work_dir / "values_08.npy").unlink()
+    generate_tablebase(
+        [(0, 0)], str(work_dir), path,
+        max_num_empty_cells=MAX_NUM_EMPTY_CELLS, num_rows=NUM_ROWS,
+        num_columns=NUM_COLUMNS, num_workers=1
+    )
+    with open(path, "rb") as table_file:
+        assert table_file.read() == expected_bytes
+
+    with pytest.raises(ValueError):
+        generate_tablebase(
+            [(0, 0)], str(work_dir), path, max_num_empty_cells=8,
+            num_rows=NUM_ROWS, num_columns=NUM_COLUMNS, num_workers=1
+        )
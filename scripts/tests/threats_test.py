@@ -0,0 +1,92 @@
+"""Tests for threat analysis.
+
+Tested with pytest. Run `pytest` to test."""
+import pytest
+
+from scripts.bitboard import board_to_bitboards, get_bit_index, get_layout
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.threats import (
+    get_board_threats, get_even_threats, get_must_block_cells,
+    get_non_losing_moves, get_odd_threats, get_winning_cells
+)
+
+LAYOUT = get_layout(ROW_COUNT, COLUMN_COUNT)
+
+
+def _cell(row_num: int, col_num: int) -> int:
+    return 1 << get_bit_index(row_num, col_num, LAYOUT)
+
+
+@pytest.fixture
+def base_board(scope="function"):
+    board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+    board.init_board()
+    return board
+
+
+class TestThreats:
+    """Tests the threat masks."""
+
+    def test_get_winning_cells(self, base_board):
+        """Tests threats along rows, columns and diagonals."""
+        # horizontal: open on both ends.
+        base_board[0, 1:4] = 1
+        player_1_pieces, player_2_pieces = board_to_bitboards(base_board)
+        mask = player_1_pieces | player_2_pieces
+        assert get_winning_cells(player_1_pieces, mask, LAYOUT) == (
+            _cell(0, 0) | _cell(0, 4)
+        )
+
+        # a gap in the middle of a diagonal is a threat, even though it
+        # can't be played yet.
+        base_board[1, 0] = 2
+        base_board[3, 2] = 2
+        base_board[4, 3] = 2
+        player_1_pieces, player_2_pieces = board_to_bitboards(base_board)
+        mask = player_1_pieces | player_2_pieces
+        assert get_winning_cells(player_2_pieces, mask, LAYOUT) == (
+            _cell(2, 1)
+        )
+        assert get_even_threats(player_2_pieces, mask, LAYOUT) == 0
+        assert get_odd_threats(player_2_pieces, mask, LAYOUT) == (
+            _cell(2, 1)
+        )
+        assert get_board_threats(base_board)[2]["immediate"] == 0
+
+    def test_get_non_losing_moves(self, base_board):
+        """Tests must-block and non-losing move masks."""
+        # Player 1 threatens to complete the bottom row on column 4.
+        base_board[0, 1:4] = 1
+        base_board[0, 0] = 2
+        base_board[1, 0] = 2
+        player_1_pieces, player_2_pieces = board_to_bitboards(base_board)
+        mask = player_1_pieces | player_2_pieces
+        assert get_must_block_cells(player_2_pieces, mask, LAYOUT) == (
+            _cell(0, 4)
+        )
+        assert get_non_losing_moves(player_2_pieces, mask, LAYOUT) == (
+            _cell(0, 4)
+        )
+
+        # two threats to block: every move loses.
+        base_board[0, 0] = 0
+        base_board[1, 0] = 0
+        base_board[0, 5] = 2
+        player_1_pieces, player_2_pieces = board_to_bitboards(base_board)
+        mask = player_1_pieces | player_2_pieces
+        assert get_non_losing_moves(player_2_pieces, mask, LAYOUT) == 0
+
+    def test_get_non_losing_moves_below_threat(self, base_board):
+        """Tests that moves directly below an opponent threat are
+        excluded."""
+        base_board[1, 1:4] = 1
+        base_board[0, 1:4] = 2
+        base_board[0, 0] = 1
+        base_board[1, 0] = 2
+        player_1_pieces, player_2_pieces = board_to_bitboards(base_board)
+        mask = player_1_pieces | player_2_pieces
+        non_losing_moves = get_non_losing_moves(player_2_pieces, mask, LAYOUT)
+        # (1, 4) is a threat for Player 1, so playing (0, 4) loses.
+        assert not non_losing_moves & _cell(0, 4)
+        assert non_losing_moves & _cell(0, 5)
@@ -0,0 +1,153 @@
+"""Tests for the tournament runner.
+
+Tested with pytest. Run `pytest` to test."""
+import json
+
+import pytest
+
+from scripts.bitboard import get_layout
+from scripts.game_record import (
+    RESULT_DRAW, RESULT_PLAYER_1_WINS, RESULT_PLAYER_2_WINS
+)
+from scripts.tournament import (
+    GameResult, GameSpec, compute_ratings, parse_agent_spec, play_game,
+    run_tournament, schedule_games
+)
+
+NUM_ROWS = 4
+NUM_COLUMNS = 5
+LAYOUT = get_layout(NUM_ROWS, NUM_COLUMNS)
+
+
+def _make_result(player_1: str, player_2: str, result: int) -> GameResult:
+    return GameResult(
+        game_id="", player_1=player_1, player_2=player_2, result=result,
+        moves=[], wall_seconds=0.0, cpu_seconds=0.0
+    )
+
+
+def test_parse_agent_spec():
+    assert parse_agent_spec("medium") == {"kind": "medium"}
+    parsed = parse_agent_spec("alpha_beta:depth=3,time=0.5")
+    assert parsed["depth"] == 3 and parsed["time"] == 0.5
+    assert parse_agent_spec("level:3") == {"kind": "level", "level": 3}
+    for spec in (
+        "impossible", "alpha_beta", "alpha_beta:nodes=10", "level:0"
+    ):
+        with pytest.raises(ValueError):
+            parse_agent_spec(spec)
+
+
+def test_schedule_is_balanced():
+    """Tests that every pairing plays every opening with both colors."""
+    openings = [(2,), (1,), (0, 1)]
+    games = schedule_games(["a", "b", "c"], openings, "round_robin")
+    assert len(games) == 3 * 3 * 2
+    assert len({game.game_id for game in games}) == len(games)
+    for agent in ("a", "b", "c"):
+        assert sum(game.player_1 == agent for game in games) == 6
+        assert sum(game.player_2 == agent for game in games) == 6
+
+    games = schedule_games(["a", "b", "c"], openings, "gauntlet")
+    assert len(games) == 2 * 3 * 2
+    assert all("a" in (game.player_1, game.player_2) for game in games)
+
+
+def test_compute_ratings():
+    """Tests that ratings are ordered by results, centered on 0, and that
+    more games narrow the confidence intervals."""
+    results = (
+        [_make_result("a", "b", RESULT_PLAYER_1_WINS)] * 6
+        + [_make_result("b", "a", RESULT_DRAW)] * 2
+        + [_make_result("b", "c", RESULT_PLAYER_1_WINS)] * 3
+        + [_make_result("c", "b", RESULT_PLAYER_2_WINS)] * 3
+    )
+    ratings = compute_ratings(results)
+    assert ratings["a"]["elo"] > ratings["b"]["elo"] > ratings["c"]["elo"]
+    assert sum(rating["elo"] for rating in ratings.values()) == (
+        pytest.approx(0, abs=1e-6)
+    )
+    assert ratings["a"]["num_games"] == 8
+    assert ratings["a"]["score"] == pytest.approx(7 / 8)
+
+    even_ratings = compute_ratings(
+        [_make_result("a", "b", RESULT_DRAW)] * 4
+    )
+    more_even_ratings = compute_ratings(
+        [_make_result("a", "b", RESULT_DRAW)] * 40
+    )
+    assert even_ratings["a"]["elo"] == pytest.approx(0, abs=1e-6)
+    assert more_even_ratings["a"]["elo_ci"] < even_ratings["a"]["elo_ci"]
+
+
+def test_resumable_tournament(tmp_path):
+    """Tests that a tournament picks up from its checkpoint, and refuses a
+    checkpoint of a different tournament."""
+    checkpoint_path = str(tmp_path / "tournament.jsonl")
+    kwargs = dict(
+        openings=[(2,), (1,)], num_rows=NUM_ROWS, num_columns=NUM_COLUMNS,
+        num_workers=1
+    )
+    agents = ["easy", "alpha_beta:depth=2"]
+    stats = run_tournament(agents, checkpoint_path, **kwargs)
+    assert stats["num_games_played"] == 4
+    assert stats["games_per_second"] > 0
+
+    # drop the last game, as if the run had been interrupted.
+    with open(checkpoint_path) as checkpoint_file:
+        lines = checkpoint_file.readlines()
+    with open(checkpoint_path, "w") as checkpoint_file:
+        checkpoint_file.writelines(lines[:-1])
+    stats = run_tournament(agents, checkpoint_path, **kwargs)
+    assert stats["num_games_played"] == 1
+    assert sum(
+        rating["num_games"] for rating in stats["ratings"].values()
+    ) == 2 * 4
+    with open(checkpoint_path) as checkpoint_file:
+        game_ids = [
+            json.loads(line)["game_id"]
+            for line in checkpoint_file.readlines()[1:]
+        ]
+    assert len(set(game_ids)) == 4
+
+    # cut the last game off halfway through its line: resuming replays it
+    # once, and leaves a checkpoint that doesn't need it again.
+    with open(checkpoint_path) as checkpoint_file:
+        text = checkpoint_file.read()
+    with open(checkpoint_path, "w") as checkpoint_file:
+        checkpoint_file.write(text[:len(text) - 20])
+    for num_games_played in (1, 0, 0):
+        stats = run_tournament(agents, checkpoint_path, **kwargs)
+        assert stats["num_games_played"] == num_games_played
+    with open(checkpoint_path) as checkpoint_file:
+        lines = checkpoint_file.readlines()
+    assert len(lines) == 1 + 4
+    assert all(line.endswith("\n") for line in lines)
+
+    with pytest.raises(ValueError):
+        run_tournament(
+            agents + ["medium"], checkpoint_path, **kwargs
+        )
+
+    with open(checkpoint_path, "w") as checkpoint_file:
+        checkpoint_file.write("not json\n")
+    with pytest.raises(ValueError):
+        run_tournament(agents, checkpoint_path, **kwargs)
+    # cut off while writing the header: started over.
+    with open(checkpoint_path, "w") as checkpoint_file:
+        checkpoint_file.write('{"config": {"age')
+    assert run_tournament(
+        agents, checkpoint_path, **kwargs
+    )["num_games_played"] == 4
+
+
+def test_registry_agents_replay():
+    """Tests that games with registry agents replay move for move."""
+    game = GameSpec(
+        game_id="0", player_1="medium", player_2="naive", opening=(),
+        seed=3
+    )
+    assert play_game(game, LAYOUT).moves == play_game(game, LAYOUT).moves
+    assert play_game(game, LAYOUT).moves != play_game(
+        game._replace(seed=4), LAYOUT
+    ).moves
@@ -0,0 +1,88 @@
+"""Tests for the transposition tables.
+
+Tested with pytest. Run `pytest` to test."""
+import multiprocessing
+
+import pytest
+
+from scripts.transposition import (
+    EXACT, LOWER_BOUND, UPPER_BOUND, SharedTranspositionTable,
+    TranspositionTable, pack_entry, unpack_entry
+)
+
+
+def test_transposition_table():
+    """Tests storing, replacing and evicting entries."""
+    transposition_table = TranspositionTable(max_num_entries=2)
+    assert transposition_table.get(1) is None
+
+    transposition_table.store(1, depth=4, score=10, flag=EXACT, best_col_num=3)
+    # shallower results don't replace deeper ones.
+    transposition_table.store(
+        1, depth=2, score=-5, flag=LOWER_BOUND, best_col_num=0
+    )
+    assert transposition_table.get(1).score == 10
+
+    transposition_table.store(2, depth=1, score=0, flag=EXACT, best_col_num=1)
+    transposition_table.store(3, depth=1, score=0, flag=EXACT, best_col_num=1)
+    assert len(transposition_table) == 2
+    assert transposition_table.get(1) is None
+    assert transposition_table.get(3).best_col_num == 1
+    assert transposition_table.get_hit_rate() == 2 / 4
+
+
+def test_pack_entry():
+    for entry in ((0, -1000, EXACT, None), (42, 995, UPPER_BOUND, 6)):
+        assert tuple(unpack_entry(pack_entry(*entry))) == entry
+
+
+def _store_from_worker(name: str, worker_num: int):
+    table = SharedTranspositionTable.attach(name, worker_num)
+    assert table.get(1).score == 10
+    table.store(2, depth=3, score=-7, flag=LOWER_BOUND, best_col_num=0)
+    table.close()
+
+
+def test_shared_transposition_table():
+    """Tests that entries and stats are shared with worker processes."""
+    with SharedTranspositionTable.create(1000, max_num_workers=2) as table:
+        assert table.num_slots == 1024
+        assert table.get(1) is None
+
+        table.store(1, depth=4, score=10, flag=EXACT, best_col_num=3)
+        table.store(1, depth=2, score=-5, flag=LOWER_BOUND, best_col_num=0)
+        assert table.get(1) == (4, 10, EXACT, 3)
+
+        worker = multiprocessing.Process(
+            target=_store_from_worker, args=(table.name, 1)
+        )
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+        assert table.get(2) == (3, -7, LOWER_BOUND, 0)
+        assert len(table) == 2
+
+        worker_stats = table.get_worker_stats()
+        assert [stats["worker_num"] for stats in worker_stats] == [0, 1]
+        assert worker_stats[1]["hit_rate"] == 1.0
+        assert worker_stats[1]["num_stores"] == 1
+        assert table.get_hit_rate() == 2 / 3
+
+        # a slot torn by concurrent writes doesn't verify.
+        slot_num = table._get_slot_num(2)
+        table.slots[slot_num, 1] ^= 1 << 16
+        assert table.get(2) is None
+
+        with pytest.raises(ValueError):
+            SharedTranspositionTable.attach(table.name, 2)
+        name = table.name
+    with pytest.raises(FileNotFoundError):
+        SharedTranspositionTable.attach(name, 1)
+
+
+def test_only_owner_unlinks():
+    with SharedTranspositionTable.create(16) as table:
+        worker_table = SharedTranspositionTable.attach(table.name, 1)
+        with pytest.raises(ValueError):
+            worker_table.unlink()
+        worker_table.close()
@@ -0,0 +1,101 @@
+"""Tests for the NumPy value/policy network.
+
+Tested with pytest. Run `pytest` to test."""
+import numpy as np
+
+from scripts import algos
+from scripts.components import Board
+from scripts.constants import COLUMN_COUNT, ROW_COUNT
+from scripts.value_network import (
+    ValuePolicyNetwork, _conv3x3_relu, encode_board, init_random_weights,
+    load_weights, save_weights
+)
+
+
+class TestValuePolicyNetwork:
+    """Tests the 'ValuePolicyNetwork' class and its helpers."""
+
+    def test_load_weights_is_memory_mapped(self, tmp_path):
+        """Tests the round trip through 'save_weights' and
+        'load_weights'."""
+        path = str(tmp_path / "weights.npz")
+        weights = init_random_weights(num_filters=4, hidden_size=8)
+        save_weights(path, weights)
+
+        loaded_weights = load_weights(path)
+        for name, value in weights.items():
+            assert np.array_equal(loaded_weights[name], value)
+            assert not loaded_weights[name].flags.owndata
+            assert not loaded_weights[name].flags.writeable
+
+    def test_conv3x3_relu(self):
+        """Tests the im2col convolution against a direct loop."""
+        rng = np.random.default_rng(0)
+        inputs = rng.standard_normal((2, 3, 5, 4)).astype(np.float32)
+        weight = rng.standard_normal((6, 3, 3, 3)).astype(np.float32)
+        bias = rng.standard_normal(6).astype(np.float32)
+
+        padded = np.pad(inputs, ((0, 0), (0, 0), (1, 1), (1, 1)))
+        expected = np.zeros((2, 6, 5, 4), dtype=np.float32)
+        for row_num in range(5):
+            for col_num in range(4):
+                window = padded[:, :, row_num:row_num + 3, col_num:col_num + 3]
+                expected[:, :, row_num, col_num] = np.einsum(
+                    "ncij,ocij->no", window, weight
+                ) + bias
+        expected = np.maximum(expected, 0)
+
+        assert np.allclose(
+            _conv3x3_relu(inputs, weight, bias), expected, atol=1e-5
+        )
+
+    def test_forward(self):
+        """Tests output shapes and that batching doesn't change results."""
+        network = ValuePolicyNetwork(init_random_weights())
+        board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+        board.drop_piece(col_num=2, value=1)
+        planes = np.stack([
+            encode_board(board, player=1), encode_board(board, player=2)
+        ])
+
+        policy_logits, values = network.forward(planes)
+        assert policy_logits.shape == (2, COLUMN_COUNT)
+        assert values.shape == (2,)
+        assert np.all(np.abs(values) <= 1)
+
+        single_policy_logits, single_values = network.forward(planes[1:])
+        assert np.allclose(single_policy_logits[0], policy_logits[1])
+        assert np.allclose(single_values[0], values[1])
+
+    def test_make_move_deep_q_learning(self, monkeypatch):
+        """Tests that the deep Q opponent makes a move, and takes immediate
+        wins."""
+        monkeypatch.setattr(
+            algos, "VALUE_POLICY_NETWORK",
+            ValuePolicyNetwork(init_random_weights())
+        )
+        board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+        algos.make_move_deep_q_learning(board)
+        assert np.count_nonzero(board.board == 2) == 1
+
+        board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+        board[0:3, 4] = 2
+        board[0, 0:3] = 1
+        algos.make_move_deep_q_learning(board)
+        assert board[3, 4] == 2
+
+    def test_missing_weights_are_looked_for_once(
+        self, monkeypatch, tmp_path, capsys
+    ):
+        """Tests that without weights, the deep Q opponent warns once and
+        plays random moves."""
+        monkeypatch.setattr(algos, "VALUE_POLICY_NETWORK", None)
+        monkeypatch.setattr(algos, "HAS_NO_VALUE_POLICY_WEIGHTS", False)
+        monkeypatch.setattr(
+            algos, "VALUE_POLICY_WEIGHTS_PATH", str(tmp_path / "none.npz")
+        )
+        board = Board(num_rows=ROW_COUNT, num_columns=COLUMN_COUNT)
+        for _ in range(3):
+            algos.make_move_deep_q_learning(board)
+        assert np.count_nonzero(board.board == 2) == 3
+        assert capsys.readouterr().out.count("No weights found") == 1
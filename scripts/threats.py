@@ -0,0 +1,180 @@
+"""Threat analysis on bitboards.
+
+A threat is an empty cell that would complete `NUM_IN_A_ROW_TO_WIN` pieces
+in a row for a player. Threats that can be played right away are immediate
+threats; the others are future threats, which decide most endgames through
+zugzwang: since the board fills up from the bottom, which player is forced
+to play below a threat depends on the parity of the threat's row.
+Counting rows from 1 at the bottom, threats on odd rows are good for
+Player 1 (who moves first) and threats on even rows are good for Player 2.
+
+All functions take and return bitboards (see `bitboard.py`), where
+`current_pieces` are the pieces of the player to move.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from bitboard import BitboardLayout, board_to_bitboards, get_layout
+import constants
+
+
+def popcount(bits: int) -> int:
+    """Number of set bits."""
+    return bin(bits).count("1")
+
+
+def get_winning_cells(
+    pieces: int,
+    mask: int,
+    layout: BitboardLayout,
+    num_in_a_row: int = constants.NUM_IN_A_ROW_TO_WIN
+) -> int:
+    """Every empty cell that would complete `num_in_a_row` pieces in a row
+    for the player owning `pieces`, whether it can be played now or not."""
+    winning_cells = 0
+    for shift in layout.direction_shifts:
+        # the empty cell can be at any position along the line.
+        for empty_index in range(num_in_a_row):
+            cells = layout.board_mask
+            for piece_index in range(num_in_a_row):
+                if piece_index == empty_index:
+                    continue
+                offset = (piece_index - empty_index) * shift
+                if offset > 0:
+                    cells &= pieces >> offset
+                else:
+                    cells &= pieces << -offset
+                if not cells:
+                    break
+            winning_cells |= cells
+    return winning_cells & layout.board_mask & ~mask
+
+
+def get_winning_cells_array(
+    pieces_array: np.ndarray,
+    mask_array: np.ndarray,
+    layout: BitboardLayout,
+    num_in_a_row: int = constants.NUM_IN_A_ROW_TO_WIN
+) -> np.ndarray:
+    """Vectorized `get_winning_cells`, over uint64 arrays of positions."""
+    board_mask = np.uint64(layout.board_mask)
+    winning_cells = np.zeros_like(pieces_array, dtype=np.uint64)
+    for shift in layout.direction_shifts:
+        for empty_index in range(num_in_a_row):
+            cells = np.full_like(winning_cells, board_mask)
+            for piece_index in range(num_in_a_row):
+                if piece_index == empty_index:
+                    continue
+                offset = (piece_index - empty_index) * shift
+                if offset > 0:
+                    cells &= pieces_array >> np.uint64(offset)
+                else:
+                    cells &= pieces_array << np.uint64(-offset)
+            winning_cells |= cells
+    return winning_cells & board_mask & ~mask_array
+
+
+def get_playable_cells(mask: int, layout: BitboardLayout) -> int:
+    """The cell that a piece would land on, in every column that isn't
+    full."""
+    return (mask + layout.bottom_mask) & layout.board_mask
+
+
+def get_immediate_threats(
+    pieces: int, mask: int, layout: BitboardLayout
+) -> int:
+    """Winning cells for `pieces` that can be played right now."""
+    return get_winning_cells(pieces, mask, layout) & get_playable_cells(
+        mask, layout
+    )
+
+
+def get_must_block_cells(
+    current_pieces: int, mask: int, layout: BitboardLayout
+) -> int:
+    """Cells that the player to move has to play in, or the opponent wins
+    on their next move."""
+    return get_immediate_threats(current_pieces ^ mask, mask, layout)
+
+
+def get_non_losing_moves(
+    current_pieces: int, mask: int, layout: BitboardLayout
+) -> int:
+    """Moves for the player to move that don't let the opponent win on
+    their next move.
+
+    Only valid if the player to move can't win right away. If the opponent
+    has two immediate threats, there are no non-losing moves. Playing
+    directly below one of the opponent's threats is never non-losing, since
+    it lets the opponent play on the threat.
+
+    Returns:
+        (int): a bit set on the landing cell of every non-losing move.
+    """
+    playable_cells = get_playable_cells(mask, layout)
+    opponent_winning_cells = get_winning_cells(
+        current_pieces ^ mask, mask, layout
+    )
+    forced_cells = playable_cells & opponent_winning_cells
+    if forced_cells:
+        if forced_cells & (forced_cells - 1):
+            # more than one threat to block.
+            return 0
+        playable_cells = forced_cells
+    return playable_cells & ~(opponent_winning_cells >> 1)
+
+
+@lru_cache(maxsize=None)
+def get_odd_row_mask(layout: BitboardLayout) -> int:
+    """Cells on odd rows, counting rows from 1 at the bottom of the board
+    (i.e. even `row_num`s)."""
+    odd_row_mask = 0
+    for row_num in range(0, layout.num_rows, 2):
+        odd_row_mask |= layout.bottom_mask << row_num
+    return odd_row_mask & layout.board_mask
+
+
+def get_odd_threats(pieces: int, mask: int, layout: BitboardLayout) -> int:
+    """Threats of the player owning `pieces` on odd rows."""
+    return get_winning_cells(pieces, mask, layout) & get_odd_row_mask(layout)
+
+
+def get_even_threats(pieces: int, mask: int, layout: BitboardLayout) -> int:
+    """Threats of the player owning `pieces` on even rows."""
+    return get_winning_cells(pieces, mask, layout) & (
+        layout.board_mask & ~get_odd_row_mask(layout)
+    )
+
+
+def get_good_threats(
+    pieces: int,
+    mask: int,
+    layout: BitboardLayout,
+    is_player_1: bool
+) -> int:
+    """Threats whose row parity favors their owner: odd threats for Player
+    1, even threats for Player 2."""
+    if is_player_1:
+        return get_odd_threats(pieces, mask, layout)
+    return get_even_threats(pieces, mask, layout)
+
+
+def get_board_threats(board) -> dict:
+    """Threat masks of both players on a `Board`.
+
+    Returns:
+        (dict): keyed on player (1 or 2), with the player's "immediate",
+        "odd" and "even" threats as bitboards.
+    """
+    layout = get_layout(board.num_rows, board.num_columns)
+    player_1_pieces, player_2_pieces = board_to_bitboards(board)
+    mask = player_1_pieces | player_2_pieces
+    return {
+        player: {
+            "immediate": get_immediate_threats(pieces, mask, layout),
+            "odd": get_odd_threats(pieces, mask, layout),
+            "even": get_even_threats(pieces, mask, layout)
+        }
+        for player, pieces in ((1, player_1_pieces), (2, player_2_pieces))
+    }
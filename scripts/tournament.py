@@ -0,0 +1,556 @@
+"""Tournaments between computer opponents, with Elo ratings.
+
+Agents are named by spec strings:
+- the name of an opponent of `opponents.OPPONENT_REGISTRY`, e.g. a
+  difficulty level ("easy", "medium", "hard"), as in the game, but built
+  afresh for every game, seeded from the game's seed, searching by node
+  budget only and without a table kept between moves, so that its games
+  can be played again move for move;
+- "level:<n>": one of the `STRENGTH_LEVELS` of `strength.py`;
+- "alpha_beta:depth=<n>", "alpha_beta:time=<seconds>" or both, e.g.
+  "alpha_beta:depth=8,time=0.1": iterative deepening up to a depth, within
+  a time limit per move, or both.
+
+Every pairing of agents (all pairs for a round robin, the first agent
+against each of the others for a gauntlet) plays every opening twice, once
+with each agent moving first, so colors and openings are balanced. Openings
+come from an opening suite (see `openings.py`), generated on the fly unless
+one is loaded from a file. Games
+are played across a process pool, and every finished game is appended to a
+checkpoint file straight away: running the same tournament again skips the
+games already in the checkpoint, so an interrupted run picks up where it
+left off.
+
+Ratings are fitted to every game played (a Bradley-Terry model, where draws
+count as half a win for each side, with a few virtual draws per pairing as
+a prior, like BayesElo), with 95% confidence intervals from the curvature
+of the likelihood.
+
+Run `python tournament.py --help` for usage.
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from algos import SearchContext, iterative_deepening_search
+from bitboard import (
+    BitboardLayout, get_layout, get_playable_columns, has_n_in_a_row,
+    play_column
+)
+import constants
+from game_record import (
+    RESULT_DRAW, RESULT_PLAYER_1_WINS, RESULT_PLAYER_2_WINS
+)
+from openings import generate_opening_suite, load_opening_suite
+from opponents import OPPONENT_REGISTRY
+from strength import STRENGTH_LEVELS, choose_move
+
+SCHEDULES = ("round_robin", "gauntlet")
+
+DEFAULT_NUM_OPENINGS = 8
+# depth of "alpha_beta" agents that only set a time limit.
+MAX_SEARCH_DEPTH = constants.ROW_COUNT * constants.COLUMN_COUNT
+
+# virtual draws added to every pairing that played, so that an agent that
+# won every game still gets a finite rating.
+PRIOR_NUM_DRAWS = 2.0
+ELO_PER_NATURAL_UNIT = 400 / math.log(10)
+CONFIDENCE_Z = 1.96
+MAX_NUM_NEWTON_STEPS = 100
+
+# an agent picks a column given the pieces of the player to move and the
+# mask of all pieces on the board.
+Agent = Callable[[int, int, BitboardLayout, random.Random], int]
+
+
+class GameSpec(NamedTuple):
+    """One scheduled game."""
+    game_id: str
+    player_1: str
+    player_2: str
+    opening: Tuple[int, ...]
+    seed: int
+
+
+class GameResult(NamedTuple):
+    """Outcome of a game, as written to the checkpoint."""
+    game_id: str
+    player_1: str
+    player_2: str
+    # one of the result codes of `game_record.py`.
+    result: int
+    moves: List[int]
+    wall_seconds: float
+    cpu_seconds: float
+
+
+def parse_agent_spec(spec: str) -> Dict[str, object]:
+    """Parses an agent spec string (see the module docstring).
+
+    Raises:
+        ValueError: if the spec isn't a known agent.
+    """
+    if spec in OPPONENT_REGISTRY:
+        return {"kind": spec}
+    kind, _, params = spec.partition(":")
+    if kind == "level" and params.isdigit() and (
+        int(params) in STRENGTH_LEVELS
+    ):
+        return {"kind": kind, "level": int(params)}
+    if kind != "alpha_beta" or not params:
+        raise ValueError(
+            f"Unknown agent {spec!r}: expected one of "
+            f"{OPPONENT_REGISTRY.get_names()}, "
+            f"'level:<one of {sorted(STRENGTH_LEVELS)}>' or "
+            "'alpha_beta:depth=<n>,time=<seconds>'."
+        )
+    parsed = {"kind": kind, "depth": MAX_SEARCH_DEPTH, "time": None}
+    for param in params.split(","):
+        name, _, value = param.partition("=")
+        if name == "depth":
+            parsed["depth"] = int(value)
+        elif name == "time":
+            parsed["time"] = float(value)
+        else:
+            raise ValueError(f"Unknown parameter {name!r} in {spec!r}.")
+    return parsed
+
+
+def make_agent(spec: str, seed: Optional[int] = None) -> Agent:
+    """Builds the agent for a spec string.
+
+    Args:
+        seed (int | None): of the opponent of a registry agent, which
+        doesn't use the game's random number generator (see the module
+        docstring).
+    """
+    parsed = parse_agent_spec(spec)
+    if parsed["kind"] in OPPONENT_REGISTRY:
+        # imported here: self-play pulls in more than the engine.
+        from self_play import make_board_policy
+        return make_board_policy(OPPONENT_REGISTRY.build(
+            parsed["kind"], seed=seed, deterministic=True,
+            keeps_transposition_table=False
+        ))
+    if parsed["kind"] == "level":
+        strength_level = STRENGTH_LEVELS[parsed["level"]]
+
+        def level_agent(
+            current_pieces: int,
+            mask: int,
+            layout: BitboardLayout,
+            rng: random.Random
+        ) -> int:
+            return choose_move(
+                current_pieces, mask, layout, strength_level, rng=rng
+            )[0]
+
+        return level_agent
+
+    def alpha_beta_agent(
+        current_pieces: int,
+        mask: int,
+        layout: BitboardLayout,
+        rng: random.Random
+    ) -> int:
+        deadline = None
+        if parsed["time"] is not None:
+            deadline = time.perf_counter() + parsed["time"]
+        context = SearchContext(layout=layout, deadline=deadline)
+        best_col_num, _, _ = iterative_deepening_search(
+            current_pieces, mask, parsed["depth"], context
+        )
+        if best_col_num is None:
+            # out of time before the first iteration finished.
+            return get_playable_columns(mask, layout)[0]
+        return best_col_num
+
+    return alpha_beta_agent
+
+
+def schedule_games(
+    agent_specs: Sequence[str],
+    openings: Sequence[Tuple[int, ...]],
+    schedule: str = "round_robin",
+    num_rounds: int = 1,
+    seed: int = 0
+) -> List[GameSpec]:
+    """Every game of a tournament, interleaved so that a partial run still
+    covers every pairing."""
+    if schedule == "round_robin":
+        pairings = list(itertools.combinations(agent_specs, 2))
+    elif schedule == "gauntlet":
+        pairings = [
+            (agent_specs[0], opponent) for opponent in agent_specs[1:]
+        ]
+    else:
+        raise ValueError(
+            f"Unknown schedule {schedule!r}: expected one of {SCHEDULES}."
+        )
+
+    games = []
+    for round_num in range(num_rounds):
+        for opening_num, opening in enumerate(openings):
+            for agent_1, agent_2 in pairings:
+                for player_1, player_2 in ((agent_1, agent_2),
+                                           (agent_2, agent_1)):
+                    game_id = (
+                        f"{round_num}/{opening_num}/{player_1}/{player_2}"
+                    )
+                    games.append(GameSpec(
+                        game_id=game_id,
+                        player_1=player_1,
+                        player_2=player_2,
+                        opening=tuple(opening),
+                        seed=seed + len(games)
+                    ))
+    return games
+
+
+# agents are built once per worker process, except for registry agents,
+# which are built for every game.
+_AGENTS: Dict[str, Agent] = {}
+
+
+def play_game(game: GameSpec, layout: BitboardLayout) -> GameResult:
+    """Plays a scheduled game out from its opening."""
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    rng = random.Random(game.seed)
+    agents = []
+    for spec in (game.player_1, game.player_2):
+        if spec in OPPONENT_REGISTRY:
+            agents.append(make_agent(spec, seed=rng.getrandbits(64)))
+            continue
+        if spec not in _AGENTS:
+            _AGENTS[spec] = make_agent(spec)
+        agents.append(_AGENTS[spec])
+
+    current_pieces, mask = 0, 0
+    moves = []
+    result = RESULT_DRAW
+    while mask != layout.board_mask:
+        move_num = len(moves)
+        if move_num < len(game.opening):
+            col_num = game.opening[move_num]
+        else:
+            col_num = agents[move_num % 2](current_pieces, mask, layout, rng)
+        current_pieces, mask = play_column(
+            current_pieces, mask, col_num, layout
+        )
+        moves.append(col_num)
+        if has_n_in_a_row(current_pieces, layout):
+            result = (
+                RESULT_PLAYER_1_WINS if move_num % 2 == 0
+                else RESULT_PLAYER_2_WINS
+            )
+            break
+        current_pieces ^= mask
+
+    return GameResult(
+        game_id=game.game_id,
+        player_1=game.player_1,
+        player_2=game.player_2,
+        result=result,
+        moves=moves,
+        wall_seconds=time.perf_counter() - start_wall_time,
+        cpu_seconds=time.process_time() - start_cpu_time
+    )
+
+
+def _play_game_worker(
+    args: Tuple[GameSpec, BitboardLayout]
+) -> GameResult:
+    return play_game(*args)
+
+
+def _read_checkpoint(
+    path: str, config: Dict[str, object]
+) -> Tuple[List[GameResult], int]:
+    """Games already played by a tournament, from its checkpoint, and the
+    number of bytes of the checkpoint that they (and its header) take up.
+
+    A line that was cut off by an interruption ends the checkpoint: it,
+    and anything after it, is to be cut off before appending.
+    """
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, "rb") as checkpoint_file:
+        lines = checkpoint_file.read().split(b"\n")
+    # the text after the last newline, if any, was cut off.
+    lines = lines[:-1]
+    if not lines:
+        # empty, or cut off while writing the header: nothing was played.
+        return [], 0
+    try:
+        header = json.loads(lines[0])
+    except json.JSONDecodeError:
+        header = None
+    if not isinstance(header, dict) or "config" not in header:
+        raise ValueError(f"{path} isn't a tournament checkpoint.")
+    if header != {"config": config}:
+        raise ValueError(
+            f"{path} is the checkpoint of a different tournament."
+        )
+
+    results = []
+    num_bytes = len(lines[0]) + 1
+    for line in lines[1:]:
+        try:
+            results.append(GameResult(**json.loads(line)))
+        except (json.JSONDecodeError, TypeError):
+            break
+        num_bytes += len(line) + 1
+    return results, num_bytes
+
+
+def read_checkpoint(
+    path: str, config: Dict[str, object]
+) -> List[GameResult]:
+    """Games already played by a tournament, from its checkpoint, up to
+    any line cut off by an interruption.
+
+    Raises:
+        ValueError: if the file isn't a checkpoint, or is the checkpoint
+        of a tournament with a different config.
+    """
+    return _read_checkpoint(path, config)[0]
+
+
+def compute_ratings(
+    results: Sequence[GameResult],
+    prior_num_draws: float = PRIOR_NUM_DRAWS
+) -> Dict[str, Dict[str, float]]:
+    """Fits Elo ratings to game results (see the module docstring).
+
+    Ratings are relative, with a mean of 0.
+
+    Returns:
+        (Dict[str, Dict[str, float]]): per agent, its "elo", the half-width
+        of its 95% confidence interval ("elo_ci"), games played and score
+        (wins plus half the draws, as a fraction of games played).
+    """
+    names = sorted({
+        name for result in results
+        for name in (result.player_1, result.player_2)
+    })
+    if not names:
+        return {}
+    index = {name: i for i, name in enumerate(names)}
+    num_agents = len(names)
+    # num_games[i, j]: games between i and j; scores[i, j]: i's score.
+    num_games = np.zeros((num_agents, num_agents))
+    scores = np.zeros((num_agents, num_agents))
+    for result in results:
+        i, j = index[result.player_1], index[result.player_2]
+        score = {
+            RESULT_PLAYER_1_WINS: 1.0,
+            RESULT_PLAYER_2_WINS: 0.0,
+            RESULT_DRAW: 0.5
+        }[result.result]
+        num_games[i, j] += 1
+        num_games[j, i] += 1
+        scores[i, j] += score
+        scores[j, i] += 1 - score
+
+    played = num_games > 0
+    prior_num_games = num_games + prior_num_draws * played
+    prior_scores = scores + prior_num_draws / 2 * played
+
+    # Newton's method on the log-likelihood, in natural units.
+    strengths = np.zeros(num_agents)
+    for _ in range(MAX_NUM_NEWTON_STEPS):
+        win_probs = 1 / (1 + np.exp(strengths[None, :] - strengths[:, None]))
+        gradient = (prior_scores - prior_num_games * win_probs).sum(axis=1)
+        weights = prior_num_games * win_probs * (1 - win_probs)
+        # negative Hessian: a weighted graph Laplacian, which is singular
+        # (ratings are only defined up to a constant), hence `pinv`.
+        information = np.diag(weights.sum(axis=1)) - weights
+        covariance = np.linalg.pinv(information)
+        step = covariance @ gradient
+        strengths += step
+        strengths -= strengths.mean()
+        if np.abs(step).max() < 1e-9:
+            break
+
+    stds = np.sqrt(np.clip(np.diag(covariance), 0, None))
+    return {
+        name: {
+            "elo": strengths[i] * ELO_PER_NATURAL_UNIT,
+            "elo_ci": CONFIDENCE_Z * stds[i] * ELO_PER_NATURAL_UNIT,
+            "num_games": int(num_games[i].sum()),
+            "score": (
+                scores[i].sum() / num_games[i].sum()
+                if num_games[i].sum() else 0.0
+            )
+        }
+        for name, i in index.items()
+    }
+
+
+def run_tournament(
+    agent_specs: Sequence[str],
+    checkpoint_path: str,
+    schedule: str = "round_robin",
+    openings: Optional[Sequence[Tuple[int, ...]]] = None,
+    num_rounds: int = 1,
+    num_workers: int = os.cpu_count() or 1,
+    num_rows: int = constants.ROW_COUNT,
+    num_columns: int = constants.COLUMN_COUNT,
+    seed: int = 0
+) -> Dict[str, object]:
+    """Plays every game of a tournament that isn't in the checkpoint yet,
+    appending each finished game to the checkpoint.
+
+    Args:
+        openings (Sequence[Tuple[int, ...]] | None): moves to start every
+        game from; a suite of `DEFAULT_NUM_OPENINGS` openings if unset.
+
+    Returns:
+        (Dict[str, object]): the "ratings" (see `compute_ratings`), and
+        "num_games_played" (by this call), "elapsed_seconds",
+        "games_per_second" and "cpu_utilization" (CPU time spent playing
+        over the wall time available to the workers) for this call.
+    """
+    for spec in agent_specs:
+        parse_agent_spec(spec)
+    if len(set(agent_specs)) < 2:
+        raise ValueError("A tournament needs at least two agents.")
+    layout = get_layout(num_rows, num_columns)
+    if openings is None:
+        openings = generate_opening_suite(
+            DEFAULT_NUM_OPENINGS, layout=layout, seed=seed
+        )
+    games = schedule_games(
+        agent_specs, openings, schedule, num_rounds=num_rounds, seed=seed
+    )
+    config = {
+        "agents": list(agent_specs),
+        "schedule": schedule,
+        "openings": [list(opening) for opening in openings],
+        "num_rounds": num_rounds,
+        "num_rows": num_rows,
+        "num_columns": num_columns,
+        "seed": seed
+    }
+    results, num_valid_bytes = _read_checkpoint(checkpoint_path, config)
+    played_game_ids = {result.game_id for result in results}
+    pending_games = [
+        game for game in games if game.game_id not in played_game_ids
+    ]
+
+    if num_valid_bytes == 0:
+        with open(checkpoint_path, "w") as checkpoint_file:
+            checkpoint_file.write(json.dumps({"config": config}) + "\n")
+    elif os.path.getsize(checkpoint_path) > num_valid_bytes:
+        # cut off what an interruption left half-written, so that new games
+        # are appended after the last complete one.
+        os.truncate(checkpoint_path, num_valid_bytes)
+
+    start_time = time.perf_counter()
+    cpu_seconds = 0.0
+    num_games_played = 0
+    pool = (
+        multiprocessing.Pool(num_workers)
+        if num_workers > 1 and pending_games else None
+    )
+    try:
+        tasks = [(game, layout) for game in pending_games]
+        game_results = (
+            pool.imap_unordered(_play_game_worker, tasks) if pool
+            else map(_play_game_worker, tasks)
+        )
+        with open(checkpoint_path, "a") as checkpoint_file:
+            for result in game_results:
+                checkpoint_file.write(json.dumps(result._asdict()) + "\n")
+                checkpoint_file.flush()
+                results.append(result)
+                cpu_seconds += result.cpu_seconds
+                num_games_played += 1
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    elapsed_seconds = time.perf_counter() - start_time
+    return {
+        "ratings": compute_ratings(results),
+        "num_games_played": num_games_played,
+        "elapsed_seconds": elapsed_seconds,
+        "games_per_second": (
+            num_games_played / elapsed_seconds if elapsed_seconds else 0.0
+        ),
+        "cpu_utilization": (
+            cpu_seconds / (elapsed_seconds * max(num_workers, 1))
+            if elapsed_seconds else 0.0
+        )
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "agents", nargs="+",
+        help="agent specs, e.g. easy medium alpha_beta:depth=8,time=0.1"
+    )
+    parser.add_argument("--checkpoint", required=True)
+    parser.add_argument(
+        "--schedule", choices=SCHEDULES, default="round_robin",
+        help="gauntlet plays the first agent against each of the others"
+    )
+    parser.add_argument("--num-rounds", type=int, default=1)
+    parser.add_argument(
+        "--opening-suite",
+        help="game record file of openings (see openings.py); a suite of "
+        "--num-openings openings is generated if unset"
+    )
+    parser.add_argument(
+        "--num-openings", type=int, default=DEFAULT_NUM_OPENINGS
+    )
+    parser.add_argument("--num-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    layout = get_layout(constants.ROW_COUNT, constants.COLUMN_COUNT)
+    if args.opening_suite:
+        openings = load_opening_suite(args.opening_suite)
+    else:
+        openings = generate_opening_suite(
+            args.num_openings, layout=layout, seed=args.seed
+        )
+    stats = run_tournament(
+        args.agents,
+        checkpoint_path=args.checkpoint,
+        schedule=args.schedule,
+        openings=openings,
+        num_rounds=args.num_rounds,
+        num_workers=args.num_workers,
+        seed=args.seed
+    )
+
+    # imported here: the table printer lives with the benchmarks.
+    from benchmark import print_table
+    print_table([
+        {"agent": name, **rating}
+        for name, rating in sorted(
+            stats["ratings"].items(), key=lambda item: -item[1]["elo"]
+        )
+    ])
+    print(
+        f"{stats['num_games_played']} games in "
+        f"{stats['elapsed_seconds']:.1f} s: "
+        f"{stats['games_per_second']:.2f} games/s, "
+        f"{stats['cpu_utilization']:.0%} CPU utilization"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""Transposition tables for the alpha-beta search.
+
+Positions are keyed on `current_pieces + mask`, which is unique for every
+position (with the player to move) in the bitboard layout of
+`bitboard.py`.
+
+`TranspositionTable` is private to a process. `SharedTranspositionTable`
+lives in shared memory, so that every search process on a host (e.g.
+self-play workers) reads and adds to the same results.
+"""
+from multiprocessing import shared_memory
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+DEFAULT_MAX_NUM_ENTRIES = 1 << 18
+
+# layout of a shared table: a header, a row of stats per worker, then two
+# uint64s per slot.
+SHARED_TABLE_MAGIC = 0x43345454  # "C4TT"
+HEADER_SIZE = 4
+HEADER_MAGIC = 0
+HEADER_NUM_SLOTS = 1
+HEADER_MAX_NUM_WORKERS = 2
+DEFAULT_MAX_NUM_WORKERS = 256
+NUM_WORKER_STATS = 4
+STATS_HITS = 0
+STATS_MISSES = 1
+STATS_STORES = 2
+STATS_PID = 3
+
+# a slot's entry is packed into its second uint64 ("data"):
+# bits 0-15: score + SCORE_OFFSET, bits 16-23: depth, bits 24-25: flag,
+# bits 26-29: best column (NO_COLUMN if None), bit 63: set if occupied.
+SCORE_OFFSET = 1 << 15
+NO_COLUMN = 15
+OCCUPIED_BIT = 1 << 63
+# the first uint64 is the key XORed with the data, so that an entry torn by
+# two processes writing the slot at once never verifies against a key.
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+UINT64_MASK = (1 << 64) - 1
+
+# how a stored score relates to the true score of the position.
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TranspositionEntry(NamedTuple):
+    """Result of searching a position."""
+    depth: int
+    score: int
+    flag: int
+    best_col_num: Optional[int]
+
+
+def get_position_key(current_pieces: int, mask: int) -> int:
+    """Unique key of a position, with the player to move."""
+    return current_pieces + mask
+
+
+class TranspositionTable:
+    """Bounded table of search results, keyed on position.
+
+    When the table is full, the oldest entry is evicted to make room.
+    """
+
+    def __init__(self, max_num_entries: int = DEFAULT_MAX_NUM_ENTRIES):
+        self.max_num_entries = max_num_entries
+        self.entries = {}
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: int) -> Optional[TranspositionEntry]:
+        """Looks up a position, or returns None if it isn't stored."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.num_misses += 1
+        else:
+            self.num_hits += 1
+        return entry
+
+    def store(
+        self,
+        key: int,
+        depth: int,
+        score: int,
+        flag: int,
+        best_col_num: Optional[int]
+    ):
+        """Stores the result of searching a position.
+
+        An existing entry is only replaced by one searched at least as
+        deep.
+        """
+        existing_entry = self.entries.get(key)
+        if existing_entry is not None:
+            if existing_entry.depth > depth:
+                return
+        elif len(self.entries) >= self.max_num_entries:
+            # dicts keep insertion order, so the first key is the oldest.
+            del self.entries[next(iter(self.entries))]
+        self.entries[key] = TranspositionEntry(
+            depth, score, flag, best_col_num
+        )
+
+    def clear(self):
+        """Removes every entry and resets the stats."""
+        self.entries.clear()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def get_hit_rate(self) -> float:
+        """Fraction of lookups that found an entry."""
+        num_lookups = self.num_hits + self.num_misses
+        return self.num_hits / num_lookups if num_lookups else 0.0
+
+
+def pack_entry(
+    depth: int, score: int, flag: int, best_col_num: Optional[int]
+) -> int:
+    """Packs an entry into the data word of a shared table slot."""
+    return (
+        OCCUPIED_BIT
+        | (score + SCORE_OFFSET)
+        | depth << 16
+        | flag << 24
+        | (NO_COLUMN if best_col_num is None else best_col_num) << 26
+    )
+
+
+def unpack_entry(data: int) -> TranspositionEntry:
+    """Inverse of `pack_entry`."""
+    best_col_num = (data >> 26) & 0xF
+    return TranspositionEntry(
+        depth=(data >> 16) & 0xFF,
+        score=(data & 0xFFFF) - SCORE_OFFSET,
+        flag=(data >> 24) & 0x3,
+        best_col_num=None if best_col_num == NO_COLUMN else best_col_num
+    )
+
+
+class SharedTranspositionTable:
+    """Fixed-size table of search results in shared memory, that any number
+    of processes on the same host read and write at once, without locks.
+
+    Every slot is two uint64s: the packed entry ("data", see `pack_entry`)
+    and the key XORed with the data. A reader only accepts a slot if the
+    two XOR back to its key, so an entry torn by concurrent writes reads as
+    a miss, as in Lazy SMP. Each key maps to a single slot; a new entry
+    replaces whatever is there, except a deeper result for the same key.
+
+    Usable wherever a `TranspositionTable` is. The creating process owns
+    the shared memory:
+
+        table = SharedTranspositionTable.create(1 << 20)
+        # in worker processes started from here on:
+        worker_table = SharedTranspositionTable.attach(table.name, 1)
+        ...
+        worker_table.close()
+        # once every worker is done:
+        table.close()
+        table.unlink()
+
+    Workers should be started by the creating process (e.g. with
+    `multiprocessing`), so that they share its resource tracker and don't
+    destroy the table when they exit.
+
+    Hits, misses and stores are counted per worker, in the shared memory,
+    so that any process can read every worker's stats (see
+    `get_worker_stats`).
+    """
+
+    def __init__(
+        self,
+        shm: shared_memory.SharedMemory,
+        worker_num: int,
+        is_owner: bool
+    ):
+        self.shm = shm
+        self.is_owner = is_owner
+        header = np.ndarray((HEADER_SIZE,), dtype=np.uint64, buffer=shm.buf)
+        if int(header[HEADER_MAGIC]) != SHARED_TABLE_MAGIC:
+            shm.close()
+            raise ValueError(
+                f"{shm.name} isn't a shared transposition table."
+            )
+        num_slots = int(header[HEADER_NUM_SLOTS])
+        max_num_workers = int(header[HEADER_MAX_NUM_WORKERS])
+        if not 0 <= worker_num < max_num_workers:
+            shm.close()
+            raise ValueError(
+                f"Worker number {worker_num} isn't in "
+                f"[0, {max_num_workers})."
+            )
+        self.num_slot_bits = num_slots.bit_length() - 1
+        self.worker_num = worker_num
+        self.all_stats = np.ndarray(
+            (max_num_workers, NUM_WORKER_STATS), dtype=np.uint64,
+            buffer=shm.buf, offset=header.nbytes
+        )
+        self.stats = self.all_stats[worker_num]
+        self.slots = np.ndarray(
+            (num_slots, 2), dtype=np.uint64, buffer=shm.buf,
+            offset=header.nbytes + self.all_stats.nbytes
+        )
+        self.stats[STATS_PID] = os.getpid()
+
+    @classmethod
+    def create(
+        cls,
+        max_num_entries: int = DEFAULT_MAX_NUM_ENTRIES,
+        max_num_workers: int = DEFAULT_MAX_NUM_WORKERS,
+        name: Optional[str] = None
+    ) -> "SharedTranspositionTable":
+        """Allocates a new, empty table, with room for `max_num_entries`
+        (rounded up to a power of 2). The creator is worker 0."""
+        num_slots = 1 << max(max_num_entries - 1, 1).bit_length()
+        size = 8 * (
+            HEADER_SIZE + max_num_workers * NUM_WORKER_STATS + 2 * num_slots
+        )
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        # fresh shared memory is zeroed: every slot starts empty.
+        header = np.ndarray((HEADER_SIZE,), dtype=np.uint64, buffer=shm.buf)
+        header[HEADER_MAGIC] = SHARED_TABLE_MAGIC
+        header[HEADER_NUM_SLOTS] = num_slots
+        header[HEADER_MAX_NUM_WORKERS] = max_num_workers
+        del header
+        return cls(shm, worker_num=0, is_owner=True)
+
+    @classmethod
+    def attach(
+        cls, name: str, worker_num: int
+    ) -> "SharedTranspositionTable":
+        """Attaches to a table created by `create`, as worker `worker_num`
+        (which should be unique among the processes using the table).
+
+        Raises:
+            FileNotFoundError: if there is no table called `name`.
+            ValueError: if `name` isn't a table, or `worker_num` is out of
+            range.
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, worker_num=worker_num, is_owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def num_slots(self) -> int:
+        return len(self.slots)
+
+    @property
+    def num_hits(self) -> int:
+        return int(self.stats[STATS_HITS])
+
+    @property
+    def num_misses(self) -> int:
+        return int(self.stats[STATS_MISSES])
+
+    def _get_slot_num(self, key: int) -> int:
+        return ((key * HASH_MULTIPLIER) & UINT64_MASK) >> (
+            64 - self.num_slot_bits
+        )
+
+    def _read(self, slot_num: int, key: int) -> Optional[int]:
+        """The data of a slot, if it holds `key`."""
+        checked_key, data = self.slots[slot_num].tolist()
+        if data & OCCUPIED_BIT and checked_key ^ data == key:
+            return data
+        return None
+
+    def __len__(self):
+        """Number of occupied slots."""
+        return int(np.count_nonzero(self.slots[:, 1]))
+
+    def get(self, key: int) -> Optional[TranspositionEntry]:
+        """Looks up a position, or returns None if it isn't stored."""
+        data = self._read(self._get_slot_num(key), key)
+        if data is None:
+            self.stats[STATS_MISSES] += 1
+            return None
+        self.stats[STATS_HITS] += 1
+        return unpack_entry(data)
+
+    def store(
+        self,
+        key: int,
+        depth: int,
+        score: int,
+        flag: int,
+        best_col_num: Optional[int]
+    ):
+        """Stores the result of searching a position, unless the slot holds
+        a deeper result for the same position."""
+        slot_num = self._get_slot_num(key)
+        existing_data = self._read(slot_num, key)
+        if existing_data is not None and (existing_data >> 16) & 0xFF > depth:
+            return
+        data = pack_entry(depth, score, flag, best_col_num)
+        slot = self.slots[slot_num]
+        slot[1] = data
+        slot[0] = key ^ data
+        self.stats[STATS_STORES] += 1
+
+    def clear(self):
+        """Removes every entry, for every worker, and resets this worker's
+        stats."""
+        self.slots[:] = 0
+        self.stats[:STATS_PID] = 0
+
+    def get_hit_rate(self) -> float:
+        """Fraction of this worker's lookups that found an entry."""
+        num_lookups = self.num_hits + self.num_misses
+        return self.num_hits / num_lookups if num_lookups else 0.0
+
+    def get_worker_stats(self) -> List[Dict[str, float]]:
+        """Lookups, hits, stores and hit rate of every worker that has
+        used the table."""
+        worker_stats = []
+        for worker_num, stats in enumerate(self.all_stats.tolist()):
+            num_hits, num_misses, num_stores, pid = stats
+            if not pid:
+                continue
+            num_lookups = num_hits + num_misses
+            worker_stats.append({
+                "worker_num": worker_num,
+                "pid": pid,
+                "num_lookups": num_lookups,
+                "num_hits": num_hits,
+                "num_stores": num_stores,
+                "hit_rate": num_hits / num_lookups if num_lookups else 0.0
+            })
+        return worker_stats
+
+    def close(self):
+        """Detaches this process from the table. The table itself stays
+        until the owner unlinks it."""
+        # numpy views keep the buffer alive: drop them first.
+        self.all_stats = self.stats = self.slots = None
+        self.shm.close()
+
+    def unlink(self):
+        """Destroys the table, once every process has closed it. Only the
+        owner may unlink."""
+        if not self.is_owner:
+            raise ValueError(
+                "Only the process that created a table can unlink it."
+            )
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the table, and destroys it if this process owns it."""
+        self.close()
+        if self.is_owner:
+            self.unlink()
@@ -0,0 +1,212 @@
+"""Small convolutional value + policy network, with inference in pure NumPy.
+
+The network takes boards encoded as (2, num_rows, num_columns) planes (see
+`encode_board`) and returns, for every board in a batch, a logit per column
+(the policy) and a value in [-1, 1] from the point of view of the player to
+move. No deep learning framework or GPU is needed at runtime: weights are
+read from an uncompressed `.npz` file and memory-mapped, so loading is
+instant and several processes on the same machine share the same pages.
+
+Architecture:
+    input (N, 2, R, C)
+    -> conv 3x3, `num_filters`, ReLU
+    -> conv 3x3, `num_filters`, ReLU
+    -> dense `hidden_size`, ReLU
+    -> policy head: dense C (logits)
+    -> value head: dense 1, tanh
+"""
+import zipfile
+from typing import Dict, Tuple
+
+import numpy as np
+
+import constants
+
+WEIGHT_NAMES = (
+    "conv1_weight", "conv1_bias",
+    "conv2_weight", "conv2_bias",
+    "dense_weight", "dense_bias",
+    "policy_weight", "policy_bias",
+    "value_weight", "value_bias"
+)
+
+DEFAULT_NUM_FILTERS = 32
+DEFAULT_HIDDEN_SIZE = 128
+
+# size of a zip local file header, before the file name and extra field.
+ZIP_LOCAL_HEADER_SIZE = 30
+
+
+def init_random_weights(
+    num_rows: int = constants.ROW_COUNT,
+    num_columns: int = constants.COLUMN_COUNT,
+    num_filters: int = DEFAULT_NUM_FILTERS,
+    hidden_size: int = DEFAULT_HIDDEN_SIZE,
+    seed: int = 0
+) -> Dict[str, np.ndarray]:
+    """Randomly initialized (He-initialized) weights, e.g. as a starting
+    point for training or for benchmarking."""
+    rng = np.random.default_rng(seed)
+
+    def _he_normal(shape, fan_in):
+        return (
+            rng.standard_normal(shape) * np.sqrt(2.0 / fan_in)
+        ).astype(np.float32)
+
+    num_features = num_filters * num_rows * num_columns
+    return {
+        "conv1_weight": _he_normal((num_filters, 2, 3, 3), 2 * 9),
+        "conv1_bias": np.zeros(num_filters, dtype=np.float32),
+        "conv2_weight": _he_normal(
+            (num_filters, num_filters, 3, 3), num_filters * 9
+        ),
+        "conv2_bias": np.zeros(num_filters, dtype=np.float32),
+        "dense_weight": _he_normal((num_features, hidden_size), num_features),
+        "dense_bias": np.zeros(hidden_size, dtype=np.float32),
+        "policy_weight": _he_normal((hidden_size, num_columns), hidden_size),
+        "policy_bias": np.zeros(num_columns, dtype=np.float32),
+        "value_weight": _he_normal((hidden_size, 1), hidden_size),
+        "value_bias": np.zeros(1, dtype=np.float32)
+    }
+
+
+def save_weights(path: str, weights: Dict[str, np.ndarray]):
+    """Saves weights as an uncompressed `.npz`, so that they can be
+    memory-mapped by `load_weights`."""
+    np.savez(
+        path,
+        **{
+            name: np.ascontiguousarray(weights[name], dtype=np.float32)
+            for name in WEIGHT_NAMES
+        }
+    )
+
+
+def load_weights(path: str) -> Dict[str, np.ndarray]:
+    """Memory-maps every array stored in an uncompressed `.npz` file.
+
+    `numpy.load` ignores `mmap_mode` for `.npz` files, so this finds where
+    each `.npy` member starts inside the zip and maps it directly.
+    """
+    weights = {}
+    with zipfile.ZipFile(path) as zip_file, open(path, "rb") as file_obj:
+        for info in zip_file.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(
+                    f"{info.filename} in {path} is compressed and can't be "
+                    "memory-mapped. Save weights with `save_weights`."
+                )
+            # the local header's extra field can differ from the one in the
+            # central directory, so read its length from the local header.
+            file_obj.seek(info.header_offset + 26)
+            file_name_length, extra_length = np.frombuffer(
+                file_obj.read(4), dtype="<u2"
+            )
+            data_offset = (
+                info.header_offset + ZIP_LOCAL_HEADER_SIZE
+                + int(file_name_length) + int(extra_length)
+            )
+            file_obj.seek(data_offset)
+            version = np.lib.format.read_magic(file_obj)
+            if version == (1, 0):
+                read_array_header = np.lib.format.read_array_header_1_0
+            else:
+                read_array_header = np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_array_header(file_obj)
+            name = info.filename[:-len(".npy")]
+            # plain ndarray view over the memory map.
+            weights[name] = np.asarray(np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=file_obj.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C"
+            ))
+
+    missing_names = set(WEIGHT_NAMES) - set(weights)
+    if missing_names:
+        raise ValueError(
+            f"{path} is missing weights: {sorted(missing_names)}"
+        )
+    return weights
+
+
+def encode_board(board, player: int) -> np.ndarray:
+    """Encodes a `Board` as (2, num_rows, num_columns) uint8 planes, from the
+    point of view of `player` (plane 0 holds their pieces)."""
+    return np.stack(
+        [board.board == player, board.board == 3 - player]
+    ).astype(np.uint8)
+
+
+def _conv3x3_relu(
+    inputs: np.ndarray, weight: np.ndarray, bias: np.ndarray
+) -> np.ndarray:
+    """'Same'-padded 3x3 convolution followed by ReLU.
+
+    Implemented as a single matrix multiply over all 3x3 windows (im2col).
+    """
+    batch_size, num_channels, num_rows, num_columns = inputs.shape
+    padded = np.pad(inputs, ((0, 0), (0, 0), (1, 1), (1, 1)))
+    # (N, C, R, W, 3, 3) -> (N, R, W, C, 3, 3)
+    windows = np.lib.stride_tricks.sliding_window_view(
+        padded, (3, 3), axis=(2, 3)
+    ).transpose(0, 2, 3, 1, 4, 5)
+    columns = windows.reshape(
+        batch_size * num_rows * num_columns, num_channels * 9
+    )
+    outputs = columns @ weight.reshape(weight.shape[0], -1).T + bias
+    np.maximum(outputs, 0, out=outputs)
+    return outputs.reshape(
+        batch_size, num_rows, num_columns, weight.shape[0]
+    ).transpose(0, 3, 1, 2)
+
+
+class ValuePolicyNetwork:
+    """Value + policy network that runs on the CPU with NumPy."""
+
+    def __init__(self, weights: Dict[str, np.ndarray]):
+        self.weights = weights
+        self.num_columns = weights["policy_bias"].shape[0]
+
+    @classmethod
+    def from_file(cls, path: str) -> "ValuePolicyNetwork":
+        """Builds a network from memory-mapped weights."""
+        return cls(load_weights(path))
+
+    def forward(self, planes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Runs a batched forward pass.
+
+        Args:
+            planes (numpy.ndarray): (N, 2, num_rows, num_columns) boards.
+
+        Returns:
+            policy_logits (numpy.ndarray): (N, num_columns) logits.
+            values (numpy.ndarray): (N,) values in [-1, 1], from the point of
+            view of the player to move.
+        """
+        weights = self.weights
+        hidden = planes.astype(np.float32)
+        hidden = _conv3x3_relu(
+            hidden, weights["conv1_weight"], weights["conv1_bias"]
+        )
+        hidden = _conv3x3_relu(
+            hidden, weights["conv2_weight"], weights["conv2_bias"]
+        )
+        hidden = hidden.reshape(hidden.shape[0], -1)
+        hidden = hidden @ weights["dense_weight"] + weights["dense_bias"]
+        np.maximum(hidden, 0, out=hidden)
+
+        policy_logits = (
+            hidden @ weights["policy_weight"] + weights["policy_bias"]
+        )
+        values = np.tanh(
+            hidden @ weights["value_weight"] + weights["value_bias"]
+        )[:, 0]
+        return policy_logits, values
+
+    def evaluate(self, planes: np.ndarray) -> np.ndarray:
+        """Values of a batch of boards, from the point of view of the player
+        to move."""
+        return self.forward(planes)[1]